@@ -0,0 +1,305 @@
+"""
+Almacén compartido de datos de solo lectura para el Dashboard Jamundí Conectada
+Un cargador escribe una sola vez los DataFrames como archivos Arrow IPC sin
+compresión; todas las sesiones y procesos los abren por memory-map, de modo
+que las páginas del archivo se comparten en el caché del sistema operativo.
+Un sello de versión explícito (archivo VERSION) controla la invalidación.
+
+Varias particiones (p. ej. una por municipio) comparten el directorio: cada
+una tiene su propio sello (VERSION.<particion>) y su propio bloqueo de carga,
+de modo que publicar o recargar una no toca las demás.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from cache_figuras import huella_datos
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+DIRECTORIO_ALMACEN = os.environ.get(
+    'SIPID_DIR_ALMACEN', os.path.join(tempfile.gettempdir(), 'sipid_almacen')
+)
+VERSIONES_CONSERVADAS = 2
+
+_snapshots_abiertos = {}
+_lock_local = threading.Lock()
+
+# ============================================================================
+# VERSIÓN
+# ============================================================================
+
+def _archivo_version(particion: str = None) -> str:
+    """Nombre del sello de versión de una partición (None = partición única)"""
+    return 'VERSION' if particion is None else f'VERSION.{particion}'
+
+
+def leer_version(directorio: str = DIRECTORIO_ALMACEN, particion: str = None):
+    """
+    Lee el sello de versión vigente
+
+    Args:
+        directorio: Carpeta del almacén
+        particion: Partición (p. ej. 'm76364'); None = partición única
+
+    Returns:
+        Versión publicada o None si no hay snapshot
+    """
+    try:
+        with open(os.path.join(directorio, _archivo_version(particion)), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _versiones_vigentes(directorio: str) -> set:
+    """Versiones a las que apunta algún sello (de cualquier partición)"""
+    vigentes = set()
+    try:
+        entradas = list(os.scandir(directorio))
+    except FileNotFoundError:
+        return vigentes
+    for entrada in entradas:
+        if entrada.name == 'VERSION' or entrada.name.startswith('VERSION.'):
+            particion = entrada.name[len('VERSION.'):] or None
+            version = leer_version(directorio, particion)
+            if version:
+                vigentes.add(version)
+    return vigentes
+
+
+def invalidar(directorio: str = DIRECTORIO_ALMACEN, particion: str = None):
+    """Retira el sello de versión; el próximo asegurar_snapshot volverá a cargar"""
+    try:
+        os.remove(os.path.join(directorio, _archivo_version(particion)))
+    except FileNotFoundError:
+        pass
+
+# ============================================================================
+# ESCRITURA
+# ============================================================================
+
+def publicar_snapshot(tablas: dict, extras: dict = None, directorio: str = DIRECTORIO_ALMACEN,
+                      particion: str = None) -> str:
+    """
+    Escribe un snapshot y lo publica como versión vigente
+
+    La escritura se hace en una carpeta temporal que luego se renombra, y el
+    archivo VERSION se reemplaza de forma atómica: los lectores nunca ven un
+    snapshot a medio escribir.
+
+    Args:
+        tablas: Diccionario nombre -> DataFrame
+        extras: Diccionario nombre -> objeto serializable en JSON (p. ej. GeoJSON)
+        directorio: Carpeta del almacén
+        particion: Partición cuyo sello se actualiza (None = partición única)
+
+    Returns:
+        Versión publicada (huella del contenido)
+    """
+    extras = extras or {}
+    version = huella_datos((tablas, json.dumps(extras, sort_keys=True, default=str)))[:16]
+    destino = os.path.join(directorio, f'v_{version}')
+    os.makedirs(directorio, exist_ok=True)
+
+    if not os.path.isdir(destino):
+        temporal = tempfile.mkdtemp(prefix='.escribiendo_', dir=directorio)
+        for nombre, df in tablas.items():
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(os.path.join(temporal, f'{nombre}.arrow'), 'wb') as sink:
+                with pa.ipc.new_file(sink, tabla.schema) as escritor:
+                    escritor.write_table(tabla)
+        for nombre, obj in extras.items():
+            with open(os.path.join(temporal, f'{nombre}.json'), 'w', encoding='utf-8') as f:
+                json.dump(obj, f, ensure_ascii=False)
+        try:
+            os.rename(temporal, destino)
+        except OSError:
+            # Otro proceso publicó la misma versión mientras tanto
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    archivo_version = _archivo_version(particion)
+    temporal_version = os.path.join(directorio, f'.{archivo_version}.{os.getpid()}')
+    with open(temporal_version, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(temporal_version, os.path.join(directorio, archivo_version))
+
+    _limpiar_versiones_antiguas(directorio, version)
+    return version
+
+
+def _limpiar_versiones_antiguas(directorio: str, vigente: str):
+    """
+    Elimina snapshots viejos conservando los VERSIONES_CONSERVADAS más recientes
+
+    Nunca elimina una versión vigente de alguna partición.
+    """
+    protegidas = {f'v_{v}' for v in _versiones_vigentes(directorio) | {vigente}}
+    versiones = sorted(
+        (e for e in os.scandir(directorio) if e.is_dir() and e.name.startswith('v_')),
+        key=lambda e: e.stat().st_mtime,
+        reverse=True
+    )
+    for entrada in versiones[VERSIONES_CONSERVADAS:]:
+        if entrada.name not in protegidas:
+            # Los procesos que aún lo tengan mapeado conservan acceso (POSIX)
+            shutil.rmtree(entrada.path, ignore_errors=True)
+
+
+def _version_vigente(directorio: str, max_antiguedad_s: float = None, particion: str = None):
+    """Versión publicada si existe su carpeta y no supera la antigüedad máxima"""
+    version = leer_version(directorio, particion)
+    if not version or not os.path.isdir(os.path.join(directorio, f'v_{version}')):
+        return None
+    if max_antiguedad_s is not None:
+        antiguedad = time.time() - os.path.getmtime(os.path.join(directorio, _archivo_version(particion)))
+        if antiguedad > max_antiguedad_s:
+            return None
+    return version
+
+
+def asegurar_snapshot(cargador, directorio: str = DIRECTORIO_ALMACEN,
+                      max_antiguedad_s: float = None, particion: str = None) -> str:
+    """
+    Devuelve la versión vigente, ejecutando el cargador solo si no existe ninguna
+
+    Un bloqueo de archivo garantiza que, con varios procesos arrancando a la
+    vez, solo uno ejecute el cargador; los demás esperan y reutilizan su snapshot.
+    Si el cargador devuelve la tabla 'conectividad' vacía se lanza
+    RuntimeError y el sello anterior no se toca, así el siguiente intento
+    vuelve a consultar las fuentes.
+
+    Args:
+        cargador: Función sin argumentos que retorna (tablas, extras)
+        directorio: Carpeta del almacén
+        max_antiguedad_s: Si el sello es más antiguo, se vuelve a cargar
+        particion: Partición a asegurar (cada una con su propio bloqueo)
+
+    Returns:
+        Versión vigente
+    """
+    version = _version_vigente(directorio, max_antiguedad_s, particion)
+    if version:
+        return version
+
+    os.makedirs(directorio, exist_ok=True)
+    nombre_bloqueo = '.bloqueo' if particion is None else f'.bloqueo.{particion}'
+    with open(os.path.join(directorio, nombre_bloqueo), 'w') as bloqueo:
+        if fcntl is not None:
+            fcntl.flock(bloqueo, fcntl.LOCK_EX)
+        try:
+            version = _version_vigente(directorio, max_antiguedad_s, particion)
+            if version:
+                return version
+            tablas, extras = cargador()
+            # Una carga sin conectividad (API caída) no se publica: quedaría
+            # sellada como vigente para todos los procesos durante max_antiguedad_s
+            if 'conectividad' in tablas and tablas['conectividad'].empty:
+                raise RuntimeError('Las fuentes no devolvieron conectividad: no se publica un snapshot vacío')
+            return publicar_snapshot(tablas, extras, directorio, particion)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(bloqueo, fcntl.LOCK_UN)
+
+# ============================================================================
+# LECTURA
+# ============================================================================
+
+class Snapshot:
+    """Vista de solo lectura de una versión del almacén (tablas mapeadas en memoria)"""
+
+    def __init__(self, directorio: str, version: str):
+        self.version = version
+        self.ruta = os.path.join(directorio, f'v_{version}')
+        self._arrow = {}
+        self._pandas = {}
+        self._extras = {}
+        self._lock = threading.Lock()
+        self.abierto_en = time.time()
+
+    def como_arrow(self, nombre: str) -> pa.Table:
+        """
+        Tabla Arrow respaldada directamente por el archivo mapeado (sin copias)
+
+        Args:
+            nombre: Nombre de la tabla
+
+        Returns:
+            pyarrow.Table
+        """
+        with self._lock:
+            if nombre not in self._arrow:
+                origen = pa.memory_map(os.path.join(self.ruta, f'{nombre}.arrow'), 'r')
+                self._arrow[nombre] = pa.ipc.open_file(origen).read_all()
+            return self._arrow[nombre]
+
+    def como_pandas(self, nombre: str) -> pd.DataFrame:
+        """
+        DataFrame de la tabla, convertido una sola vez por proceso
+
+        Las columnas numéricas sin nulos quedan respaldadas por el archivo
+        mapeado (split_blocks evita consolidar y copiar). El resultado es
+        compartido: no debe modificarse en el lugar.
+
+        Args:
+            nombre: Nombre de la tabla
+
+        Returns:
+            DataFrame de solo lectura
+        """
+        tabla = self.como_arrow(nombre)
+        with self._lock:
+            if nombre not in self._pandas:
+                self._pandas[nombre] = tabla.to_pandas(split_blocks=True)
+            return self._pandas[nombre]
+
+    def extra(self, nombre: str):
+        """Objeto JSON adicional guardado con el snapshot (p. ej. el GeoJSON)"""
+        with self._lock:
+            if nombre not in self._extras:
+                ruta = os.path.join(self.ruta, f'{nombre}.json')
+                if os.path.exists(ruta):
+                    with open(ruta, 'r', encoding='utf-8') as f:
+                        self._extras[nombre] = json.load(f)
+                else:
+                    self._extras[nombre] = None
+            return self._extras[nombre]
+
+
+def abrir_snapshot(version: str = None, directorio: str = DIRECTORIO_ALMACEN,
+                   particion: str = None) -> Snapshot:
+    """
+    Abre (o reutiliza) el snapshot de una versión en este proceso
+
+    Args:
+        version: Versión a abrir; por defecto la vigente de la partición
+        directorio: Carpeta del almacén
+        particion: Partición de la que leer la versión vigente
+
+    Returns:
+        Snapshot compartido por todas las sesiones del proceso
+    """
+    version = version or leer_version(directorio, particion)
+    if version is None:
+        raise FileNotFoundError(f"No hay snapshot publicado en {directorio}")
+
+    with _lock_local:
+        snapshot = _snapshots_abiertos.get((directorio, version))
+        if snapshot is None:
+            snapshot = Snapshot(directorio, version)
+            # Se conservan solo las versiones vigentes de alguna partición
+            vigentes = _versiones_vigentes(directorio)
+            for clave in [k for k in _snapshots_abiertos if k[0] == directorio and k[1] not in vigentes]:
+                del _snapshots_abiertos[clave]
+            _snapshots_abiertos[(directorio, version)] = snapshot
+        return snapshot
@@ -0,0 +1,399 @@
+"""
+API JSON de solo lectura sobre el ranking y las alertas del SIPID
+Servidor HTTP asíncrono (asyncio, sin dependencias externas) con resultados
+precalculados en memoria, respuestas condicionales por ETag, paginación y filtros
+
+Uso:
+    python api_consultas.py --puerto 8600
+    python api_consultas.py --zonas zonas.parquet --puerto 8600
+    python api_consultas.py --municipio 76001 --puerto 8600
+
+Endpoints:
+    GET /salud                      Estado y versión de los datos
+    GET /zonas                      Zonas rankeadas (filtros: nivel, tipo, q, min_puntaje;
+                                    paginación: pagina, por_pagina)
+    GET /zonas/<nombre>             Detalle de una zona
+    GET /top?n=10                   Top N zonas por prioridad
+    GET /alertas                    Alertas (filtros: tipo, zona; paginación)
+    GET /reporte                    Resumen del ranking y de las alertas
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import sys
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+from almacen_compartido import DIRECTORIO_ALMACEN, abrir_snapshot, leer_version
+from data_processing import crear_datos_zonas_simulados
+from municipios import particion_municipio
+from ranking import calcular_puntaje_prioridad, obtener_top_zonas, generar_reporte_ranking
+from utils import generar_alertas, obtener_estadisticas_alertas
+from cache_figuras import huella_datos
+
+POR_PAGINA_DEFECTO = 50
+POR_PAGINA_MAX = 500
+MAX_RESPUESTAS_CACHEADAS = 4096
+MAX_CUERPO_DESCARTADO = 64 * 1024
+
+COLUMNAS_ZONA = [
+    'ranking', 'zona', 'tipo', 'poblacion', 'tiene_sede_educativa', 'sede_con_conexion',
+    'velocidad_promedio_mbps', 'penetracion_internet', 'densidad_poblacion',
+    'latitud', 'longitud', 'puntaje_prioridad', 'nivel_prioridad',
+    'componente_educacion', 'componente_poblacion', 'componente_conectividad'
+]
+
+ESTADOS_HTTP = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 500: 'Internal Server Error'
+}
+
+
+def _a_json(obj) -> bytes:
+    """Serializa a JSON (UTF-8) convirtiendo tipos de NumPy/pandas"""
+    def convertir(o):
+        if isinstance(o, np.integer):
+            return int(o)
+        if isinstance(o, np.floating):
+            return float(o)
+        if isinstance(o, np.bool_):
+            return bool(o)
+        return str(o)
+    return json.dumps(obj, ensure_ascii=False, default=convertir, separators=(',', ':')).encode('utf-8')
+
+# ============================================================================
+# RESULTADOS PRECALCULADOS
+# ============================================================================
+
+class ServicioConsultas:
+    """Ranking, alertas e índices precalculados para responder consultas en memoria"""
+
+    def __init__(self, df_zonas_ranked: pd.DataFrame):
+        self.cargar(df_zonas_ranked)
+
+    def cargar(self, df_zonas_ranked: pd.DataFrame):
+        """
+        Precalcula registros serializados, índices y alertas a partir del ranking
+
+        Args:
+            df_zonas_ranked: Zonas con puntajes calculados
+        """
+        columnas = [c for c in COLUMNAS_ZONA if c in df_zonas_ranked.columns]
+        df = df_zonas_ranked.sort_values(['ranking', 'zona'])[columnas].reset_index(drop=True)
+        df['nivel_prioridad'] = df['nivel_prioridad'].astype(str)
+        registros = df.to_dict('records')
+
+        alertas = generar_alertas(df_zonas_ranked)
+
+        estado = {
+            'version': huella_datos(df_zonas_ranked)[:16],
+            'registros': registros,
+            'zonas_json': [_a_json(r) for r in registros],
+            'posicion_por_nombre': {r['zona'].lower(): i for i, r in enumerate(registros)},
+            'nombres_minuscula': df['zona'].str.lower().to_numpy(),
+            'puntajes': df['puntaje_prioridad'].to_numpy(),
+            'por_nivel': {k: np.asarray(v) for k, v in df.groupby('nivel_prioridad').indices.items()},
+            'por_tipo': {k.lower(): np.asarray(v) for k, v in df.groupby('tipo').indices.items()},
+            'alertas': alertas,
+            'alertas_json': [_a_json(a) for a in alertas],
+            'reporte': _a_json({
+                'ranking': generar_reporte_ranking(df_zonas_ranked),
+                'alertas': obtener_estadisticas_alertas(alertas)
+            }),
+            'top': df_zonas_ranked
+        }
+        # Reemplazo atómico: las consultas en curso siguen usando el estado anterior
+        self._estado = estado
+        self._respuestas = OrderedDict()
+
+    @property
+    def version(self) -> str:
+        return self._estado['version']
+
+    # ------------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _paginar(posiciones, params):
+        """Obtiene la página solicitada de una lista de posiciones"""
+        pagina = max(int(params.get('pagina', 1)), 1)
+        por_pagina = min(max(int(params.get('por_pagina', POR_PAGINA_DEFECTO)), 1), POR_PAGINA_MAX)
+        inicio = (pagina - 1) * por_pagina
+        return posiciones[inicio:inicio + por_pagina], pagina, por_pagina
+
+    @staticmethod
+    def _cuerpo_pagina(elementos_json, total, pagina, por_pagina) -> bytes:
+        """Arma el cuerpo JSON de una página a partir de elementos ya serializados"""
+        cabecera = f'{{"total":{total},"pagina":{pagina},"por_pagina":{por_pagina},"datos":['
+        return cabecera.encode() + b','.join(elementos_json) + b']}'
+
+    def consultar_zonas(self, params: dict) -> bytes:
+        estado = self._estado
+        mascara = np.ones(len(estado['registros']), dtype=bool)
+
+        if 'nivel' in params:
+            sel = np.zeros_like(mascara)
+            for nivel in params['nivel'].split(','):
+                sel[estado['por_nivel'].get(nivel.strip().capitalize(), [])] = True
+            mascara &= sel
+        if 'tipo' in params:
+            sel = np.zeros_like(mascara)
+            sel[estado['por_tipo'].get(params['tipo'].lower(), [])] = True
+            mascara &= sel
+        if 'min_puntaje' in params:
+            mascara &= estado['puntajes'] >= float(params['min_puntaje'])
+        if 'q' in params:
+            q = params['q'].lower()
+            mascara &= np.fromiter((q in n for n in estado['nombres_minuscula']), bool, len(mascara))
+
+        posiciones = np.flatnonzero(mascara)
+        pagina_pos, pagina, por_pagina = self._paginar(posiciones, params)
+        return self._cuerpo_pagina(
+            [estado['zonas_json'][i] for i in pagina_pos], len(posiciones), pagina, por_pagina
+        )
+
+    def consultar_zona(self, nombre: str):
+        estado = self._estado
+        posicion = estado['posicion_por_nombre'].get(nombre.lower())
+        return None if posicion is None else estado['zonas_json'][posicion]
+
+    def consultar_top(self, params: dict) -> bytes:
+        n = min(max(int(params.get('n', 10)), 1), POR_PAGINA_MAX)
+        top = obtener_top_zonas(self._estado['top'], n)
+        estado = self._estado
+        return b'[' + b','.join(
+            estado['zonas_json'][estado['posicion_por_nombre'][z.lower()]] for z in top['zona']
+        ) + b']'
+
+    def consultar_alertas(self, params: dict) -> bytes:
+        estado = self._estado
+        posiciones = np.arange(len(estado['alertas']))
+        if 'tipo' in params:
+            tipos = {t.strip().upper() for t in params['tipo'].split(',')}
+            posiciones = [i for i in posiciones if estado['alertas'][i]['tipo'] in tipos]
+        if 'zona' in params:
+            zona = params['zona'].lower()
+            posiciones = [i for i in posiciones if estado['alertas'][i]['zona'].lower() == zona]
+
+        pagina_pos, pagina, por_pagina = self._paginar(list(posiciones), params)
+        return self._cuerpo_pagina(
+            [estado['alertas_json'][i] for i in pagina_pos], len(posiciones), pagina, por_pagina
+        )
+
+    # ------------------------------------------------------------------------
+    # Enrutamiento con caché de respuestas
+    # ------------------------------------------------------------------------
+
+    def responder(self, ruta: str, params: dict):
+        """
+        Resuelve una ruta GET y devuelve (estado HTTP, ETag, cuerpo)
+
+        Las respuestas se guardan por (ruta, parámetros) hasta que cambia la
+        versión de los datos, de modo que las consultas repetidas no recalculan.
+        """
+        clave = (ruta, tuple(sorted(params.items())))
+        respuestas = self._respuestas
+        cacheada = respuestas.get(clave)
+        if cacheada is not None:
+            respuestas.move_to_end(clave)
+            return cacheada
+
+        try:
+            cuerpo = self._resolver(ruta, params)
+        except (ValueError, TypeError) as e:
+            return 400, None, _a_json({'error': f'Parámetro inválido: {e}'})
+
+        if cuerpo is None:
+            return 404, None, _a_json({'error': f'No encontrado: {ruta}'})
+
+        etag = '"' + self.version + '-' + hashlib.blake2b(cuerpo, digest_size=6).hexdigest() + '"'
+        respuesta = (200, etag, cuerpo)
+        respuestas[clave] = respuesta
+        if len(respuestas) > MAX_RESPUESTAS_CACHEADAS:
+            respuestas.popitem(last=False)
+        return respuesta
+
+    def _resolver(self, ruta: str, params: dict):
+        partes = [unquote(p) for p in ruta.strip('/').split('/') if p]
+        if partes == ['salud']:
+            return _a_json({'estado': 'ok', 'version': self.version, 'zonas': len(self._estado['registros'])})
+        if partes == ['zonas']:
+            return self.consultar_zonas(params)
+        if len(partes) == 2 and partes[0] == 'zonas':
+            return self.consultar_zona(partes[1])
+        if partes == ['top']:
+            return self.consultar_top(params)
+        if partes == ['alertas']:
+            return self.consultar_alertas(params)
+        if partes == ['reporte']:
+            return self._estado['reporte']
+        return None
+
+# ============================================================================
+# SERVIDOR HTTP
+# ============================================================================
+
+def _respuesta_http(estado: int, cuerpo: bytes = b'', etag: str = None, mantener: bool = True) -> bytes:
+    cabeceras = [
+        f'HTTP/1.1 {estado} {ESTADOS_HTTP.get(estado, "")}',
+        'Content-Type: application/json; charset=utf-8',
+        f'Content-Length: {len(cuerpo)}',
+        'Cache-Control: no-cache',
+        'Access-Control-Allow-Origin: *',
+        f'Connection: {"keep-alive" if mantener else "close"}'
+    ]
+    if etag:
+        cabeceras.append(f'ETag: {etag}')
+    return ('\r\n'.join(cabeceras) + '\r\n\r\n').encode('latin-1') + cuerpo
+
+
+async def atender_conexion(servicio: ServicioConsultas, reader, writer):
+    """Atiende una conexión HTTP/1.1 con keep-alive"""
+    try:
+        while True:
+            try:
+                encabezado = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+
+            lineas = encabezado.decode('latin-1').split('\r\n')
+            try:
+                metodo, objetivo, version_http = lineas[0].split(' ', 2)
+            except ValueError:
+                writer.write(_respuesta_http(400, _a_json({'error': 'Solicitud inválida'}), mantener=False))
+                break
+
+            cabeceras = {}
+            for linea in lineas[1:]:
+                if ':' in linea:
+                    nombre, valor = linea.split(':', 1)
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+            mantener = (cabeceras.get('connection', '').lower() != 'close'
+                        and version_http.upper() == 'HTTP/1.1')
+
+            # La API no usa cuerpos, pero hay que consumirlos para que el siguiente
+            # pedido de la conexión empiece en su línea de solicitud
+            if 'transfer-encoding' in cabeceras:
+                mantener = False
+            elif 'content-length' in cabeceras:
+                try:
+                    longitud = int(cabeceras['content-length'])
+                except ValueError:
+                    longitud = -1
+                if 0 <= longitud <= MAX_CUERPO_DESCARTADO:
+                    try:
+                        await reader.readexactly(longitud)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+                else:
+                    mantener = False
+
+            if metodo not in ('GET', 'HEAD'):
+                writer.write(_respuesta_http(405, _a_json({'error': 'Solo lectura (GET)'}), mantener=mantener))
+            else:
+                url = urlsplit(objetivo)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                try:
+                    estado, etag, cuerpo = servicio.responder(url.path, params)
+                except Exception as e:
+                    # Un error inesperado responde 500 en vez de cortar la conexión
+                    print(f"❌ Error atendiendo {url.path}: {e!r}")
+                    estado, etag, cuerpo = 500, None, _a_json({'error': 'Error interno'})
+
+                if etag and cabeceras.get('if-none-match') == etag:
+                    writer.write(_respuesta_http(304, etag=etag, mantener=mantener))
+                else:
+                    respuesta = _respuesta_http(estado, cuerpo, etag, mantener)
+                    if metodo == 'HEAD':
+                        respuesta = respuesta[:len(respuesta) - len(cuerpo)]
+                    writer.write(respuesta)
+
+            await writer.drain()
+            if not mantener:
+                break
+    finally:
+        writer.close()
+        with contextlib.suppress(Exception):
+            await writer.wait_closed()
+
+
+async def iniciar_servidor(servicio: ServicioConsultas, host: str = '127.0.0.1', puerto: int = 8600):
+    """
+    Crea el servidor asíncrono
+
+    Returns:
+        Objeto asyncio.Server ya escuchando
+    """
+    return await asyncio.start_server(
+        lambda r, w: atender_conexion(servicio, r, w), host, puerto, backlog=1024
+    )
+
+
+def crear_servicio(ruta_zonas: str = None, cod_municipio: int = None,
+                   directorio: str = DIRECTORIO_ALMACEN) -> ServicioConsultas:
+    """
+    Construye el servicio de consultas
+
+    Sin ruta_zonas se sirve el ranking del snapshot compartido vigente del
+    municipio, el mismo que muestra el dashboard; si aún no hay snapshot
+    publicado se recurre a las zonas simuladas.
+
+    Args:
+        ruta_zonas: Snapshot de zonas (CSV/Parquet) a rankear
+        cod_municipio: Código DANE de la partición del almacén (por defecto el configurado)
+        directorio: Carpeta del almacén compartido
+
+    Returns:
+        ServicioConsultas listo para responder
+    """
+    if not ruta_zonas:
+        version = leer_version(directorio, particion_municipio(cod_municipio))
+        if version is not None:
+            return ServicioConsultas(abrir_snapshot(version, directorio).como_pandas('zonas_ranked'))
+        print(f"⚠️ No hay snapshot publicado en {directorio}: se usan zonas simuladas")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if ruta_zonas:
+            df_zonas = pd.read_parquet(ruta_zonas) if ruta_zonas.endswith('.parquet') else pd.read_csv(ruta_zonas)
+        else:
+            df_zonas = crear_datos_zonas_simulados()
+        return ServicioConsultas(calcular_puntaje_prioridad(df_zonas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='API de consultas del SIPID')
+    parser.add_argument('--zonas', help='Snapshot de zonas (CSV o Parquet)')
+    parser.add_argument('--municipio', type=int, default=None, metavar='COD',
+                        help='Código DANE cuyo snapshot compartido se sirve (sin --zonas)')
+    parser.add_argument('--directorio', default=DIRECTORIO_ALMACEN)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8600)
+    args = parser.parse_args()
+
+    servicio = crear_servicio(args.zonas, args.municipio, args.directorio)
+
+    try:
+        import uvloop  # opcional: bucle de eventos más rápido
+        uvloop.install()
+    except ImportError:
+        pass
+
+    async def principal():
+        servidor = await iniciar_servidor(servicio, args.host, args.puerto)
+        print(f"🌐 API SIPID en http://{args.host}:{args.puerto} (versión de datos {servicio.version})")
+        async with servidor:
+            await servidor.serve_forever()
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -5,26 +5,24 @@ Versión Avanzada con Polígonos, Alertas, Exportación PDF y Más
 
 Autor: Sistema de Análisis de Datos
 Fecha: 2025
-Tecnologías: Streamlit, Pandas, Plotly, GeoPandas
+Tecnologías: Streamlit, Pandas, Plotly
 """
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
+from pathlib import Path
 import json
+import os
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
 # Importar módulos personalizados
 from data_processing import (
-    consolidar_datos_jamundi,
-    crear_datos_zonas_simulados,
     obtener_estadisticas_generales
 )
 from ranking import (
-    calcular_puntaje_prioridad,
     obtener_top_zonas,
     generar_reporte_ranking,
     crear_tabla_ranking_display
@@ -34,7 +32,11 @@ from visualizations import (
     crear_grafico_evolucion_temporal,
     crear_grafico_proveedores,
     crear_grafico_segmentos,
-    crear_indicadores_kpi
+    crear_indicadores_kpi,
+    crear_mapa_marcadores_prioridad,
+    crear_grafico_pronostico_velocidad,
+    crear_grafico_concentracion_mercado,
+    crear_grafico_mezcla_tecnologica
 )
 from visualizations_advanced import (
     crear_grafico_evolucion_zona,
@@ -48,12 +50,42 @@ from visualizations_advanced import (
 from utils import (
     generar_alertas,
     obtener_estadisticas_alertas,
-    exportar_zona_a_pdf,
     buscar_zonas,
     obtener_sugerencias,
-    cargar_geojson_corregimientos,
     obtener_color_prioridad
 )
+from perfilado import (
+    PERFILADO_ACTIVO,
+    obtener_registro,
+    medir_etapa,
+    registrar_cache,
+    resumen_etapas,
+    latencia_por_ciclo,
+    exportar_json_lines,
+    exportar_prometheus
+)
+from cache_figuras import cache_figuras_global
+from almacen_compartido import DIRECTORIO_ALMACEN, abrir_snapshot, leer_version
+from indice_zonas import RegistroZonas
+from pronosticos import ajustar_pronosticos, META_VELOCIDAD_MBPS
+from series_zonas import construir_series_zonas
+from similitud_zonas import IndiceSimilitud
+from estadisticas_zonas import calcular_estadisticas_zonas
+from exportacion import FORMATOS_EXPORTACION, exportador
+from historial_zonas import HistorialZonas, ruta_historial
+from municipios import MUNICIPIOS_ACTIVOS, obtener_municipio, particion_municipio
+from consultas_sql import MOTOR_CONSULTAS, construir_motor, elegir_motor
+from concentracion_mercado import EJES_CUBO, construir_cubo_mercado
+from cola_trabajos import ColaTrabajos, ESTADOS_ACTIVOS
+from escenarios import Escenario, Intervencion, evaluar_escenarios, tabla_comparativa, rankings_lado_a_lado
+from precalentamiento import MAX_ANTIGUEDAD_DATOS_S, asegurar_municipio, obtener_precalentador
+from filtros_facetados import (
+    IndiceFacetado,
+    FACETAS_ZONAS,
+    RANGOS_ZONAS,
+    FACETAS_CONECTIVIDAD,
+    RANGOS_CONECTIVIDAD
+)
 
 # ============================================================================
 # CONFIGURACIÓN DE LA PÁGINA
@@ -185,21 +217,275 @@ st.markdown("""
 # CARGA DE DATOS (CON CACHÉ)
 # ============================================================================
 
-@st.cache_data
-def cargar_todos_los_datos():
-    """Carga todos los datos necesarios para el dashboard"""
-    df_conectividad = consolidar_datos_jamundi()
-    df_zonas = crear_datos_zonas_simulados()
-    df_zonas_ranked = calcular_puntaje_prioridad(df_zonas)
-    
-    # Cargar GeoJSON
-    geojson_data = cargar_geojson_corregimientos('/home/ubuntu/jamundi_conectada/corregimientos_jamundi.geojson')
-    
-    return df_conectividad, df_zonas_ranked, geojson_data
+# Las cachés por versión guardan la vigente y la anterior de cada municipio:
+# tras un refresco la versión vieja se desaloja en vez de quedar en memoria
+MAX_VERSIONES_CACHEADAS = 2 * len(MUNICIPIOS_ACTIVOS)
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def cargar_todos_los_datos(version):
+    """
+    Abre el snapshot compartido de una versión
+    
+    cache_resource entrega el mismo objeto a todas las sesiones (sin copias);
+    los DataFrames son de solo lectura y están mapeados desde el almacén.
+    """
+    snapshot = abrir_snapshot(version)
+    return (
+        snapshot.como_pandas('conectividad'),
+        snapshot.como_pandas('zonas_ranked'),
+        snapshot.extra('geojson')
+    )
+
+# Cada rerun es un ciclo del registro de métricas
+ciclo_actual = obtener_registro().iniciar_ciclo()
+inicio_rerun = time.perf_counter()
+st.session_state.ciclo_script = ciclo_actual
+
+# Municipio activo: cada uno vive en su propia partición del almacén, así que
+# cambiar de municipio solo cambia la versión con que se consultan las cachés
+if len(MUNICIPIOS_ACTIVOS) > 1:
+    cod_municipio = st.sidebar.selectbox(
+        "🏙️ Municipio",
+        options=MUNICIPIOS_ACTIVOS,
+        format_func=lambda cod: obtener_municipio(cod)['nombre'],
+        key='cod_municipio'
+    )
+else:
+    cod_municipio = MUNICIPIOS_ACTIVOS[0]
+municipio = obtener_municipio(cod_municipio)
 
 # Cargar datos
-with st.spinner('Cargando datos del proyecto Jamundí Conectada...'):
-    df_conectividad, df_zonas_ranked, geojson_data = cargar_todos_los_datos()
+fallos_datos_previos = obtener_registro().fallos_cache('datos')
+with st.spinner(f"Cargando datos del proyecto {municipio['nombre']} Conectada..."):
+    with medir_etapa('carga_datos') as etapa:
+        try:
+            version_datos = asegurar_municipio(cod_municipio, max_antiguedad_s=MAX_ANTIGUEDAD_DATOS_S)
+        except RuntimeError as e:
+            # Fuentes caídas: se sirve el último snapshot publicado aunque esté vencido
+            version_datos = leer_version(DIRECTORIO_ALMACEN, particion_municipio(cod_municipio))
+            if not version_datos:
+                st.error(f"❌ No se pudieron cargar los datos de {municipio['nombre']}: {e}")
+                st.stop()
+            st.warning(f"⚠️ No se pudieron actualizar los datos ({e}). Se muestran los últimos publicados.")
+        df_conectividad, df_zonas_ranked, geojson_data = cargar_todos_los_datos(version_datos)
+        etapa['filas_salida'] = len(df_conectividad)
+if obtener_registro().fallos_cache('datos') == fallos_datos_previos:
+    registrar_cache('datos', acierto=True)
+
+# ============================================================================
+# CÁLCULOS DERIVADOS (CACHEADOS POR VERSIÓN DE DATOS Y FILTROS)
+# ============================================================================
+# Cada función depende solo de sus argumentos: la versión del snapshot y los
+# filtros como tuplas ordenadas. Un rerun que no cambia los filtros (abrir el
+# panel de alertas, buscar una zona) reutiliza todos los resultados, y un
+# cambio de filtro recalcula solo el DataFrame filtrado y lo que depende de él.
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def registro_zonas(version):
+    """Registro de zonas con búsquedas O(1) por nombre/id (compartido entre sesiones)"""
+    return RegistroZonas(cargar_todos_los_datos(version)[1])
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def series_por_zona(version):
+    """Series de accesos por zona × periodo y por zona × tecnología (una vez por versión)"""
+    df_conectividad, df_zonas_ranked, _ = cargar_todos_los_datos(version)
+    return construir_series_zonas(df_conectividad, df_zonas_ranked)
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def estadisticas_catalogo(version):
+    """Media, extremos y percentiles por métrica y tipo de zona (una vez por versión)"""
+    return calcular_estadisticas_zonas(cargar_todos_los_datos(version)[1])
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def indices_facetados(version):
+    """Índices de bitmaps sobre zonas y conectividad (se construyen una vez por versión)"""
+    df_conectividad, df_zonas_ranked, _ = cargar_todos_los_datos(version)
+    return (
+        IndiceFacetado(df_zonas_ranked, FACETAS_ZONAS, RANGOS_ZONAS),
+        IndiceFacetado(df_conectividad, FACETAS_CONECTIVIDAD, RANGOS_CONECTIVIDAD)
+    )
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def motor_consultas(version):
+    """
+    Base SQL de la conectividad para gráficos y KPIs (None = agregados en pandas)
+    
+    Se activa con SIPID_MOTOR_CONSULTAS=auto|duckdb|sqlite. El archivo vive en
+    la carpeta del snapshot: lo construye un solo proceso por versión.
+    """
+    if MOTOR_CONSULTAS == 'pandas':
+        return None
+    motor = elegir_motor(MOTOR_CONSULTAS)
+    ruta = os.path.join(abrir_snapshot(version).ruta, f'conectividad.{motor}')
+    return construir_motor(cargar_todos_los_datos(version)[0], ruta, motor, huella=version)
+
+@st.cache_resource(max_entries=64)
+def seleccion_zonas(version, zonas, niveles):
+    """
+    Resultado del filtro de zonas: posiciones, conteos por faceta y DataFrame
+    
+    Args:
+        version: Versión del snapshot de datos
+        zonas: Tupla ordenada de zonas seleccionadas
+        niveles: Tupla ordenada de niveles de prioridad seleccionados (None = todos)
+    """
+    registrar_cache('derivados', acierto=False)
+    indice = indices_facetados(version)[0]
+    with medir_etapa('filtrado', filas_entrada=indice.n) as etapa:
+        resultado = indice.filtrar({'zona': zonas, 'nivel_prioridad': niveles})
+        etapa['filas_salida'] = len(resultado)
+    return resultado
+
+def filtrar_zonas(version, zonas, niveles):
+    """Zonas que cumplen los filtros (objeto compartido, no modificar)"""
+    return seleccion_zonas(version, zonas, niveles).df
+
+@st.cache_resource(max_entries=16)
+def indice_similitud(version, zonas, niveles):
+    """Índice de k vecinos sobre las zonas filtradas (comparación con zonas similares)"""
+    return IndiceSimilitud(filtrar_zonas(version, zonas, niveles))
+
+@st.cache_resource(max_entries=64)
+def filtrar_conectividad(version, zonas, facetas, rango_velocidad):
+    """
+    Registros de conectividad según las facetas de la pestaña de análisis
+    
+    Args:
+        version: Versión del snapshot de datos
+        zonas: Tupla de zonas (solo aplica si la conectividad trae la columna zona)
+        facetas: Tupla de pares (faceta, tupla de valores o None)
+        rango_velocidad: (mínimo, máximo) de velocidad de bajada; None = sin límite
+    """
+    registrar_cache('derivados', acierto=False)
+    indice = indices_facetados(version)[1]
+    filtros = dict(facetas)
+    if 'zona' in indice.facetas:
+        filtros['zona'] = zonas
+    rangos = {'velocidad_bajada': rango_velocidad} if rango_velocidad else None
+    return indice.filtrar(filtros, rangos)
+
+@st.cache_resource(max_entries=MAX_VERSIONES_CACHEADAS)
+def cubo_mercado(version):
+    """Cubo periodo × segmento × proveedor × tecnología de la conectividad (una vez por versión)"""
+    return construir_cubo_mercado(cargar_todos_los_datos(version)[0])
+
+@st.cache_data(max_entries=64)
+def metricas_mercado(version, zonas, facetas, rango_velocidad):
+    """
+    HHI, cuotas, rotación y mezcla tecnológica con los filtros de conectividad
+    
+    Si solo se filtra por proveedor, tecnología o segmento se recorta el cubo
+    de la versión; los demás filtros (periodo, zona, velocidad) construyen un
+    cubo con los registros filtrados.
+    """
+    registrar_cache('derivados', acierto=False)
+    filtros = {f: v for f, v in facetas if v}
+    recortable = (rango_velocidad is None and set(filtros) <= set(EJES_CUBO)
+                  and 'zona' not in indices_facetados(version)[1].facetas)
+    if recortable:
+        cubo = cubo_mercado(version).filtrar(filtros)
+    else:
+        cubo = construir_cubo_mercado(filtrar_conectividad(version, zonas, facetas, rango_velocidad).df)
+    return cubo.hhi(), cubo.cuotas(), cubo.rotacion(), cubo.mezcla_tecnologica()
+
+@st.cache_data(max_entries=64)
+def calcular_alertas(version, zonas, niveles):
+    """Alertas y sus estadísticas para una selección de filtros"""
+    registrar_cache('derivados', acierto=False)
+    alertas = generar_alertas(filtrar_zonas(version, zonas, niveles))
+    return alertas, obtener_estadisticas_alertas(alertas)
+
+@st.cache_data(max_entries=64)
+def calcular_kpis(version, zonas, niveles):
+    """KPIs para una selección de filtros (ceros si no hay zonas)"""
+    registrar_cache('derivados', acierto=False)
+    df_zonas_filtrado = filtrar_zonas(version, zonas, niveles)
+    if len(df_zonas_filtrado) > 0:
+        return crear_indicadores_kpi(df_zonas_filtrado, cargar_todos_los_datos(version)[0],
+                                     motor=motor_consultas(version))
+    return {
+        'poblacion_total': 0,
+        'zonas_totales': 0,
+        'zonas_alta_prioridad': 0,
+        'sedes_sin_conexion': 0,
+        'velocidad_promedio': 0,
+        'penetracion_promedio': 0,
+        'total_accesos': 0,
+        'num_proveedores': 0,
+        'num_tecnologias': 0
+    }
+
+@st.cache_data(max_entries=64)
+def tabla_ranking(version, zonas, niveles):
+    """Tabla de ranking formateada para la pestaña de análisis"""
+    df_zonas_filtrado = filtrar_zonas(version, zonas, niveles)
+    return crear_tabla_ranking_display(df_zonas_filtrado, len(df_zonas_filtrado))
+
+@st.cache_resource(max_entries=64)
+def tabla_explorador(version, zonas, niveles):
+    """Columnas renombradas del explorador de datos (objeto compartido, no modificar)"""
+    df_display_zonas = filtrar_zonas(version, zonas, niveles)[[
+        'ranking', 'zona', 'tipo', 'poblacion', 'velocidad_promedio_mbps',
+        'penetracion_internet', 'tiene_sede_educativa', 'sede_con_conexion',
+        'puntaje_prioridad', 'nivel_prioridad'
+    ]].copy()
+    df_display_zonas.columns = [
+        'Ranking', 'Zona', 'Tipo', 'Población', 'Velocidad (Mbps)',
+        'Penetración', 'Tiene Sede', 'Sede Conectada', 'Puntaje', 'Nivel'
+    ]
+    return df_display_zonas
+
+@st.cache_resource
+def historial_zonas(cod_municipio):
+    """Conexión al historial versionado de atributos de zonas de un municipio (compartida)"""
+    return HistorialZonas(ruta_historial(cod_municipio))
+
+@st.cache_data(max_entries=16)
+def ranking_historico(cod_municipio, fecha, revision):
+    """
+    Ranking a una fecha de corte y cambios de atributos desde entonces
+    
+    Args:
+        cod_municipio: Código DANE del municipio
+        fecha: Fecha de corte (ISO)
+        revision: Revisión del historial (invalida la caché al registrar cambios)
+    """
+    historial = historial_zonas(cod_municipio)
+    df_ranked = historial.ranking_as_of(fecha)
+    return crear_tabla_ranking_display(df_ranked, len(df_ranked)), historial.diferencias(fecha)
+
+@st.cache_data(max_entries=16)
+def simular_escenarios(version, definiciones):
+    """
+    Evalúa los escenarios del simulador contra el catálogo completo
+    
+    Args:
+        version: Versión del snapshot de datos
+        definiciones: Tupla de (nombre, zonas, conectar_sedes, velocidad_minima)
+    """
+    registrar_cache('derivados', acierto=False)
+    escenarios = []
+    for nombre, zonas, conectar_sedes, velocidad_minima in definiciones:
+        cambios = {}
+        if conectar_sedes:
+            cambios['sede_con_conexion'] = True
+        if velocidad_minima > 0:
+            cambios['velocidad_promedio_mbps'] = ('minimo', velocidad_minima)
+        escenarios.append(Escenario(nombre, [Intervencion(zonas, cambios)] if cambios else []))
+    return evaluar_escenarios(cargar_todos_los_datos(version)[1], escenarios)
+
+@st.cache_resource
+def cola_trabajos():
+    """Cola de trabajos en segundo plano del proceso (PDF, ranking completo, refresco)"""
+    return ColaTrabajos()
+
+def encolar_trabajo(tipo, argumentos, clave=None, descripcion=None):
+    """Encola un trabajo y lo asocia a la sesión para mostrar su avance en la barra lateral"""
+    id_trabajo = cola_trabajos().encolar(tipo, argumentos, clave=clave)
+    trabajos = st.session_state.setdefault('trabajos', {})
+    trabajos.pop(id_trabajo, None)
+    trabajos[id_trabajo] = descripcion or tipo
+    return id_trabajo
 
 # ============================================================================
 # ESTADO DE LA SESIÓN
@@ -208,6 +494,14 @@ with st.spinner('Cargando datos del proyecto Jamundí Conectada...'):
 if 'zona_seleccionada' not in st.session_state:
     st.session_state.zona_seleccionada = None
 
+# Los filtros de zonas pertenecen a un municipio: al cambiarlo se reinician
+if st.session_state.get('municipio_filtros') != cod_municipio:
+    st.session_state.municipio_filtros = cod_municipio
+    st.session_state.zona_seleccionada = None
+    st.session_state.pop('zonas_seleccionadas', None)
+    for clave in [c for c in st.session_state if c.startswith(('faceta_', 'escenario_'))]:
+        del st.session_state[clave]
+
 if 'mostrar_panel_alertas' not in st.session_state:
     st.session_state.mostrar_panel_alertas = False
 
@@ -216,7 +510,7 @@ if 'mostrar_panel_alertas' not in st.session_state:
 # ============================================================================
 
 # Título centrado sin versión
-st.markdown('<div class="main-header">🌐 Jamundí Conectada</div>', unsafe_allow_html=True)
+st.markdown(f'<div class="main-header">🌐 {municipio["nombre"]} Conectada</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Sistema Inteligente de Priorización de Infraestructura Digital (SIPID)</div>', unsafe_allow_html=True)
 
 # ============================================================================
@@ -278,23 +572,13 @@ with st.sidebar.expander("📍 Filtrar por Zonas/Corregimientos", expanded=False
     if 'zonas_seleccionadas' not in st.session_state:
         st.session_state.zonas_seleccionadas = df_zonas_ranked['zona'].tolist()
     
-    # Crear checkboxes para cada zona
+    # Crear checkboxes para cada zona (icono precalculado en el registro de zonas)
     zonas_temp = []
-    for zona in sorted(df_zonas_ranked['zona'].unique()):
-        zona_info = df_zonas_ranked[df_zonas_ranked['zona'] == zona].iloc[0]
-        nivel = zona_info['nivel_prioridad']
-        
-        # Icono según nivel de prioridad
-        if nivel == 'Alta':
-            icono = "🔴"
-        elif nivel == 'Media':
-            icono = "🟠"
-        else:
-            icono = "🟢"
-        
+    seleccion_previa = set(st.session_state.zonas_seleccionadas)
+    for zona, icono in registro_zonas(version_datos).opciones():
         checkbox_value = st.checkbox(
             f"{icono} {zona}",
-            value=zona in st.session_state.zonas_seleccionadas,
+            value=zona in seleccion_previa,
             key=f"zona_v3_{zona}"
         )
         
@@ -314,10 +598,15 @@ with st.sidebar.expander("🎯 Filtrar por Nivel de Prioridad", expanded=False):
     if 'niveles_seleccionados' not in st.session_state:
         st.session_state.niveles_seleccionados = ['Alta', 'Media', 'Baja']
     
+    # Zonas por nivel dentro de la selección de zonas (conteo facetado)
+    conteos_niveles = seleccion_zonas(
+        version_datos, tuple(sorted(st.session_state.zonas_seleccionadas)), None
+    ).conteos.get('nivel_prioridad', {})
+    
     niveles_temp = []
     
     nivel_alta = st.checkbox(
-        "🔴 Alta Prioridad",
+        f"🔴 Alta Prioridad ({conteos_niveles.get('Alta', 0)})",
         value='Alta' in st.session_state.niveles_seleccionados,
         key="nivel_alta_v3"
     )
@@ -325,7 +614,7 @@ with st.sidebar.expander("🎯 Filtrar por Nivel de Prioridad", expanded=False):
         niveles_temp.append('Alta')
     
     nivel_media = st.checkbox(
-        "🟠 Media Prioridad",
+        f"🟠 Media Prioridad ({conteos_niveles.get('Media', 0)})",
         value='Media' in st.session_state.niveles_seleccionados,
         key="nivel_media_v3"
     )
@@ -333,7 +622,7 @@ with st.sidebar.expander("🎯 Filtrar por Nivel de Prioridad", expanded=False):
         niveles_temp.append('Media')
     
     nivel_baja = st.checkbox(
-        "🟢 Baja Prioridad",
+        f"🟢 Baja Prioridad ({conteos_niveles.get('Baja', 0)})",
         value='Baja' in st.session_state.niveles_seleccionados,
         key="nivel_baja_v3"
     )
@@ -355,31 +644,18 @@ st.sidebar.markdown(f"""
 # APLICAR FILTROS A LOS DATOS
 # ============================================================================
 
-# Filtrar zonas según selección
-df_zonas_filtrado = df_zonas_ranked[
-    (df_zonas_ranked['zona'].isin(st.session_state.zonas_seleccionadas)) &
-    (df_zonas_ranked['nivel_prioridad'].isin(st.session_state.niveles_seleccionados))
-].copy()
-
-# Generar alertas
-alertas = generar_alertas(df_zonas_filtrado)
-stats_alertas = obtener_estadisticas_alertas(alertas)
+# Clave de los cálculos derivados: tuplas ordenadas (hashables y estables)
+filtros_activos = (
+    tuple(sorted(st.session_state.zonas_seleccionadas)),
+    tuple(sorted(st.session_state.niveles_seleccionados))
+)
 
-# Recalcular KPIs con datos filtrados
-if len(df_zonas_filtrado) > 0:
-    kpis = crear_indicadores_kpi(df_zonas_filtrado, df_conectividad)
-else:
-    kpis = {
-        'poblacion_total': 0,
-        'zonas_totales': 0,
-        'zonas_alta_prioridad': 0,
-        'sedes_sin_conexion': 0,
-        'velocidad_promedio': 0,
-        'penetracion_promedio': 0,
-        'total_accesos': 0,
-        'num_proveedores': 0,
-        'num_tecnologias': 0
-    }
+fallos_derivados_previos = obtener_registro().fallos_cache('derivados')
+df_zonas_filtrado = filtrar_zonas(version_datos, *filtros_activos)
+alertas, stats_alertas = calcular_alertas(version_datos, *filtros_activos)
+kpis = calcular_kpis(version_datos, *filtros_activos)
+if obtener_registro().fallos_cache('derivados') == fallos_derivados_previos:
+    registrar_cache('derivados', acierto=True)
 
 # ============================================================================
 # PANEL DE ALERTAS (OPCIONAL)
@@ -467,6 +743,8 @@ if len(df_zonas_filtrado) > 0:
             delta_color="inverse" if stats_alertas['criticas'] > 0 else "off",
             help="Total de alertas activas"
         )
+elif len(df_zonas_ranked) == 0:
+    st.info(f"ℹ️ Los indicadores por zona no están disponibles para {municipio['nombre']}.")
 else:
     st.warning("⚠️ No hay zonas seleccionadas. Por favor, activa al menos un filtro.")
 
@@ -476,248 +754,389 @@ st.markdown("---")
 # PESTAÑAS PRINCIPALES
 # ============================================================================
 
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🗺️ Mapa Interactivo",
     "📈 Análisis Detallado",
     "📄 Información del Proyecto",
-    "🔍 Explorador de Datos"
+    "🔍 Explorador de Datos",
+    "🧪 Escenarios"
 ])
 
 # ============================================================================
 # PESTAÑA 1: MAPA INTERACTIVO CON PANEL LATERAL EXPANDIDO
 # ============================================================================
 
-with tab1:
-    if len(df_zonas_filtrado) > 0:
-        st.header("🗺️ Mapa Interactivo de Prioridades")
-        
-        # Crear dos columnas: mapa (65%) y panel lateral (35%)
-        col_mapa, col_panel = st.columns([65, 35])
-        
-        with col_mapa:
-            st.subheader("Mapa con Polígonos de Corregimientos")
-            
-            # Crear mapa con Plotly
-            fig_mapa = go.Figure()
+def abrir_ciclo_fragmento(nombre):
+    """
+    Abre un ciclo de métricas nuevo si el fragmento se ejecuta por su cuenta
+    
+    En un rerun completo el fragmento comparte el ciclo del script; si vuelve
+    a ejecutarse en el mismo ciclo es un rerun parcial, una interacción propia.
+    """
+    clave = f'ciclo_fragmento_{nombre}'
+    if st.session_state.get(clave) == st.session_state.ciclo_script:
+        st.session_state.ciclo_script = obtener_registro().iniciar_ciclo()
+    st.session_state[clave] = st.session_state.ciclo_script
+
+
+@st.fragment
+def seccion_mapa(version, zonas, niveles, cod_municipio):
+    """
+    Pestaña del mapa y del detalle de zona como fragmento
+    
+    Elegir otra zona en el selector (o exportar su PDF) vuelve a ejecutar solo
+    esta función, no toda la página. Los datos se obtienen de las cachés por
+    versión y filtros, así que un rerun parcial no recalcula nada compartido.
+    """
+    abrir_ciclo_fragmento('mapa')
+    
+    df_zonas_filtrado = filtrar_zonas(version, zonas, niveles)
+    registro = registro_zonas(version)
+    mascara_filtro = registro.mascara(zonas, niveles)
+    
+    with medir_etapa('fragmento_mapa', filas_entrada=len(df_zonas_filtrado)):
+        if len(df_zonas_filtrado) > 0:
+            st.header("🗺️ Mapa Interactivo de Prioridades")
             
-            # Polígonos desactivados - Solo mostrar puntos geográficos
-            # (Los datos de GeoJSON se mantienen para uso futuro)
+            # Crear dos columnas: mapa (65%) y panel lateral (35%)
+            col_mapa, col_panel = st.columns([65, 35])
             
-            # Añadir puntos de calor por zona
-            for idx, row in df_zonas_filtrado.iterrows():
-                # Color según nivel de prioridad
-                if row['nivel_prioridad'] == 'Alta':
-                    color = '#d62728'
-                    size = 25
-                elif row['nivel_prioridad'] == 'Media':
-                    color = '#ff7f0e'
-                    size = 20
-                else:
-                    color = '#2ca02c'
-                    size = 15
+            with col_mapa:
+                st.subheader("Mapa con Polígonos de Corregimientos")
                 
-                # Añadir marcador
-                fig_mapa.add_trace(go.Scattermapbox(
-                    lat=[row['latitud']],
-                    lon=[row['longitud']],
-                    mode='markers',
-                    marker=dict(
-                        size=size,
-                        color=color,
-                        opacity=0.8
-                    ),
-                    text=row['zona'],
-                    name=row['zona'],
-                    customdata=[[
-                        row['zona'],
-                        row['poblacion'],
-                        row['velocidad_promedio_mbps'],
-                        row['puntaje_prioridad'],
-                        row['nivel_prioridad'],
-                        row['ranking']
-                    ]],
-                    hovertemplate="<b>%{customdata[0]}</b><br>" +
-                                  "Población: %{customdata[1]:,}<br>" +
-                                  "Velocidad: %{customdata[2]:.2f} Mbps<br>" +
-                                  "Puntaje: %{customdata[3]:.3f}<br>" +
-                                  "Nivel: %{customdata[4]}<br>" +
-                                  "Ranking: #%{customdata[5]}<br>" +
-                                  "<extra></extra>",
-                    showlegend=False
-                ))
-            
-            # Configurar el mapa
-            fig_mapa.update_layout(
-                mapbox=dict(
-                    style='open-street-map',
-                    center=dict(lat=3.28, lon=-76.58),
-                    zoom=10
-                ),
-                height=600,
-                margin={"r": 0, "t": 0, "l": 0, "b": 0},
-                showlegend=False,
-                hovermode='closest'
-            )
-            
-            # Mostrar mapa
-            st.plotly_chart(fig_mapa, use_container_width=True, key="mapa_principal_v3")
-            
-            # Selector manual de zona
-            st.markdown("**Selecciona un corregimiento para ver detalles:**")
-            zona_seleccionada_manual = st.selectbox(
-                "Zona:",
-                options=df_zonas_filtrado['zona'].tolist(),
-                index=0,
-                key="selector_zona_manual_v3"
-            )
+                with medir_etapa('mapa', filas_entrada=len(df_zonas_filtrado)):
+                    # Polígonos desactivados - Solo mostrar puntos geográficos
+                    # (Los datos de GeoJSON se mantienen para uso futuro)
+                    fig_mapa = crear_mapa_marcadores_prioridad(df_zonas_filtrado, cod_municipio=cod_municipio)
+                
+                # Mostrar mapa
+                st.plotly_chart(fig_mapa, use_container_width=True, key="mapa_principal_v3")
+                
+                # Selector manual de zona
+                st.markdown("**Selecciona un corregimiento para ver detalles:**")
+                zona_seleccionada_manual = st.selectbox(
+                    "Zona:",
+                    options=df_zonas_filtrado['zona'].tolist(),
+                    index=0,
+                    key="selector_zona_manual_v3"
+                )
+                
+                if zona_seleccionada_manual:
+                    st.session_state.zona_seleccionada = zona_seleccionada_manual
             
-            if zona_seleccionada_manual:
-                st.session_state.zona_seleccionada = zona_seleccionada_manual
-        
-        with col_panel:
-            st.subheader("📊 Panel de Información Detallada")
+            # Búsqueda O(1) en el registro y en la máscara de la selección actual
+            id_zona = registro.id_zona(st.session_state.zona_seleccionada)
+            zona_en_filtro = id_zona is not None and bool(mascara_filtro[id_zona])
             
-            if st.session_state.zona_seleccionada:
-                zona_data = df_zonas_filtrado[
-                    df_zonas_filtrado['zona'] == st.session_state.zona_seleccionada
-                ].iloc[0]
+            with col_panel:
+                st.subheader("📊 Panel de Información Detallada")
                 
-                # Título de la zona con botón de exportación
-                nivel = zona_data['nivel_prioridad']
-                if nivel == 'Alta':
-                    badge_class = "priority-badge-alta"
-                elif nivel == 'Media':
-                    badge_class = "priority-badge-media"
+                if zona_en_filtro:
+                    zona_data = registro.fila(st.session_state.zona_seleccionada)
+                    info_zona = registro.info(st.session_state.zona_seleccionada)
+                    
+                    # Título de la zona con botón de exportación
+                    nivel = info_zona['nivel']
+                    badge_class = info_zona['badge']
+                    
+                    st.markdown(f"""
+                    <div class="zona-card">
+                        <h3 style="color: #000;">{zona_data['zona']}</h3>
+                        <span class="{badge_class}">{nivel}</span>
+                        <p style="margin-top: 10px; color: #000; font-weight: 500;">Ranking: #{int(zona_data['ranking'])}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Exportación a PDF en segundo plano: la descarga aparece en la barra lateral
+                    if st.button("📥 Exportar a PDF", use_container_width=True, key="btn_exportar_pdf"):
+                        encolar_trabajo(
+                            'pdf_zona', {'zona': zona_data.to_dict(), 'cod_municipio': cod_municipio,
+                                         'version': version},
+                            clave=(version, zona_data['zona']), descripcion=f"PDF {zona_data['zona']}"
+                        )
+                        st.toast("⏳ Generando el PDF; la descarga aparecerá en Trabajos en Segundo Plano.")
+                        # El panel de trabajos se arma solo en ejecuciones completas, no en este fragmento
+                        st.rerun(scope="app")
+                    
+                    st.markdown("---")
+                    
+                    # Métricas principales
+                    st.markdown("### 📈 Métricas Principales")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("👥 Población", f"{int(zona_data['poblacion']):,}")
+                        st.metric("⚡ Velocidad", f"{zona_data['velocidad_promedio_mbps']:.1f} Mbps")
+                    with col2:
+                        st.metric("🎯 Puntaje", f"{zona_data['puntaje_prioridad']:.3f}")
+                        st.metric("📡 Penetración", f"{zona_data['penetracion_internet']*100:.1f}%")
+                    
                 else:
-                    badge_class = "priority-badge-baja"
+                    st.info("👆 Selecciona un corregimiento en el mapa o en el selector para ver información detallada.")
+            
+            # Gráficos en sección amplia (fuera del col_panel)
+            if zona_en_filtro:
+                zona_data = registro.fila(st.session_state.zona_seleccionada)
                 
-                st.markdown(f"""
-                <div class="zona-card">
-                    <h3 style="color: #000;">{zona_data['zona']}</h3>
-                    <span class="{badge_class}">{nivel}</span>
-                    <p style="margin-top: 10px; color: #000; font-weight: 500;">Ranking: #{int(zona_data['ranking'])}</p>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown("---")
+                st.markdown(f"### 📈 Análisis Detallado: {st.session_state.zona_seleccionada}")
                 
-                # Botón de exportación a PDF
-                if st.button("📥 Exportar a PDF", use_container_width=True, key="btn_exportar_pdf"):
-                    ruta_pdf = f"/home/ubuntu/reporte_{zona_data['zona'].replace(' ', '_')}.pdf"
-                    if exportar_zona_a_pdf(zona_data, ruta_pdf):
-                        with open(ruta_pdf, "rb") as pdf_file:
-                            st.download_button(
-                                label="⬇️ Descargar PDF",
-                                data=pdf_file,
-                                file_name=f"reporte_{zona_data['zona'].replace(' ', '_')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                        st.success("✅ PDF generado correctamente")
-                    else:
-                        st.error("❌ Error al generar PDF")
+                # Tabs para organizar gráficos en espacio amplio
+                tab_graficos = st.tabs(["📊 Componentes", "📈 Evolución", "🎯 Comparación", "🔧 Tecnologías", "📡 Radar", "🎯 Meta"])
                 
-                st.markdown("---")
+                with tab_graficos[0]:
+                    fig_comp = crear_grafico_barras_componentes_detallado(zona_data)
+                    st.plotly_chart(fig_comp, use_container_width=True, config={'displayModeBar': False})
                 
-                # Métricas principales
-                st.markdown("### 📈 Métricas Principales")
+                with tab_graficos[1]:
+                    fig_evol = crear_grafico_evolucion_zona(zona_data['zona'], series_por_zona(version))
+                    st.plotly_chart(fig_evol, use_container_width=True, config={'displayModeBar': False})
                 
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("👥 Población", f"{int(zona_data['poblacion']):,}")
-                    st.metric("⚡ Velocidad", f"{zona_data['velocidad_promedio_mbps']:.1f} Mbps")
-                with col2:
-                    st.metric("🎯 Puntaje", f"{zona_data['puntaje_prioridad']:.3f}")
-                    st.metric("📡 Penetración", f"{zona_data['penetracion_internet']*100:.1f}%")
+                with tab_graficos[2]:
+                    fig_comp_zonas = crear_grafico_comparacion_zonas_similares(
+                        zona_data, indice_similitud(version, zonas, niveles),
+                        estadisticas_zonas=estadisticas_catalogo(version)
+                    )
+                    st.plotly_chart(fig_comp_zonas, use_container_width=True, config={'displayModeBar': False})
                 
-            else:
-                st.info("👆 Selecciona un corregimiento en el mapa o en el selector para ver información detallada.")
-        
-        # Gráficos en sección amplia (fuera del col_panel)
-        if st.session_state.zona_seleccionada and st.session_state.zona_seleccionada in df_zonas_filtrado['zona'].values:
-            zona_data = df_zonas_filtrado[df_zonas_filtrado['zona'] == st.session_state.zona_seleccionada].iloc[0]
-            
-            st.markdown("---")
-            st.markdown(f"### 📈 Análisis Detallado: {st.session_state.zona_seleccionada}")
-            
-            # Tabs para organizar gráficos en espacio amplio
-            tab_graficos = st.tabs(["📊 Componentes", "📈 Evolución", "🎯 Comparación", "🔧 Tecnologías", "📡 Radar", "🎯 Meta"])
-            
-            with tab_graficos[0]:
-                fig_comp = crear_grafico_barras_componentes_detallado(zona_data)
-                st.plotly_chart(fig_comp, use_container_width=True, config={'displayModeBar': False})
-            
-            with tab_graficos[1]:
-                fig_evol = crear_grafico_evolucion_zona(zona_data['zona'], df_conectividad)
-                st.plotly_chart(fig_evol, use_container_width=True, config={'displayModeBar': False})
-            
-            with tab_graficos[2]:
-                fig_comp_zonas = crear_grafico_comparacion_zonas_similares(zona_data, df_zonas_filtrado)
-                st.plotly_chart(fig_comp_zonas, use_container_width=True, config={'displayModeBar': False})
-            
-            with tab_graficos[3]:
-                fig_tech = crear_grafico_distribucion_tecnologias_zona(zona_data['zona'], df_conectividad)
-                st.plotly_chart(fig_tech, use_container_width=True, config={'displayModeBar': False})
-            
-            with tab_graficos[4]:
-                fig_radar = crear_grafico_radar_metricas(zona_data, df_zonas_filtrado)
-                st.plotly_chart(fig_radar, use_container_width=True, config={'displayModeBar': False})
-            
-            with tab_graficos[5]:
-                fig_meta = crear_indicador_progreso_meta(zona_data, meta_velocidad=25)
-                st.plotly_chart(fig_meta, use_container_width=True, config={'displayModeBar': False})
-            
-            # Información adicional
-            st.markdown("---")
-            st.markdown("### ℹ️ Información Adicional")
-            
-            col_info1, col_info2 = st.columns(2)
-            with col_info1:
-                st.metric("🏙️ Tipo", zona_data['tipo'])
-                st.metric("🏫 Sede Educativa", 'Sí' if zona_data['tiene_sede_educativa'] else 'No')
-            with col_info2:
-                st.metric("📶 Sede Conectada", 'Sí' if zona_data['sede_con_conexion'] else 'No')
-                st.metric("📍 Densidad", f"{zona_data['densidad_poblacion']:.2f} hab/km²")
-    else:
-        st.warning("⚠️ No hay datos para mostrar con los filtros seleccionados.")
+                with tab_graficos[3]:
+                    fig_tech = crear_grafico_distribucion_tecnologias_zona(zona_data['zona'], series_por_zona(version))
+                    st.plotly_chart(fig_tech, use_container_width=True, config={'displayModeBar': False})
+                
+                with tab_graficos[4]:
+                    escala_radar = st.radio(
+                        "Escala", ["Percentil", "Relativa a la media"],
+                        horizontal=True, key="escala_radar", label_visibility="collapsed"
+                    )
+                    fig_radar = crear_grafico_radar_metricas(
+                        zona_data, estadisticas_catalogo(version),
+                        escala='percentil' if escala_radar == "Percentil" else 'media'
+                    )
+                    st.plotly_chart(fig_radar, use_container_width=True, config={'displayModeBar': False})
+                
+                with tab_graficos[5]:
+                    fig_meta = crear_indicador_progreso_meta(
+                        zona_data, meta_velocidad=25, estadisticas_zonas=estadisticas_catalogo(version)
+                    )
+                    st.plotly_chart(fig_meta, use_container_width=True, config={'displayModeBar': False})
+                
+                # Información adicional
+                st.markdown("---")
+                st.markdown("### ℹ️ Información Adicional")
+                
+                col_info1, col_info2 = st.columns(2)
+                with col_info1:
+                    st.metric("🏙️ Tipo", zona_data['tipo'])
+                    st.metric("🏫 Sede Educativa", 'Sí' if zona_data['tiene_sede_educativa'] else 'No')
+                with col_info2:
+                    st.metric("📶 Sede Conectada", 'Sí' if zona_data['sede_con_conexion'] else 'No')
+                    st.metric("📍 Densidad", f"{zona_data['densidad_poblacion']:.2f} hab/km²")
+        else:
+            st.warning("⚠️ No hay datos para mostrar con los filtros seleccionados.")
+
+
+with tab1, medir_etapa('pestana_mapa'):
+    seccion_mapa(version_datos, *filtros_activos, cod_municipio)
 
 # ============================================================================
 # PESTAÑA 2: ANÁLISIS DETALLADO
 # ============================================================================
 
-with tab2:
-    st.header("📈 Análisis Detallado de Conectividad")
-    
-    if len(df_zonas_filtrado) > 0:
-        # Tabla de ranking
-        st.subheader("🏆 Ranking de Zonas Priorizadas")
-        df_display = crear_tabla_ranking_display(df_zonas_filtrado, len(df_zonas_filtrado))
-        st.dataframe(df_display, use_container_width=True, height=400, hide_index=True)
+@st.cache_data(max_entries=64)
+def tabla_meta_velocidad(version, zonas, facetas, rango_velocidad):
+    """Trimestre estimado en que cada tecnología alcanza la meta de velocidad"""
+    df_conectividad = filtrar_conectividad(version, zonas, facetas, rango_velocidad).df
+    df_meta = ajustar_pronosticos(df_conectividad, 'velocidad', ['tecnologia']).periodo_meta()
+    df_meta['periodo_meta'] = df_meta['periodo_meta'].fillna('No se alcanza en 10 años')
+    df_meta = df_meta.rename(columns={
+        'tecnologia': 'Tecnología',
+        'valor_actual': 'Velocidad Actual (Mbps)',
+        'trimestres_restantes': 'Trimestres Restantes',
+        'periodo_meta': 'Periodo Estimado'
+    })
+    return df_meta.round(1)
+
+ETIQUETAS_FACETAS = {
+    'proveedor': '🏢 Proveedor',
+    'tecnologia': '🔧 Tecnología',
+    'segmento': '👥 Segmento',
+    'periodo': '📅 Periodo'
+}
+
+@st.fragment
+def seccion_conectividad(version, zonas, cod_municipio):
+    """
+    Filtros facetados y gráficos de conectividad como fragmento
+    
+    Cambiar una faceta vuelve a ejecutar solo esta sección. Cada opción muestra
+    cuántos registros quedarían al marcarla, calculado en la misma pasada del filtro.
+    """
+    abrir_ciclo_fragmento('conectividad')
+    indice = indices_facetados(version)[1]
+    
+    with medir_etapa('fragmento_conectividad', filas_entrada=indice.n):
+        facetas_ui = [f for f in ETIQUETAS_FACETAS if f in indice.facetas]
         
-        st.markdown("---")
+        # Los conteos se calculan con la selección vigente (estado de los widgets)
+        seleccion = tuple(
+            (f, tuple(st.session_state.get(f'faceta_{f}', [])) or None) for f in facetas_ui
+        )
+        rango_velocidad = None
+        if 'velocidad_bajada' in RANGOS_CONECTIVIDAD and indice.n > 0:
+            vel_min, vel_max = indice.rango('velocidad_bajada')
+            rango_ui = st.session_state.get('faceta_velocidad', (vel_min, vel_max))
+            if tuple(rango_ui) != (vel_min, vel_max):
+                rango_velocidad = tuple(rango_ui)
+        
+        resultado = filtrar_conectividad(version, zonas, seleccion, rango_velocidad)
+        
+        with st.expander("🎛️ Filtros de Conectividad", expanded=False):
+            columnas = st.columns(max(len(facetas_ui), 1))
+            for columna, faceta in zip(columnas, facetas_ui):
+                conteos = resultado.conteos.get(faceta, {})
+                with columna:
+                    st.multiselect(
+                        ETIQUETAS_FACETAS[faceta],
+                        options=indice.valores(faceta),
+                        format_func=lambda v, c=conteos: f"{v} ({c.get(v, 0):,})",
+                        placeholder="Todos",
+                        key=f'faceta_{faceta}'
+                    )
+            if indice.n > 0 and vel_max > vel_min:
+                st.slider(
+                    "⚡ Velocidad de bajada (Mbps)",
+                    min_value=vel_min,
+                    max_value=vel_max,
+                    value=(vel_min, vel_max),
+                    key='faceta_velocidad'
+                )
+            st.caption(f"{len(resultado):,} de {indice.n:,} registros")
+        
+        if len(resultado) == 0:
+            st.warning("⚠️ Ningún registro de conectividad cumple los filtros.")
+            return
+        df_conectividad = resultado.df
+        
+        # Con motor SQL los agregados se calculan en la base con los mismos filtros
+        motor = motor_consultas(version)
+        if motor is not None:
+            filtros_sql = {f: v for f, v in seleccion if f in motor.columnas}
+            if 'zona' in motor.columnas:
+                filtros_sql['zona'] = zonas
+            fuente = None
+            argumentos_sql = dict(
+                motor=motor, filtros=filtros_sql,
+                rangos={'velocidad_bajada': rango_velocidad} if rango_velocidad else None
+            )
+        else:
+            fuente = df_conectividad
+            argumentos_sql = {}
         
         # Gráficos en columnas
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("🔧 Distribución por Tecnología")
-            fig_tech = crear_grafico_barras_tecnologias(df_conectividad)
+            fig_tech = crear_grafico_barras_tecnologias(fuente, **argumentos_sql)
             st.plotly_chart(fig_tech, use_container_width=True)
         
         with col2:
             st.subheader("👥 Distribución por Segmento")
-            fig_seg = crear_grafico_segmentos(df_conectividad)
+            fig_seg = crear_grafico_segmentos(fuente, **argumentos_sql)
             st.plotly_chart(fig_seg, use_container_width=True)
         
         st.markdown("---")
         
         # Evolución temporal
         st.subheader("📅 Evolución Temporal de Accesos")
-        fig_evol = crear_grafico_evolucion_temporal(df_conectividad)
+        fig_evol = crear_grafico_evolucion_temporal(fuente, **argumentos_sql)
         st.plotly_chart(fig_evol, use_container_width=True)
         
         # Proveedores
         st.subheader("🏢 Principales Proveedores")
-        fig_prov = crear_grafico_proveedores(df_conectividad, top_n=10)
+        fig_prov = crear_grafico_proveedores(fuente, top_n=10, cod_municipio=cod_municipio, **argumentos_sql)
         st.plotly_chart(fig_prov, use_container_width=True)
+        
+        # Concentración del mercado
+        st.subheader("📊 Concentración del Mercado")
+        df_hhi, df_cuotas, df_rotacion, df_mezcla = metricas_mercado(version, zonas, seleccion, rango_velocidad)
+        if len(df_hhi) > 0:
+            ultimo = df_hhi.iloc[-1]
+            col_hhi, col_lider, col_prov, col_rot = st.columns(4)
+            with col_hhi:
+                st.metric("📐 HHI", f"{ultimo['hhi']:,.0f}", help=f"{ultimo['nivel']} ({ultimo['periodo']})")
+            with col_lider:
+                st.metric("🥇 Líder", ultimo['lider'], f"{ultimo['cuota_lider']*100:.1f}% del mercado", delta_color="off")
+            with col_prov:
+                st.metric("🏢 Proveedores", int(ultimo['n_proveedores']))
+            with col_rot:
+                rotacion = df_rotacion['tasa_rotacion'].iloc[-1] if len(df_rotacion) > 0 else 0.0
+                st.metric("🔄 Rotación", f"{rotacion*100:.1f}%",
+                          help="Accesos perdidos por los proveedores que decrecieron frente al trimestre anterior")
+            
+            col_conc, col_mezcla = st.columns(2)
+            with col_conc:
+                st.plotly_chart(crear_grafico_concentracion_mercado(df_hhi), use_container_width=True)
+            with col_mezcla:
+                st.plotly_chart(crear_grafico_mezcla_tecnologica(df_mezcla), use_container_width=True)
+            
+            with st.expander("🔄 Rotación y Cuotas por Trimestre", expanded=False):
+                st.dataframe(df_rotacion, use_container_width=True, hide_index=True)
+                st.dataframe(df_cuotas[df_cuotas['periodo'] == ultimo['periodo']],
+                             use_container_width=True, hide_index=True)
+        
+        # Proyección hacia la meta de velocidad
+        st.subheader(f"🔮 Proyección de Velocidad hacia la Meta ({META_VELOCIDAD_MBPS} Mbps)")
+        fig_pron = crear_grafico_pronostico_velocidad(df_conectividad, meta_velocidad=META_VELOCIDAD_MBPS)
+        st.plotly_chart(fig_pron, use_container_width=True)
+        
+        df_meta = tabla_meta_velocidad(version, zonas, seleccion, rango_velocidad)
+        st.dataframe(df_meta, use_container_width=True, hide_index=True)
+
+
+with tab2, medir_etapa('pestana_analisis'):
+    st.header("📈 Análisis Detallado de Conectividad")
+    
+    if len(df_zonas_filtrado) > 0:
+        # Tabla de ranking
+        st.subheader("🏆 Ranking de Zonas Priorizadas")
+        df_display = tabla_ranking(version_datos, *filtros_activos)
+        st.dataframe(df_display, use_container_width=True, height=400, hide_index=True)
+        if st.button("📤 Exportar ranking completo (CSV)", key="btn_ranking_completo"):
+            encolar_trabajo('ranking_completo', {'version': version_datos},
+                            clave=version_datos, descripcion="Ranking completo")
+            st.info("⏳ Calculando el ranking completo; la descarga aparecerá en **Trabajos en Segundo Plano**.")
+        if st.button("📚 Paquete de reportes PDF (todas las zonas)", key="btn_paquete_reportes"):
+            encolar_trabajo('paquete_reportes', {'version': version_datos, 'cod_municipio': cod_municipio},
+                            clave=version_datos, descripcion="Paquete de reportes PDF")
+            st.info("⏳ Generando los reportes; la descarga aparecerá en **Trabajos en Segundo Plano**.")
+        
+        historial = historial_zonas(cod_municipio)
+        fechas_historial = historial.fechas()
+        if fechas_historial:
+            with st.expander("🕰️ Ranking a una Fecha Anterior", expanded=False):
+                fecha_corte = st.date_input(
+                    "Fecha de corte",
+                    value=datetime.now().date(),
+                    min_value=datetime.fromisoformat(fechas_historial[0]).date(),
+                    max_value=datetime.now().date(),
+                    key="fecha_corte_historial"
+                )
+                df_historico, df_cambios = ranking_historico(cod_municipio, fecha_corte.isoformat(), historial.revision())
+                st.dataframe(df_historico, use_container_width=True, height=300, hide_index=True)
+                if len(df_cambios) > 0:
+                    st.caption(f"Cambios de atributos desde el {fecha_corte.isoformat()}:")
+                    st.dataframe(df_cambios, use_container_width=True, hide_index=True)
+                else:
+                    st.caption(f"Sin cambios de atributos desde el {fecha_corte.isoformat()}.")
+        
+        st.markdown("---")
+        
+        seccion_conectividad(version_datos, filtros_activos[0], cod_municipio)
+    elif len(df_zonas_ranked) == 0:
+        # Municipio sin catálogo de zonas: solo hay datos de conectividad
+        st.info(f"ℹ️ {municipio['nombre']} aún no tiene catálogo de zonas; se muestran solo los datos de conectividad.")
+        seccion_conectividad(version_datos, filtros_activos[0], cod_municipio)
     else:
         st.warning("⚠️ No hay datos para mostrar con los filtros seleccionados.")
 
@@ -725,7 +1144,7 @@ with tab2:
 # PESTAÑA 3: INFORMACIÓN DEL PROYECTO
 # ============================================================================
 
-with tab3:
+with tab3, medir_etapa('pestana_proyecto'):
     st.header("📄 Información del Proyecto Jamundí Conectada")
     
     st.markdown("""
@@ -846,22 +1265,13 @@ with tab3:
 # PESTAÑA 4: EXPLORADOR DE DATOS
 # ============================================================================
 
-with tab4:
+with tab4, medir_etapa('pestana_explorador'):
     st.header("🔍 Explorador de Datos")
     
     if len(df_zonas_filtrado) > 0:
         st.subheader("🗺️ Datos de Zonas Filtradas")
         
-        df_display_zonas = df_zonas_filtrado[[
-            'ranking', 'zona', 'tipo', 'poblacion', 'velocidad_promedio_mbps',
-            'penetracion_internet', 'tiene_sede_educativa', 'sede_con_conexion',
-            'puntaje_prioridad', 'nivel_prioridad'
-        ]].copy()
-        
-        df_display_zonas.columns = [
-            'Ranking', 'Zona', 'Tipo', 'Población', 'Velocidad (Mbps)',
-            'Penetración', 'Tiene Sede', 'Sede Conectada', 'Puntaje', 'Nivel'
-        ]
+        df_display_zonas = tabla_explorador(version_datos, *filtros_activos)
         
         st.dataframe(df_display_zonas, use_container_width=True, height=400)
         
@@ -874,14 +1284,27 @@ with tab4:
         with col3:
             st.metric("Velocidad Promedio", f"{df_zonas_filtrado['velocidad_promedio_mbps'].mean():.2f} Mbps")
         
-        # Botón de descarga
-        csv_zonas = df_display_zonas.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📅 Descargar Datos Filtrados (CSV)",
-            data=csv_zonas,
-            file_name=f"jamundi_zonas_filtradas_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+        # Descarga perezosa: el archivo se genera por bloques solo al hacer clic
+        # y queda en disco por versión + filtros + formato (on_click="ignore":
+        # descargar no provoca un rerun)
+        col_formato, col_descarga = st.columns([1, 2])
+        with col_formato:
+            formato_descarga = st.selectbox(
+                "Formato", list(FORMATOS_EXPORTACION), key="formato_descarga",
+                format_func=str.upper, label_visibility="collapsed"
+            )
+        with col_descarga:
+            st.download_button(
+                label=f"📅 Descargar Datos Filtrados ({formato_descarga.upper()})",
+                data=exportador.generador_descarga(
+                    lambda: df_display_zonas, formato_descarga,
+                    clave=('explorador', version_datos, filtros_activos)
+                ),
+                file_name=(f"jamundi_zonas_filtradas_{datetime.now().strftime('%Y%m%d')}"
+                           f"{FORMATOS_EXPORTACION[formato_descarga][1]}"),
+                mime=FORMATOS_EXPORTACION[formato_descarga][0],
+                on_click="ignore"
+            )
         
         # Disclaimer
         st.markdown("---")
@@ -894,6 +1317,102 @@ with tab4:
     else:
         st.warning("⚠️ No hay datos para mostrar con los filtros seleccionados.")
 
+# ============================================================================
+# PESTAÑA 5: SIMULADOR DE ESCENARIOS
+# ============================================================================
+
+MAX_ESCENARIOS = 3
+
+@st.fragment
+def seccion_escenarios(version):
+    """
+    Simulador what-if como fragmento
+    
+    Cada escenario conecta las sedes y/o sube la velocidad de un grupo de
+    zonas; el ranking y las alertas se recalculan sobre el catálogo completo
+    (no sobre los filtros) y se comparan con la situación actual.
+    """
+    abrir_ciclo_fragmento('escenarios')
+    registro = registro_zonas(version)
+    
+    n_escenarios = st.radio(
+        "Número de escenarios", list(range(1, MAX_ESCENARIOS + 1)), index=1,
+        horizontal=True, key='escenarios_n'
+    )
+    definiciones = []
+    for i, columna in enumerate(st.columns(n_escenarios)):
+        with columna:
+            nombre = st.text_input("Nombre", value=f"Escenario {i + 1}", key=f'escenario_{i}_nombre')
+            zonas = st.multiselect(
+                "Zonas intervenidas", options=registro.nombres, key=f'escenario_{i}_zonas',
+                placeholder="Elige una o más zonas"
+            )
+            conectar_sedes = st.checkbox("🏫 Conectar sedes educativas", value=True, key=f'escenario_{i}_sedes')
+            velocidad_minima = st.number_input(
+                "⚡ Velocidad mínima garantizada (Mbps)", min_value=0.0, max_value=1000.0,
+                value=float(META_VELOCIDAD_MBPS), step=5.0, key=f'escenario_{i}_velocidad'
+            )
+            if zonas:
+                # Nombres únicos: son las columnas de la comparación lado a lado
+                nombre = nombre.strip() or f"Escenario {i + 1}"
+                if any(nombre == d[0] for d in definiciones):
+                    nombre = f"{nombre} ({i + 1})"
+                definiciones.append((nombre, tuple(sorted(zonas)), conectar_sedes, float(velocidad_minima)))
+    
+    if not definiciones:
+        st.info("ℹ️ Elige las zonas intervenidas de al menos un escenario para ver su efecto.")
+        return
+    
+    with medir_etapa('fragmento_escenarios', filas_entrada=len(registro)):
+        resultados = simular_escenarios(version, tuple(definiciones))
+    
+    st.subheader("📊 Comparación de Escenarios")
+    df_comparativa = tabla_comparativa(resultados).rename(columns={
+        'escenario': 'Escenario',
+        'zonas_alta': 'Zonas Alta Prioridad',
+        'zonas_con_cambio_ranking': 'Cambian de Puesto',
+        'zonas_con_cambio_nivel': 'Cambian de Nivel',
+        'puntaje_promedio': 'Puntaje Promedio',
+        'alertas': 'Alertas',
+        'alertas_criticas': 'Alertas Críticas',
+        'alertas_nuevas': 'Alertas Nuevas',
+        'alertas_resueltas': 'Alertas Resueltas'
+    })
+    st.dataframe(df_comparativa, use_container_width=True, hide_index=True)
+    
+    st.subheader("🏆 Ranking Lado a Lado (Top 10 de algún escenario)")
+    df_lado_a_lado = rankings_lado_a_lado(resultados, cargar_todos_los_datos(version)[1], top=10)
+    st.dataframe(df_lado_a_lado.rename(columns={'zona': 'Zona'}), use_container_width=True, hide_index=True)
+    
+    for resultado in resultados:
+        with st.expander(f"🔎 {resultado.nombre}: {len(resultado.diferencias)} zonas con cambios"):
+            st.dataframe(
+                resultado.diferencias[[
+                    'zona', 'ranking_base', 'ranking_escenario', 'nivel_base',
+                    'nivel_escenario', 'cambio_puntaje'
+                ]].rename(columns={
+                    'zona': 'Zona', 'ranking_base': 'Ranking Actual',
+                    'ranking_escenario': 'Ranking Escenario', 'nivel_base': 'Nivel Actual',
+                    'nivel_escenario': 'Nivel Escenario', 'cambio_puntaje': 'Cambio de Puntaje'
+                }),
+                use_container_width=True, hide_index=True
+            )
+            resueltas = resultado.cambios_alertas['resueltas']
+            nuevas = resultado.cambios_alertas['nuevas']
+            if resueltas:
+                st.success("✅ Alertas resueltas: " + ", ".join(f"{z} ({t})" for z, t in resueltas))
+            if nuevas:
+                st.warning("⚠️ Alertas nuevas: " + ", ".join(f"{z} ({t})" for z, t in nuevas))
+
+
+with tab5, medir_etapa('pestana_escenarios'):
+    st.header("🧪 Simulador de Escenarios")
+    st.markdown("""
+    Planea intervenciones hipotéticas y compara cómo cambiarían el ranking de prioridad
+    y las alertas del municipio antes de ejecutarlas.
+    """)
+    seccion_escenarios(version_datos)
+
 # ============================================================================
 # PIE DE PÁGINA
 # ============================================================================
@@ -902,7 +1421,180 @@ st.markdown("---")
 st.markdown("""
 <div style='text-align: center; color: #666; padding: 2rem 0;'>
     <p><strong>Dashboard Jamundí Conectada</strong> | Sistema Inteligente de Priorización de Infraestructura Digital (SIPID)</p>
-    <p>Desarrollado con ❤️ usando Streamlit, Pandas, Plotly y GeoPandas</p>
+    <p>Desarrollado con ❤️ usando Streamlit, Pandas y Plotly</p>
 
 </div>
 """, unsafe_allow_html=True)
+
+# Tiempo total del rerun completo (los reruns de los fragmentos se miden aparte)
+if PERFILADO_ACTIVO:
+    obtener_registro().registrar_etapa('rerun', time.perf_counter() - inicio_rerun)
+
+# ============================================================================
+# PRECALENTAMIENTO EN SEGUNDO PLANO
+# ============================================================================
+# Tras el primer render de una versión, un hilo del proceso construye lo que
+# aún no se pidió con los filtros por defecto: índices, agregados, tablas y
+# figuras de las pestañas y del detalle de las primeras zonas. Las cachés son
+# las mismas que usan las sesiones, así que nadie vuelve a calcularlas.
+
+ZONAS_DETALLE_PRECALENTADAS = 5
+
+def pasos_precalentamiento(version, cod_municipio):
+    """Lista de (nombre, función) que deja calientes las vistas por defecto de un municipio"""
+    df_conectividad_v, df_zonas_v, _ = cargar_todos_los_datos(version)
+    zonas = tuple(sorted(df_zonas_v['zona'].tolist()))
+    niveles = ('Alta', 'Baja', 'Media')
+    
+    def vistas_filtradas():
+        seleccion_zonas(version, zonas, None)
+        calcular_alertas(version, zonas, niveles)
+        calcular_kpis(version, zonas, niveles)
+        tabla_ranking(version, zonas, niveles)
+        tabla_explorador(version, zonas, niveles)
+    
+    def figuras_conectividad():
+        facetas = tuple((f, None) for f in ETIQUETAS_FACETAS if f in indices_facetados(version)[1].facetas)
+        df = filtrar_conectividad(version, zonas, facetas, None).df
+        crear_grafico_barras_tecnologias(df)
+        crear_grafico_segmentos(df)
+        crear_grafico_evolucion_temporal(df)
+        crear_grafico_proveedores(df, top_n=10, cod_municipio=cod_municipio)
+        df_hhi, _, _, df_mezcla = metricas_mercado(version, zonas, facetas, None)
+        crear_grafico_concentracion_mercado(df_hhi)
+        crear_grafico_mezcla_tecnologica(df_mezcla)
+        crear_grafico_pronostico_velocidad(df, meta_velocidad=META_VELOCIDAD_MBPS)
+        tabla_meta_velocidad(version, zonas, facetas, None)
+    
+    def figuras_detalle():
+        df_filtrado = filtrar_zonas(version, zonas, niveles)
+        registro = registro_zonas(version)
+        series = series_por_zona(version)
+        estadisticas = estadisticas_catalogo(version)
+        similitud = indice_similitud(version, zonas, niveles)
+        for zona in df_filtrado['zona'].head(ZONAS_DETALLE_PRECALENTADAS):
+            zona_data = registro.fila(zona)
+            crear_mini_mapa_ubicacion(zona_data)
+            crear_grafico_barras_componentes_detallado(zona_data)
+            crear_grafico_evolucion_zona(zona, series)
+            crear_grafico_comparacion_zonas_similares(zona_data, similitud, estadisticas_zonas=estadisticas)
+            crear_grafico_distribucion_tecnologias_zona(zona, series)
+            crear_grafico_radar_metricas(zona_data, estadisticas, escala='percentil')
+            crear_indicador_progreso_meta(zona_data, meta_velocidad=25, estadisticas_zonas=estadisticas)
+    
+    return [
+        ('indices', lambda: (registro_zonas(version), indices_facetados(version), cubo_mercado(version))),
+        ('agregados', lambda: (series_por_zona(version), estadisticas_catalogo(version))),
+        ('vistas_filtradas', vistas_filtradas),
+        ('mapa', lambda: crear_mapa_marcadores_prioridad(filtrar_zonas(version, zonas, niveles),
+                                                         cod_municipio=cod_municipio)),
+        ('conectividad', figuras_conectividad),
+        ('detalle_zonas', figuras_detalle),
+    ]
+
+obtener_precalentador(cod_municipio).iniciar(version_datos, pasos_precalentamiento(version_datos, cod_municipio))
+
+# ============================================================================
+# TRABAJOS EN SEGUNDO PLANO
+# ============================================================================
+# Los trabajos de la sesión corren en el pool de la cola; este panel solo lee
+# su estado. Mientras alguno sigue activo el fragmento se vuelve a ejecutar
+# cada INTERVALO_SONDEO_S segundos sin recargar la página.
+
+INTERVALO_SONDEO_S = 1.5
+MAX_TRABAJOS_PANEL = 5
+
+def panel_trabajos(sondeando):
+    """Avance y descargas de los trabajos de la sesión"""
+    cola = cola_trabajos()
+    trabajos = [(cola.estado(i), descripcion) for i, descripcion
+                in list(st.session_state.trabajos.items())[-MAX_TRABAJOS_PANEL:][::-1]]
+    trabajos = [(t, d) for t, d in trabajos if t is not None]
+    
+    with st.expander("⏳ Trabajos en Segundo Plano", expanded=True):
+        for trabajo, descripcion in trabajos:
+            if trabajo['estado'] in ESTADOS_ACTIVOS:
+                st.progress(trabajo['progreso'], text=f"{descripcion}: {trabajo['mensaje'] or trabajo['estado']}")
+            elif trabajo['estado'] == 'completado' and (trabajo['resultado'] or {}).get('ruta'):
+                resultado = trabajo['resultado']
+                st.download_button(
+                    label=f"⬇️ {descripcion}",
+                    data=Path(resultado['ruta']).read_bytes,
+                    file_name=resultado['nombre'],
+                    use_container_width=True,
+                    key=f"descarga_{trabajo['id']}",
+                    on_click="ignore"
+                )
+            elif trabajo['estado'] == 'completado':
+                st.caption(f"✅ {descripcion}")
+            else:
+                st.caption(f"❌ {descripcion}: {trabajo['mensaje']}")
+    
+    # Al terminar el último trabajo activo se recarga la página para dejar de sondear
+    if sondeando and not any(t['estado'] in ESTADOS_ACTIVOS for t, _ in trabajos):
+        st.rerun()
+
+if st.session_state.get('trabajos'):
+    cola = cola_trabajos()
+    sondear = any((cola.estado(i) or {}).get('estado') in ESTADOS_ACTIVOS for i in st.session_state.trabajos)
+    with st.sidebar:
+        st.fragment(panel_trabajos, run_every=INTERVALO_SONDEO_S if sondear else None)(sondear)
+
+# ============================================================================
+# PANEL DE ADMINISTRACIÓN (OPCIONAL)
+# ============================================================================
+
+# Se activa con la variable de entorno SIPID_ADMIN=1 o con ?admin=1 en la URL
+if os.environ.get('SIPID_ADMIN') == '1' or st.query_params.get('admin') == '1':
+    with st.sidebar.expander("🛠️ Rendimiento (Admin)", expanded=False):
+        st.markdown(f"**Etapas del rerun #{ciclo_actual}:**")
+        st.dataframe(
+            resumen_etapas(ciclo_actual)[['etapa', 'llamadas', 'total_ms', 'filas_entrada', 'filas_salida']],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        st.markdown("**Latencia por interacción:**")
+        st.dataframe(
+            latencia_por_ciclo(['rerun', 'fragmento_mapa', 'fragmento_conectividad', 'fragmento_escenarios'], ultimos=10),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        st.markdown("**Cachés:**")
+        stats_cache = obtener_registro().estadisticas_cache()
+        for nombre_cache, c in stats_cache.items():
+            st.markdown(f"- {nombre_cache}: {c['aciertos']} aciertos / {c['fallos']} fallos ({c['tasa_acierto']*100:.0f}%)")
+        st.caption(f"Figuras en caché: {cache_figuras_global.estadisticas()['entradas']} "
+                   f"({cache_figuras_global.estadisticas()['memoria_mb']:.2f} MB)")
+        
+        estado_precalentamiento = obtener_precalentador(cod_municipio).estado()
+        st.markdown(f"**Precalentamiento:** {'✅ listo' if estado_precalentamiento['listo'] else '⏳ en curso'}")
+        st.dataframe(
+            pd.DataFrame(estado_precalentamiento['pasos'], columns=['paso', 'estado', 'ms']),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        if st.button("🔄 Refrescar datos ahora", use_container_width=True, key="btn_refrescar_datos"):
+            encolar_trabajo('refrescar_datos', {'cod_municipio': cod_municipio},
+                            descripcion=f"Refresco de {municipio['nombre']}")
+            # El panel de trabajos ya se dibujó en esta ejecución: volver a armarlo con el nuevo
+            st.rerun()
+        
+        st.download_button(
+            label="⬇️ Métricas (JSON lines)",
+            data=exportar_json_lines(),
+            file_name="sipid_metricas.jsonl",
+            mime="application/x-ndjson",
+            use_container_width=True,
+            on_click="ignore"
+        )
+        st.download_button(
+            label="⬇️ Métricas (Prometheus)",
+            data=exportar_prometheus(),
+            file_name="sipid_metricas.prom",
+            mime="text/plain",
+            use_container_width=True,
+            on_click="ignore"
+        )
@@ -0,0 +1,461 @@
+"""
+Suite de benchmarks sin interfaz para el proyecto Jamundí Conectada
+Mide datos, ranking, alertas, búsqueda, KPIs y gráficos sobre tablas
+sintéticas de distinto tamaño y guarda los resultados en JSON para
+comparar regresiones entre commits
+
+Uso:
+    python benchmark.py --escalas 10 1000 100000 --salida resultados_benchmark.json
+    python benchmark.py --comparar base.json nuevo.json --tolerancia 0.2
+    python benchmark.py --arranque --escalas 1000 --repeticiones 3 --salida arranque.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_processing
+from data_processing import consolidar_datos_jamundi
+from ranking import calcular_puntaje_prioridad
+from utils import generar_alertas, buscar_zonas
+import visualizations
+import visualizations_advanced
+from visualizations import crear_indicadores_kpi
+from generador_sintetico import generar_zonas, generar_conectividad
+from pronosticos import construir_series, ajustar_lote
+from series_zonas import construir_series_zonas
+from similitud_zonas import IndiceSimilitud
+from estadisticas_zonas import calcular_estadisticas_zonas
+from escenarios import Escenario, Intervencion, evaluar_escenarios
+from consultas_sql import construir_motor
+from concentracion_mercado import CuboMercado, construir_cubo_mercado
+from reportes_pdf import generar_reporte_zona, generar_paquete_reportes, obtener_plantilla
+from imagenes_graficos import CacheImagenesDisco
+
+ESCALAS_POR_DEFECTO = [10, 1000, 100000]
+
+# ============================================================================
+# STUB DE LA API NACIONAL
+# ============================================================================
+
+def escribir_stub_api_nacional(df_conectividad: pd.DataFrame, ruta: str):
+    """
+    Escribe un CSV con el formato crudo de la API nacional (datos.gov.co)
+
+    Args:
+        df_conectividad: Registros de conectividad sintéticos
+        ruta: Ruta del CSV de salida
+    """
+    df_api = df_conectividad.rename(columns={'accesos': 'no_de_accesos'})
+    # La API publica las velocidades con coma decimal
+    df_api['velocidad_bajada'] = df_api['velocidad_bajada'].astype(str).str.replace('.', ',')
+    df_api.to_csv(ruta, index=False)
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+def _sin_cache(func):
+    """Función original sin la caché de figuras, para medir el costo real"""
+    return getattr(func, 'sin_cache', func)
+
+
+def medir(func, repeticiones: int) -> dict:
+    """
+    Ejecuta una función varias veces y mide su tiempo de pared
+
+    Args:
+        func: Función sin argumentos a medir
+        repeticiones: Número de ejecuciones
+
+    Returns:
+        Diccionario con tiempos medio, mínimo y máximo en segundos
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            func()
+            tiempos.append(time.perf_counter() - inicio)
+
+    return {
+        'media_s': float(np.mean(tiempos)),
+        'min_s': float(np.min(tiempos)),
+        'max_s': float(np.max(tiempos)),
+        'repeticiones': repeticiones
+    }
+
+
+def _ajustar_pronosticos_sin_cache(df_conectividad: pd.DataFrame):
+    """Ajuste en lote de todas las series de velocidad, sin la caché de modelos"""
+    _, indices, matriz = construir_series(df_conectividad, 'velocidad')
+    return ajustar_lote(matriz, indices, logaritmica=True)
+
+
+def casos_benchmark(df_zonas_ranked: pd.DataFrame, df_conectividad: pd.DataFrame,
+                    df_zonas: pd.DataFrame) -> dict:
+    """
+    Construye los casos a medir para una escala dada
+
+    Returns:
+        Diccionario nombre -> función sin argumentos
+    """
+    zona_data = df_zonas_ranked.iloc[0]
+    series_zonas = construir_series_zonas(df_conectividad, df_zonas_ranked)
+    indice_similitud = IndiceSimilitud(df_zonas_ranked)
+    estadisticas = calcular_estadisticas_zonas(df_zonas_ranked)
+    # Tres escenarios que intervienen el 1% de las zonas (al menos una)
+    intervenidas = df_zonas_ranked['zona'].to_numpy()[:max(len(df_zonas_ranked) // 100, 1)]
+    escenarios = [
+        Escenario('Sedes', [Intervencion(intervenidas, {'sede_con_conexion': True})]),
+        Escenario('Velocidad', [Intervencion(intervenidas, {'velocidad_promedio_mbps': ('minimo', 25)})]),
+        Escenario('Ambos', [Intervencion(intervenidas, {'sede_con_conexion': True,
+                                                        'velocidad_promedio_mbps': ('minimo', 25)})]),
+    ]
+
+    # Cubo de mercado sin el último trimestre, para medir la actualización incremental
+    periodo = df_conectividad['anno'] * 4 + df_conectividad['trimestre']
+    ultimo_trimestre = df_conectividad[periodo == periodo.max()]
+    cubo = construir_cubo_mercado(df_conectividad)
+    cubo_previo = construir_cubo_mercado(df_conectividad[periodo < periodo.max()])
+
+    def metricas_mercado():
+        sub = cubo.filtrar({'proveedor': ('CLARO', 'TIGO', 'MOVISTAR')})
+        return sub.hhi(), sub.cuotas(), sub.rotacion(), sub.mezcla_tecnologica()
+
+    # Base SQLite de la conectividad (se borra al liberar los casos)
+    tmp_sql = tempfile.TemporaryDirectory(prefix='sipid_benchmark_sql_')
+    motor = construir_motor(df_conectividad, os.path.join(tmp_sql.name, 'conectividad.sqlite'), 'sqlite')
+
+    # La plantilla PDF se compila una vez por proceso: se mide el costo por reporte
+    obtener_plantilla()
+
+    # Caché de imágenes con 100 PNG de 50 KB y un límite que obliga a desalojar
+    cache_imagenes = CacheImagenesDisco(os.path.join(tmp_sql.name, 'imagenes'), limite_mb=4)
+    png = os.urandom(50 * 1024)
+
+    def cache_imagenes_disco():
+        for i in range(100):
+            cache_imagenes.guardar(f'imagen{i}', png)
+        return [cache_imagenes.obtener(f'imagen{i}') for i in range(100)]
+
+    casos = {
+        'calcular_puntaje_prioridad': lambda: calcular_puntaje_prioridad(df_zonas),
+        'generar_alertas': lambda: generar_alertas(df_zonas_ranked),
+        'buscar_zonas': lambda: buscar_zonas('zona 00', df_zonas_ranked),
+        'crear_indicadores_kpi': lambda: crear_indicadores_kpi(df_zonas_ranked, df_conectividad),
+        'ajustar_pronosticos': lambda: _ajustar_pronosticos_sin_cache(df_conectividad),
+        'construir_series_zonas': lambda: construir_series_zonas(df_conectividad, df_zonas_ranked),
+        'construir_indice_similitud': lambda: IndiceSimilitud(df_zonas_ranked),
+        'vecinos_similares': lambda: indice_similitud.vecinos(zona_data['zona'], k=5),
+        'calcular_estadisticas_zonas': lambda: calcular_estadisticas_zonas(df_zonas_ranked),
+        'evaluar_escenarios': lambda: evaluar_escenarios(df_zonas_ranked, escenarios),
+        'construir_cubo_mercado': lambda: construir_cubo_mercado(df_conectividad),
+        'metricas_mercado': metricas_mercado,
+        'agregar_trimestre_mercado': lambda: CuboMercado(
+            cubo_previo.indices_periodo, cubo_previo.segmentos, cubo_previo.proveedores,
+            cubo_previo.tecnologias, cubo_previo.accesos.copy()).agregar_trimestre(ultimo_trimestre),
+        'construir_motor_sqlite': lambda: construir_motor(
+            df_conectividad, os.path.join(tmp_sql.name, f'medicion_{time.perf_counter_ns()}.sqlite'), 'sqlite'),
+        'crear_indicadores_kpi_sql':
+            lambda: crear_indicadores_kpi(df_zonas_ranked, None, motor=motor, filtros={'proveedor': ('CLARO',)}),
+        'generar_reporte_zona':
+            lambda: generar_reporte_zona(zona_data, os.path.join(tmp_sql.name, 'reporte_zona.pdf')),
+        # Paquete acotado a 100 zonas: mide el costo por página sin crecer con la escala
+        'paquete_reportes_top100': lambda: generar_paquete_reportes(
+            df_zonas_ranked.nsmallest(100, 'ranking'), os.path.join(tmp_sql.name, 'paquete.pdf')),
+        'cache_imagenes_disco': cache_imagenes_disco,
+    }
+
+    for nombre in ['crear_mapa_prioridades', 'crear_mapa_marcadores_prioridad', 'crear_mapa_velocidades',
+                   'crear_grafico_dispersion_vulnerabilidad']:
+        func = _sin_cache(getattr(visualizations, nombre))
+        casos[nombre] = lambda func=func: func(df_zonas_ranked)
+
+    for nombre in ['crear_grafico_barras_tecnologias', 'crear_grafico_evolucion_temporal',
+                   'crear_grafico_proveedores', 'crear_grafico_segmentos']:
+        func = _sin_cache(getattr(visualizations, nombre))
+        casos[nombre] = lambda func=func: func(df_conectividad)
+        casos[f'{nombre}_sql'] = lambda func=func: func(None, motor=motor)
+
+    va = visualizations_advanced
+    casos.update({
+        'crear_grafico_evolucion_zona':
+            lambda: _sin_cache(va.crear_grafico_evolucion_zona)(zona_data['zona'], series_zonas),
+        'crear_grafico_comparacion_zonas_similares':
+            lambda: _sin_cache(va.crear_grafico_comparacion_zonas_similares)(
+                zona_data, indice_similitud, estadisticas_zonas=estadisticas),
+        'crear_grafico_distribucion_tecnologias_zona':
+            lambda: _sin_cache(va.crear_grafico_distribucion_tecnologias_zona)(zona_data['zona'], series_zonas),
+        'crear_grafico_radar_metricas':
+            lambda: _sin_cache(va.crear_grafico_radar_metricas)(zona_data, estadisticas),
+        'crear_mini_mapa_ubicacion':
+            lambda: _sin_cache(va.crear_mini_mapa_ubicacion)(zona_data),
+        'crear_grafico_barras_componentes_detallado':
+            lambda: _sin_cache(va.crear_grafico_barras_componentes_detallado)(zona_data),
+        'crear_indicador_progreso_meta':
+            lambda: _sin_cache(va.crear_indicador_progreso_meta)(zona_data, estadisticas_zonas=estadisticas),
+    })
+
+    return casos
+
+
+def ejecutar_benchmarks(escalas: list, repeticiones: int = 3, semilla: int = 42,
+                        omitir: list = None) -> list:
+    """
+    Ejecuta todos los casos para cada escala
+
+    Args:
+        escalas: Lista de números de filas a probar
+        repeticiones: Ejecuciones por caso
+        semilla: Semilla de los datos sintéticos
+        omitir: Nombres de casos a excluir
+
+    Returns:
+        Lista de resultados (un diccionario por caso y escala)
+    """
+    omitir = set(omitir or [])
+    resultados = []
+
+    for filas in escalas:
+        print(f"\n📏 Escala: {filas:,} filas")
+        df_zonas = generar_zonas(filas, semilla)
+        df_conectividad = generar_conectividad(filas, df_zonas, semilla).drop(columns='zona')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta_stub = os.path.join(tmp, 'api_nacional.csv')
+            escribir_stub_api_nacional(df_conectividad, ruta_stub)
+
+            url_original = data_processing.URL_API_NACIONAL
+            data_processing.URL_API_NACIONAL = ruta_stub
+            try:
+                if 'consolidar_datos_jamundi' not in omitir:
+                    r = medir(consolidar_datos_jamundi, repeticiones)
+                    resultados.append({'caso': 'consolidar_datos_jamundi', 'filas': filas, **r})
+                    print(f"   ⏱️ consolidar_datos_jamundi: {r['media_s']*1000:.2f} ms")
+            finally:
+                data_processing.URL_API_NACIONAL = url_original
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_zonas_ranked = calcular_puntaje_prioridad(df_zonas)
+
+        for caso, func in casos_benchmark(df_zonas_ranked, df_conectividad, df_zonas).items():
+            if caso in omitir:
+                continue
+            r = medir(func, repeticiones)
+            resultados.append({'caso': caso, 'filas': filas, **r})
+            print(f"   ⏱️ {caso}: {r['media_s']*1000:.2f} ms")
+
+    return resultados
+
+# ============================================================================
+# ARRANQUE EN FRÍO
+# ============================================================================
+
+# Módulos que no deberían cargarse hasta que se usen (ver carga_perezosa)
+MODULOS_PESADOS = ['plotly.express', 'fpdf', 'openpyxl', 'geopandas']
+
+# Se ejecuta en un intérprete nuevo: importa Streamlit y renderiza app_v3 una vez
+_SCRIPT_ARRANQUE = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+importado = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+fin = time.perf_counter()
+print(json.dumps({
+    'importacion_s': importado - inicio,
+    'primer_render_s': fin - importado,
+    'excepciones': [str(e.value) for e in at.exception],
+    'pesados_cargados': [m for m in sys.argv[2:] if m in sys.modules]
+}))
+"""
+
+
+def medir_arranque(escalas: list, repeticiones: int = 3, semilla: int = 42) -> list:
+    """
+    Mide el tiempo hasta el primer render de un worker nuevo
+
+    Cada repetición lanza un intérprete limpio, con un almacén compartido
+    vacío, que importa Streamlit y ejecuta app_v3 una vez contra un stub de
+    la API nacional. Se mide el tiempo total del proceso y el del primer
+    render, y se informa qué módulos pesados quedaron cargados.
+
+    Args:
+        escalas: Número de filas del stub de la API nacional
+        repeticiones: Procesos por escala
+        semilla: Semilla de los datos sintéticos
+
+    Returns:
+        Lista de resultados con el mismo formato que ejecutar_benchmarks
+    """
+    ruta_app = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_v3.py')
+    resultados = []
+
+    for filas in escalas:
+        print(f"\n📏 Arranque con {filas:,} filas en la API")
+        df_zonas = generar_zonas(filas, semilla)
+        df_conectividad = generar_conectividad(filas, df_zonas, semilla).drop(columns='zona')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta_stub = os.path.join(tmp, 'api_nacional.csv')
+            escribir_stub_api_nacional(df_conectividad, ruta_stub)
+
+            tiempos = {'arranque_proceso': [], 'arranque_importacion': [], 'arranque_primer_render': []}
+            for i in range(repeticiones):
+                entorno = {
+                    **os.environ,
+                    'SIPID_URL_API_NACIONAL': ruta_stub,
+                    'SIPID_DIR_ALMACEN': os.path.join(tmp, f'almacen_{i}'),
+                    'SIPID_DIR_EXPORTACIONES': os.path.join(tmp, f'exportaciones_{i}'),
+                }
+                inicio = time.perf_counter()
+                proceso = subprocess.run(
+                    [sys.executable, '-c', _SCRIPT_ARRANQUE, ruta_app, *MODULOS_PESADOS],
+                    capture_output=True, text=True, env=entorno,
+                    cwd=os.path.dirname(ruta_app)
+                )
+                total = time.perf_counter() - inicio
+                if proceso.returncode != 0:
+                    raise RuntimeError(f"El arranque falló:\n{proceso.stderr[-2000:]}")
+                medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+
+                tiempos['arranque_proceso'].append(total)
+                tiempos['arranque_importacion'].append(medicion['importacion_s'])
+                tiempos['arranque_primer_render'].append(medicion['primer_render_s'])
+                if medicion['excepciones']:
+                    print(f"   ⚠️ Excepciones en el render: {medicion['excepciones']}")
+
+            print(f"   📦 Módulos pesados cargados en el primer render: "
+                  f"{', '.join(medicion['pesados_cargados']) or 'ninguno'}")
+
+        for caso, valores in tiempos.items():
+            resultados.append({
+                'caso': caso, 'filas': filas,
+                'media_s': float(np.mean(valores)),
+                'min_s': float(np.min(valores)),
+                'max_s': float(np.max(valores)),
+                'repeticiones': repeticiones
+            })
+            print(f"   ⏱️ {caso}: {np.mean(valores)*1000:.0f} ms")
+
+    return resultados
+
+# ============================================================================
+# PERSISTENCIA Y COMPARACIÓN
+# ============================================================================
+
+def _commit_actual():
+    """Hash corto del commit actual de git (None si no está disponible)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def guardar_resultados(resultados: list, ruta: str, metadatos: dict = None):
+    """
+    Guarda los resultados en JSON junto con el contexto de ejecución
+
+    Args:
+        resultados: Lista de resultados de ejecutar_benchmarks
+        ruta: Archivo JSON de salida
+        metadatos: Información adicional a incluir
+    """
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        **(metadatos or {}),
+        'resultados': resultados
+    }
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+
+
+def comparar_resultados(ruta_base: str, ruta_nueva: str, tolerancia: float = 0.2) -> pd.DataFrame:
+    """
+    Compara dos archivos de resultados y marca las regresiones
+
+    Args:
+        ruta_base: Resultados de referencia
+        ruta_nueva: Resultados a evaluar
+        tolerancia: Aumento relativo máximo aceptado (0.2 = 20%)
+
+    Returns:
+        DataFrame con tiempos, razón nuevo/base y columna 'regresion'
+    """
+    with open(ruta_base, encoding='utf-8') as f:
+        base = pd.DataFrame(json.load(f)['resultados'])
+    with open(ruta_nueva, encoding='utf-8') as f:
+        nueva = pd.DataFrame(json.load(f)['resultados'])
+
+    df = base[['caso', 'filas', 'media_s']].merge(
+        nueva[['caso', 'filas', 'media_s']],
+        on=['caso', 'filas'],
+        suffixes=('_base', '_nueva')
+    )
+    df['razon'] = df['media_s_nueva'] / df['media_s_base']
+    df['regresion'] = df['razon'] > 1 + tolerancia
+
+    return df.sort_values(['caso', 'filas'])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks de Jamundí Conectada')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_POR_DEFECTO,
+                        help='Número de filas sintéticas por escala (10 a 1000000)')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--omitir', nargs='*', default=[], help='Casos a excluir')
+    parser.add_argument('--salida', default='resultados_benchmark.json')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NUEVO'),
+                        help='Compara dos archivos de resultados en lugar de medir')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    parser.add_argument('--arranque', action='store_true',
+                        help='Mide el tiempo hasta el primer render de un worker nuevo')
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        df = comparar_resultados(args.comparar[0], args.comparar[1], args.tolerancia)
+        print(df.to_string(index=False))
+        regresiones = int(df['regresion'].sum())
+        print(f"\n{'❌' if regresiones else '✅'} Regresiones: {regresiones}")
+        return 1 if regresiones else 0
+
+    print("=" * 80)
+    print("BENCHMARKS JAMUNDÍ CONECTADA")
+    print("=" * 80)
+
+    if args.arranque:
+        resultados = medir_arranque(args.escalas, args.repeticiones, args.semilla)
+    else:
+        resultados = ejecutar_benchmarks(args.escalas, args.repeticiones, args.semilla, args.omitir)
+    guardar_resultados(resultados, args.salida, {
+        'escalas': args.escalas,
+        'semilla': args.semilla,
+        'modo': 'arranque' if args.arranque else 'funciones'
+    })
+    print(f"\n✅ Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Caché de figuras Plotly para el Dashboard Jamundí Conectada
+Evita reconstruir gráficos cuyos datos de entrada y parámetros no cambiaron
+entre reruns de Streamlit. Las figuras se guardan ya serializadas en JSON.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from perfilado import registrar_cache
+
+# Límites por defecto de la caché global
+MAX_ENTRADAS_FIGURAS = 256
+LIMITE_MEMORIA_FIGURAS_MB = 64
+
+# ============================================================================
+# HUELLA DE CONTENIDO
+# ============================================================================
+
+def huella_datos(obj) -> str:
+    """
+    Calcula una huella (hash) estable del contenido de un objeto
+
+    Soporta DataFrames, Series, arreglos de NumPy, colecciones y escalares.
+    Dos objetos con el mismo contenido producen la misma huella, sin importar
+    su identidad. Otros objetos participan si exponen `huella` (atributo o
+    método) con un identificador de su contenido.
+
+    Args:
+        obj: Objeto a resumir
+
+    Returns:
+        Cadena hexadecimal con la huella del contenido
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _actualizar_huella(h, obj)
+    return h.hexdigest()
+
+
+def _actualizar_huella(h, obj):
+    """Alimenta el hash con el contenido de obj (recursivo para colecciones)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        h.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(zip(obj.columns, obj.dtypes.astype(str)))).encode())
+        else:
+            h.update(repr((obj.name, str(obj.dtype))).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        except TypeError:
+            # Series con tipos mezclados (p. ej. una fila de zona): usar su repr
+            h.update(repr(obj.to_dict()).encode())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for clave in sorted(obj, key=repr):
+            _actualizar_huella(h, clave)
+            _actualizar_huella(h, obj[clave])
+        h.update(b'}')
+    elif isinstance(obj, np.ndarray):
+        h.update(repr(('ndarray', str(obj.dtype), obj.shape)).encode())
+        if obj.dtype == object:
+            _actualizar_huella(h, obj.ravel().tolist())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for item in obj:
+            _actualizar_huella(h, item)
+        h.update(b']')
+    elif hasattr(obj, 'huella'):
+        huella = obj.huella() if callable(obj.huella) else obj.huella
+        h.update(repr((type(obj).__qualname__, huella)).encode())
+    elif type(obj).__repr__ is object.__repr__:
+        # El repr por defecto es la dirección en memoria, que se reutiliza tras el GC
+        raise TypeError(f"{type(obj).__qualname__} no tiene huella de contenido: defina 'huella'")
+    else:
+        h.update(repr(obj).encode())
+
+# ============================================================================
+# CACHÉ LRU CON LÍMITE DE MEMORIA
+# ============================================================================
+
+class CacheFiguras:
+    """Caché LRU de figuras serializadas con límite de entradas y de memoria"""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_FIGURAS,
+                 limite_memoria_mb: float = LIMITE_MEMORIA_FIGURAS_MB):
+        self.max_entradas = max_entradas
+        self.limite_bytes = int(limite_memoria_mb * 1024 * 1024)
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener_json(self, clave: str):
+        """
+        Obtiene el JSON de una figura cacheada
+
+        Args:
+            clave: Clave de la figura
+
+        Returns:
+            Cadena JSON de la figura o None si no está en caché
+        """
+        with self._lock:
+            figura_json = self._entradas.get(clave)
+            if figura_json is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return figura_json
+
+    def guardar_json(self, clave: str, figura_json: str):
+        """
+        Guarda el JSON de una figura, desalojando las menos usadas si es necesario
+
+        Args:
+            clave: Clave de la figura
+            figura_json: Figura serializada
+        """
+        tamano = len(figura_json)
+        if tamano > self.limite_bytes:
+            return
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+
+            self._entradas[clave] = figura_json
+            self._bytes += tamano
+
+            while self._entradas and (
+                len(self._entradas) > self.max_entradas or self._bytes > self.limite_bytes
+            ):
+                _, desalojada = self._entradas.popitem(last=False)
+                self._bytes -= len(desalojada)
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self) -> dict:
+        """
+        Obtiene estadísticas de uso de la caché
+
+        Returns:
+            Diccionario con entradas, memoria usada, aciertos, fallos y tasa de acierto
+        """
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'memoria_mb': self._bytes / (1024 * 1024),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_acierto': self.aciertos / total if total else 0.0
+            }
+
+
+# Caché compartida por todas las sesiones del proceso
+cache_figuras_global = CacheFiguras()
+
+
+def figura_desde_json(figura_json: str) -> go.Figure:
+    """
+    Reconstruye una figura desde su JSON sin volver a validar sus propiedades
+
+    Args:
+        figura_json: Figura serializada con fig.to_json()
+
+    Returns:
+        Figura de Plotly
+    """
+    return go.Figure(json.loads(figura_json), _validate=False)
+
+
+def cachear_figura(func):
+    """
+    Decorador que cachea la figura producida por una función de visualización
+
+    La clave combina el nombre de la función con la huella de todos sus
+    argumentos (DataFrames incluidos), de modo que cualquier cambio en los
+    datos o en los parámetros genera una figura nueva.
+    """
+    nombre = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def envoltura(*args, **kwargs):
+        clave = nombre + ':' + huella_datos((args, kwargs))
+
+        figura_json = cache_figuras_global.obtener_json(clave)
+        registrar_cache('figuras', figura_json is not None)
+        if figura_json is not None:
+            return figura_desde_json(figura_json)
+
+        fig = func(*args, **kwargs)
+        cache_figuras_global.guardar_json(clave, fig.to_json())
+        return fig
+
+    envoltura.sin_cache = func
+    return envoltura
@@ -0,0 +1,132 @@
+"""
+Carga perezosa de módulos pesados para el proyecto Jamundí Conectada
+Los módulos que solo se usan tras ciertos clics (plotly.express, fpdf,
+openpyxl) se importan la primera vez que se accede a uno de sus atributos,
+no al arrancar el dashboard. Incluye una auditoría de tiempos de importación
+basada en `python -X importtime`.
+"""
+
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+_lock = threading.Lock()
+# nombre -> segundos que tardó la importación diferida
+_tiempos_carga = {}
+
+
+class ModuloPerezoso:
+    """Representante de un módulo que se importa en el primer acceso a un atributo"""
+
+    def __init__(self, nombre: str):
+        """
+        Args:
+            nombre: Nombre completo del módulo (p. ej. 'plotly.express')
+        """
+        self._nombre = nombre
+        self._modulo = None
+
+    def _cargar(self):
+        if self._modulo is None:
+            with _lock:
+                if self._modulo is None:
+                    inicio = time.perf_counter()
+                    modulo = importlib.import_module(self._nombre)
+                    if self._nombre not in _tiempos_carga:
+                        _tiempos_carga[self._nombre] = time.perf_counter() - inicio
+                    self._modulo = modulo
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._cargar(), atributo)
+
+    def __repr__(self) -> str:
+        estado = 'cargado' if self._modulo is not None else 'pendiente'
+        return f"<ModuloPerezoso {self._nombre!r} ({estado})>"
+
+
+def importar_perezoso(nombre: str):
+    """
+    Devuelve el módulo si ya está importado o un representante perezoso si no
+
+    Args:
+        nombre: Nombre completo del módulo
+
+    Returns:
+        Módulo o ModuloPerezoso
+    """
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    return ModuloPerezoso(nombre)
+
+
+def tiempos_carga_diferida() -> dict:
+    """Módulos cargados de forma diferida en este proceso y su tiempo de importación (s)"""
+    with _lock:
+        return dict(_tiempos_carga)
+
+# ============================================================================
+# AUDITORÍA DE IMPORTACIONES
+# ============================================================================
+
+_PATRON_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def auditar_importaciones(modulos: list, top: int = 15) -> pd.DataFrame:
+    """
+    Mide qué módulos cuestan más al importar, en un intérprete nuevo
+
+    Args:
+        modulos: Módulos a importar (p. ej. los que importa app_v3 al arrancar)
+        top: Número de filas a devolver
+
+    Returns:
+        DataFrame con modulo, propio_ms, acumulado_ms y nivel (profundidad
+        en el árbol de importación), ordenado por tiempo acumulado
+    """
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modulos)],
+        capture_output=True, text=True
+    )
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        coincidencia = _PATRON_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            filas.append({
+                'modulo': nombre,
+                'propio_ms': int(propio) / 1000,
+                'acumulado_ms': int(acumulado) / 1000,
+                'nivel': len(sangria) // 2
+            })
+    df = pd.DataFrame(filas, columns=['modulo', 'propio_ms', 'acumulado_ms', 'nivel'])
+    return df.sort_values('acumulado_ms', ascending=False).head(top).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    print("="*80)
+    print("AUDITORÍA DE IMPORTACIONES")
+    print("="*80)
+
+    df = auditar_importaciones(['visualizations', 'visualizations_advanced', 'utils', 'exportacion'])
+    print(df.to_string(index=False))
+
+    for pesado in ['plotly.express', 'fpdf', 'openpyxl']:
+        cargado = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, visualizations, visualizations_advanced, utils, exportacion; '
+             f'print({pesado!r} in sys.modules)'],
+            capture_output=True, text=True
+        ).stdout.strip()
+        print(f"   {'⚠️' if cargado == 'True' else '✅'} {pesado} cargado al importar: {cargado}")
+
+    px = importar_perezoso('plotly.express')
+    print(f"\n{px!r}")
+    px.colors
+    print(f"{px!r} en {tiempos_carga_diferida().get('plotly.express', 0) * 1000:.0f} ms")
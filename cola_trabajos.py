@@ -0,0 +1,521 @@
+"""
+Cola de trabajos en segundo plano para el Dashboard Jamundí Conectada
+Las tareas largas (PDF de una zona, ranking completo con otros pesos,
+refresco de datos) se encolan en SQLite y las ejecuta un pool de procesos:
+la sesión de Streamlit solo inserta una fila y consulta su estado, sin
+bloquear la interfaz mientras el trabajo corre.
+
+- Estado persistente: pendiente → en_curso → completado | error | cancelado,
+  con progreso (0-1) y mensaje que escribe el propio trabajador.
+- Resultados por id: diccionario JSON y, si el trabajo genera un archivo,
+  la ruta dentro de la carpeta de resultados.
+- Un trabajo con la misma clave (p. ej. versión + zona) no se repite
+  mientras esté en curso o su resultado siga disponible.
+- Los trabajos que quedaron en curso cuando su proceso murió vuelven a
+  pendiente al abrir la cola.
+
+Un trabajador independiente puede atender la misma base:
+    python cola_trabajos.py --trabajador
+    python cola_trabajos.py --listar
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import huella_datos
+
+DIRECTORIO_TRABAJOS = os.environ.get(
+    'SIPID_DIR_TRABAJOS', os.path.join(tempfile.gettempdir(), 'sipid_trabajos')
+)
+MAX_TRABAJADORES = int(os.environ.get('SIPID_MAX_TRABAJADORES', min(2, os.cpu_count() or 1)))
+# Los trabajos terminados (y sus archivos) se borran pasado este tiempo
+MAX_ANTIGUEDAD_TRABAJOS_S = 7 * 24 * 3600
+
+ESTADOS_ACTIVOS = ('pendiente', 'en_curso')
+ESTADOS_FINALES = ('completado', 'error', 'cancelado')
+
+# tipo -> 'modulo.funcion'; el trabajador importa la función por su ruta, así
+# que otros módulos pueden registrar tipos sin que la cola los importe
+TIPOS_TRABAJO = {
+    'pdf_zona': 'cola_trabajos.trabajo_pdf_zona',
+    'paquete_reportes': 'cola_trabajos.trabajo_paquete_reportes',
+    'ranking_completo': 'cola_trabajos.trabajo_ranking_completo',
+    'refrescar_datos': 'cola_trabajos.trabajo_refrescar_datos',
+}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    argumentos TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    progreso REAL NOT NULL DEFAULT 0,
+    mensaje TEXT,
+    resultado TEXT,
+    error TEXT,
+    pid INTEGER,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, creado);
+"""
+
+_COLUMNAS = ['id', 'tipo', 'argumentos', 'estado', 'progreso', 'mensaje', 'resultado',
+             'error', 'pid', 'creado', 'iniciado', 'terminado']
+
+
+def registrar_tipo(tipo: str, ruta_funcion: str):
+    """
+    Registra un tipo de trabajo
+
+    Args:
+        tipo: Nombre del tipo
+        ruta_funcion: 'modulo.funcion' con firma funcion(argumentos, progreso, ruta_base) -> dict,
+                      donde progreso(fraccion, mensaje) informa el avance y ruta_base es
+                      el prefijo para los archivos que genere el trabajo
+    """
+    TIPOS_TRABAJO[tipo] = ruta_funcion
+
+
+def _a_json(valor):
+    """Convierte tipos de numpy/pandas para json.dumps"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (pd.Timestamp, np.datetime64)):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _conectar(ruta: str) -> sqlite3.Connection:
+    conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=None)
+    # WAL: las sesiones leen el estado mientras un trabajador escribe su progreso
+    conexion.execute('PRAGMA journal_mode=WAL')
+    conexion.execute('PRAGMA synchronous=NORMAL')
+    return conexion
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# ============================================================================
+# EJECUCIÓN (EN EL PROCESO TRABAJADOR)
+# ============================================================================
+
+def ejecutar_trabajo(ruta_db: str, id_trabajo: str) -> str:
+    """
+    Reclama y ejecuta un trabajo pendiente
+
+    El reclamo es un UPDATE condicionado al estado, así que si varios procesos
+    intentan el mismo trabajo solo uno lo ejecuta.
+
+    Args:
+        ruta_db: Base SQLite de la cola
+        id_trabajo: Identificador del trabajo
+
+    Returns:
+        Estado final ('omitido' si otro proceso ya lo había reclamado)
+    """
+    conexion = _conectar(ruta_db)
+    try:
+        reclamado = conexion.execute(
+            "UPDATE trabajos SET estado = 'en_curso', pid = ?, iniciado = ?, mensaje = 'Iniciando' "
+            "WHERE id = ? AND estado = 'pendiente'",
+            (os.getpid(), time.time(), id_trabajo)
+        ).rowcount
+        if not reclamado:
+            return 'omitido'
+        tipo, argumentos = conexion.execute(
+            'SELECT tipo, argumentos FROM trabajos WHERE id = ?', (id_trabajo,)
+        ).fetchone()
+
+        def progreso(fraccion: float, mensaje: str = None):
+            conexion.execute(
+                'UPDATE trabajos SET progreso = ?, mensaje = COALESCE(?, mensaje) WHERE id = ?',
+                (float(min(max(fraccion, 0.0), 1.0)), mensaje, id_trabajo)
+            )
+
+        directorio_resultados = os.path.join(os.path.dirname(ruta_db), 'resultados')
+        os.makedirs(directorio_resultados, exist_ok=True)
+        try:
+            modulo, funcion = TIPOS_TRABAJO[tipo].rsplit('.', 1)
+            ejecutar = getattr(importlib.import_module(modulo), funcion)
+            resultado = ejecutar(json.loads(argumentos), progreso,
+                                 os.path.join(directorio_resultados, id_trabajo))
+            conexion.execute(
+                "UPDATE trabajos SET estado = 'completado', progreso = 1, mensaje = 'Listo', "
+                'resultado = ?, terminado = ? WHERE id = ?',
+                (json.dumps(resultado or {}, default=_a_json), time.time(), id_trabajo)
+            )
+            return 'completado'
+        except Exception as e:
+            conexion.execute(
+                "UPDATE trabajos SET estado = 'error', mensaje = ?, error = ?, terminado = ? WHERE id = ?",
+                (f'{type(e).__name__}: {e}', traceback.format_exc(), time.time(), id_trabajo)
+            )
+            return 'error'
+    finally:
+        conexion.close()
+
+# ============================================================================
+# COLA
+# ============================================================================
+
+class ColaTrabajos:
+    """Cola persistente en SQLite con un pool de procesos que la atiende"""
+
+    def __init__(self, directorio: str = DIRECTORIO_TRABAJOS, max_trabajadores: int = MAX_TRABAJADORES):
+        """
+        Args:
+            directorio: Carpeta de la base (trabajos.sqlite) y de los resultados
+            max_trabajadores: Procesos del pool (0 = solo encolar; los ejecuta
+                              un trabajador externo)
+        """
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, 'trabajos.sqlite')
+        self.max_trabajadores = max_trabajadores
+        self._lock = threading.Lock()
+        self._conexion = _conectar(self.ruta)
+        self._conexion.executescript(_ESQUEMA)
+        self._ejecutor = None
+        self.limpiar()
+        self.recuperar()
+
+    def __repr__(self) -> str:
+        return f"ColaTrabajos({self.ruta!r})"
+
+    def _enviar(self, id_trabajo: str):
+        """Entrega el trabajo al pool (que se crea con el primer envío)"""
+        if self.max_trabajadores <= 0:
+            return
+        with self._lock:
+            if self._ejecutor is None:
+                # spawn: el proceso de Streamlit tiene hilos y no conviene duplicarlo con fork
+                self._ejecutor = ProcessPoolExecutor(
+                    self.max_trabajadores, mp_context=multiprocessing.get_context('spawn')
+                )
+            self._ejecutor.submit(ejecutar_trabajo, self.ruta, id_trabajo)
+
+    def encolar(self, tipo: str, argumentos: dict = None, clave=None) -> str:
+        """
+        Encola un trabajo
+
+        Args:
+            tipo: Uno de TIPOS_TRABAJO
+            argumentos: Diccionario serializable a JSON
+            clave: Identificador de la tarea (p. ej. versión + zona); si ya hay
+                   un trabajo con la misma clave activo o completado se
+                   devuelve ese en lugar de crear otro
+
+        Returns:
+            Id del trabajo
+        """
+        if tipo not in TIPOS_TRABAJO:
+            raise ValueError(f"Tipo de trabajo no soportado: {tipo}. Opciones: {list(TIPOS_TRABAJO)}")
+        id_trabajo = huella_datos((tipo, clave))[:16] if clave is not None else uuid.uuid4().hex[:16]
+        fila = (id_trabajo, tipo, json.dumps(argumentos or {}, default=_a_json), time.time())
+
+        with self._lock:
+            existente = self._conexion.execute(
+                'SELECT estado FROM trabajos WHERE id = ?', (id_trabajo,)
+            ).fetchone()
+            if existente and (existente[0] in ESTADOS_ACTIVOS or
+                              (existente[0] == 'completado' and self._resultado_disponible(id_trabajo))):
+                return id_trabajo
+            # Nuevo, o un intento anterior fallido/cancelado/sin archivo: se reinicia
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO trabajos (id, tipo, argumentos, estado, creado) "
+                "VALUES (?, ?, ?, 'pendiente', ?)", fila
+            )
+        self._enviar(id_trabajo)
+        return id_trabajo
+
+    def _resultado_disponible(self, id_trabajo: str) -> bool:
+        """False si el resultado apunta a un archivo que ya no existe"""
+        fila = self._conexion.execute('SELECT resultado FROM trabajos WHERE id = ?', (id_trabajo,)).fetchone()
+        ruta = json.loads(fila[0] or '{}').get('ruta') if fila else None
+        return ruta is None or os.path.exists(ruta)
+
+    def estado(self, id_trabajo: str) -> dict:
+        """
+        Estado de un trabajo
+
+        Returns:
+            Diccionario con id, tipo, estado, progreso, mensaje, resultado,
+            error y marcas de tiempo (None si el id no existe)
+        """
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT {', '.join(_COLUMNAS)} FROM trabajos WHERE id = ?", (id_trabajo,)
+            ).fetchone()
+        if fila is None:
+            return None
+        trabajo = dict(zip(_COLUMNAS, fila))
+        trabajo['argumentos'] = json.loads(trabajo['argumentos'])
+        trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+        return trabajo
+
+    def resultado(self, id_trabajo: str) -> dict:
+        """Resultado de un trabajo completado (None si aún no termina o falló)"""
+        trabajo = self.estado(id_trabajo)
+        return trabajo['resultado'] if trabajo and trabajo['estado'] == 'completado' else None
+
+    def esperar(self, id_trabajo: str, timeout: float = None, intervalo: float = 0.1) -> dict:
+        """Sondea hasta que el trabajo termine (o venza el timeout) y devuelve su estado"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            trabajo = self.estado(id_trabajo)
+            if trabajo is None or trabajo['estado'] in ESTADOS_FINALES:
+                return trabajo
+            if limite is not None and time.monotonic() >= limite:
+                return trabajo
+            time.sleep(intervalo)
+
+    def listar(self, ids: list = None, limite: int = 50) -> pd.DataFrame:
+        """
+        Trabajos más recientes
+
+        Args:
+            ids: Si se indica, solo esos trabajos (p. ej. los de una sesión)
+            limite: Número máximo de filas
+
+        Returns:
+            DataFrame con id, tipo, estado, progreso, mensaje, creado y terminado
+        """
+        consulta = 'SELECT id, tipo, estado, progreso, mensaje, creado, terminado FROM trabajos'
+        parametros = ()
+        if ids is not None:
+            if not ids:
+                return pd.DataFrame(columns=['id', 'tipo', 'estado', 'progreso', 'mensaje', 'creado', 'terminado'])
+            consulta += f" WHERE id IN ({', '.join('?' * len(ids))})"
+            parametros = tuple(ids)
+        with self._lock:
+            return pd.read_sql_query(f'{consulta} ORDER BY creado DESC LIMIT {int(limite)}',
+                                     self._conexion, params=parametros)
+
+    def cancelar(self, id_trabajo: str) -> bool:
+        """Cancela un trabajo que aún no empezó (True si se canceló)"""
+        with self._lock:
+            return bool(self._conexion.execute(
+                "UPDATE trabajos SET estado = 'cancelado', mensaje = 'Cancelado', terminado = ? "
+                "WHERE id = ? AND estado = 'pendiente'", (time.time(), id_trabajo)
+            ).rowcount)
+
+    def recuperar(self) -> int:
+        """
+        Devuelve a pendiente los trabajos cuyo proceso murió y reenvía los pendientes
+
+        Returns:
+            Número de trabajos reenviados al pool
+        """
+        with self._lock:
+            en_curso = self._conexion.execute(
+                "SELECT id, pid FROM trabajos WHERE estado = 'en_curso'"
+            ).fetchall()
+            for id_trabajo, pid in en_curso:
+                if pid is None or not _proceso_vivo(pid):
+                    self._conexion.execute(
+                        "UPDATE trabajos SET estado = 'pendiente', pid = NULL, progreso = 0, "
+                        "mensaje = 'Reintentando' WHERE id = ? AND estado = 'en_curso'", (id_trabajo,)
+                    )
+        if self.max_trabajadores <= 0:
+            return 0
+        pendientes = self.pendientes()
+        for id_trabajo in pendientes:
+            self._enviar(id_trabajo)
+        return len(pendientes)
+
+    def pendientes(self) -> list:
+        """Ids de los trabajos pendientes, del más antiguo al más reciente"""
+        with self._lock:
+            return [fila[0] for fila in self._conexion.execute(
+                "SELECT id FROM trabajos WHERE estado = 'pendiente' ORDER BY creado"
+            )]
+
+    def limpiar(self, max_antiguedad_s: float = MAX_ANTIGUEDAD_TRABAJOS_S) -> int:
+        """Borra los trabajos terminados hace más de max_antiguedad_s y sus archivos"""
+        limite = time.time() - max_antiguedad_s
+        with self._lock:
+            viejos = self._conexion.execute(
+                f"SELECT id, resultado FROM trabajos WHERE estado IN ({', '.join('?' * len(ESTADOS_FINALES))}) "
+                'AND terminado < ?', (*ESTADOS_FINALES, limite)
+            ).fetchall()
+            for id_trabajo, resultado in viejos:
+                ruta = json.loads(resultado or '{}').get('ruta')
+                if ruta and os.path.exists(ruta):
+                    os.remove(ruta)
+                self._conexion.execute('DELETE FROM trabajos WHERE id = ?', (id_trabajo,))
+        return len(viejos)
+
+    def cerrar(self, esperar: bool = True):
+        """Detiene el pool (los trabajos pendientes quedan en la base)"""
+        with self._lock:
+            if self._ejecutor is not None:
+                self._ejecutor.shutdown(wait=esperar, cancel_futures=not esperar)
+                self._ejecutor = None
+
+# ============================================================================
+# TIPOS DE TRABAJO
+# ============================================================================
+
+def trabajo_pdf_zona(argumentos: dict, progreso, ruta_base: str) -> dict:
+    """
+    PDF con la ficha de una zona
+
+    Args:
+        argumentos: {'zona': fila de la zona como diccionario,
+                     'cod_municipio': municipio del encabezado (opcional),
+                     'version': snapshot de la zona; si se indica, el PDF
+                                incluye los gráficos de la zona (opcional)}
+    """
+    from utils import exportar_zona_a_pdf
+
+    zona_data = pd.Series(argumentos['zona'])
+    imagenes = None
+    if argumentos.get('version'):
+        progreso(0.1, 'Renderizando gráficos')
+        imagenes = _imagenes_reporte(argumentos['version'], zona_data.to_frame().T).get(zona_data['zona'])
+    progreso(0.6, f"Generando PDF de {zona_data['zona']}")
+    ruta = f'{ruta_base}.pdf'
+    if not exportar_zona_a_pdf(zona_data, ruta, imagenes, argumentos.get('cod_municipio')):
+        raise RuntimeError(f"No se pudo generar el PDF de {zona_data['zona']}")
+    return {'ruta': ruta, 'nombre': f"reporte_{zona_data['zona'].replace(' ', '_')}.pdf"}
+
+
+def _imagenes_reporte(version: str, df_zonas: pd.DataFrame) -> dict:
+    """Gráficos de las zonas para los reportes (el radar compara con todo el snapshot)"""
+    from almacen_compartido import abrir_snapshot
+    from estadisticas_zonas import calcular_estadisticas_zonas
+    from imagenes_graficos import imagenes_zonas
+
+    estadisticas = calcular_estadisticas_zonas(abrir_snapshot(version).como_pandas('zonas_ranked'))
+    return imagenes_zonas(df_zonas, estadisticas)
+
+
+def trabajo_paquete_reportes(argumentos: dict, progreso, ruta_base: str) -> dict:
+    """
+    PDF único con el reporte de cada zona de un snapshot, en orden de ranking
+
+    Args:
+        argumentos: {'version': versión del snapshot, 'cod_municipio': municipio
+                     (opcional), 'top_n': solo las N zonas más prioritarias (opcional),
+                     'graficos': incluir los gráficos de cada zona (por defecto True)}
+    """
+    from almacen_compartido import abrir_snapshot
+    from reportes_pdf import generar_paquete_reportes
+
+    progreso(0.1, 'Leyendo zonas del snapshot')
+    df_zonas = abrir_snapshot(argumentos['version']).como_pandas('zonas_ranked').sort_values('ranking')
+    if argumentos.get('top_n'):
+        df_zonas = df_zonas.head(argumentos['top_n'])
+    imagenes = None
+    if argumentos.get('graficos', True):
+        progreso(0.2, f'Renderizando gráficos de {len(df_zonas):,} zonas')
+        imagenes = _imagenes_reporte(argumentos['version'], df_zonas)
+    progreso(0.6, f'Generando {len(df_zonas):,} reportes')
+    ruta = f'{ruta_base}.pdf'
+    generar_paquete_reportes(df_zonas, ruta, imagenes, cod_municipio=argumentos.get('cod_municipio'))
+    return {'ruta': ruta, 'nombre': 'reportes_zonas.pdf', 'filas': len(df_zonas)}
+
+
+def trabajo_ranking_completo(argumentos: dict, progreso, ruta_base: str) -> dict:
+    """
+    Ranking de todas las zonas de un snapshot con otros pesos
+
+    Args:
+        argumentos: {'version': versión del snapshot, 'pesos': pesos del ranking
+                     (opcional), 'formato': formato de exportación (csv por defecto)}
+    """
+    from almacen_compartido import abrir_snapshot
+    from exportacion import FORMATOS_EXPORTACION, escribir_tabla
+    from ranking import calcular_puntaje_prioridad
+
+    progreso(0.1, 'Leyendo zonas del snapshot')
+    df_zonas = abrir_snapshot(argumentos['version']).como_pandas('zonas_ranked')
+    progreso(0.4, f'Calculando ranking de {len(df_zonas):,} zonas')
+    df_ranked = calcular_puntaje_prioridad(df_zonas, argumentos.get('pesos'))
+    formato = argumentos.get('formato', 'csv')
+    ruta = f'{ruta_base}{FORMATOS_EXPORTACION[formato][1]}'
+    progreso(0.7, 'Escribiendo resultado')
+    escribir_tabla(df_ranked, ruta, formato)
+    return {'ruta': ruta, 'nombre': f'ranking_zonas{FORMATOS_EXPORTACION[formato][1]}', 'filas': len(df_ranked)}
+
+
+def trabajo_refrescar_datos(argumentos: dict, progreso, ruta_base: str) -> dict:
+    """
+    Vuelve a consultar las fuentes y publica un snapshot nuevo
+
+    Si las fuentes no devuelven conectividad (API caída) el trabajo falla y
+    se conserva el snapshot vigente en lugar de publicar uno vacío.
+
+    Args:
+        argumentos: {'cod_municipio': código DANE (opcional)}
+    """
+    from almacen_compartido import DIRECTORIO_ALMACEN, publicar_snapshot
+    from municipios import particion_municipio
+    from precalentamiento import cargar_fuentes
+
+    progreso(0.1, 'Consultando fuentes')
+    # cargar_fuentes falla si no hay conectividad: el snapshot vigente no se toca
+    tablas, extras = cargar_fuentes(argumentos.get('cod_municipio'))
+    progreso(0.8, 'Publicando snapshot')
+    version = publicar_snapshot(tablas, extras, DIRECTORIO_ALMACEN,
+                                particion_municipio(argumentos.get('cod_municipio')))
+    return {'version': version}
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Cola de trabajos de Jamundí Conectada')
+    parser.add_argument('--directorio', default=DIRECTORIO_TRABAJOS)
+    parser.add_argument('--trabajador', action='store_true',
+                        help='Atiende los trabajos pendientes de la base (sin pool propio)')
+    parser.add_argument('--intervalo', type=float, default=1.0, metavar='SEGUNDOS')
+    parser.add_argument('--listar', action='store_true', help='Muestra los trabajos más recientes')
+    args = parser.parse_args(argv)
+
+    cola = ColaTrabajos(args.directorio, max_trabajadores=0)
+    if args.listar:
+        print(cola.listar().to_string(index=False))
+        return 0
+    if not args.trabajador:
+        parser.print_help()
+        return 0
+
+    print(f"👷 Atendiendo {cola.ruta} cada {args.intervalo} s")
+    while True:
+        cola.recuperar()
+        for id_trabajo in cola.pendientes():
+            inicio = time.perf_counter()
+            estado = ejecutar_trabajo(cola.ruta, id_trabajo)
+            if estado != 'omitido':
+                print(f"{'✅' if estado == 'completado' else '❌'} {id_trabajo} {estado} "
+                      f"en {time.perf_counter() - inicio:.1f} s")
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Concentración del mercado de proveedores para el proyecto Jamundí Conectada
+Agrega la conectividad en un cubo denso periodo × segmento × proveedor ×
+tecnología con una sola pasada vectorizada (np.bincount sobre códigos
+combinados). Todas las métricas salen del cubo, cuyo tamaño depende de las
+categorías y no de las filas:
+
+- Cuota de cada proveedor por periodo (y segmento)
+- Índice de Herfindahl-Hirschman (HHI, 0-10.000) y su nivel de concentración
+- Rotación entre trimestres: accesos ganados/perdidos, entradas y salidas
+- Mezcla tecnológica por periodo (y segmento)
+
+Filtrar por proveedor, tecnología o segmento es un slice del cubo, y un
+trimestre nuevo se suma con `agregar_trimestre` sin volver a recorrer el
+histórico.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from perfilado import perfilar
+from pronosticos import etiqueta_periodo
+
+# Umbrales del HHI (guías de fusiones horizontales DOJ/FTC 2010)
+UMBRALES_HHI = (1500, 2500)
+NIVELES_HHI = ['No concentrado', 'Moderadamente concentrado', 'Altamente concentrado']
+
+# Ejes del cubo que se pueden filtrar sin volver a los registros
+EJES_CUBO = ('segmento', 'proveedor', 'tecnologia')
+
+SIN_DATO = 'Sin dato'
+
+
+def nivel_hhi(hhi: float) -> str:
+    """Nivel de concentración de un HHI según UMBRALES_HHI"""
+    return NIVELES_HHI[int(np.searchsorted(UMBRALES_HHI, hhi, side='right'))]
+
+
+def _codificar(valores, categorias: list):
+    """
+    Códigos de cada valor extendiendo las categorías conocidas
+
+    Se factoriza una sola vez y solo los valores únicos se cruzan con las
+    categorías existentes, así que el costo no depende de cuántas haya.
+
+    Returns:
+        (códigos, categorías ampliadas)
+    """
+    codigos_locales, unicos = pd.factorize(valores)
+    unicos = np.asarray(unicos).tolist()
+    nuevos = sorted(set(unicos) - set(categorias))
+    if nuevos:
+        categorias = categorias + nuevos
+    if not unicos:
+        return codigos_locales, categorias
+    return pd.Index(categorias).get_indexer(unicos)[codigos_locales], categorias
+
+
+class CuboMercado:
+    """Cubo de accesos periodo × segmento × proveedor × tecnología"""
+
+    def __init__(self, indices_periodo=None, segmentos=None, proveedores=None,
+                 tecnologias=None, accesos: np.ndarray = None):
+        """
+        Args:
+            indices_periodo: Índice absoluto de trimestre de cada periodo (ordenado)
+            segmentos: Nombres de segmento
+            proveedores: Nombres de proveedor
+            tecnologias: Nombres de tecnología
+            accesos: Matriz (periodos, segmentos, proveedores, tecnologías)
+        """
+        self.indices_periodo = list(indices_periodo or [])
+        self.segmentos = list(segmentos or [])
+        self.proveedores = list(proveedores or [])
+        self.tecnologias = list(tecnologias or [])
+        forma = (len(self.indices_periodo), len(self.segmentos), len(self.proveedores), len(self.tecnologias))
+        self.accesos = np.zeros(forma) if accesos is None else accesos
+
+    def huella(self) -> str:
+        """Huella del contenido del cubo (ejes y accesos)"""
+        h = hashlib.blake2b(digest_size=8)
+        for eje in (self.indices_periodo, self.segmentos, self.proveedores, self.tecnologias):
+            h.update(repr(eje).encode())
+        h.update(np.ascontiguousarray(self.accesos).tobytes())
+        return h.hexdigest()
+
+    @property
+    def periodos(self) -> list:
+        return [etiqueta_periodo(t) for t in self.indices_periodo]
+
+    @property
+    def total(self) -> float:
+        return float(self.accesos.sum())
+
+    # ------------------------------------------------------------------
+    # Construcción incremental
+    # ------------------------------------------------------------------
+
+    def agregar_trimestre(self, df: pd.DataFrame) -> 'CuboMercado':
+        """
+        Suma registros al cubo (normalmente los de un trimestre nuevo)
+
+        Las categorías nuevas amplían los ejes; los periodos que ya existían
+        acumulan los accesos. Solo se recorren las filas recibidas.
+
+        Args:
+            df: Registros con anno, trimestre, proveedor, accesos y,
+                opcionalmente, segmento y tecnologia
+
+        Returns:
+            El mismo cubo (modificado en sitio)
+        """
+        df = df.dropna(subset=['anno', 'trimestre', 'proveedor'])
+        if df.empty:
+            return self
+        periodo = df['anno'].to_numpy(dtype=np.int64) * 4 + df['trimestre'].to_numpy(dtype=np.int64) - 1
+        # Segmento y tecnología faltantes se agrupan en SIN_DATO para no perder accesos
+        columnas = {
+            eje: df[eje].fillna(SIN_DATO) if eje in df.columns else pd.Series(SIN_DATO, index=df.index)
+            for eje in EJES_CUBO
+        }
+
+        c_periodo, indices_periodo = _codificar(periodo, self.indices_periodo)
+        c_segmento, segmentos = _codificar(columnas['segmento'], self.segmentos)
+        c_proveedor, proveedores = _codificar(columnas['proveedor'], self.proveedores)
+        c_tecnologia, tecnologias = _codificar(columnas['tecnologia'], self.tecnologias)
+
+        forma = (len(indices_periodo), len(segmentos), len(proveedores), len(tecnologias))
+        if forma != self.accesos.shape:
+            self.accesos = np.pad(self.accesos, [(0, n - m) for n, m in zip(forma, self.accesos.shape)])
+
+        codigo = np.ravel_multi_index((c_periodo, c_segmento, c_proveedor, c_tecnologia), forma)
+        accesos = np.nan_to_num(df['accesos'].to_numpy(dtype=float))
+        self.accesos += np.bincount(codigo, weights=accesos, minlength=int(np.prod(forma))).reshape(forma)
+
+        # Mantener el eje de periodos ordenado aunque llegue un trimestre atrasado
+        orden = np.argsort(indices_periodo, kind='stable')
+        self.indices_periodo = [indices_periodo[i] for i in orden]
+        self.accesos = self.accesos[orden]
+        self.segmentos, self.proveedores, self.tecnologias = segmentos, proveedores, tecnologias
+        return self
+
+    # ------------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------------
+
+    def filtrar(self, filtros: dict = None) -> 'CuboMercado':
+        """
+        Sub-cubo con los valores admitidos de cada eje
+
+        Args:
+            filtros: Eje ('segmento', 'proveedor', 'tecnologia') -> valores
+                     admitidos; None o vacío = sin restricción
+
+        Returns:
+            CuboMercado nuevo (los ejes conservan el orden original)
+        """
+        ejes = {'segmento': self.segmentos, 'proveedor': self.proveedores, 'tecnologia': self.tecnologias}
+        accesos = self.accesos
+        for eje, valores in (filtros or {}).items():
+            if eje not in ejes:
+                raise ValueError(f"Eje no filtrable en el cubo: {eje}. Opciones: {list(ejes)}")
+            if not valores:
+                continue
+            admitidos = set(valores)
+            posiciones = [i for i, v in enumerate(ejes[eje]) if v in admitidos]
+            ejes[eje] = [ejes[eje][i] for i in posiciones]
+            accesos = np.take(accesos, posiciones, axis=1 + EJES_CUBO.index(eje))
+        return CuboMercado(self.indices_periodo, ejes['segmento'], ejes['proveedor'],
+                           ejes['tecnologia'], accesos)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def _por_proveedor(self, por_segmento: bool) -> np.ndarray:
+        """Accesos (periodos, grupos, proveedores); un solo grupo si no se separa por segmento"""
+        matriz = self.accesos.sum(axis=3)
+        return matriz if por_segmento else matriz.sum(axis=1, keepdims=True)
+
+    def _claves(self, por_segmento: bool) -> dict:
+        """Columnas periodo (y segmento) de las tablas por periodo × grupo"""
+        grupos = self.segmentos if por_segmento else [None]
+        claves = {'periodo': np.repeat(self.periodos, len(grupos))}
+        if por_segmento:
+            claves['segmento'] = np.tile(grupos, len(self.indices_periodo))
+        return claves
+
+    def cuotas(self, por_segmento: bool = False) -> pd.DataFrame:
+        """
+        Accesos y cuota de cada proveedor por periodo
+
+        Args:
+            por_segmento: Calcula las cuotas dentro de cada segmento
+
+        Returns:
+            DataFrame con periodo, [segmento], proveedor, accesos y cuota (0-1),
+            ordenado por periodo y cuota descendente; omite las filas sin accesos
+        """
+        matriz = self._por_proveedor(por_segmento)
+        totales = matriz.sum(axis=2, keepdims=True)
+        cuotas = np.divide(matriz, totales, out=np.zeros_like(matriz), where=totales > 0)
+        n_grupos, n_prov = matriz.shape[1], matriz.shape[2]
+
+        claves = {k: np.repeat(v, n_prov) for k, v in self._claves(por_segmento).items()}
+        df = pd.DataFrame({
+            **claves,
+            'proveedor': np.tile(self.proveedores, len(self.indices_periodo) * n_grupos),
+            'accesos': matriz.ravel(),
+            'cuota': cuotas.ravel()
+        })
+        df = df[df['accesos'] > 0]
+        return df.sort_values(['periodo', *(['segmento'] if por_segmento else []), 'cuota'],
+                              ascending=[True] * (2 if por_segmento else 1) + [False],
+                              kind='stable').reset_index(drop=True)
+
+    def hhi(self, por_segmento: bool = False) -> pd.DataFrame:
+        """
+        Índice de Herfindahl-Hirschman por periodo
+
+        HHI = Σ (cuota en %)²: 10.000 es un monopolio y valores cercanos a 0
+        indican muchos proveedores pequeños.
+
+        Args:
+            por_segmento: Calcula el índice dentro de cada segmento
+
+        Returns:
+            DataFrame con periodo, [segmento], accesos, n_proveedores, hhi,
+            cr4 (cuota conjunta de los 4 mayores), lider, cuota_lider y nivel
+        """
+        matriz = self._por_proveedor(por_segmento)
+        totales = matriz.sum(axis=2)
+        cuotas = np.divide(matriz, totales[..., None], out=np.zeros_like(matriz),
+                           where=totales[..., None] > 0)
+        # Las 4 mayores cuotas sin ordenar todo el eje de proveedores
+        k = min(4, cuotas.shape[2])
+        top = -np.partition(-cuotas, k - 1, axis=2)[..., :k] if k > 0 else np.zeros(cuotas.shape[:2] + (0,))
+        lider = cuotas.argmax(axis=2) if cuotas.shape[2] > 0 else np.zeros(cuotas.shape[:2], dtype=int)
+        hhi = (np.square(cuotas * 100)).sum(axis=2)
+
+        df = pd.DataFrame({
+            **self._claves(por_segmento),
+            'accesos': totales.ravel(),
+            'n_proveedores': (matriz > 0).sum(axis=2).ravel(),
+            'hhi': hhi.ravel(),
+            'cr4': top.sum(axis=2).ravel(),
+            'lider': [self.proveedores[i] if self.proveedores else None for i in lider.ravel()],
+            'cuota_lider': cuotas.max(axis=2, initial=0).ravel()
+        })
+        df = df[df['accesos'] > 0].reset_index(drop=True)
+        df['nivel'] = [nivel_hhi(h) for h in df['hhi']]
+        return df
+
+    def rotacion(self, por_segmento: bool = False) -> pd.DataFrame:
+        """
+        Rotación de accesos entre cada periodo y el anterior disponible
+
+        Args:
+            por_segmento: Calcula la rotación dentro de cada segmento
+
+        Returns:
+            DataFrame con periodo, [segmento], periodo_anterior, accesos_ganados,
+            accesos_perdidos, tasa_rotacion (perdidos / accesos del periodo
+            anterior), variacion_cuotas (½ Σ |Δ cuota|, 0-1), entradas y salidas
+        """
+        matriz = self._por_proveedor(por_segmento)
+        if matriz.shape[0] < 2:
+            columnas = ['periodo', *(['segmento'] if por_segmento else []), 'periodo_anterior',
+                        'accesos_ganados', 'accesos_perdidos', 'tasa_rotacion',
+                        'variacion_cuotas', 'entradas', 'salidas']
+            return pd.DataFrame(columns=columnas)
+
+        actual, anterior = matriz[1:], matriz[:-1]
+        delta = actual - anterior
+        total_anterior = anterior.sum(axis=2)
+        total_actual = actual.sum(axis=2)
+        cuota_actual = np.divide(actual, total_actual[..., None], out=np.zeros_like(actual),
+                                 where=total_actual[..., None] > 0)
+        cuota_anterior = np.divide(anterior, total_anterior[..., None], out=np.zeros_like(anterior),
+                                   where=total_anterior[..., None] > 0)
+        perdidos = np.clip(-delta, 0, None).sum(axis=2)
+
+        n_grupos = matriz.shape[1]
+        claves = {k: v[n_grupos:] for k, v in self._claves(por_segmento).items()}
+        df = pd.DataFrame({
+            **claves,
+            'periodo_anterior': np.repeat(self.periodos[:-1], n_grupos),
+            'accesos_ganados': np.clip(delta, 0, None).sum(axis=2).ravel(),
+            'accesos_perdidos': perdidos.ravel(),
+            'tasa_rotacion': np.divide(perdidos, total_anterior, out=np.zeros_like(perdidos),
+                                       where=total_anterior > 0).ravel(),
+            'variacion_cuotas': (0.5 * np.abs(cuota_actual - cuota_anterior).sum(axis=2)).ravel(),
+            'entradas': ((anterior == 0) & (actual > 0)).sum(axis=2).ravel(),
+            'salidas': ((anterior > 0) & (actual == 0)).sum(axis=2).ravel()
+        })
+        return df[(total_anterior.ravel() > 0) | (total_actual.ravel() > 0)].reset_index(drop=True)
+
+    def mezcla_tecnologica(self, por_segmento: bool = False) -> pd.DataFrame:
+        """
+        Accesos y participación de cada tecnología por periodo
+
+        Args:
+            por_segmento: Calcula la mezcla dentro de cada segmento
+
+        Returns:
+            DataFrame con periodo, [segmento], tecnologia, accesos y participacion (0-1)
+        """
+        matriz = self.accesos.sum(axis=2)
+        if not por_segmento:
+            matriz = matriz.sum(axis=1, keepdims=True)
+        totales = matriz.sum(axis=2, keepdims=True)
+        participacion = np.divide(matriz, totales, out=np.zeros_like(matriz), where=totales > 0)
+        n_tec = matriz.shape[2]
+
+        claves = {k: np.repeat(v, n_tec) for k, v in self._claves(por_segmento).items()}
+        df = pd.DataFrame({
+            **claves,
+            'tecnologia': np.tile(self.tecnologias, matriz.shape[0] * matriz.shape[1]),
+            'accesos': matriz.ravel(),
+            'participacion': participacion.ravel()
+        })
+        return df[df['accesos'] > 0].reset_index(drop=True)
+
+
+@perfilar()
+def construir_cubo_mercado(df_conectividad: pd.DataFrame) -> CuboMercado:
+    """
+    Construye el cubo de mercado con una pasada sobre la conectividad
+
+    Args:
+        df_conectividad: Registros con anno, trimestre, proveedor, accesos y,
+                         opcionalmente, segmento y tecnologia
+
+    Returns:
+        CuboMercado con todos los periodos de los registros
+    """
+    return CuboMercado().agregar_trimestre(df_conectividad)
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas, generar_conectividad
+
+    print("="*80)
+    print("PRUEBA DE CONCENTRACIÓN DEL MERCADO")
+    print("="*80)
+
+    df_zonas = generar_zonas(1_000, 42)
+    df = generar_conectividad(1_000_000, df_zonas, 42)
+
+    inicio = time.perf_counter()
+    cubo = construir_cubo_mercado(df)
+    print(f"\n🧊 Cubo {cubo.accesos.shape} de {len(df):,} registros en "
+          f"{(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    inicio = time.perf_counter()
+    sub = cubo.filtrar({'tecnologia': ['Fibra óptica']})
+    df_hhi, df_rot, df_mezcla = sub.hhi(), sub.rotacion(), cubo.mezcla_tecnologica()
+    print(f"⚡ Filtro + métricas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    print(df_hhi.tail(3).to_string(index=False))
+    print(df_rot.tail(3).to_string(index=False))
+
+    # El incremental por trimestre coincide con la construcción completa
+    periodo = df['anno'] * 4 + df['trimestre']
+    ultimo = periodo == periodo.max()
+    incremental = construir_cubo_mercado(df[~ultimo])
+    inicio = time.perf_counter()
+    incremental.agregar_trimestre(df[ultimo])
+    t_agregar = time.perf_counter() - inicio
+    iguales = np.allclose(incremental.hhi()['hhi'], cubo.hhi()['hhi'])
+    print(f"\n➕ Trimestre de {int(ultimo.sum()):,} registros agregado en {t_agregar * 1000:.0f} ms "
+          f"({'✅ igual' if iguales else '❌ distinto'} al cubo completo)")
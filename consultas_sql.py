@@ -0,0 +1,296 @@
+"""
+Capa de consultas SQL sobre la conectividad para el proyecto Jamundí Conectada
+Carga una vez los datos consolidados en una base embebida (DuckDB si está
+instalado, SQLite si no) y responde los agregados de los gráficos y KPIs con
+SQL: el filtro y la agrupación se ejecutan dentro del motor y a Python solo
+llega la tabla agregada (decenas de filas), no el histórico completo.
+
+SQLite usa índices cubrientes por periodo, proveedor, tecnología y segmento
+(incluyen accesos, así un GROUP BY lee solo el índice); DuckDB es columnar y
+no los necesita. La base se guarda junto al snapshot de su versión, de modo que
+todos los procesos la comparten y se elimina con él.
+"""
+
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from filtros_facetados import columna_periodo
+from perfilado import medir_etapa, perfilar
+
+try:
+    import duckdb
+except ImportError:  # opcional: sin DuckDB se usa SQLite (biblioteca estándar)
+    duckdb = None
+
+MOTORES = ('duckdb', 'sqlite')
+
+# 'auto' = DuckDB si está instalado; 'pandas' desactiva la capa SQL en el dashboard
+MOTOR_CONSULTAS = os.environ.get('SIPID_MOTOR_CONSULTAS', 'pandas')
+
+COLUMNAS_CONECTIVIDAD = {
+    'anno': 'INTEGER',
+    'trimestre': 'INTEGER',
+    'periodo': 'TEXT',
+    'proveedor': 'TEXT',
+    'segmento': 'TEXT',
+    'tecnologia': 'TEXT',
+    'municipio': 'TEXT',
+    'zona': 'TEXT',
+    'velocidad_bajada': 'DOUBLE',
+    'velocidad_subida': 'DOUBLE',
+    'accesos': 'BIGINT',
+}
+
+# Índices cubrientes (SQLite): columna de agrupación/filtro + accesos
+INDICES_SQLITE = {
+    'idx_periodo': ('anno', 'trimestre', 'accesos'),
+    'idx_proveedor': ('proveedor', 'accesos'),
+    'idx_tecnologia': ('tecnologia', 'accesos'),
+    'idx_segmento': ('segmento', 'accesos'),
+}
+
+FILAS_POR_BLOQUE = 100_000
+
+
+def elegir_motor(preferido: str = 'auto') -> str:
+    """
+    Motor disponible según la preferencia
+
+    Args:
+        preferido: 'auto', 'duckdb' o 'sqlite'
+
+    Returns:
+        'duckdb' o 'sqlite'
+    """
+    if preferido == 'auto':
+        return 'duckdb' if duckdb is not None else 'sqlite'
+    if preferido not in MOTORES:
+        raise ValueError(f"Motor no soportado: {preferido}. Opciones: {list(MOTORES)}")
+    if preferido == 'duckdb' and duckdb is None:
+        raise ImportError("DuckDB no está instalado (pip install duckdb)")
+    return preferido
+
+
+class MotorConsultas:
+    """Base embebida de solo lectura con la tabla `conectividad`"""
+
+    def __init__(self, ruta: str, motor: str = 'auto', huella: str = None):
+        """
+        Abre una base ya construida (ver construir_motor)
+
+        Args:
+            ruta: Archivo de la base
+            motor: 'auto', 'duckdb' o 'sqlite'
+            huella: Identificador del contenido (versión del snapshot)
+        """
+        self.ruta = ruta
+        self.motor = elegir_motor(motor)
+        self.huella = huella or os.path.basename(os.path.dirname(ruta))
+        self._lock = threading.Lock()
+        if self.motor == 'duckdb':
+            self._conexion = duckdb.connect(ruta, read_only=True)
+        else:
+            self._conexion = sqlite3.connect(f'file:{ruta}?mode=ro', uri=True, check_same_thread=False)
+        self.columnas = set(self._consultar('SELECT * FROM conectividad LIMIT 0').columns)
+
+    def _consultar(self, sql: str, parametros: list = ()) -> pd.DataFrame:
+        with self._lock:
+            if self.motor == 'duckdb':
+                return self._conexion.execute(sql, list(parametros)).df()
+            return pd.read_sql_query(sql, self._conexion, params=list(parametros))
+
+    def _condiciones(self, filtros: dict = None, rangos: dict = None):
+        """
+        Cláusula WHERE parametrizada
+
+        Los nombres de columna se validan contra la tabla (no se pueden
+        parametrizar); los valores siempre van como parámetros.
+        """
+        condiciones, parametros = [], []
+        for columna, valores in (filtros or {}).items():
+            if valores is None:
+                continue
+            self._validar(columna)
+            valores = list(valores)
+            if not valores:
+                condiciones.append('FALSE' if self.motor == 'duckdb' else '0')
+                continue
+            condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(valores)
+        for columna, rango in (rangos or {}).items():
+            if rango is None:
+                continue
+            self._validar(columna)
+            condiciones.append(f'{columna} BETWEEN ? AND ?')
+            parametros.extend([float(rango[0]), float(rango[1])])
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        return where, parametros
+
+    def _validar(self, columna: str):
+        if columna not in self.columnas:
+            raise ValueError(f"Columna desconocida: {columna}. Opciones: {sorted(self.columnas)}")
+
+    @perfilar('consulta_accesos_por')
+    def accesos_por(self, columnas, filtros: dict = None, rangos: dict = None,
+                    top: int = None, orden: str = 'accesos') -> pd.DataFrame:
+        """
+        Suma de accesos agrupada
+
+        Args:
+            columnas: Columna o lista de columnas de agrupación
+            filtros: columna -> valores admitidos (None = sin filtro)
+            rangos: columna -> (mínimo, máximo)
+            top: Límite de filas
+            orden: 'accesos' (descendente) o 'grupo' (por las columnas, ascendente)
+
+        Returns:
+            DataFrame con las columnas de agrupación y 'accesos'
+        """
+        columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+        for columna in columnas:
+            self._validar(columna)
+        where, parametros = self._condiciones(filtros, rangos)
+        grupo = ', '.join(columnas)
+        sql = (f'SELECT {grupo}, SUM(accesos) AS accesos FROM conectividad{where} GROUP BY {grupo} '
+               f"ORDER BY {'accesos DESC' if orden == 'accesos' else grupo}")
+        if top is not None:
+            sql += ' LIMIT ?'
+            parametros.append(int(top))
+        return self._consultar(sql, parametros)
+
+    @perfilar('consulta_indicadores')
+    def indicadores(self, filtros: dict = None, rangos: dict = None) -> dict:
+        """
+        Totales de conectividad para los KPIs
+
+        Returns:
+            Diccionario con total_accesos, num_proveedores, num_tecnologias y registros
+        """
+        where, parametros = self._condiciones(filtros, rangos)
+        fila = self._consultar(
+            'SELECT SUM(accesos) AS total_accesos, COUNT(DISTINCT proveedor) AS num_proveedores, '
+            f'COUNT(DISTINCT tecnologia) AS num_tecnologias, COUNT(*) AS registros FROM conectividad{where}',
+            parametros
+        ).iloc[0]
+        return {clave: int(valor) if pd.notna(valor) else 0 for clave, valor in fila.items()}
+
+
+@perfilar()
+def construir_motor(df_conectividad: pd.DataFrame, ruta: str, motor: str = 'auto',
+                    huella: str = None) -> MotorConsultas:
+    """
+    Carga la conectividad en una base embebida (una sola vez por ruta)
+
+    La base se escribe en un archivo temporal y se publica con os.replace:
+    si la ruta existe, está completa (también si la construyó otro proceso).
+
+    Args:
+        df_conectividad: Datos consolidados
+        ruta: Archivo de destino (p. ej. dentro de la carpeta del snapshot)
+        motor: 'auto', 'duckdb' o 'sqlite'
+        huella: Identificador del contenido
+
+    Returns:
+        MotorConsultas abierto en solo lectura
+    """
+    motor = elegir_motor(motor)
+    if not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with medir_etapa(f'carga_motor_{motor}', filas_entrada=len(df_conectividad)):
+            if motor == 'duckdb':
+                _cargar_duckdb(df_conectividad, temporal)
+            else:
+                _cargar_sqlite(df_conectividad, temporal)
+        os.replace(temporal, ruta)
+    return MotorConsultas(ruta, motor, huella)
+
+
+def _tabla_normalizada(df_conectividad: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de COLUMNAS_CONECTIVIDAD presentes, con 'periodo' materializado"""
+    df = df_conectividad
+    if 'periodo' not in df.columns and {'anno', 'trimestre'} <= set(df.columns):
+        df = df.assign(periodo=columna_periodo(df))
+    return df[[c for c in COLUMNAS_CONECTIVIDAD if c in df.columns]]
+
+
+def _cargar_sqlite(df_conectividad: pd.DataFrame, ruta: str):
+    df = _tabla_normalizada(df_conectividad)
+    conexion = sqlite3.connect(ruta)
+    try:
+        conexion.execute('PRAGMA journal_mode=OFF')
+        conexion.execute('PRAGMA synchronous=OFF')
+        columnas = ', '.join(f'{c} {COLUMNAS_CONECTIVIDAD[c]}' for c in df.columns)
+        conexion.execute(f'CREATE TABLE conectividad ({columnas})')
+        insertar = f"INSERT INTO conectividad VALUES ({', '.join('?' * len(df.columns))})"
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+            bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+            conexion.executemany(insertar, bloque.astype(object).where(bloque.notna(), None).itertuples(
+                index=False, name=None))
+        # Los índices se crean tras la carga (una sola ordenación por índice)
+        for nombre, columnas_indice in INDICES_SQLITE.items():
+            if set(columnas_indice) <= set(df.columns):
+                conexion.execute(f"CREATE INDEX {nombre} ON conectividad ({', '.join(columnas_indice)})")
+        conexion.execute('ANALYZE')
+        conexion.commit()
+    finally:
+        conexion.close()
+
+
+def _cargar_duckdb(df_conectividad: pd.DataFrame, ruta: str):
+    df = _tabla_normalizada(df_conectividad)
+    conexion = duckdb.connect(ruta)
+    try:
+        conexion.register('origen', df)
+        # Ordenar por periodo agrupa las filas de cada trimestre (zonemaps más selectivos)
+        orden = ' ORDER BY anno, trimestre' if {'anno', 'trimestre'} <= set(df.columns) else ''
+        conexion.execute(f'CREATE TABLE conectividad AS SELECT * FROM origen{orden}')
+        conexion.unregister('origen')
+    finally:
+        conexion.close()
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import tempfile
+    import time
+    from generador_sintetico import generar_conectividad, generar_zonas
+
+    print("="*80)
+    print("PRUEBA DE LA CAPA DE CONSULTAS SQL")
+    print("="*80)
+
+    df = generar_conectividad(1_000_000, generar_zonas(1000, 42), 42)
+    directorio = tempfile.mkdtemp(prefix='sipid_consultas_')
+    motores = ['sqlite'] + (['duckdb'] if duckdb is not None else [])
+    print(f"\n⚙️ Motores disponibles: {motores}")
+
+    for nombre_motor in motores:
+        inicio = time.perf_counter()
+        motor = construir_motor(df, os.path.join(directorio, f'conectividad.{nombre_motor}'), nombre_motor)
+        print(f"\n🏗️ {motor!r}: {len(df):,} filas cargadas en {time.perf_counter() - inicio:.1f} s")
+
+        for descripcion, consulta in [
+            ('tecnologías', lambda: motor.accesos_por('tecnologia')),
+            ('top 10 proveedores', lambda: motor.accesos_por('proveedor', top=10)),
+            ('evolución', lambda: motor.accesos_por(['anno', 'trimestre'], orden='grupo')),
+            ('KPIs filtrados', lambda: motor.indicadores({'proveedor': ('CLARO', 'TIGO')}, {'velocidad_bajada': (10, 100)})),
+        ]:
+            inicio = time.perf_counter()
+            resultado = consulta()
+            print(f"   ⏱️ {descripcion:20s} {(time.perf_counter() - inicio) * 1000:7.1f} ms")
+
+        # Mismos resultados que pandas
+        esperado = df.groupby('tecnologia')['accesos'].sum()
+        obtenido = motor.accesos_por('tecnologia').set_index('tecnologia')['accesos']
+        assert (obtenido.sort_index() == esperado.sort_index()).all()
+        filtrado = df[df['proveedor'].isin(['CLARO', 'TIGO']) & df['velocidad_bajada'].between(10, 100)]
+        assert resultado['total_accesos'] == filtrado['accesos'].sum()
+        assert resultado['num_proveedores'] == filtrado['proveedor'].nunique()
+
+    inicio = time.perf_counter()
+    df.groupby('tecnologia')['accesos'].sum()
+    print(f"\n⏱️ pandas groupby tecnologías (referencia): {(time.perf_counter() - inicio) * 1000:.1f} ms")
@@ -4,12 +4,30 @@ Autor: Sistema de Análisis de Datos
 Fecha: 2025
 """
 
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+from municipios import COD_MUNICIPIO_POR_DEFECTO, obtener_municipio
+from perfilado import perfilar
+
+# Fuente de la API nacional de internet fijo (puede apuntar a un CSV local,
+# también con la variable de entorno SIPID_URL_API_NACIONAL)
+URL_API_NACIONAL = os.environ.get(
+    'SIPID_URL_API_NACIONAL', 'https://www.datos.gov.co/resource/n48w-gutb.csv'
+)
+# Filas por página de la consulta SoQL a la API nacional
+TAMANO_PAGINA_API = 50000
+
+# Municipio del catálogo de zonas del proyecto (crear_datos_zonas_simulados)
+COD_JAMUNDI = 76364
+
 def limpiar_velocidad(valor):
     """
     Limpia y convierte valores de velocidad que pueden estar en formato string con comas
@@ -84,30 +102,91 @@ def cargar_datos_internet_fijo() -> pd.DataFrame:
     return df
 
 
-def cargar_datos_api_nacional() -> pd.DataFrame:
+def filtrar_municipio(df: pd.DataFrame, municipio: dict) -> pd.DataFrame:
+    """
+    Filas de un municipio, con la columna cod_municipio
+    
+    Se filtra por código DANE; si la fuente no lo trae, por nombre completo
+    (patron) y, cuando hay columna departamento, también por departamento,
+    para no mezclar municipios homónimos o que contienen el nombre.
+    
+    Args:
+        df: Registros de varios municipios
+        municipio: Configuración devuelta por obtener_municipio
+    
+    Returns:
+        Copia con las filas del municipio
+    """
+    if 'cod_municipio' in df.columns:
+        mascara = pd.to_numeric(df['cod_municipio'], errors='coerce') == municipio['cod_municipio']
+    else:
+        mascara = df['municipio'].astype(str).str.strip().str.upper().str.fullmatch(municipio['patron'])
+        if 'departamento' in df.columns:
+            departamento = re.escape(municipio['departamento'].upper())
+            mascara &= df['departamento'].astype(str).str.strip().str.upper().str.fullmatch(departamento)
+    return df[mascara.fillna(False)].assign(cod_municipio=municipio['cod_municipio'])
+
+
+def _url_pagina_api(url: str, cod_municipio: int, desplazamiento: int) -> str:
+    """URL de una página de la API con el filtro del municipio en SoQL"""
+    partes = urlsplit(url)
+    parametros = {k: v for k, v in parse_qsl(partes.query) if k not in ('$where', '$limit', '$offset', '$order')}
+    parametros.update({
+        '$where': f'cod_municipio={cod_municipio}',
+        '$order': ':id',
+        '$limit': TAMANO_PAGINA_API,
+        '$offset': desplazamiento
+    })
+    return urlunsplit(partes._replace(query=urlencode(parametros, safe='$:')))
+
+
+def _descargar_api_nacional(cod_municipio: int) -> pd.DataFrame:
+    """
+    Registros de la API nacional de un municipio
+    
+    Contra datos.gov.co el filtro viaja en la consulta ($where) y se pagina
+    hasta recibir una página incompleta; un CSV local se lee completo.
+    """
+    if not URL_API_NACIONAL.startswith(('http://', 'https://')):
+        return pd.read_csv(URL_API_NACIONAL)
+    
+    paginas = []
+    while True:
+        pagina = pd.read_csv(_url_pagina_api(URL_API_NACIONAL, cod_municipio, TAMANO_PAGINA_API * len(paginas)))
+        paginas.append(pagina)
+        if len(pagina) < TAMANO_PAGINA_API:
+            break
+    return pd.concat(paginas, ignore_index=True) if len(paginas) > 1 else paginas[0]
+
+
+def cargar_datos_api_nacional(cod_municipio: int = COD_MUNICIPIO_POR_DEFECTO) -> pd.DataFrame:
     """
     Carga y procesa los datos de la API nacional de internet fijo
     
+    Args:
+        cod_municipio: Código DANE del municipio a conservar
+    
     Returns:
-        DataFrame con datos de la API nacional filtrados para Jamundí
+        DataFrame con datos de la API nacional filtrados para el municipio
+        (con la columna cod_municipio)
     """
+    municipio = obtener_municipio(cod_municipio)
     print("📂 Cargando datos de API nacional...")
     
     try:
-        # Descargar directamente de la API de datos.gov.co
-        url = 'https://www.datos.gov.co/resource/n48w-gutb.csv?$limit=50000'
-        df = pd.read_csv(url)
+        # Descargar de datos.gov.co solo las filas del municipio
+        df = _descargar_api_nacional(municipio['cod_municipio'])
         
-        # Filtrar solo Jamundí
-        df_jamundi = df[df['municipio'].str.upper().str.contains('JAMUNDÍ|JAMUNDI', na=False)].copy()
+        # El filtro se repite en el cliente: una fuente local o un espejo sin SoQL traen de todo
+        df_municipio = filtrar_municipio(df, municipio)
         
         # Limpiar velocidades
-        df_jamundi['velocidad_bajada'] = df_jamundi['velocidad_bajada'].apply(limpiar_velocidad)
-        df_jamundi['velocidad_subida'] = df_jamundi['velocidad_subida'].apply(limpiar_velocidad)
-        df_jamundi['no_de_accesos'] = pd.to_numeric(df_jamundi['no_de_accesos'], errors='coerce').fillna(0).astype(int)
+        df_municipio['velocidad_bajada'] = df_municipio['velocidad_bajada'].apply(limpiar_velocidad)
+        df_municipio['velocidad_subida'] = df_municipio['velocidad_subida'].apply(limpiar_velocidad)
+        df_municipio['no_de_accesos'] = pd.to_numeric(df_municipio['no_de_accesos'], errors='coerce').fillna(0).astype(int)
         
-        print(f"✅ Datos API cargados: {len(df_jamundi)} registros de Jamundí")
-        return df_jamundi
+        print(f"✅ Datos API cargados: {len(df_municipio)} registros de {municipio['nombre']}")
+        return df_municipio
     except Exception as e:
         print(f"⚠️ Error cargando API nacional: {e}")
         return pd.DataFrame()
@@ -153,20 +232,27 @@ def cargar_datos_conectividad_alta_velocidad() -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def consolidar_datos_jamundi() -> pd.DataFrame:
+@perfilar()
+def consolidar_datos_jamundi(cod_municipio: int = COD_MUNICIPIO_POR_DEFECTO) -> pd.DataFrame:
     """
-    Consolida todos los datos disponibles de Jamundí
+    Consolida todos los datos disponibles de un municipio (por defecto Jamundí)
+    
+    Args:
+        cod_municipio: Código DANE del municipio
     
     Returns:
-        DataFrame consolidado con todos los datos de Jamundí
+        DataFrame consolidado con todos los datos del municipio
     """
-    print("\n🔄 Consolidando datos de Jamundí...")
+    municipio = obtener_municipio(cod_municipio)
+    print(f"\n🔄 Consolidando datos de {municipio['nombre']}...")
     
     # Cargar datos locales
     df_local = cargar_datos_internet_fijo()
+    if not df_local.empty:
+        df_local = filtrar_municipio(df_local, municipio)
     
     # Cargar datos de API
-    df_api = cargar_datos_api_nacional()
+    df_api = cargar_datos_api_nacional(municipio['cod_municipio'])
     
     # Si tenemos datos de API, combinarlos con los locales
     if not df_api.empty:
@@ -175,7 +261,7 @@ def consolidar_datos_jamundi() -> pd.DataFrame:
         
         # Seleccionar columnas comunes
         columnas_comunes = [
-            'anno', 'trimestre', 'proveedor', 'municipio', 'segmento',
+            'anno', 'trimestre', 'proveedor', 'cod_municipio', 'municipio', 'segmento',
             'tecnologia', 'velocidad_bajada', 'velocidad_subida', 'accesos'
         ]
         
@@ -215,14 +301,31 @@ def consolidar_datos_jamundi() -> pd.DataFrame:
 
 
 
-def crear_datos_zonas_simulados() -> pd.DataFrame:
+@perfilar()
+def crear_datos_zonas_simulados(cod_municipio: int = COD_MUNICIPIO_POR_DEFECTO) -> pd.DataFrame:
     """
     Crea datos simulados de zonas/corregimientos de Jamundí para el dashboard
     Basado en información real de los PDFs del proyecto
     
+    Args:
+        cod_municipio: Código DANE del municipio. Solo Jamundí tiene catálogo
+                       de zonas; para los demás se devuelve una tabla vacía
+                       (sus zonas se registran en el historial de zonas)
+    
     Returns:
         DataFrame con datos de zonas
     """
+    municipio = obtener_municipio(cod_municipio)
+    if municipio['cod_municipio'] != COD_JAMUNDI:
+        print(f"\n⚠️ Sin catálogo de zonas para {municipio['nombre']}")
+        return pd.DataFrame({
+            'zona': pd.Series(dtype=object), 'tipo': pd.Series(dtype=object),
+            'poblacion': pd.Series(dtype='int64'), 'tiene_sede_educativa': pd.Series(dtype=bool),
+            'sede_con_conexion': pd.Series(dtype=bool), 'velocidad_promedio_mbps': pd.Series(dtype=float),
+            'penetracion_internet': pd.Series(dtype=float), 'latitud': pd.Series(dtype=float),
+            'longitud': pd.Series(dtype=float), 'densidad_poblacion': pd.Series(dtype=float)
+        })
+    
     print("\n🗺️ Creando datos de zonas de Jamundí...")
     
     # Datos basados en los PDFs del proyecto
@@ -306,6 +409,7 @@ def obtener_estadisticas_generales(df: pd.DataFrame) -> Dict:
     return stats
 
 
+@perfilar()
 def filtrar_datos(df: pd.DataFrame, 
                  zonas: List[str] = None,
                  tecnologias: List[str] = None,
@@ -322,20 +426,30 @@ def filtrar_datos(df: pd.DataFrame,
         velocidad_max: Velocidad máxima de bajada
         
     Returns:
-        DataFrame filtrado
+        DataFrame filtrado (el mismo objeto si no hay criterios; no modificar)
+
+    Nota:
+        Los criterios se combinan en una sola máscara y se indexa una vez. Para
+        filtrar repetidamente la misma tabla conviene filtros_facetados.IndiceFacetado.
     """
-    df_filtrado = df.copy()
-    
+    mascara = np.ones(len(df), dtype=bool)
+
+    if zonas and 'zona' in df.columns:
+        mascara &= df['zona'].isin(zonas).to_numpy()
+
     if tecnologias and len(tecnologias) > 0:
-        df_filtrado = df_filtrado[df_filtrado['tecnologia'].isin(tecnologias)]
-    
-    if velocidad_min is not None:
-        df_filtrado = df_filtrado[df_filtrado['velocidad_bajada'] >= velocidad_min]
-    
-    if velocidad_max is not None:
-        df_filtrado = df_filtrado[df_filtrado['velocidad_bajada'] <= velocidad_max]
-    
-    return df_filtrado
+        mascara &= df['tecnologia'].isin(tecnologias).to_numpy()
+
+    if velocidad_min is not None or velocidad_max is not None:
+        velocidad = df['velocidad_bajada'].to_numpy(dtype=float)
+        if velocidad_min is not None:
+            mascara &= velocidad >= velocidad_min
+        if velocidad_max is not None:
+            mascara &= velocidad <= velocidad_max
+
+    if mascara.all():
+        return df
+    return df[mascara]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+"""
+Simulador de escenarios (what-if) para el proyecto Jamundí Conectada
+Aplica intervenciones hipotéticas (conectar sedes, subir velocidad, ...) como
+una capa superpuesta sobre la tabla base de zonas, vuelve a puntuar con el
+motor de ranking y compara rankings y alertas contra la situación actual.
+
+La superposición no copia la tabla base: las columnas no modificadas se leen
+tal cual y solo las columnas intervenidas se materializan con sus cambios.
+Varios escenarios se evalúan contra una sola puntuación de la base y se
+comparan lado a lado.
+
+Ejemplo:
+    escenario = Escenario('Sedes rurales', [
+        Intervencion(['Potrerito', 'Villa Colombia', 'Timba'], {
+            'sede_con_conexion': True,
+            'velocidad_promedio_mbps': ('minimo', 25)
+        })
+    ])
+    resultados = evaluar_escenarios(df_zonas_ranked, [escenario])
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from perfilado import perfilar
+from ranking import calcular_puntaje_prioridad
+from utils import evaluar_reglas_alertas
+
+# Columnas que leen el ranking y las alertas
+COLUMNAS_ESCENARIO = [
+    'zona', 'tipo', 'poblacion', 'velocidad_promedio_mbps', 'penetracion_internet',
+    'densidad_poblacion', 'tiene_sede_educativa', 'sede_con_conexion'
+]
+
+# Operaciones admitidas sobre una columna: nuevo = f(actual, valor)
+OPERACIONES = {
+    'fijar': lambda actual, valor: np.full(len(actual), valor, dtype=np.result_type(actual, np.asarray(valor))),
+    'minimo': lambda actual, valor: np.maximum(actual, valor),
+    'maximo': lambda actual, valor: np.minimum(actual, valor),
+    'sumar': lambda actual, valor: actual + valor,
+    'multiplicar': lambda actual, valor: actual * valor,
+}
+
+# ============================================================================
+# DEFINICIÓN DE ESCENARIOS
+# ============================================================================
+
+class Intervencion:
+    """Cambios hipotéticos aplicados a un grupo de zonas"""
+
+    def __init__(self, zonas: list, cambios: dict):
+        """
+        Args:
+            zonas: Nombres de las zonas intervenidas
+            cambios: columna -> valor (se fija) o (operacion, valor) con una
+                     operación de OPERACIONES
+        """
+        self.zonas = tuple(zonas)
+        self.cambios = []
+        for columna, cambio in cambios.items():
+            operacion, valor = cambio if isinstance(cambio, tuple) else ('fijar', cambio)
+            if operacion not in OPERACIONES:
+                raise ValueError(f"Operación no soportada: {operacion}. Opciones: {list(OPERACIONES)}")
+            if columna not in COLUMNAS_ESCENARIO or columna == 'zona':
+                raise ValueError(f"Columna no intervenible: {columna}")
+            self.cambios.append((columna, operacion, valor))
+        self.cambios = tuple(self.cambios)
+
+    def __repr__(self) -> str:
+        return f"Intervencion(zonas={list(self.zonas)}, cambios={list(self.cambios)})"
+
+
+class Escenario:
+    """Conjunto nombrado de intervenciones, aplicadas en orden"""
+
+    def __init__(self, nombre: str, intervenciones: list):
+        self.nombre = nombre
+        self.intervenciones = tuple(intervenciones)
+
+    def __repr__(self) -> str:
+        return f"Escenario({self.nombre!r}, {list(self.intervenciones)})"
+
+# ============================================================================
+# SUPERPOSICIÓN Y EVALUACIÓN
+# ============================================================================
+
+def aplicar_superposicion(df_base: pd.DataFrame, escenario: Escenario) -> pd.DataFrame:
+    """
+    Tabla de zonas del escenario: columnas base sin copiar + columnas intervenidas
+
+    Args:
+        df_base: Tabla base de zonas (no se modifica)
+        escenario: Escenario a aplicar
+
+    Returns:
+        DataFrame con COLUMNAS_ESCENARIO, en el mismo orden de filas que df_base
+    """
+    columnas = {c: df_base[c].to_numpy() for c in COLUMNAS_ESCENARIO if c in df_base.columns}
+    posicion_zona = pd.Index(columnas['zona'])
+    modificadas = set()
+
+    for intervencion in escenario.intervenciones:
+        filas = posicion_zona.get_indexer(list(intervencion.zonas))
+        filas = filas[filas >= 0]
+        if len(filas) == 0:
+            continue
+        for columna, operacion, valor in intervencion.cambios:
+            if columna not in columnas:
+                continue
+            if columna not in modificadas:
+                # Copia solo la columna intervenida, la primera vez que se toca
+                columnas[columna] = columnas[columna].copy()
+                modificadas.add(columna)
+            actual = columnas[columna][filas]
+            nuevo = OPERACIONES[operacion](actual, valor)
+            columnas[columna][filas] = nuevo.astype(columnas[columna].dtype, copy=False)
+
+    return pd.DataFrame(columnas, copy=False)
+
+
+def _resumen_ranking(df_ranked: pd.DataFrame) -> pd.DataFrame:
+    """Columnas del ranking que se comparan entre escenarios"""
+    return df_ranked[['zona', 'puntaje_prioridad', 'ranking', 'nivel_prioridad']]
+
+
+def comparar_rankings(base: pd.DataFrame, escenario: pd.DataFrame) -> pd.DataFrame:
+    """
+    Diferencias de ranking zona a zona (ambas tablas en el mismo orden de filas)
+
+    Args:
+        base: Ranking actual (zona, puntaje_prioridad, ranking, nivel_prioridad)
+        escenario: Ranking del escenario, mismas columnas
+
+    Returns:
+        DataFrame de las zonas que cambian, ordenado por magnitud del cambio;
+        cambio_ranking > 0 significa que la zona baja en prioridad
+    """
+    ranking_base = base['ranking'].to_numpy()
+    ranking_escenario = escenario['ranking'].to_numpy()
+    puntaje_base = base['puntaje_prioridad'].to_numpy()
+    puntaje_escenario = escenario['puntaje_prioridad'].to_numpy()
+    # nivel_prioridad es categórica (pd.cut): se comparan los códigos, no los textos
+    nivel_base = pd.Categorical(base['nivel_prioridad'])
+    nivel_escenario = pd.Categorical(escenario['nivel_prioridad'], categories=nivel_base.categories)
+    cambio_nivel = nivel_base.codes != nivel_escenario.codes
+
+    filas = np.flatnonzero(
+        (ranking_base != ranking_escenario) | cambio_nivel | ~np.isclose(puntaje_base, puntaje_escenario)
+    )
+    cambio_puntaje = puntaje_escenario[filas] - puntaje_base[filas]
+    filas = filas[np.lexsort((ranking_base[filas], -np.abs(cambio_puntaje)))]
+
+    return pd.DataFrame({
+        'zona': base['zona'].to_numpy()[filas],
+        'ranking_base': ranking_base[filas],
+        'ranking_escenario': ranking_escenario[filas],
+        'puntaje_base': puntaje_base[filas],
+        'puntaje_escenario': puntaje_escenario[filas],
+        'nivel_base': np.asarray(nivel_base[filas], dtype=object),
+        'nivel_escenario': np.asarray(nivel_escenario[filas], dtype=object),
+        'cambio_ranking': ranking_escenario[filas] - ranking_base[filas],
+        'cambio_puntaje': puntaje_escenario[filas] - puntaje_base[filas],
+        'cambio_nivel': cambio_nivel[filas],
+    })
+
+
+def comparar_alertas(base: tuple, escenario: tuple, zonas: np.ndarray) -> dict:
+    """
+    Alertas que aparecen o se resuelven en el escenario
+
+    Args:
+        base: (mascaras, tipos) de la base, como los devuelve _puntuar
+        escenario: (mascaras, tipos) del escenario
+        zonas: Nombres de zona por fila
+
+    Returns:
+        Diccionario con listas 'nuevas' y 'resueltas' de (zona, tipo)
+    """
+    mascaras_base, tipos = base
+    mascaras_escenario, _ = escenario
+
+    def pares(mascara):
+        filas, reglas = np.nonzero(mascara)
+        return sorted(zip(zonas[filas].tolist(), [tipos[r] for r in reglas]))
+
+    return {
+        'nuevas': pares(mascaras_escenario & ~mascaras_base),
+        'resueltas': pares(mascaras_base & ~mascaras_escenario)
+    }
+
+
+class ResultadoEscenario:
+    """Ranking, alertas y diferencias de un escenario frente a la base"""
+
+    def __init__(self, escenario: Escenario, ranking: pd.DataFrame, diferencias: pd.DataFrame,
+                 conteo_alertas: dict, cambios_alertas: dict):
+        """
+        Args:
+            escenario: Escenario evaluado
+            ranking: zona, puntaje_prioridad, ranking y nivel_prioridad del escenario
+            diferencias: Resultado de comparar_rankings
+            conteo_alertas: tipo de alerta -> número de alertas en el escenario
+            cambios_alertas: Resultado de comparar_alertas
+        """
+        self.escenario = escenario
+        self.nombre = escenario.nombre
+        self.ranking = ranking
+        self.diferencias = diferencias
+        self.conteo_alertas = conteo_alertas
+        self.cambios_alertas = cambios_alertas
+
+    def resumen(self) -> dict:
+        """Indicadores del escenario para la tabla comparativa"""
+        return {
+            'escenario': self.nombre,
+            'zonas_alta': int((self.ranking['nivel_prioridad'] == 'Alta').sum()),
+            'zonas_con_cambio_ranking': int((self.diferencias['cambio_ranking'] != 0).sum()),
+            'zonas_con_cambio_nivel': int(self.diferencias['cambio_nivel'].sum()),
+            'puntaje_promedio': float(self.ranking['puntaje_prioridad'].mean()),
+            'alertas': sum(self.conteo_alertas.values()),
+            'alertas_criticas': self.conteo_alertas.get('CRÍTICO', 0),
+            'alertas_nuevas': len(self.cambios_alertas['nuevas']),
+            'alertas_resueltas': len(self.cambios_alertas['resueltas']),
+        }
+
+
+def _puntuar(df_zonas: pd.DataFrame, pesos: dict):
+    """
+    Ranking y alertas de una tabla de zonas
+
+    Las alertas se comparan como máscaras (zona × regla) de las mismas reglas
+    que usa generar_alertas, sin construir un diccionario por alerta.
+
+    Returns:
+        Tupla (ranking, (mascaras, tipos))
+    """
+    df_ranked = calcular_puntaje_prioridad(df_zonas, pesos)
+    reglas = evaluar_reglas_alertas(df_ranked)
+    mascaras = np.column_stack([regla[0] for regla in reglas])
+    tipos = [regla[1] for regla in reglas]
+    return _resumen_ranking(df_ranked), (mascaras, tipos)
+
+
+def _contar_alertas(alertas: tuple) -> dict:
+    """Número de alertas por tipo a partir de las máscaras"""
+    mascaras, tipos = alertas
+    conteo = {}
+    for tipo, n in zip(tipos, mascaras.sum(axis=0)):
+        conteo[tipo] = conteo.get(tipo, 0) + int(n)
+    return conteo
+
+
+def evaluar_escenario(df_base: pd.DataFrame, escenario: Escenario, pesos: dict = None,
+                      base_puntuada: tuple = None) -> ResultadoEscenario:
+    """
+    Aplica un escenario, vuelve a puntuar y compara con la base
+
+    Args:
+        df_base: Tabla base de zonas
+        escenario: Escenario a evaluar
+        pesos: Pesos del ranking (por defecto los del motor)
+        base_puntuada: (ranking, alertas) de la base, si ya se calcularon
+
+    Returns:
+        ResultadoEscenario
+    """
+    ranking_base, alertas_base = base_puntuada or _puntuar(aplicar_superposicion(df_base, Escenario('base', [])), pesos)
+    ranking, alertas = _puntuar(aplicar_superposicion(df_base, escenario), pesos)
+    return ResultadoEscenario(
+        escenario, ranking,
+        comparar_rankings(ranking_base, ranking),
+        _contar_alertas(alertas),
+        comparar_alertas(alertas_base, alertas, ranking['zona'].to_numpy())
+    )
+
+# Estado de cada proceso trabajador: la tabla base llega una sola vez por proceso
+_base_trabajador = {}
+
+
+def _iniciar_trabajador(df_base, pesos, base_puntuada):
+    _base_trabajador.update(df=df_base, pesos=pesos, base_puntuada=base_puntuada)
+
+
+def _evaluar_en_trabajador(escenario: Escenario) -> ResultadoEscenario:
+    return evaluar_escenario(_base_trabajador['df'], escenario, _base_trabajador['pesos'],
+                             _base_trabajador['base_puntuada'])
+
+
+@perfilar()
+def evaluar_escenarios(df_base: pd.DataFrame, escenarios: list, pesos: dict = None,
+                       max_trabajadores: int = None, paralelismo: str = 'secuencial') -> list:
+    """
+    Evalúa varios escenarios contra la misma base
+
+    Por defecto se evalúan uno tras otro: la nueva puntuación es pandas con el
+    GIL tomado, así que los hilos no la aceleran, y con procesos el envío de
+    la tabla y de los resultados cuesta lo mismo que puntuar un escenario.
+    Los modos paralelos quedan como opción explícita.
+
+    Args:
+        df_base: Tabla base de zonas
+        escenarios: Lista de Escenario
+        pesos: Pesos del ranking (por defecto los del motor)
+        max_trabajadores: Hilos o procesos (por defecto, uno por escenario hasta os.cpu_count())
+        paralelismo: 'secuencial' (por defecto), 'hilos' o 'procesos' (la tabla
+                     base se envía una vez por proceso)
+
+    Returns:
+        Lista de ResultadoEscenario, en el orden de los escenarios
+    """
+    if not escenarios:
+        return []
+    base_puntuada = _puntuar(aplicar_superposicion(df_base, Escenario('base', [])), pesos)
+    max_trabajadores = max_trabajadores or min(len(escenarios), os.cpu_count() or 1)
+
+    if paralelismo == 'secuencial' or max_trabajadores <= 1 or len(escenarios) == 1:
+        return [evaluar_escenario(df_base, e, pesos, base_puntuada) for e in escenarios]
+
+    if paralelismo == 'procesos':
+        columnas = [c for c in COLUMNAS_ESCENARIO if c in df_base.columns]
+        with ProcessPoolExecutor(max_trabajadores, initializer=_iniciar_trabajador,
+                                 initargs=(df_base[columnas], pesos, base_puntuada)) as ejecutor:
+            return list(ejecutor.map(_evaluar_en_trabajador, escenarios))
+
+    with ThreadPoolExecutor(max_trabajadores, thread_name_prefix='escenario') as ejecutor:
+        return list(ejecutor.map(lambda e: evaluar_escenario(df_base, e, pesos, base_puntuada), escenarios))
+
+
+def tabla_comparativa(resultados: list) -> pd.DataFrame:
+    """Indicadores de todos los escenarios, uno por fila"""
+    return pd.DataFrame([r.resumen() for r in resultados])
+
+
+def rankings_lado_a_lado(resultados: list, df_base_ranked: pd.DataFrame, top: int = None) -> pd.DataFrame:
+    """
+    Ranking de cada zona en la base y en cada escenario
+
+    Args:
+        resultados: Lista de ResultadoEscenario
+        df_base_ranked: Ranking actual
+        top: Si se indica, solo las zonas que están en el top N de algún escenario
+
+    Returns:
+        DataFrame zona × (actual, escenario 1, escenario 2, ...)
+    """
+    tabla = pd.DataFrame({'zona': df_base_ranked['zona'].to_numpy(), 'Actual': df_base_ranked['ranking'].to_numpy()})
+    for r in resultados:
+        tabla[r.nombre] = r.ranking['ranking'].to_numpy()
+    if top is not None:
+        tabla = tabla[(tabla.drop(columns='zona') <= top).any(axis=1)]
+    return tabla.sort_values('Actual').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import contextlib
+    import io
+    import time
+    from data_processing import crear_datos_zonas_simulados
+    from generador_sintetico import generar_zonas
+
+    print("="*80)
+    print("PRUEBA DEL SIMULADOR DE ESCENARIOS")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_zonas = calcular_puntaje_prioridad(crear_datos_zonas_simulados())
+
+    escenarios = [
+        Escenario('Sedes rurales a 25 Mbps', [
+            Intervencion(['Potrerito', 'Villa Colombia', 'Timba'], {
+                'sede_con_conexion': True,
+                'velocidad_promedio_mbps': ('minimo', 25)
+            })
+        ]),
+        Escenario('Velocidad ×2 en todo el municipio', [
+            Intervencion(df_zonas['zona'].tolist(), {'velocidad_promedio_mbps': ('multiplicar', 2)})
+        ]),
+    ]
+
+    resultados = evaluar_escenarios(df_zonas, escenarios)
+    print(tabla_comparativa(resultados).to_string(index=False))
+    print(f"\n📋 {resultados[0].nombre}:")
+    print(resultados[0].diferencias[['zona', 'ranking_base', 'ranking_escenario', 'nivel_base',
+                                     'nivel_escenario']].head(8).to_string(index=False))
+    print(f"   Alertas resueltas: {resultados[0].cambios_alertas['resueltas']}")
+    print(rankings_lado_a_lado(resultados, df_zonas, top=5).to_string(index=False))
+
+    # La base no se modifica
+    base_intacta = calcular_puntaje_prioridad(crear_datos_zonas_simulados())
+    assert df_zonas['puntaje_prioridad'].equals(base_intacta['puntaje_prioridad'])
+
+    # Escala: muchos escenarios sobre 100,000 zonas
+    df_grande = calcular_puntaje_prioridad(generar_zonas(100_000, 42))
+    rng = np.random.default_rng(0)
+    muchos = [
+        Escenario(f'Escenario {i}', [Intervencion(
+            rng.choice(df_grande['zona'].to_numpy(), 500, replace=False),
+            {'sede_con_conexion': True, 'velocidad_promedio_mbps': ('minimo', 25)}
+        )])
+        for i in range(8)
+    ]
+    print()
+    for paralelismo in ['secuencial', 'hilos', 'procesos']:
+        inicio = time.perf_counter()
+        evaluar_escenarios(df_grande, muchos, paralelismo=paralelismo)
+        print(f"⏱️ 8 escenarios × 100,000 zonas ({paralelismo}): {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,178 @@
+"""
+Estadísticas precalculadas del catálogo de zonas para el proyecto Jamundí Conectada
+Resume una vez por versión de datos la media, mínimo, máximo y percentiles
+de cada métrica, globales y por tipo de zona, para que los gráficos del
+detalle de zona (radar, indicador de meta, comparación) no recorran todo el
+catálogo en cada clic.
+
+Cada métrica guarda una rejilla de 101 cuantiles: el percentil de un valor
+se interpola sobre ella, así la escala del radar no depende de la media (que
+se desplaza con valores extremos) y es estable al crecer el catálogo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import huella_datos
+from perfilado import perfilar
+
+# Etiqueta del gráfico -> columna de df_zonas
+METRICAS_RADAR = {
+    'Velocidad': 'velocidad_promedio_mbps',
+    'Penetración': 'penetracion_internet',
+    'Densidad': 'densidad_poblacion',
+    'Población': 'poblacion',
+}
+
+METRICAS = list(METRICAS_RADAR.values()) + ['puntaje_prioridad']
+
+PERCENTILES_RESUMEN = (5, 25, 50, 75, 95)
+REJILLA_CUANTILES = np.linspace(0, 100, 101)
+
+
+def _resumir(valores: np.ndarray) -> dict:
+    """Media, extremos, percentiles de resumen y rejilla de cuantiles de un vector"""
+    valores = valores[~np.isnan(valores)]
+    if len(valores) == 0:
+        return {'n': 0, 'media': np.nan, 'min': np.nan, 'max': np.nan,
+                **{f'p{p}': np.nan for p in PERCENTILES_RESUMEN},
+                'cuantiles': np.full(len(REJILLA_CUANTILES), np.nan)}
+    cuantiles = np.percentile(valores, REJILLA_CUANTILES)
+    return {
+        'n': len(valores),
+        'media': float(valores.mean()),
+        'min': float(cuantiles[0]),
+        'max': float(cuantiles[-1]),
+        **{f'p{p}': float(cuantiles[p]) for p in PERCENTILES_RESUMEN},
+        'cuantiles': cuantiles
+    }
+
+
+class EstadisticasZonas:
+    """Instantánea de estadísticas por métrica, global y por tipo (solo lectura)"""
+
+    def __init__(self, globales: dict, por_tipo: dict, huella: str):
+        """
+        Args:
+            globales: métrica -> resumen sobre todas las zonas
+            por_tipo: tipo -> (métrica -> resumen)
+            huella: Huella de los datos de origen (identifica el contenido)
+        """
+        self.globales = globales
+        self.por_tipo = por_tipo
+        self.huella = huella
+
+    def resumen(self, metrica: str, tipo: str = None) -> dict:
+        """
+        Resumen de una métrica
+
+        Args:
+            metrica: Columna de df_zonas
+            tipo: Tipo de zona (None = todas; si el tipo no existe se usa el global)
+
+        Returns:
+            Diccionario con n, media, min, max, p5...p95 y cuantiles
+        """
+        if tipo is not None and tipo in self.por_tipo:
+            return self.por_tipo[tipo][metrica]
+        return self.globales[metrica]
+
+    def percentil(self, metrica: str, valor: float, tipo: str = None) -> float:
+        """
+        Percentil (0-100) de un valor dentro de la distribución de la métrica
+
+        Args:
+            metrica: Columna de df_zonas
+            valor: Valor a ubicar
+            tipo: Tipo de zona de referencia (None = todas)
+
+        Returns:
+            Percentil interpolado; NaN si no hay datos
+        """
+        cuantiles = self.resumen(metrica, tipo)['cuantiles']
+        if np.isnan(cuantiles).all() or pd.isna(valor):
+            return np.nan
+        # Con valores repetidos se toma el punto medio del tramo empatado
+        izquierda = np.interp(valor, cuantiles, REJILLA_CUANTILES)
+        derecha = 100 - np.interp(-valor, -cuantiles[::-1], REJILLA_CUANTILES)
+        return float((izquierda + derecha) / 2)
+
+    def escala_media(self, metrica: str, valor: float, tipo: str = None) -> float:
+        """
+        Valor relativo a la media: 50 = promedio, 100 = doble o más
+
+        Args:
+            metrica: Columna de df_zonas
+            valor: Valor a escalar
+            tipo: Tipo de zona de referencia (None = todas)
+
+        Returns:
+            Valor en 0-100
+        """
+        media = self.resumen(metrica, tipo)['media']
+        if not media or np.isnan(media):
+            return 0.0
+        return float(min(valor / media * 50, 100))
+
+
+@perfilar()
+def calcular_estadisticas_zonas(df_zonas: pd.DataFrame) -> EstadisticasZonas:
+    """
+    Calcula la instantánea de estadísticas del catálogo de zonas
+
+    Args:
+        df_zonas: Zonas (idealmente ya rankeadas, para incluir puntaje_prioridad)
+
+    Returns:
+        EstadisticasZonas
+    """
+    metricas = [m for m in METRICAS if m in df_zonas.columns]
+    columnas_huella = ['tipo'] + metricas if 'tipo' in df_zonas.columns else metricas
+    huella = huella_datos(df_zonas[columnas_huella])[:16]
+
+    valores = {m: df_zonas[m].to_numpy(dtype=float) for m in metricas}
+    globales = {m: _resumir(v) for m, v in valores.items()}
+
+    por_tipo = {}
+    if 'tipo' in df_zonas.columns:
+        codigos, tipos = pd.factorize(df_zonas['tipo'])
+        # Un solo ordenamiento estable por código deja cada tipo en un bloque contiguo
+        orden = np.argsort(codigos, kind='stable')
+        limites = np.searchsorted(codigos[orden], np.arange(len(tipos) + 1))
+        for i, tipo in enumerate(tipos):
+            filas = orden[limites[i]:limites[i + 1]]
+            por_tipo[str(tipo)] = {m: _resumir(v[filas]) for m, v in valores.items()}
+
+    return EstadisticasZonas(globales, por_tipo, huella)
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas
+
+    print("="*80)
+    print("PRUEBA DE LAS ESTADÍSTICAS DE ZONAS")
+    print("="*80)
+
+    df_zonas = generar_zonas(100_000, 42)
+
+    inicio = time.perf_counter()
+    estadisticas = calcular_estadisticas_zonas(df_zonas)
+    print(f"\n📊 Instantánea de {len(df_zonas):,} zonas en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    print(f"   {estadisticas!r}")
+
+    for etiqueta, metrica in METRICAS_RADAR.items():
+        r = estadisticas.resumen(metrica)
+        print(f"   {etiqueta:12s} media={r['media']:.2f} p50={r['p50']:.2f} "
+              f"min={r['min']:.2f} max={r['max']:.2f}")
+
+    zona = df_zonas.iloc[0]
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        p = estadisticas.percentil('velocidad_promedio_mbps', zona['velocidad_promedio_mbps'], zona['tipo'])
+    print(f"\n⏱️ Percentil de velocidad ({zona['tipo']}): {p:.1f} "
+          f"en {(time.perf_counter() - inicio) / 1000 * 1e6:.0f} µs")
+
+    exacto = (df_zonas['velocidad_promedio_mbps'] < zona['velocidad_promedio_mbps']).mean() * 100
+    assert abs(estadisticas.percentil('velocidad_promedio_mbps', zona['velocidad_promedio_mbps']) - exacto) < 1.5
@@ -0,0 +1,241 @@
+"""
+Exportación de tablas por bloques para el proyecto Jamundí Conectada
+Escribe CSV, Parquet o XLSX bloque a bloque directamente a disco (sin
+materializar el archivo completo en memoria) y conserva los artefactos
+generados, indexados por la huella de la vista (versión + filtros + formato):
+descargar otra vez la misma vista no vuelve a generar nada.
+
+La generación es perezosa: `generador_descarga` devuelve una función sin
+argumentos que st.download_button solo ejecuta cuando el usuario hace clic.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cache_figuras import huella_datos
+from perfilado import medir_etapa, registrar_cache
+
+# formato -> (tipo MIME, extensión)
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+}
+
+FILAS_POR_BLOQUE = 50_000
+# Límite de filas de una hoja de Excel (incluido el encabezado)
+MAX_FILAS_HOJA_XLSX = 1_048_576
+
+DIRECTORIO_EXPORTACIONES = os.environ.get(
+    'SIPID_DIR_EXPORTACIONES', os.path.join(tempfile.gettempdir(), 'sipid_exportaciones')
+)
+MAX_ARTEFACTOS = 32
+
+# ============================================================================
+# ESCRITURA POR BLOQUES
+# ============================================================================
+
+def iterar_bloques(df: pd.DataFrame, filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """Recorre el DataFrame en slices consecutivos (vistas, sin copiar)"""
+    for inicio in range(0, len(df), filas_por_bloque):
+        yield df.iloc[inicio:inicio + filas_por_bloque]
+
+
+def escribir_csv(df: pd.DataFrame, ruta: str, filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """Escribe un CSV UTF-8 bloque a bloque"""
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        f.write(df.iloc[:0].to_csv(index=False))
+        for bloque in iterar_bloques(df, filas_por_bloque):
+            bloque.to_csv(f, index=False, header=False)
+
+
+def escribir_parquet(df: pd.DataFrame, ruta: str, filas_por_bloque: int = FILAS_POR_BLOQUE):
+    """Escribe un Parquet con un row group por bloque"""
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(ruta, esquema) as escritor:
+        for bloque in iterar_bloques(df, filas_por_bloque):
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+
+def _filas_python(bloque: pd.DataFrame) -> list:
+    """Filas del bloque como listas de tipos nativos (openpyxl no acepta escalares NumPy ni NaN)"""
+    return bloque.astype(object).where(bloque.notna(), None).to_numpy().tolist()
+
+
+def escribir_xlsx(df: pd.DataFrame, ruta: str, filas_por_bloque: int = FILAS_POR_BLOQUE,
+                  nombre_hoja: str = 'Datos'):
+    """
+    Escribe un XLSX en modo write-only de openpyxl (filas en streaming)
+
+    Si la tabla supera el límite de Excel se reparte en hojas consecutivas
+    ('Datos', 'Datos (2)', ...), cada una con su encabezado.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    encabezado = [str(c) for c in df.columns]
+    filas_por_hoja = MAX_FILAS_HOJA_XLSX - 1
+
+    for n_hoja, inicio_hoja in enumerate(range(0, max(len(df), 1), filas_por_hoja), start=1):
+        hoja = libro.create_sheet(nombre_hoja if n_hoja == 1 else f'{nombre_hoja} ({n_hoja})')
+        hoja.append(encabezado)
+        for bloque in iterar_bloques(df.iloc[inicio_hoja:inicio_hoja + filas_por_hoja], filas_por_bloque):
+            for fila in _filas_python(bloque):
+                hoja.append(fila)
+
+    libro.save(ruta)
+
+
+ESCRITORES = {
+    'csv': escribir_csv,
+    'parquet': escribir_parquet,
+    'xlsx': escribir_xlsx,
+}
+
+
+def escribir_tabla(df: pd.DataFrame, ruta: str, formato: str):
+    """
+    Escribe una tabla en el formato indicado, bloque a bloque
+
+    Args:
+        df: Tabla a exportar
+        ruta: Archivo de destino
+        formato: Uno de FORMATOS_EXPORTACION
+    """
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato no soportado: {formato}. Opciones: {list(ESCRITORES)}")
+    ESCRITORES[formato](df, ruta)
+
+# ============================================================================
+# CACHÉ DE ARTEFACTOS
+# ============================================================================
+
+class ExportadorTablas:
+    """Genera exportaciones bajo demanda y las conserva en disco por huella de vista"""
+
+    def __init__(self, directorio: str = DIRECTORIO_EXPORTACIONES, max_artefactos: int = MAX_ARTEFACTOS):
+        """
+        Args:
+            directorio: Carpeta donde se guardan los artefactos
+            max_artefactos: Número máximo de archivos conservados (LRU)
+        """
+        self.directorio = directorio
+        self.max_artefactos = max_artefactos
+        self._artefactos = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock por clave: dos clics simultáneos sobre la misma vista generan una sola vez
+        self._locks_clave = {}
+
+    def _lock_de(self, clave: str) -> threading.Lock:
+        with self._lock:
+            return self._locks_clave.setdefault(clave, threading.Lock())
+
+    def exportar(self, obtener_df, formato: str, clave: str = None) -> str:
+        """
+        Devuelve la ruta del artefacto, generándolo solo si no existe
+
+        Args:
+            obtener_df: DataFrame o función sin argumentos que lo devuelve
+            formato: Uno de FORMATOS_EXPORTACION
+            clave: Identificador de la vista (p. ej. versión + filtros); por
+                   defecto la huella del contenido del DataFrame
+
+        Returns:
+            Ruta del archivo generado
+        """
+        if formato not in FORMATOS_EXPORTACION:
+            raise ValueError(f"Formato no soportado: {formato}. Opciones: {list(FORMATOS_EXPORTACION)}")
+
+        df = None
+        if clave is None:
+            df = obtener_df() if callable(obtener_df) else obtener_df
+            clave = huella_datos(df)
+        clave = huella_datos((clave, formato))[:24]
+
+        ruta = os.path.join(self.directorio, f'{clave}{FORMATOS_EXPORTACION[formato][1]}')
+
+        with self._lock_de(clave):
+            # El archivo se publica con os.replace: si existe, está completo
+            # (también si lo generó otro proceso o una ejecución anterior)
+            if os.path.exists(ruta):
+                with self._lock:
+                    self._artefactos[clave] = ruta
+                    self._artefactos.move_to_end(clave)
+                registrar_cache('exportacion', acierto=True)
+                return ruta
+            registrar_cache('exportacion', acierto=False)
+
+            if df is None:
+                df = obtener_df() if callable(obtener_df) else obtener_df
+
+            os.makedirs(self.directorio, exist_ok=True)
+            temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with medir_etapa(f'exportacion_{formato}', filas_entrada=len(df)):
+                escribir_tabla(df, temporal, formato)
+            os.replace(temporal, ruta)
+
+            with self._lock:
+                self._artefactos[clave] = ruta
+                while len(self._artefactos) > self.max_artefactos:
+                    _, ruta_antigua = self._artefactos.popitem(last=False)
+                    try:
+                        os.remove(ruta_antigua)
+                    except FileNotFoundError:
+                        pass
+        return ruta
+
+    def generador_descarga(self, obtener_df, formato: str, clave: str):
+        """
+        Función sin argumentos para st.download_button(data=...)
+
+        Streamlit la ejecuta solo al hacer clic, así que una vista que nadie
+        descarga no cuesta nada en cada rerun.
+
+        Args:
+            obtener_df: Función sin argumentos que devuelve la tabla
+            formato: Uno de FORMATOS_EXPORTACION
+            clave: Identificador de la vista
+
+        Returns:
+            Callable que devuelve los bytes del artefacto
+        """
+        def generar() -> bytes:
+            with open(self.exportar(obtener_df, formato, clave), 'rb') as f:
+                return f.read()
+        return generar
+
+
+exportador = ExportadorTablas()
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas
+
+    print("="*80)
+    print("PRUEBA DE EXPORTACIÓN POR BLOQUES")
+    print("="*80)
+
+    df = generar_zonas(200_000, 42)
+    exportador_prueba = ExportadorTablas(tempfile.mkdtemp(prefix='sipid_exportaciones_prueba_'))
+
+    for formato in FORMATOS_EXPORTACION:
+        tabla = df.head(20_000) if formato == 'xlsx' else df
+        for intento in ('generación', 'caché'):
+            inicio = time.perf_counter()
+            ruta = exportador_prueba.exportar(lambda: tabla, formato, clave=('prueba', len(tabla)))
+            transcurrido = time.perf_counter() - inicio
+            print(f"   📄 {formato:8s} {intento:10s} {len(tabla):>8,} filas "
+                  f"{os.path.getsize(ruta) / 1e6:7.1f} MB en {transcurrido * 1000:7.1f} ms")
+
+    leido = pd.read_parquet(exportador_prueba.exportar(df, 'parquet', clave=('prueba', len(df))))
+    assert len(leido) == len(df)
+    leido = pd.read_csv(exportador_prueba.exportar(df, 'csv', clave=('prueba', len(df))))
+    assert len(leido) == len(df) and list(leido.columns) == list(df.columns)
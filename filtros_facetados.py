@@ -0,0 +1,307 @@
+"""
+Motor de filtrado facetado con bitmaps para el proyecto Jamundí Conectada
+Precalcula un bitmap empaquetado (1 bit por fila) por cada valor de las
+facetas y un índice ordenado por cada columna de rango. Un filtro combinado
+es un AND de bitmaps, devuelve posiciones en lugar de copiar el DataFrame y
+calcula los conteos por faceta en la misma pasada
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from perfilado import perfilar
+
+FACETAS_CONECTIVIDAD = ['proveedor', 'tecnologia', 'segmento', 'periodo', 'zona']
+RANGOS_CONECTIVIDAD = ['velocidad_bajada']
+
+FACETAS_ZONAS = ['zona', 'tipo', 'nivel_prioridad']
+RANGOS_ZONAS = ['velocidad_promedio_mbps', 'puntaje_prioridad']
+
+# Facetas con más valores que esto no guardan un bitmap por valor: la
+# selección se arma a partir de las posiciones ordenadas por código
+MAX_VALORES_BITMAP = 256
+MAX_SELECCIONES_CACHE = 64
+
+
+def columna_periodo(df: pd.DataFrame) -> pd.Series:
+    """
+    Periodo 'AAAA-Tn' a partir de las columnas anno y trimestre
+
+    Returns:
+        Serie de texto (ordenable cronológicamente)
+    """
+    return df['anno'].astype(int).astype(str) + '-T' + df['trimestre'].astype(int).astype(str)
+
+
+class ResultadoFiltro:
+    """Filas seleccionadas por un filtro y conteos por faceta"""
+
+    def __init__(self, df: pd.DataFrame, posiciones: np.ndarray, conteos: dict):
+        self._df_origen = df
+        self.posiciones = posiciones
+        self.conteos = conteos
+        self._df = None
+
+    def __len__(self) -> int:
+        return len(self.posiciones)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        DataFrame de las filas seleccionadas, materializado al primer acceso
+
+        Sin filtros es el DataFrame original y con un bloque contiguo de filas
+        es un slice; solo una selección dispersa reúne las filas en uno nuevo.
+        """
+        if self._df is None:
+            n = len(self.posiciones)
+            if n == len(self._df_origen):
+                self._df = self._df_origen
+            elif n and self.posiciones[-1] - self.posiciones[0] == n - 1:
+                self._df = self._df_origen.iloc[self.posiciones[0]:self.posiciones[-1] + 1]
+            else:
+                self._df = self._df_origen.take(self.posiciones)
+        return self._df
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Valores de una sola columna para las filas seleccionadas (sin armar el DataFrame)"""
+        return self._df_origen[nombre].to_numpy()[self.posiciones]
+
+
+class IndiceFacetado:
+    """
+    Índice de solo lectura para filtrar un DataFrame por facetas y rangos
+
+    Ejemplo:
+        indice = IndiceFacetado(df, ['proveedor', 'tecnologia'], ['velocidad_bajada'])
+        r = indice.filtrar({'tecnologia': ['Fibra óptica']}, {'velocidad_bajada': (10, None)})
+        r.df, r.conteos['proveedor']
+    """
+
+    def __init__(self, df: pd.DataFrame, facetas: list, rangos: list = None):
+        """
+        Args:
+            df: DataFrame a indexar (no se copia ni se modifica)
+            facetas: Columnas categóricas; 'periodo' se deriva de anno/trimestre
+            rangos: Columnas numéricas para filtros por rango
+        """
+        self._df = df
+        self.n = len(df)
+        self._facetas = {}
+        self._rangos = {}
+        self._selecciones = OrderedDict()
+        self._lock = threading.Lock()
+
+        for faceta in facetas:
+            if faceta in df.columns:
+                serie = df[faceta]
+            elif faceta == 'periodo' and {'anno', 'trimestre'} <= set(df.columns):
+                serie = columna_periodo(df)
+            else:
+                continue
+
+            codigos, valores = pd.factorize(serie, sort=True)
+            codigos = codigos.astype(np.int32)
+            orden = np.argsort(codigos, kind='stable')
+            # limites[c]:limites[c+1] son las posiciones (en orden) del valor c
+            limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+
+            info = {
+                'codigos': codigos,
+                'valores': list(valores),
+                'indice_valor': {v: i for i, v in enumerate(valores)},
+                'orden': orden,
+                'limites': limites,
+                'bitmaps': None
+            }
+            if len(valores) <= MAX_VALORES_BITMAP:
+                info['bitmaps'] = [
+                    self._empaquetar(orden[limites[c]:limites[c + 1]])
+                    for c in range(len(valores))
+                ]
+            self._facetas[faceta] = info
+
+        for columna in rangos or []:
+            if columna not in df.columns:
+                continue
+            valores = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=float)
+            orden = np.argsort(valores, kind='stable')  # NaN al final
+            self._rangos[columna] = {
+                'orden': orden,
+                'ordenados': valores[orden],
+                'validos': int(np.count_nonzero(~np.isnan(valores)))
+            }
+
+    # ------------------------------------------------------------------------
+    # BITMAPS
+    # ------------------------------------------------------------------------
+
+    def _empaquetar(self, posiciones: np.ndarray) -> np.ndarray:
+        """Bitmap empaquetado (uint8) con las posiciones indicadas encendidas"""
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[posiciones] = True
+        return np.packbits(mascara)
+
+    def _todos(self) -> np.ndarray:
+        return np.packbits(np.ones(self.n, dtype=bool))
+
+    def _bitmap_faceta(self, faceta: str, seleccion) -> np.ndarray:
+        """OR de los bitmaps de los valores seleccionados (con caché por selección)"""
+        clave = (faceta, frozenset(seleccion))
+        with self._lock:
+            bitmap = self._selecciones.get(clave)
+            if bitmap is not None:
+                self._selecciones.move_to_end(clave)
+                return bitmap
+
+        info = self._facetas[faceta]
+        codigos = [info['indice_valor'][v] for v in seleccion if v in info['indice_valor']]
+
+        if info['bitmaps'] is not None and len(codigos) <= 8:
+            bitmap = np.packbits(np.zeros(self.n, dtype=bool))
+            for c in codigos:
+                bitmap = bitmap | info['bitmaps'][c]
+        else:
+            limites, orden = info['limites'], info['orden']
+            partes = [orden[limites[c]:limites[c + 1]] for c in codigos]
+            bitmap = self._empaquetar(np.concatenate(partes) if partes else np.array([], dtype=np.int64))
+
+        with self._lock:
+            self._selecciones[clave] = bitmap
+            if len(self._selecciones) > MAX_SELECCIONES_CACHE:
+                self._selecciones.popitem(last=False)
+        return bitmap
+
+    def _bitmap_rango(self, columna: str, minimo=None, maximo=None) -> np.ndarray:
+        """Bitmap de las filas con minimo <= valor <= maximo (búsqueda binaria)"""
+        info = self._rangos[columna]
+        inicio = 0 if minimo is None else np.searchsorted(info['ordenados'], minimo, side='left')
+        fin = info['validos'] if maximo is None else np.searchsorted(info['ordenados'], maximo, side='right')
+        return self._empaquetar(info['orden'][inicio:max(inicio, fin)])
+
+    # ------------------------------------------------------------------------
+    # CONSULTA
+    # ------------------------------------------------------------------------
+
+    @property
+    def facetas(self) -> list:
+        return list(self._facetas)
+
+    def valores(self, faceta: str) -> list:
+        """Valores distintos de una faceta, ordenados"""
+        return list(self._facetas[faceta]['valores'])
+
+    def rango(self, columna: str) -> tuple:
+        """Mínimo y máximo (sin NaN) de una columna de rango"""
+        info = self._rangos[columna]
+        if info['validos'] == 0:
+            return (0.0, 0.0)
+        return (float(info['ordenados'][0]), float(info['ordenados'][info['validos'] - 1]))
+
+    def _contar(self, faceta: str, bitmap: np.ndarray) -> dict:
+        info = self._facetas[faceta]
+        codigos = info['codigos'][np.unpackbits(bitmap, count=self.n).astype(bool)]
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(info['valores']))
+        return dict(zip(info['valores'], conteos.tolist()))
+
+    @perfilar('filtro_facetado')
+    def filtrar(self, filtros: dict = None, rangos: dict = None, contar: bool = True) -> ResultadoFiltro:
+        """
+        Aplica filtros por faceta y por rango en una sola pasada
+
+        Un filtro con lista None se ignora (todos los valores); una lista vacía
+        no selecciona nada. Los conteos de cada faceta se calculan con todos
+        los demás filtros aplicados pero no el suyo, de modo que indican
+        cuántas filas quedarían al marcar cada valor.
+
+        Args:
+            filtros: Diccionario faceta -> valores permitidos
+            rangos: Diccionario columna -> (minimo, maximo); None = sin límite
+            contar: Si es False no se calculan los conteos
+
+        Returns:
+            ResultadoFiltro con posiciones, conteos y el DataFrame perezoso
+        """
+        activos = []  # (faceta o None, bitmap)
+        for faceta, seleccion in (filtros or {}).items():
+            if seleccion is None or faceta not in self._facetas:
+                continue
+            activos.append((faceta, self._bitmap_faceta(faceta, seleccion)))
+        for columna, (minimo, maximo) in (rangos or {}).items():
+            if columna in self._rangos and (minimo is not None or maximo is not None):
+                activos.append((None, self._bitmap_rango(columna, minimo, maximo)))
+
+        # AND acumulado por la izquierda y por la derecha: el bitmap "todos
+        # menos el filtro i" es prefijo[i] & sufijo[i + 1]
+        todos = self._todos()
+        prefijos = [todos]
+        for _, bitmap in activos:
+            prefijos.append(prefijos[-1] & bitmap)
+        sufijos = [todos]
+        for _, bitmap in reversed(activos):
+            sufijos.append(sufijos[-1] & bitmap)
+        sufijos.reverse()
+
+        combinado = prefijos[-1]
+        posiciones = np.flatnonzero(np.unpackbits(combinado, count=self.n))
+
+        conteos = {}
+        if contar:
+            indice_activo = {faceta: i for i, (faceta, _) in enumerate(activos) if faceta}
+            for faceta in self._facetas:
+                i = indice_activo.get(faceta)
+                base = combinado if i is None else prefijos[i] & sufijos[i + 1]
+                conteos[faceta] = self._contar(faceta, base)
+
+        return ResultadoFiltro(self._df, posiciones, conteos)
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas, generar_conectividad
+
+    print("="*80)
+    print("PRUEBA DEL MOTOR DE FILTRADO FACETADO")
+    print("="*80)
+
+    df_zonas = generar_zonas(1000, 42)
+    df = generar_conectividad(1_000_000, df_zonas, 42)
+
+    inicio = time.perf_counter()
+    indice = IndiceFacetado(df, FACETAS_CONECTIVIDAD, RANGOS_CONECTIVIDAD)
+    print(f"\n🏗️ Índice de {len(df):,} filas en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    filtros = {
+        'tecnologia': indice.valores('tecnologia')[:2],
+        'proveedor': indice.valores('proveedor')[:3],
+        'zona': indice.valores('zona')[:300]
+    }
+    rangos = {'velocidad_bajada': (10, 200)}
+
+    inicio = time.perf_counter()
+    r = indice.filtrar(filtros, rangos)
+    t_indice = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    mascara = (
+        df['tecnologia'].isin(filtros['tecnologia']) & df['proveedor'].isin(filtros['proveedor']) &
+        df['zona'].isin(filtros['zona']) & df['velocidad_bajada'].between(10, 200)
+    )
+    esperado = df[mascara]
+    t_pandas = time.perf_counter() - inicio
+
+    assert np.array_equal(r.posiciones, np.flatnonzero(mascara.to_numpy()))
+    assert r.df.equals(esperado)
+    sin_tecnologia = df[
+        df['proveedor'].isin(filtros['proveedor']) & df['zona'].isin(filtros['zona']) &
+        df['velocidad_bajada'].between(10, 200)
+    ]['tecnologia'].value_counts()
+    assert all(r.conteos['tecnologia'][k] == v for k, v in sin_tecnologia.items())
+
+    print(f"✅ {len(r):,} filas; índice {t_indice * 1000:.1f} ms vs pandas {t_pandas * 1000:.1f} ms "
+          f"(con conteos de {len(r.conteos)} facetas)")
+    print(f"   Conteos por tecnología: {r.conteos['tecnologia']}")
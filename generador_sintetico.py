@@ -0,0 +1,385 @@
+"""
+Generador de datos sintéticos a gran escala para el proyecto Jamundí Conectada
+Produce zonas y registros de conectividad estadísticamente plausibles de
+cualquier tamaño, para benchmarks y pruebas de carga sin depender de la API
+
+Uso:
+    python generador_sintetico.py --zonas 100000 --registros 5000000 --salida datos_sinteticos
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RUTA_GEOJSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corregimientos_jamundi.geojson')
+TAMANO_BLOQUE = 500_000
+
+# Años cubiertos por las historias trimestrales
+ANNO_INICIO = 2019
+ANNO_FIN = 2025
+
+# Participación de mercado aproximada de los proveedores
+PROVEEDORES = {
+    'CLARO': 0.30, 'TIGO': 0.22, 'EMCALI': 0.18, 'CELSIA': 0.12,
+    'MOVISTAR': 0.08, 'WISP TELECOMUNICACIONES': 0.05, 'WIFIMAX': 0.05
+}
+
+SEGMENTOS = {
+    'Residencial - Estrato 1': 0.25, 'Residencial - Estrato 2': 0.30,
+    'Residencial - Estrato 3': 0.20, 'Residencial - Estrato 4': 0.08,
+    'Corporativo': 0.12, 'Oficial': 0.05
+}
+
+# Tecnología: (velocidad base Mbps, crecimiento de velocidad anual, tendencia de accesos anual)
+TECNOLOGIAS = {
+    'Fibra óptica': (120.0, 0.25, 0.30),
+    'Cable': (50.0, 0.15, 0.02),
+    'xDSL': (6.0, 0.03, -0.15),
+    'Inalámbrico': (10.0, 0.10, 0.08),
+    'Satelital': (8.0, 0.12, 0.05)
+}
+
+# Correlaciones latentes entre log-población, log-densidad, velocidad y penetración
+CORRELACION_ZONAS = np.array([
+    [1.00, 0.75, 0.55, 0.60],
+    [0.75, 1.00, 0.60, 0.65],
+    [0.55, 0.60, 1.00, 0.80],
+    [0.60, 0.65, 0.80, 1.00]
+])
+
+# ============================================================================
+# GEOGRAFÍA
+# ============================================================================
+
+def cargar_poligonos(ruta_geojson: str = RUTA_GEOJSON) -> list:
+    """
+    Carga los anillos exteriores de los polígonos del GeoJSON
+
+    Args:
+        ruta_geojson: Ruta al archivo GeoJSON de corregimientos
+
+    Returns:
+        Lista de tuplas (nombre, array Nx2 de coordenadas lon/lat)
+    """
+    with open(ruta_geojson, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    poligonos = []
+    for feature in geojson['features']:
+        geom = feature['geometry']
+        anillos = [geom['coordinates']] if geom['type'] == 'Polygon' else geom['coordinates']
+        for anillo in anillos:
+            poligonos.append((feature['properties'].get('name'), np.asarray(anillo[0], dtype=float)))
+    return poligonos
+
+
+def _area_poligono(coords: np.ndarray) -> float:
+    """Área (en grados²) de un polígono por la fórmula del cordón"""
+    x, y = coords[:, 0], coords[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1)))
+
+
+def puntos_en_poligono(lon: np.ndarray, lat: np.ndarray, coords: np.ndarray) -> np.ndarray:
+    """
+    Prueba vectorizada de punto en polígono (ray casting)
+
+    Args:
+        lon: Longitudes de los puntos
+        lat: Latitudes de los puntos
+        coords: Vértices del polígono (lon, lat)
+
+    Returns:
+        Array booleano, True para los puntos dentro del polígono
+    """
+    dentro = np.zeros(len(lon), dtype=bool)
+    x1, y1 = coords[:-1, 0], coords[:-1, 1]
+    x2, y2 = coords[1:, 0], coords[1:, 1]
+    for xa, ya, xb, yb in zip(x1, y1, x2, y2):
+        cruza = (ya > lat) != (yb > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_corte = xa + (lat - ya) * (xb - xa) / (yb - ya)
+        dentro ^= cruza & (lon < x_corte)
+    return dentro
+
+
+def generar_puntos(n: int, rng: np.random.Generator, poligonos: list = None):
+    """
+    Genera n puntos dentro de los corregimientos, proporcional a su área
+
+    Args:
+        n: Número de puntos
+        rng: Generador aleatorio
+        poligonos: Resultado de cargar_poligonos (se carga si es None)
+
+    Returns:
+        Tupla (latitudes, longitudes, nombre del corregimiento de cada punto)
+    """
+    poligonos = poligonos if poligonos is not None else cargar_poligonos()
+    areas = np.array([_area_poligono(c) for _, c in poligonos])
+    asignacion = rng.choice(len(poligonos), size=n, p=areas / areas.sum())
+
+    lat = np.empty(n)
+    lon = np.empty(n)
+    for i, (_, coords) in enumerate(poligonos):
+        pendientes = np.flatnonzero(asignacion == i)
+        (lon_min, lat_min), (lon_max, lat_max) = coords.min(axis=0), coords.max(axis=0)
+        # Muestreo por rechazo dentro de la caja envolvente del polígono
+        while len(pendientes):
+            cand_lon = rng.uniform(lon_min, lon_max, len(pendientes))
+            cand_lat = rng.uniform(lat_min, lat_max, len(pendientes))
+            ok = puntos_en_poligono(cand_lon, cand_lat, coords)
+            lon[pendientes[ok]] = cand_lon[ok]
+            lat[pendientes[ok]] = cand_lat[ok]
+            pendientes = pendientes[~ok]
+
+    nombres = np.array([nombre for nombre, _ in poligonos], dtype=object)[asignacion]
+    return lat, lon, nombres
+
+# ============================================================================
+# ZONAS
+# ============================================================================
+
+def generar_zonas(n: int, semilla: int = 42, proporcion_urbana: float = 0.05,
+                  ruta_geojson: str = RUTA_GEOJSON) -> pd.DataFrame:
+    """
+    Genera zonas con población, velocidad, penetración y densidad correlacionadas
+
+    Usa una cópula gaussiana: las cuatro métricas comparten un factor latente
+    con la correlación CORRELACION_ZONAS, y las zonas urbanas se desplazan
+    hacia valores más altos. Las columnas coinciden con crear_datos_zonas_simulados.
+
+    Args:
+        n: Número de zonas
+        semilla: Semilla aleatoria
+        proporcion_urbana: Fracción de zonas urbanas
+        ruta_geojson: GeoJSON cuyos polígonos delimitan las coordenadas
+
+    Returns:
+        DataFrame de zonas
+    """
+    rng = np.random.default_rng(semilla)
+
+    urbana = rng.random(n) < proporcion_urbana
+    latente = rng.multivariate_normal(np.zeros(4), CORRELACION_ZONAS, size=n)
+    latente[urbana] += 1.5
+
+    poblacion = np.exp(8.0 + 0.8 * latente[:, 0]).clip(100, 500_000).astype(int)
+    densidad = np.exp(5.0 + 1.0 * latente[:, 1]).clip(5, 20_000)
+    velocidad = np.exp(1.6 + 0.8 * latente[:, 2]).clip(0.5, 300).round(1)
+    penetracion = (1 / (1 + np.exp(-(latente[:, 3] - 1.2)))).clip(0.02, 0.98).round(2)
+
+    # Las sedes son más probables en zonas pobladas; su conexión sigue a la velocidad
+    tiene_sede = rng.random(n) < 1 / (1 + np.exp(-(latente[:, 0] + 1.5)))
+    sede_con_conexion = tiene_sede & (rng.random(n) < 1 / (1 + np.exp(-(latente[:, 2] - 0.5))))
+
+    if os.path.exists(ruta_geojson):
+        lat, lon, corregimiento = generar_puntos(n, rng, cargar_poligonos(ruta_geojson))
+    else:
+        lat = rng.uniform(3.12, 3.29, n)
+        lon = rng.uniform(-76.69, -76.48, n)
+        corregimiento = np.full(n, None, dtype=object)
+
+    return pd.DataFrame({
+        'zona': [f'Zona {i:07d}' for i in range(n)],
+        'tipo': np.where(urbana, 'Urbana', 'Rural'),
+        'poblacion': poblacion,
+        'tiene_sede_educativa': tiene_sede,
+        'sede_con_conexion': sede_con_conexion,
+        'velocidad_promedio_mbps': velocidad,
+        'penetracion_internet': penetracion,
+        'latitud': lat,
+        'longitud': lon,
+        'densidad_poblacion': densidad,
+        'corregimiento': corregimiento
+    })
+
+# ============================================================================
+# CONECTIVIDAD
+# ============================================================================
+
+def _periodos():
+    """Lista de (año, trimestre) entre ANNO_INICIO y ANNO_FIN"""
+    return [(a, t) for a in range(ANNO_INICIO, ANNO_FIN + 1) for t in range(1, 5)]
+
+
+def generar_conectividad_por_bloques(n_registros: int, df_zonas: pd.DataFrame,
+                                     semilla: int = 42, tamano_bloque: int = TAMANO_BLOQUE,
+                                     municipio: str = 'JAMUNDÍ'):
+    """
+    Genera registros de conectividad en bloques, como historias trimestrales
+
+    Cada serie (zona × proveedor × tecnología × segmento) cubre todos los
+    trimestres, con tendencia de accesos y de velocidad según la tecnología.
+    Las series se reparten entre zonas proporcionalmente a su población
+    conectada. Cada bloque es reproducible por sí mismo.
+
+    Args:
+        n_registros: Número aproximado de registros a generar
+        df_zonas: Zonas a las que se atribuyen las series
+        semilla: Semilla aleatoria
+        tamano_bloque: Registros por bloque
+        municipio: Valor de la columna municipio
+
+    Yields:
+        DataFrames con las columnas del consolidado más 'zona'
+    """
+    periodos = np.array(_periodos())
+    n_periodos = len(periodos)
+    n_series = max(1, math.ceil(n_registros / n_periodos))
+    series_por_bloque = max(1, tamano_bloque // n_periodos)
+
+    nombres_prov, p_prov = list(PROVEEDORES), np.array(list(PROVEEDORES.values()))
+    nombres_seg, p_seg = list(SEGMENTOS), np.array(list(SEGMENTOS.values()))
+    nombres_tec = list(TECNOLOGIAS)
+    params_tec = np.array(list(TECNOLOGIAS.values()))
+
+    peso_zona = (df_zonas['poblacion'] * df_zonas['penetracion_internet']).to_numpy(dtype=float)
+    peso_zona = peso_zona / peso_zona.sum()
+    urbana = (df_zonas['tipo'] == 'Urbana').to_numpy()
+    nombres_zona = df_zonas['zona'].to_numpy()
+
+    semillas = np.random.SeedSequence(semilla).spawn(math.ceil(n_series / series_por_bloque))
+    t = (periodos[:, 0] - ANNO_INICIO) + (periodos[:, 1] - 1) / 4
+
+    for b, semilla_bloque in enumerate(semillas):
+        rng = np.random.default_rng(semilla_bloque)
+        m = min(series_por_bloque, n_series - b * series_por_bloque)
+
+        zona = rng.choice(len(nombres_zona), size=m, p=peso_zona)
+        # Zonas urbanas: más fibra y cable; rurales: más inalámbrico y satelital
+        p_tec = np.where(urbana[zona][:, None],
+                         [0.45, 0.30, 0.15, 0.07, 0.03],
+                         [0.10, 0.10, 0.25, 0.35, 0.20])
+        tec = (rng.random((m, 1)) > np.cumsum(p_tec, axis=1)).sum(axis=1).clip(0, len(nombres_tec) - 1)
+        prov = rng.choice(len(nombres_prov), size=m, p=p_prov)
+        seg = rng.choice(len(nombres_seg), size=m, p=p_seg)
+
+        base_accesos = rng.lognormal(3.0, 1.0, m)
+        vel_base = params_tec[tec, 0] * rng.lognormal(0, 0.3, m)
+        crec_vel, tend_acc = params_tec[tec, 1], params_tec[tec, 2]
+
+        accesos = base_accesos[:, None] * np.exp(tend_acc[:, None] * t[None, :])
+        accesos *= rng.lognormal(0, 0.1, (m, n_periodos))
+        velocidad = vel_base[:, None] * np.exp(crec_vel[:, None] * t[None, :])
+
+        yield pd.DataFrame({
+            'anno': np.tile(periodos[:, 0], m),
+            'trimestre': np.tile(periodos[:, 1], m),
+            'proveedor': np.array(nombres_prov, dtype=object)[np.repeat(prov, n_periodos)],
+            'municipio': municipio,
+            'segmento': np.array(nombres_seg, dtype=object)[np.repeat(seg, n_periodos)],
+            'tecnologia': np.array(nombres_tec, dtype=object)[np.repeat(tec, n_periodos)],
+            'velocidad_bajada': velocidad.ravel().round(2),
+            'velocidad_subida': (velocidad.ravel() * 0.2).round(2),
+            'accesos': accesos.ravel().round().astype(int),
+            'zona': nombres_zona[np.repeat(zona, n_periodos)]
+        })
+
+
+def generar_conectividad(n_registros: int, df_zonas: pd.DataFrame, semilla: int = 42) -> pd.DataFrame:
+    """
+    Genera registros de conectividad en memoria (ver generar_conectividad_por_bloques)
+
+    Returns:
+        DataFrame con exactamente n_registros filas
+    """
+    bloques = list(generar_conectividad_por_bloques(n_registros, df_zonas, semilla))
+    return pd.concat(bloques, ignore_index=True).head(n_registros)
+
+# ============================================================================
+# ESCRITURA EN PARQUET
+# ============================================================================
+
+def escribir_parquet_por_bloques(bloques, ruta: str) -> int:
+    """
+    Escribe un iterable de DataFrames en un único archivo Parquet, bloque a bloque
+
+    Requiere pyarrow. La memoria usada es la de un solo bloque.
+
+    Args:
+        bloques: Iterable de DataFrames con el mismo esquema
+        ruta: Archivo Parquet de salida
+
+    Returns:
+        Número total de filas escritas
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Se requiere pyarrow para escribir Parquet: pip install pyarrow") from e
+
+    escritor = None
+    total = 0
+    try:
+        for bloque in bloques:
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(ruta, tabla.schema, compression='zstd')
+            escritor.write_table(tabla)
+            total += len(bloque)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    return total
+
+
+def generar_dataset(directorio: str, n_zonas: int, n_registros: int,
+                    semilla: int = 42, tamano_bloque: int = TAMANO_BLOQUE) -> dict:
+    """
+    Genera y escribe en Parquet las zonas y la conectividad sintéticas
+
+    Args:
+        directorio: Carpeta de salida (se crea si no existe)
+        n_zonas: Número de zonas
+        n_registros: Número aproximado de registros de conectividad
+        semilla: Semilla aleatoria
+        tamano_bloque: Registros por bloque al escribir la conectividad
+
+    Returns:
+        Diccionario con las rutas y el número de filas escritas
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta_zonas = os.path.join(directorio, 'zonas.parquet')
+    ruta_conectividad = os.path.join(directorio, 'conectividad.parquet')
+
+    df_zonas = generar_zonas(n_zonas, semilla)
+    escribir_parquet_por_bloques([df_zonas], ruta_zonas)
+
+    filas = escribir_parquet_por_bloques(
+        generar_conectividad_por_bloques(n_registros, df_zonas, semilla, tamano_bloque),
+        ruta_conectividad
+    )
+
+    return {
+        'zonas': ruta_zonas,
+        'conectividad': ruta_conectividad,
+        'filas_zonas': len(df_zonas),
+        'filas_conectividad': filas
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generador de datos sintéticos de Jamundí Conectada')
+    parser.add_argument('--zonas', type=int, default=1000)
+    parser.add_argument('--registros', type=int, default=100_000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE)
+    parser.add_argument('--salida', default='datos_sinteticos')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("GENERADOR DE DATOS SINTÉTICOS")
+    print("=" * 80)
+
+    resultado = generar_dataset(args.salida, args.zonas, args.registros, args.semilla, args.bloque)
+
+    print(f"\n✅ Zonas: {resultado['filas_zonas']:,} → {resultado['zonas']}")
+    print(f"✅ Conectividad: {resultado['filas_conectividad']:,} → {resultado['conectividad']}")
+    sys.exit(0)
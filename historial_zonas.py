@@ -0,0 +1,362 @@
+"""
+Historial versionado de atributos de zonas para el proyecto Jamundí Conectada
+Cada versión de una zona es una fila de SQLite con su intervalo de vigencia
+[valido_desde, valido_hasta): registrar un cambio cierra la fila vigente e
+inserta una nueva, nunca sobrescribe valores. Así se puede consultar la tabla
+tal como estaba en cualquier fecha (`as_of`) y reproducir el ranking de un
+trimestre pasado sin recorrer el registro de cambios.
+
+Las diferencias entre dos fechas solo leen las zonas cuyo intervalo empieza o
+termina entre ellas (índices por fecha), no las dos tablas completas. Cada
+municipio tiene su propio archivo de historial.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from municipios import obtener_municipio
+from perfilado import perfilar
+from ranking import calcular_puntaje_prioridad
+
+DIRECTORIO_HISTORIAL = os.environ.get(
+    'SIPID_DIR_HISTORIAL', os.path.dirname(os.path.abspath(__file__))
+)
+
+# Columna de df_zonas -> tipo (afinidad SQLite y dtype al leer)
+ATRIBUTOS = {
+    'tipo': ('TEXT', object),
+    'poblacion': ('INTEGER', 'int64'),
+    'tiene_sede_educativa': ('INTEGER', bool),
+    'sede_con_conexion': ('INTEGER', bool),
+    'velocidad_promedio_mbps': ('REAL', 'float64'),
+    'penetracion_internet': ('REAL', 'float64'),
+    'latitud': ('REAL', 'float64'),
+    'longitud': ('REAL', 'float64'),
+    'densidad_poblacion': ('REAL', 'float64'),
+}
+
+# Fecha abierta: las filas vigentes tienen valido_hasta NULL
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS zonas (
+    zona TEXT NOT NULL,
+    {', '.join(f'{columna} {tipo}' for columna, (tipo, _) in ATRIBUTOS.items())},
+    orden INTEGER NOT NULL,
+    valido_desde TEXT NOT NULL,
+    valido_hasta TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_zonas_desde ON zonas (valido_desde);
+CREATE INDEX IF NOT EXISTS idx_zonas_hasta ON zonas (valido_hasta);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_zonas_vigentes ON zonas (zona) WHERE valido_hasta IS NULL;
+"""
+
+
+def ruta_historial(cod_municipio: int = None) -> str:
+    """Archivo SQLite del historial de un municipio (por defecto el configurado)"""
+    cod_municipio = obtener_municipio(cod_municipio)['cod_municipio']
+    return os.path.join(DIRECTORIO_HISTORIAL, f'historial_zonas_{cod_municipio}.sqlite')
+
+
+def _fecha_iso(fecha) -> str:
+    """Fecha (date, datetime, Timestamp o texto) como 'AAAA-MM-DD'"""
+    return pd.Timestamp(fecha).date().isoformat()
+
+
+def fin_trimestre(anno: int, trimestre: int) -> str:
+    """
+    Último día de un trimestre
+
+    Args:
+        anno: Año
+        trimestre: 1 a 4
+
+    Returns:
+        Fecha ISO (p. ej. '2024-03-31' para 2024 T1)
+    """
+    if trimestre not in (1, 2, 3, 4):
+        raise ValueError(f"Trimestre inválido: {trimestre}")
+    return _fecha_iso(pd.Period(year=anno, quarter=trimestre, freq='Q').end_time)
+
+
+class HistorialZonas:
+    """Tabla de zonas con vigencia por fila: consultas a una fecha y diferencias entre fechas"""
+
+    def __init__(self, ruta: str = None):
+        """
+        Args:
+            ruta: Archivo SQLite (se crea si no existe; ':memory:' para pruebas).
+                  Por defecto el del municipio configurado (ver ruta_historial)
+        """
+        ruta = ruta or ruta_historial()
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        if ruta != ':memory:':
+            # WAL: los lectores de otros procesos no bloquean al escritor
+            self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.executescript(_ESQUEMA)
+
+    def __repr__(self) -> str:
+        return f"HistorialZonas({self.ruta!r}, revision={self.revision()})"
+
+    def _leer(self, consulta: str, parametros: tuple = ()) -> pd.DataFrame:
+        with self._lock:
+            df = pd.read_sql_query(consulta, self._conexion, params=parametros)
+        for columna, (_, dtype) in ATRIBUTOS.items():
+            if dtype is bool:
+                df[columna] = df[columna].fillna(0).astype(bool)
+            elif dtype != object and df[columna].notna().all():
+                df[columna] = df[columna].astype(dtype)
+        return df
+
+    def revision(self) -> int:
+        """Número de filas guardadas: cambia con cada registro (clave de cachés)"""
+        with self._lock:
+            return self._conexion.execute('SELECT COUNT(*) FROM zonas').fetchone()[0]
+
+    def vacio(self) -> bool:
+        return self.revision() == 0
+
+    def fechas(self) -> list:
+        """Fechas en las que se registraron cambios, en orden"""
+        with self._lock:
+            filas = self._conexion.execute(
+                'SELECT DISTINCT valido_desde FROM zonas ORDER BY valido_desde'
+            ).fetchall()
+        return [f[0] for f in filas]
+
+    # ------------------------------------------------------------------------
+    # ESCRITURA
+    # ------------------------------------------------------------------------
+
+    @perfilar('registrar_historial_zonas')
+    def registrar(self, df_zonas: pd.DataFrame, fecha=None) -> dict:
+        """
+        Registra el estado de las zonas a partir de una fecha
+
+        Solo las zonas que cambian generan filas nuevas; las zonas que ya no
+        aparecen en df_zonas se dan de baja (se cierra su fila vigente).
+
+        Args:
+            df_zonas: Tabla de zonas con 'zona' y las columnas de ATRIBUTOS
+            fecha: Inicio de vigencia (por defecto hoy); no puede ser anterior
+                   al último cambio registrado
+
+        Returns:
+            Conteo de zonas 'nuevas', 'modificadas', 'bajas' y 'sin_cambio'
+        """
+        fecha = _fecha_iso(fecha or date.today())
+        faltantes = [c for c in ['zona', *ATRIBUTOS] if c not in df_zonas.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en df_zonas: {faltantes}")
+        if df_zonas['zona'].duplicated().any():
+            raise ValueError("df_zonas tiene zonas duplicadas")
+
+        fechas = self.fechas()
+        if fechas and fecha < fechas[-1]:
+            raise ValueError(f"El historial solo admite cambios posteriores al {fechas[-1]} (se recibió {fecha})")
+
+        nuevo = df_zonas[['zona', *ATRIBUTOS]].reset_index(drop=True)
+        vigente = self.as_of(None)
+        comparacion = nuevo.merge(vigente, on='zona', how='outer', suffixes=('', '_vigente'), indicator=True)
+
+        distinto = np.zeros(len(comparacion), dtype=bool)
+        for columna in ATRIBUTOS:
+            a, b = comparacion[columna], comparacion[f'{columna}_vigente']
+            distinto |= ~((a == b) | (a.isna() & b.isna())).to_numpy()
+
+        altas = comparacion['_merge'] == 'left_only'
+        bajas = comparacion['_merge'] == 'right_only'
+        modificadas = (comparacion['_merge'] == 'both') & distinto
+
+        cerrar = comparacion.loc[bajas | modificadas, 'zona'].tolist()
+        insertar = nuevo[nuevo['zona'].isin(comparacion.loc[altas | modificadas, 'zona'])]
+        # orden conserva la posición de la fila en df_zonas (as_of la respeta)
+        filas = [
+            (*fila, int(orden), fecha) for orden, fila in zip(
+                insertar.index,
+                insertar.astype(object).where(insertar.notna(), None).itertuples(index=False, name=None)
+            )
+        ]
+
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                'UPDATE zonas SET valido_hasta = ? WHERE zona = ? AND valido_hasta IS NULL',
+                [(fecha, zona) for zona in cerrar]
+            )
+            self._conexion.executemany(
+                f"INSERT INTO zonas (zona, {', '.join(ATRIBUTOS)}, orden, valido_desde) "
+                f"VALUES ({', '.join('?' * (len(ATRIBUTOS) + 3))})",
+                filas
+            )
+
+        return {
+            'nuevas': int(altas.sum()),
+            'modificadas': int(modificadas.sum()),
+            'bajas': int(bajas.sum()),
+            'sin_cambio': int(((comparacion['_merge'] == 'both') & ~distinto).sum())
+        }
+
+    # ------------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------------
+
+    def as_of(self, fecha=None, zonas: list = None) -> pd.DataFrame:
+        """
+        Zonas tal como estaban vigentes en una fecha
+
+        Args:
+            fecha: Fecha de corte (None = estado actual)
+            zonas: Restringe la consulta a estas zonas
+
+        Returns:
+            DataFrame con 'zona' y las columnas de ATRIBUTOS, en el orden de
+            filas con que se registraron
+        """
+        columnas = ', '.join(['zona', *ATRIBUTOS])
+        if fecha is None:
+            condicion, parametros = 'valido_hasta IS NULL', []
+        else:
+            fecha = _fecha_iso(fecha)
+            condicion = 'valido_desde <= ? AND (valido_hasta IS NULL OR valido_hasta > ?)'
+            parametros = [fecha, fecha]
+        if zonas is not None:
+            condicion += f" AND zona IN (SELECT value FROM json_each(?))"
+            parametros.append(pd.Series(list(zonas), dtype=object).to_json(orient='values'))
+        return self._leer(f'SELECT {columnas} FROM zonas WHERE {condicion} ORDER BY orden, zona', tuple(parametros))
+
+    def ranking_as_of(self, fecha=None, pesos: dict = None) -> pd.DataFrame:
+        """Ranking de prioridad calculado con los atributos vigentes en una fecha"""
+        return calcular_puntaje_prioridad(self.as_of(fecha), pesos)
+
+    def ranking_trimestre(self, anno: int, trimestre: int, pesos: dict = None) -> pd.DataFrame:
+        """Ranking de prioridad al cierre de un trimestre"""
+        return self.ranking_as_of(fin_trimestre(anno, trimestre), pesos)
+
+    @perfilar('diferencias_historial_zonas')
+    def diferencias(self, fecha_inicial, fecha_final=None) -> pd.DataFrame:
+        """
+        Cambios de atributos entre dos fechas
+
+        Args:
+            fecha_inicial: Fecha de referencia
+            fecha_final: Fecha a comparar (None = estado actual)
+
+        Returns:
+            DataFrame zona, atributo, valor_inicial, valor_final y cambio
+            ('alta', 'baja' o 'modificacion'), una fila por atributo cambiado
+        """
+        inicio = _fecha_iso(fecha_inicial)
+        fin = _fecha_iso(fecha_final) if fecha_final is not None else '9999-12-31'
+        if fin < inicio:
+            inicio, fin = fin, inicio
+
+        # Solo cambian las zonas con una fila que empieza o termina en (inicio, fin]
+        with self._lock:
+            zonas = [f[0] for f in self._conexion.execute(
+                'SELECT zona FROM zonas WHERE valido_desde > ? AND valido_desde <= ? '
+                'UNION SELECT zona FROM zonas WHERE valido_hasta > ? AND valido_hasta <= ?',
+                (inicio, fin, inicio, fin)
+            ).fetchall()]
+
+        columnas_salida = ['zona', 'atributo', 'valor_inicial', 'valor_final', 'cambio']
+        if not zonas:
+            return pd.DataFrame(columns=columnas_salida)
+
+        antes = self.as_of(inicio, zonas).set_index('zona')
+        despues = self.as_of(fecha_final, zonas).set_index('zona')
+        comparacion = antes.join(despues, how='outer', lsuffix='_inicial', rsuffix='_final')
+
+        partes = []
+        for columna in ATRIBUTOS:
+            a, b = comparacion[f'{columna}_inicial'], comparacion[f'{columna}_final']
+            cambia = ~((a == b) | (a.isna() & b.isna()))
+            if cambia.any():
+                partes.append(pd.DataFrame({
+                    'zona': comparacion.index[cambia],
+                    'atributo': columna,
+                    'valor_inicial': a[cambia].astype(object).to_numpy(),
+                    'valor_final': b[cambia].astype(object).to_numpy(),
+                }))
+        if not partes:
+            return pd.DataFrame(columns=columnas_salida)
+
+        df = pd.concat(partes, ignore_index=True)
+        df['cambio'] = np.select(
+            [~df['zona'].isin(antes.index), ~df['zona'].isin(despues.index)],
+            ['alta', 'baja'], 'modificacion'
+        )
+        return df.sort_values(['zona', 'atributo'], kind='stable').reset_index(drop=True)
+
+    def historia(self, zona: str) -> pd.DataFrame:
+        """Todas las versiones de una zona con su intervalo de vigencia"""
+        columnas = ', '.join(['zona', *ATRIBUTOS, 'valido_desde', 'valido_hasta'])
+        return self._leer(f'SELECT {columnas} FROM zonas WHERE zona = ? ORDER BY valido_desde, rowid', (zona,))
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import contextlib
+    import io
+    import time
+    from data_processing import crear_datos_zonas_simulados
+    from generador_sintetico import generar_zonas
+
+    print("="*80)
+    print("PRUEBA DEL HISTORIAL DE ZONAS")
+    print("="*80)
+
+    historial = HistorialZonas(':memory:')
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_2024 = crear_datos_zonas_simulados()
+    print(f"\n📥 2024-01-01: {historial.registrar(df_2024, '2024-01-01')}")
+
+    df_2025 = df_2024.copy()
+    conectadas = df_2025['zona'].isin(['Potrerito', 'Villa Colombia'])
+    df_2025.loc[conectadas, 'sede_con_conexion'] = True
+    df_2025.loc[conectadas, 'velocidad_promedio_mbps'] = 25.0
+    print(f"📥 2025-02-15: {historial.registrar(df_2025, '2025-02-15')}")
+
+    print(f"\n{historial!r}")
+    print(historial.diferencias('2024-12-31').to_string(index=False))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ranking_t4 = historial.ranking_trimestre(2024, 4)
+        ranking_t1 = historial.ranking_trimestre(2025, 1)
+    print("\n🏆 Top 3 al cierre de 2024 T4 y 2025 T1:")
+    print(ranking_t4.sort_values('ranking')[['zona', 'ranking']].head(3).to_string(index=False))
+    print(ranking_t1.sort_values('ranking')[['zona', 'ranking']].head(3).to_string(index=False))
+
+    # La fecha de corte reproduce exactamente la tabla registrada
+    pd.testing.assert_frame_equal(
+        historial.as_of('2024-06-30'), df_2024[['zona', *ATRIBUTOS]], check_dtype=False
+    )
+    pd.testing.assert_frame_equal(historial.as_of(), df_2025[['zona', *ATRIBUTOS]], check_dtype=False)
+    assert historial.as_of('2023-12-31').empty
+    assert len(historial.historia('Potrerito')) == 2
+
+    # Escala: 100,000 zonas con 1% de cambios por trimestre
+    historial = HistorialZonas(':memory:')
+    df = generar_zonas(100_000, 42)[['zona', *ATRIBUTOS]]
+    rng = np.random.default_rng(0)
+    inicio = time.perf_counter()
+    historial.registrar(df, '2024-01-01')
+    print(f"\n⏱️ Registro inicial de {len(df):,} zonas: {time.perf_counter() - inicio:.2f} s")
+    for i, fecha in enumerate(['2024-04-01', '2024-07-01', '2024-10-01']):
+        df = df.copy()
+        filas = rng.choice(len(df), 1000, replace=False)
+        df.loc[filas, 'velocidad_promedio_mbps'] *= 1.5
+        inicio = time.perf_counter()
+        conteo = historial.registrar(df, fecha)
+        print(f"⏱️ Registro {fecha}: {conteo} en {time.perf_counter() - inicio:.2f} s")
+    inicio = time.perf_counter()
+    historial.as_of('2024-05-15')
+    print(f"⏱️ as_of sobre {historial.revision():,} filas: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    inicio = time.perf_counter()
+    cambios = historial.diferencias('2024-05-15', '2024-08-15')
+    print(f"⏱️ Diferencias entre trimestres ({len(cambios):,} cambios): "
+          f"{(time.perf_counter() - inicio) * 1000:.0f} ms")
@@ -0,0 +1,413 @@
+"""
+Servicio de imágenes estáticas de gráficos para el proyecto Jamundí Conectada
+Convierte figuras Plotly en PNG para incrustarlas en los reportes PDF. Cada
+conversión con kaleido tarda del orden de segundos en frío, así que:
+
+- Un pool de procesos renderizadores se arranca una vez y queda caliente
+  (cada proceso mantiene su propio kaleido abierto entre figuras).
+- Las imágenes se guardan en disco por la huella de la figura (JSON, tamaño
+  y escala), con un límite de tamaño y desalojo de las menos usadas. La
+  carpeta se comparte entre procesos: un gráfico ya generado por un trabajo
+  no se vuelve a renderizar en otro.
+
+kaleido es opcional: si no está instalado, renderizar devuelve None y los
+reportes se generan sin gráficos.
+
+Configuración por variables de entorno:
+    SIPID_DIR_IMAGENES       Carpeta de la caché en disco
+    SIPID_MAX_MB_IMAGENES    Tamaño máximo de la caché (MB)
+    SIPID_RENDERIZADORES     Procesos renderizadores (0 = en el mismo proceso)
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cache_figuras import huella_datos
+from perfilado import perfilar, registrar_cache
+
+DIRECTORIO_IMAGENES = os.environ.get(
+    'SIPID_DIR_IMAGENES', os.path.join(tempfile.gettempdir(), 'sipid_imagenes')
+)
+MAX_MB_IMAGENES = float(os.environ.get('SIPID_MAX_MB_IMAGENES', 256))
+RENDERIZADORES = int(os.environ.get('SIPID_RENDERIZADORES', min(2, os.cpu_count() or 1)))
+
+# Tamaño de render por defecto (px); el alto sale del layout de la figura si lo fija
+ANCHO_IMAGEN = 700
+ALTO_IMAGEN = 300
+ESCALA_IMAGEN = 2
+
+# Al desalojar se baja hasta esta fracción del límite, para no recontar la
+# carpeta con cada escritura cuando la caché está llena
+FRACCION_TRAS_DESALOJO = 0.9
+
+# Una figura que tarde más que esto se omite del reporte
+TIEMPO_MAX_RENDER_S = 60
+
+
+def motor_disponible() -> bool:
+    """True si kaleido está instalado (plotly lo necesita para exportar imágenes)"""
+    return importlib.util.find_spec('kaleido') is not None
+
+# ============================================================================
+# CACHÉ EN DISCO
+# ============================================================================
+
+class CacheImagenesDisco:
+    """
+    Caché de imágenes en disco con límite de tamaño y desalojo LRU
+
+    La fecha de modificación de cada archivo marca su último uso. El total de
+    bytes se lleva en memoria y, al superar el límite, se vuelve a contar la
+    carpeta: así también se contemplan las escrituras de otros procesos.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_IMAGENES, limite_mb: float = MAX_MB_IMAGENES):
+        """
+        Args:
+            directorio: Carpeta de la caché (se crea si no existe)
+            limite_mb: Tamaño máximo de la caché en MB
+        """
+        self.directorio = directorio
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        os.makedirs(directorio, exist_ok=True)
+        self._bytes = sum(tamano for _, _, tamano in self._archivos())
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f'{clave}.png')
+
+    def _archivos(self) -> list:
+        """(ruta, último uso, tamaño) de cada imagen de la carpeta"""
+        archivos = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if not entrada.name.endswith('.png'):
+                    continue
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue  # otro proceso la desalojó
+                archivos.append((entrada.path, info.st_mtime, info.st_size))
+        return archivos
+
+    def obtener(self, clave: str):
+        """
+        Lee una imagen de la caché
+
+        Args:
+            clave: Huella de la imagen
+
+        Returns:
+            Bytes de la imagen o None si no está
+        """
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                datos = f.read()
+            os.utime(ruta)  # marca el uso para el desalojo LRU
+        except FileNotFoundError:
+            datos = None
+        with self._lock:
+            if datos is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        registrar_cache('imagenes', datos is not None)
+        return datos
+
+    def guardar(self, clave: str, datos: bytes):
+        """
+        Escribe una imagen, desalojando las menos usadas si se supera el límite
+
+        Args:
+            clave: Huella de la imagen
+            datos: Bytes de la imagen
+        """
+        if len(datos) > self.limite_bytes:
+            return
+        ruta = self._ruta(clave)
+        # Escritura atómica: un lector concurrente nunca ve un PNG a medias
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+        with self._lock:
+            try:
+                anterior = os.path.getsize(ruta)  # sobrescribir una clave no suma dos veces
+            except FileNotFoundError:
+                anterior = 0
+            os.replace(temporal, ruta)
+            self._bytes += len(datos) - anterior
+            if self._bytes > self.limite_bytes:
+                self._desalojar()
+
+    def _desalojar(self):
+        """Borra las imágenes usadas hace más tiempo hasta quedar bajo el límite"""
+        archivos = sorted(self._archivos(), key=lambda archivo: archivo[1])
+        total = sum(tamano for _, _, tamano in archivos)
+        objetivo = self.limite_bytes * FRACCION_TRAS_DESALOJO
+        for ruta, _, tamano in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        self._bytes = total
+
+    def limpiar(self):
+        """Borra todas las imágenes y reinicia los contadores"""
+        with self._lock:
+            for ruta, _, _ in self._archivos():
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+            self._bytes = 0
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self) -> dict:
+        """
+        Obtiene estadísticas de uso de la caché
+
+        Returns:
+            Diccionario con imágenes, tamaño en disco, aciertos, fallos y tasa de acierto
+        """
+        archivos = self._archivos()
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'imagenes': len(archivos),
+                'disco_mb': sum(tamano for _, _, tamano in archivos) / (1024 * 1024),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_acierto': self.aciertos / total if total else 0.0
+            }
+
+# ============================================================================
+# POOL DE RENDERIZADORES
+# ============================================================================
+
+def _calentar_proceso():
+    """Inicializador de cada renderizador: arranca kaleido con una figura vacía"""
+    try:
+        _renderizar_json('{"data": [], "layout": {}}', 10, 10, 1)
+    except Exception:
+        pass  # el error real aparecerá con la primera figura
+
+
+def _renderizar_json(figura_json: str, ancho: int, alto: int, escala: float) -> bytes:
+    """Convierte una figura serializada en PNG (se ejecuta en el renderizador)"""
+    import plotly.io as pio
+
+    return pio.to_image(pio.from_json(figura_json, skip_invalid=True), format='png',
+                        width=ancho, height=alto, scale=escala)
+
+
+class RenderizadorImagenes:
+    """Convierte figuras en PNG con un pool de procesos caliente y caché en disco"""
+
+    def __init__(self, procesos: int = RENDERIZADORES, cache: CacheImagenesDisco = None):
+        """
+        Args:
+            procesos: Renderizadores en paralelo (0 = en el mismo proceso)
+            cache: Caché en disco (por defecto la de DIRECTORIO_IMAGENES)
+        """
+        self.procesos = procesos
+        self.cache = cache if cache is not None else CacheImagenesDisco()
+        self.disponible = motor_disponible()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def calentar(self):
+        """Arranca el pool y kaleido en cada proceso antes de la primera figura"""
+        if not self.disponible or self.procesos == 0:
+            return
+        pool = self._obtener_pool()
+        for futuro in [pool.submit(_calentar_proceso) for _ in range(self.procesos)]:
+            futuro.result()
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesos, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_calentar_proceso
+                )
+            return self._pool
+
+    @staticmethod
+    def _parametros(fig, ancho: int, alto: int, escala: float):
+        """JSON de la figura, tamaño final y huella de la imagen"""
+        figura_json = fig.to_json()
+        alto = alto or fig.layout.height or ALTO_IMAGEN
+        return figura_json, ancho, alto, escala, huella_datos((figura_json, ancho, alto, escala))
+
+    def renderizar(self, fig, ancho: int = ANCHO_IMAGEN, alto: int = None,
+                   escala: float = ESCALA_IMAGEN):
+        """
+        Convierte una figura en PNG
+
+        Args:
+            fig: Figura de Plotly
+            ancho: Ancho en píxeles
+            alto: Alto en píxeles (por defecto el del layout o ALTO_IMAGEN)
+            escala: Factor de resolución
+
+        Returns:
+            Bytes PNG, o None si kaleido no está instalado o el render falla
+        """
+        return self.renderizar_lote([fig], ancho, alto, escala)[0]
+
+    @perfilar()
+    def renderizar_lote(self, figuras: list, ancho: int = ANCHO_IMAGEN, alto: int = None,
+                        escala: float = ESCALA_IMAGEN) -> list:
+        """
+        Convierte varias figuras en PNG, repartiendo las que no están en caché entre el pool
+
+        Args:
+            figuras: Lista de figuras de Plotly
+            ancho, alto, escala: Como en renderizar
+
+        Returns:
+            Lista de bytes PNG (None para las figuras que no se pudieron renderizar)
+        """
+        parametros = [self._parametros(fig, ancho, alto, escala) for fig in figuras]
+        resultados = [self.cache.obtener(clave) for *_, clave in parametros]
+        pendientes = [i for i, datos in enumerate(resultados) if datos is None]
+        if not pendientes or not self.disponible:
+            return resultados
+
+        if self.procesos == 0:
+            futuros = None
+        else:
+            pool = self._obtener_pool()
+            futuros = {i: pool.submit(_renderizar_json, *parametros[i][:4]) for i in pendientes}
+
+        for i in pendientes:
+            try:
+                if futuros is None:
+                    datos = _renderizar_json(*parametros[i][:4])
+                else:
+                    datos = futuros[i].result(timeout=TIEMPO_MAX_RENDER_S)
+            except Exception as e:  # incluye el TimeoutError de result()
+                print(f"⚠️ No se pudo renderizar un gráfico: {e}")
+                continue
+            self.cache.guardar(parametros[i][4], datos)
+            resultados[i] = datos
+        return resultados
+
+    def cerrar(self):
+        """Detiene el pool de renderizadores"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+_renderizador = None
+_lock_renderizador = threading.Lock()
+
+
+def obtener_renderizador() -> RenderizadorImagenes:
+    """Renderizador del proceso (su pool queda caliente entre reportes)"""
+    global _renderizador
+    with _lock_renderizador:
+        if _renderizador is None:
+            _renderizador = RenderizadorImagenes()
+            if not _renderizador.disponible:
+                print("ℹ️ kaleido no está instalado: los reportes PDF se generan sin gráficos")
+        return _renderizador
+
+# ============================================================================
+# GRÁFICOS DE LOS REPORTES
+# ============================================================================
+
+def figuras_zona(zona_data, estadisticas_zonas=None) -> list:
+    """
+    Figuras del panel lateral que se incluyen en el reporte de una zona
+
+    Args:
+        zona_data: Serie con la fila de la zona (ranking incluido)
+        estadisticas_zonas: EstadisticasZonas del catálogo (habilita el radar)
+
+    Returns:
+        Lista de figuras: componentes, radar, progreso hacia la meta y mini mapa
+    """
+    import visualizations_advanced as va
+
+    figuras = [va.crear_grafico_barras_componentes_detallado(zona_data)]
+    if estadisticas_zonas is not None:
+        figuras.append(va.crear_grafico_radar_metricas(zona_data, estadisticas_zonas))
+    figuras.append(va.crear_indicador_progreso_meta(zona_data, estadisticas_zonas=estadisticas_zonas))
+    figuras.append(va.crear_mini_mapa_ubicacion(zona_data))
+    return figuras
+
+
+def imagenes_zonas(df_zonas: pd.DataFrame, estadisticas_zonas=None) -> dict:
+    """
+    PNG de los gráficos de cada zona, renderizados en un solo lote
+
+    Args:
+        df_zonas: Zonas con puntajes calculados
+        estadisticas_zonas: EstadisticasZonas del catálogo (habilita el radar)
+
+    Returns:
+        Diccionario zona -> lista de PNG (vacío si kaleido no está instalado)
+    """
+    renderizador = obtener_renderizador()
+    if not renderizador.disponible or len(df_zonas) == 0:
+        return {}
+    figuras, zonas = [], []
+    for _, zona_data in df_zonas.iterrows():
+        for fig in figuras_zona(zona_data, estadisticas_zonas):
+            figuras.append(fig)
+            zonas.append(zona_data['zona'])
+    imagenes = {}
+    for zona, datos in zip(zonas, renderizador.renderizar_lote(figuras)):
+        if datos is not None:
+            imagenes.setdefault(zona, []).append(datos)
+    return imagenes
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    from generador_sintetico import generar_zonas
+    from ranking import calcular_puntaje_prioridad
+    from estadisticas_zonas import calcular_estadisticas_zonas
+
+    print("="*80)
+    print("PRUEBA DEL SERVICIO DE IMÁGENES DE GRÁFICOS")
+    print("="*80)
+
+    # Caché en disco: el límite fuerza el desalojo de las menos usadas
+    cache = CacheImagenesDisco(tempfile.mkdtemp(prefix='sipid_imagenes_'), limite_mb=0.05)
+    for i in range(8):
+        cache.guardar(f'prueba{i}', os.urandom(10 * 1024))
+        time.sleep(0.01)
+        cache.obtener('prueba0')  # la más antigua sigue en uso
+    print(f"\n💾 Caché en disco: {cache.estadisticas()}")
+    print(f"   prueba0 conservada: {cache.obtener('prueba0') is not None}, "
+          f"prueba1 desalojada: {cache.obtener('prueba1') is None}")
+
+    df_ranked = calcular_puntaje_prioridad(generar_zonas(20, 42))
+    estadisticas = calcular_estadisticas_zonas(df_ranked)
+    renderizador = obtener_renderizador()
+    print(f"\n🖼️ kaleido disponible: {renderizador.disponible} ({renderizador.procesos} renderizadores)")
+
+    for intento in ('en frío', 'desde caché'):
+        inicio = time.perf_counter()
+        imagenes = imagenes_zonas(df_ranked.head(3), estadisticas)
+        print(f"   {intento}: {sum(map(len, imagenes.values()))} imágenes en "
+              f"{(time.perf_counter() - inicio) * 1000:.0f} ms")
+    renderizador.cerrar()
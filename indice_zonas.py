@@ -0,0 +1,190 @@
+"""
+Registro de zonas con índices precalculados para el proyecto Jamundí Conectada
+Resuelve por nombre o id (posición en la tabla) sin recorrer el DataFrame:
+los widgets y paneles hacen búsquedas O(1) y el filtrado por zona/nivel usa
+una máscara de ids seleccionados en lugar de encadenar máscaras isin
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import obtener_color_prioridad
+
+NIVELES_PRIORIDAD = ['Alta', 'Media', 'Baja']
+
+ICONOS_PRIORIDAD = {
+    'Alta': '🔴',
+    'Media': '🟠',
+    'Baja': '🟢'
+}
+
+CLASES_BADGE = {
+    'Alta': 'priority-badge-alta',
+    'Media': 'priority-badge-media',
+    'Baja': 'priority-badge-baja'
+}
+
+
+class RegistroZonas:
+    """
+    Índice de solo lectura sobre las zonas rankeadas
+
+    El id de una zona es su posición en la tabla original, de modo que
+    df.iloc[id] es su fila. Si un nombre aparece varias veces se usa la
+    primera aparición, igual que df[df['zona'] == nombre].iloc[0].
+    """
+
+    def __init__(self, df_zonas_ranked: pd.DataFrame):
+        """
+        Args:
+            df_zonas_ranked: Zonas con nivel_prioridad calculado (no se copia ni se modifica)
+        """
+        self._df = df_zonas_ranked
+        self.nombres = df_zonas_ranked['zona'].astype(str).to_numpy()
+        self.niveles = df_zonas_ranked['nivel_prioridad'].astype(str).to_numpy()
+
+        self._id_por_nombre = {}
+        for id_zona, nombre in enumerate(self.nombres):
+            self._id_por_nombre.setdefault(nombre, id_zona)
+
+        self.iconos = np.array([ICONOS_PRIORIDAD.get(n, '🟢') for n in self.niveles], dtype=object)
+        self.colores = np.array([obtener_color_prioridad(n) for n in self.niveles], dtype=object)
+        self._mascaras_nivel = {nivel: self.niveles == nivel for nivel in np.unique(self.niveles)}
+
+        ids_unicos = np.fromiter(self._id_por_nombre.values(), dtype=np.int64)
+        self._ids_ordenados = ids_unicos[np.argsort(self.nombres[ids_unicos], kind='stable')]
+        self._filas = {}
+
+    def __len__(self) -> int:
+        return len(self.nombres)
+
+    def __contains__(self, nombre) -> bool:
+        return nombre in self._id_por_nombre
+
+    # ------------------------------------------------------------------------
+    # BÚSQUEDAS
+    # ------------------------------------------------------------------------
+
+    def id_zona(self, nombre: str):
+        """Id de una zona por nombre (None si no existe)"""
+        return self._id_por_nombre.get(nombre)
+
+    def fila(self, zona) -> pd.Series:
+        """
+        Fila completa de una zona, por nombre o por id
+
+        Args:
+            zona: Nombre (str) o id (int) de la zona
+
+        Returns:
+            Serie con los datos de la zona (se reutiliza entre llamadas)
+        """
+        id_zona = self._id_por_nombre[zona] if isinstance(zona, str) else int(zona)
+        fila = self._filas.get(id_zona)
+        if fila is None:
+            fila = self._df.iloc[id_zona]
+            self._filas[id_zona] = fila
+        return fila
+
+    def info(self, zona) -> dict:
+        """
+        Atributos de presentación precalculados de una zona
+
+        Args:
+            zona: Nombre (str) o id (int) de la zona
+
+        Returns:
+            Diccionario con id, zona, nivel, icono, color y clase CSS del badge
+        """
+        id_zona = self._id_por_nombre[zona] if isinstance(zona, str) else int(zona)
+        nivel = self.niveles[id_zona]
+        return {
+            'id': id_zona,
+            'zona': self.nombres[id_zona],
+            'nivel': nivel,
+            'icono': self.iconos[id_zona],
+            'color': self.colores[id_zona],
+            'badge': CLASES_BADGE.get(nivel, 'priority-badge-baja')
+        }
+
+    def opciones(self) -> list:
+        """Pares (zona, icono) ordenados por nombre, para listas de selección"""
+        return [(self.nombres[i], self.iconos[i]) for i in self._ids_ordenados]
+
+    # ------------------------------------------------------------------------
+    # SELECCIÓN
+    # ------------------------------------------------------------------------
+
+    def mascara(self, zonas, niveles=None) -> np.ndarray:
+        """
+        Máscara booleana de los ids que cumplen la selección
+
+        Args:
+            zonas: Nombres de zonas seleccionadas (se ignoran los desconocidos)
+            niveles: Niveles de prioridad seleccionados; None = todos
+
+        Returns:
+            Array booleano de longitud len(registro)
+        """
+        seleccion = np.zeros(len(self), dtype=bool)
+        ids = [self._id_por_nombre[z] for z in zonas if z in self._id_por_nombre]
+        seleccion[ids] = True
+        # Los nombres repetidos comparten la selección de su primera aparición
+        if len(self._id_por_nombre) < len(self):
+            seleccion = np.isin(self.nombres, self.nombres[ids])
+
+        if niveles is not None:
+            por_nivel = np.zeros(len(self), dtype=bool)
+            for nivel in niveles:
+                if nivel in self._mascaras_nivel:
+                    por_nivel |= self._mascaras_nivel[nivel]
+            seleccion &= por_nivel
+
+        return seleccion
+
+    def filtrar(self, zonas, niveles=None) -> pd.DataFrame:
+        """
+        Filas de las zonas seleccionadas, en el orden de la tabla original
+
+        Args:
+            zonas: Nombres de zonas seleccionadas
+            niveles: Niveles de prioridad seleccionados; None = todos
+
+        Returns:
+            DataFrame filtrado
+        """
+        return self._df[self.mascara(zonas, niveles)]
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from data_processing import crear_datos_zonas_simulados
+    from ranking import calcular_puntaje_prioridad
+
+    print("="*80)
+    print("PRUEBA DEL REGISTRO DE ZONAS")
+    print("="*80)
+
+    df_zonas_ranked = calcular_puntaje_prioridad(crear_datos_zonas_simulados())
+    registro = RegistroZonas(df_zonas_ranked)
+
+    print(f"\n📍 {len(registro)} zonas indexadas")
+    for zona, icono in registro.opciones()[:5]:
+        print(f"   {icono} {zona}: {registro.info(zona)['color']}")
+
+    nombre = registro.opciones()[0][0]
+    esperado = df_zonas_ranked[df_zonas_ranked['zona'] == nombre].iloc[0]
+    assert registro.fila(nombre).equals(esperado)
+
+    zonas = df_zonas_ranked['zona'].tolist()[::2]
+    esperado = df_zonas_ranked[
+        df_zonas_ranked['zona'].isin(zonas) & df_zonas_ranked['nivel_prioridad'].isin(['Alta', 'Media'])
+    ]
+    assert registro.filtrar(zonas, ['Alta', 'Media']).equals(esperado)
+    print("\n✅ Búsquedas y filtrado coinciden con las máscaras de pandas")
+
+    inicio = time.perf_counter()
+    for zona, _ in registro.opciones():
+        registro.info(zona)
+    print(f"⏱️ {len(registro)} búsquedas en {(time.perf_counter() - inicio) * 1000:.3f} ms")
@@ -0,0 +1,112 @@
+"""
+Catálogo de municipios atendidos por el SIPID
+Cada municipio se identifica por su código DANE (`cod_municipio`, el mismo de
+la API nacional de internet fijo) y define el centro del mapa, el patrón de
+nombre con que aparece en fuentes sin código (una expresión regular que debe
+cubrir el nombre completo, en mayúsculas) y, si existe, su GeoJSON.
+
+Los datos de cada municipio se cargan y publican en su propia partición del
+almacén compartido: un proceso puede atender varios municipios reutilizando
+las mismas cachés, pero cada uno con sus propios índices y sin recorrer las
+filas de los demás.
+"""
+
+import os
+
+# cod_municipio -> configuración
+MUNICIPIOS = {
+    76364: {
+        'nombre': 'Jamundí',
+        'departamento': 'Valle del Cauca',
+        'centro': (3.28, -76.58),
+        'zoom': 10,
+        'patron': 'JAMUNDÍ|JAMUNDI',
+        'geojson': 'corregimientos_jamundi.geojson',
+    },
+    76001: {
+        'nombre': 'Cali',
+        'departamento': 'Valle del Cauca',
+        'centro': (3.4516, -76.5320),
+        'zoom': 10,
+        'patron': 'CALI|SANTIAGO DE CALI',
+        'geojson': None,
+    },
+    76892: {
+        'nombre': 'Yumbo',
+        'departamento': 'Valle del Cauca',
+        'centro': (3.5823, -76.4958),
+        'zoom': 11,
+        'patron': 'YUMBO',
+        'geojson': None,
+    },
+    76130: {
+        'nombre': 'Candelaria',
+        'departamento': 'Valle del Cauca',
+        'centro': (3.4072, -76.3484),
+        'zoom': 11,
+        'patron': 'CANDELARIA',
+        'geojson': None,
+    },
+    19573: {
+        'nombre': 'Puerto Tejada',
+        'departamento': 'Cauca',
+        'centro': (3.2306, -76.4175),
+        'zoom': 11,
+        'patron': 'PUERTO TEJADA',
+        'geojson': None,
+    },
+    19698: {
+        'nombre': 'Santander de Quilichao',
+        'departamento': 'Cauca',
+        'centro': (3.0091, -76.4850),
+        'zoom': 10,
+        'patron': 'SANTANDER DE QUILICHAO',
+        'geojson': None,
+    },
+}
+
+COD_MUNICIPIO_POR_DEFECTO = int(os.environ.get('SIPID_COD_MUNICIPIO', 76364))
+
+# Municipios que ofrece el dashboard (p. ej. SIPID_MUNICIPIOS=76364,76001)
+MUNICIPIOS_ACTIVOS = [
+    int(cod) for cod in os.environ.get('SIPID_MUNICIPIOS', str(COD_MUNICIPIO_POR_DEFECTO)).split(',')
+    if cod.strip()
+]
+
+
+def obtener_municipio(cod_municipio: int = None) -> dict:
+    """
+    Configuración de un municipio
+
+    Args:
+        cod_municipio: Código DANE (por defecto COD_MUNICIPIO_POR_DEFECTO)
+
+    Returns:
+        Diccionario con cod_municipio, nombre, departamento, centro, zoom,
+        patron y geojson
+    """
+    cod_municipio = int(cod_municipio or COD_MUNICIPIO_POR_DEFECTO)
+    if cod_municipio not in MUNICIPIOS:
+        raise ValueError(f"Municipio no configurado: {cod_municipio}. Opciones: {sorted(MUNICIPIOS)}")
+    return {'cod_municipio': cod_municipio, **MUNICIPIOS[cod_municipio]}
+
+
+def particion_municipio(cod_municipio: int = None) -> str:
+    """Nombre de la partición del almacén compartido para un municipio"""
+    return f'm{obtener_municipio(cod_municipio)["cod_municipio"]}'
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    print("="*80)
+    print("CATÁLOGO DE MUNICIPIOS")
+    print("="*80)
+
+    for cod in MUNICIPIOS:
+        municipio = obtener_municipio(cod)
+        activo = '✅' if cod in MUNICIPIOS_ACTIVOS else '  '
+        print(f"   {activo} {cod} {municipio['nombre']:24s} {municipio['departamento']:16s} "
+              f"centro={municipio['centro']} partición={particion_municipio(cod)}")
+
+    for cod in MUNICIPIOS_ACTIVOS:
+        obtener_municipio(cod)
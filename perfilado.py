@@ -0,0 +1,321 @@
+"""
+Instrumentación ligera del pipeline del Dashboard Jamundí Conectada
+Registra tiempo por etapa, número de filas y aciertos/fallos de caché,
+y los exporta como JSON lines o en formato de texto de Prometheus
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+# Se puede desactivar con SIPID_PERFILADO=0
+PERFILADO_ACTIVO = os.environ.get('SIPID_PERFILADO', '1') != '0'
+MAX_REGISTROS = 5000
+
+# ============================================================================
+# REGISTRO DE MÉTRICAS
+# ============================================================================
+
+class RegistroMetricas:
+    """Almacena las mediciones de etapas y los contadores de caché del proceso"""
+
+    def __init__(self, max_registros: int = MAX_REGISTROS):
+        self._registros = deque(maxlen=max_registros)
+        self._caches = {}
+        self._lock = threading.Lock()
+        self.ciclo = 0
+
+    def iniciar_ciclo(self) -> int:
+        """
+        Marca el inicio de un nuevo ciclo (p. ej. un rerun de Streamlit)
+
+        Returns:
+            Identificador del ciclo iniciado
+        """
+        with self._lock:
+            self.ciclo += 1
+            return self.ciclo
+
+    def registrar_etapa(self, etapa: str, segundos: float,
+                        filas_entrada: int = None, filas_salida: int = None):
+        """Añade la medición de una etapa al registro"""
+        with self._lock:
+            self._registros.append({
+                'ts': time.time(),
+                'ciclo': self.ciclo,
+                'etapa': etapa,
+                'segundos': segundos,
+                'filas_entrada': filas_entrada,
+                'filas_salida': filas_salida
+            })
+
+    def registrar_cache(self, cache: str, acierto: bool):
+        """Incrementa el contador de aciertos o fallos de una caché"""
+        with self._lock:
+            contadores = self._caches.setdefault(cache, {'aciertos': 0, 'fallos': 0})
+            contadores['aciertos' if acierto else 'fallos'] += 1
+
+    def fallos_cache(self, cache: str) -> int:
+        """Número de fallos acumulados de una caché"""
+        with self._lock:
+            return self._caches.get(cache, {}).get('fallos', 0)
+
+    def registros(self, ciclo: int = None) -> list:
+        """
+        Obtiene las mediciones registradas
+
+        Args:
+            ciclo: Si se indica, solo las mediciones de ese ciclo
+
+        Returns:
+            Lista de diccionarios con las mediciones
+        """
+        with self._lock:
+            registros = list(self._registros)
+        if ciclo is not None:
+            registros = [r for r in registros if r['ciclo'] == ciclo]
+        return registros
+
+    def estadisticas_cache(self) -> dict:
+        """Copia de los contadores de caché con su tasa de acierto"""
+        with self._lock:
+            resultado = {}
+            for cache, c in self._caches.items():
+                total = c['aciertos'] + c['fallos']
+                resultado[cache] = {
+                    **c,
+                    'tasa_acierto': c['aciertos'] / total if total else 0.0
+                }
+            return resultado
+
+    def limpiar(self):
+        """Elimina todas las mediciones y contadores"""
+        with self._lock:
+            self._registros.clear()
+            self._caches.clear()
+            self.ciclo = 0
+
+
+# Registro compartido por todo el proceso
+registro_global = RegistroMetricas()
+
+
+def obtener_registro() -> RegistroMetricas:
+    """Devuelve el registro de métricas del proceso"""
+    return registro_global
+
+
+def registrar_cache(cache: str, acierto: bool):
+    """Registra un acierto o fallo de caché en el registro global"""
+    if PERFILADO_ACTIVO:
+        registro_global.registrar_cache(cache, acierto)
+
+# ============================================================================
+# DECORADOR Y CONTEXT MANAGER
+# ============================================================================
+
+def _contar_filas(obj):
+    """Número de filas de un DataFrame, Series o lista (None en otro caso)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, list)):
+        return len(obj)
+    return None
+
+
+@contextmanager
+def medir_etapa(etapa: str, filas_entrada: int = None):
+    """
+    Mide el tiempo de pared de un bloque de código
+
+    El diccionario entregado permite anotar 'filas_salida' dentro del bloque.
+
+    Args:
+        etapa: Nombre de la etapa
+        filas_entrada: Filas procesadas por la etapa (opcional)
+
+    Ejemplo:
+        with medir_etapa('filtrado') as etapa:
+            df = ...
+            etapa['filas_salida'] = len(df)
+    """
+    info = {'filas_entrada': filas_entrada, 'filas_salida': None}
+    if not PERFILADO_ACTIVO:
+        yield info
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield info
+    finally:
+        registro_global.registrar_etapa(
+            etapa, time.perf_counter() - inicio,
+            info['filas_entrada'], info['filas_salida']
+        )
+
+
+def perfilar(etapa: str = None):
+    """
+    Decorador que registra tiempo y filas de entrada/salida de una función
+
+    Las filas de entrada corresponden al primer DataFrame recibido y las de
+    salida al resultado, si este es un DataFrame, Series o lista.
+
+    Args:
+        etapa: Nombre de la etapa (por defecto, el nombre de la función)
+    """
+    def decorador(func):
+        nombre = etapa or func.__name__
+
+        @wraps(func)
+        def envoltura(*args, **kwargs):
+            if not PERFILADO_ACTIVO:
+                return func(*args, **kwargs)
+
+            filas_entrada = next(
+                (len(a) for a in list(args) + list(kwargs.values())
+                 if isinstance(a, pd.DataFrame)),
+                None
+            )
+            inicio = time.perf_counter()
+            resultado = None
+            try:
+                resultado = func(*args, **kwargs)
+                return resultado
+            finally:
+                # Como medir_etapa: las llamadas que fallan también se miden
+                registro_global.registrar_etapa(
+                    nombre, time.perf_counter() - inicio,
+                    filas_entrada, _contar_filas(resultado)
+                )
+
+        return envoltura
+    return decorador
+
+# ============================================================================
+# RESUMEN Y EXPORTACIÓN
+# ============================================================================
+
+def resumen_etapas(ciclo: int = None) -> pd.DataFrame:
+    """
+    Resume las mediciones por etapa
+
+    Args:
+        ciclo: Si se indica, resume solo ese ciclo
+
+    Returns:
+        DataFrame con llamadas, tiempo total, medio, p95 y filas por etapa
+    """
+    registros = registro_global.registros(ciclo)
+    if not registros:
+        return pd.DataFrame(columns=[
+            'etapa', 'llamadas', 'total_ms', 'media_ms', 'p95_ms',
+            'filas_entrada', 'filas_salida'
+        ])
+
+    df = pd.DataFrame(registros)
+    df['ms'] = df['segundos'] * 1000
+    resumen = df.groupby('etapa').agg(
+        llamadas=('ms', 'size'),
+        total_ms=('ms', 'sum'),
+        media_ms=('ms', 'mean'),
+        p95_ms=('ms', lambda s: s.quantile(0.95)),
+        filas_entrada=('filas_entrada', 'last'),
+        filas_salida=('filas_salida', 'last')
+    ).reset_index()
+
+    return resumen.sort_values('total_ms', ascending=False).round(3)
+
+
+def latencia_por_ciclo(etapas_raiz: list, ultimos: int = 20) -> pd.DataFrame:
+    """
+    Latencia de cada interacción a partir de la etapa que engloba el ciclo
+
+    Un ciclo se clasifica por la primera etapa de etapas_raiz que contenga
+    (p. ej. 'rerun' para un rerun completo y 'fragmento_mapa' para un rerun
+    parcial), lo que permite comparar ambos tipos de interacción.
+
+    Args:
+        etapas_raiz: Etapas que miden un ciclo completo, en orden de preferencia
+        ultimos: Número de ciclos más recientes a devolver
+
+    Returns:
+        DataFrame con ciclo, etapa y ms
+    """
+    df = pd.DataFrame(registro_global.registros())
+    if df.empty:
+        return pd.DataFrame(columns=['ciclo', 'etapa', 'ms'])
+
+    df = df[df['etapa'].isin(etapas_raiz)].copy()
+    df['orden'] = df['etapa'].map({e: i for i, e in enumerate(etapas_raiz)})
+    df['ms'] = df['segundos'] * 1000
+    df = df.sort_values(['ciclo', 'orden']).drop_duplicates('ciclo')
+
+    return df[['ciclo', 'etapa', 'ms']].tail(ultimos).round(3).reset_index(drop=True)
+
+
+def exportar_json_lines(ruta: str = None) -> str:
+    """
+    Exporta las mediciones como JSON lines (una medición por línea)
+
+    Args:
+        ruta: Si se indica, añade las líneas al archivo
+
+    Returns:
+        Texto en formato JSON lines
+    """
+    lineas = [json.dumps(r, ensure_ascii=False) for r in registro_global.registros()]
+    lineas += [
+        json.dumps({'ts': time.time(), 'cache': cache, **c}, ensure_ascii=False)
+        for cache, c in registro_global.estadisticas_cache().items()
+    ]
+    texto = '\n'.join(lineas) + ('\n' if lineas else '')
+
+    if ruta:
+        with open(ruta, 'a', encoding='utf-8') as f:
+            f.write(texto)
+
+    return texto
+
+
+def _escapar_etiqueta(valor) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exportar_prometheus() -> str:
+    """
+    Exporta las métricas en el formato de texto de Prometheus
+
+    Returns:
+        Texto con métricas sipid_etapa_segundos y sipid_cache_total
+    """
+    lineas = [
+        '# HELP sipid_etapa_segundos Tiempo de pared por etapa del pipeline',
+        '# TYPE sipid_etapa_segundos summary'
+    ]
+
+    acumulado = {}
+    for r in registro_global.registros():
+        suma, cuenta = acumulado.get(r['etapa'], (0.0, 0))
+        acumulado[r['etapa']] = (suma + r['segundos'], cuenta + 1)
+
+    for etapa, (suma, cuenta) in sorted(acumulado.items()):
+        etapa = _escapar_etiqueta(etapa)
+        lineas.append(f'sipid_etapa_segundos_sum{{etapa="{etapa}"}} {suma:.6f}')
+        lineas.append(f'sipid_etapa_segundos_count{{etapa="{etapa}"}} {cuenta}')
+
+    lineas += [
+        '# HELP sipid_cache_total Aciertos y fallos por caché',
+        '# TYPE sipid_cache_total counter'
+    ]
+    for cache, c in sorted(registro_global.estadisticas_cache().items()):
+        cache = _escapar_etiqueta(cache)
+        lineas.append(f'sipid_cache_total{{cache="{cache}",resultado="acierto"}} {c["aciertos"]}')
+        lineas.append(f'sipid_cache_total{{cache="{cache}",resultado="fallo"}} {c["fallos"]}')
+
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,247 @@
+"""
+Precalentamiento de cachés para el Dashboard Jamundí Conectada
+Evita que el primer visitante pague la carga en frío (descarga de
+datos.gov.co, consolidación, ranking y GeoJSON) y la construcción de índices,
+agregados y figuras.
+
+Dos puntos de entrada:
+- Antes de arrancar el servidor (hook de despliegue o tarea periódica):
+  publica el snapshot compartido en disco para que ningún worker lo cargue.
+      python precalentamiento.py                 # carga si no hay snapshot vigente
+      python precalentamiento.py --cada 43200    # refresca cada 12 h (sidecar)
+      python precalentamiento.py --comprobar     # sonda de disponibilidad (código 0/1)
+      python precalentamiento.py --municipio 76364 --municipio 76001
+- Dentro de cada proceso de Streamlit: un hilo en segundo plano recorre los
+  pasos que registra app_v3 (índices, agregados, figuras de la vista inicial)
+  y marca un evento de disponibilidad al terminar.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from almacen_compartido import DIRECTORIO_ALMACEN, asegurar_snapshot, abrir_snapshot, leer_version
+from data_processing import consolidar_datos_jamundi, crear_datos_zonas_simulados
+from historial_zonas import HistorialZonas, ruta_historial
+from municipios import MUNICIPIOS_ACTIVOS, obtener_municipio, particion_municipio
+from perfilado import medir_etapa, registrar_cache
+from ranking import calcular_puntaje_prioridad
+from utils import cargar_geojson_corregimientos
+
+# Antigüedad máxima del snapshot compartido antes de volver a consultar las APIs
+MAX_ANTIGUEDAD_DATOS_S = 24 * 3600
+
+# Los GeoJSON del catálogo de municipios se buscan junto a este módulo
+DIRECTORIO_GEOJSON = os.environ.get(
+    'SIPID_DIR_GEOJSON', os.path.dirname(os.path.abspath(__file__))
+)
+
+# ============================================================================
+# CARGA DE FUENTES
+# ============================================================================
+
+def cargar_fuentes(cod_municipio: int = None):
+    """
+    Carga y procesa las fuentes originales de un municipio (lo ejecuta un solo proceso)
+
+    Args:
+        cod_municipio: Código DANE (por defecto el municipio configurado)
+
+    Raises:
+        RuntimeError: Si las fuentes no devuelven conectividad (API caída);
+                      así nunca se publica un snapshot vacío
+    """
+    municipio = obtener_municipio(cod_municipio)
+    registrar_cache('datos', acierto=False)
+    df_conectividad = consolidar_datos_jamundi(municipio['cod_municipio'])
+    if df_conectividad.empty:
+        raise RuntimeError(f"Las fuentes no devolvieron conectividad de {municipio['nombre']}")
+    # Los atributos de zonas salen del historial versionado del municipio (se siembra la primera vez)
+    historial = HistorialZonas(ruta_historial(municipio['cod_municipio']))
+    if historial.vacio():
+        historial.registrar(crear_datos_zonas_simulados(municipio['cod_municipio']))
+    df_zonas = historial.as_of()
+    df_zonas_ranked = calcular_puntaje_prioridad(df_zonas)
+
+    # Cargar GeoJSON
+    geojson_data = None
+    if municipio['geojson']:
+        geojson_data = cargar_geojson_corregimientos(os.path.join(DIRECTORIO_GEOJSON, municipio['geojson']))
+
+    return {'conectividad': df_conectividad, 'zonas_ranked': df_zonas_ranked}, {'geojson': geojson_data}
+
+
+def asegurar_municipio(cod_municipio: int = None, directorio: str = DIRECTORIO_ALMACEN,
+                       max_antiguedad_s: float = MAX_ANTIGUEDAD_DATOS_S) -> str:
+    """
+    Versión vigente de la partición de un municipio, cargándola si hace falta
+
+    Args:
+        cod_municipio: Código DANE (por defecto el municipio configurado)
+        directorio: Carpeta del almacén
+        max_antiguedad_s: Antigüedad máxima del snapshot antes de recargar
+
+    Returns:
+        Versión vigente
+    """
+    cod_municipio = obtener_municipio(cod_municipio)['cod_municipio']
+    return asegurar_snapshot(
+        lambda: cargar_fuentes(cod_municipio), directorio,
+        max_antiguedad_s=max_antiguedad_s, particion=particion_municipio(cod_municipio)
+    )
+
+
+def precalentar_almacen(directorio: str = DIRECTORIO_ALMACEN, forzar: bool = False,
+                        cod_municipio: int = None) -> str:
+    """
+    Publica el snapshot compartido de un municipio (si hace falta) y carga sus páginas en memoria
+
+    Args:
+        directorio: Carpeta del almacén
+        forzar: Vuelve a consultar las fuentes aunque el snapshot esté vigente
+        cod_municipio: Código DANE (por defecto el municipio configurado)
+
+    Returns:
+        Versión vigente
+    """
+    version = asegurar_municipio(cod_municipio, directorio, 0 if forzar else MAX_ANTIGUEDAD_DATOS_S)
+    # Leer las tablas una vez deja sus páginas en la caché del sistema operativo
+    snapshot = abrir_snapshot(version, directorio)
+    for nombre in ('conectividad', 'zonas_ranked'):
+        snapshot.como_pandas(nombre)
+    snapshot.extra('geojson')
+    return version
+
+# ============================================================================
+# PRECALENTAMIENTO EN PROCESO
+# ============================================================================
+
+class Precalentador:
+    """Ejecuta pasos de precalentamiento en segundo plano, una vez por versión de datos"""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._version = None
+        self._pasos = []
+
+    def iniciar(self, version: str, pasos: list) -> bool:
+        """
+        Lanza el hilo de precalentamiento si esta versión aún no se precalentó
+
+        Args:
+            version: Versión del snapshot a la que pertenecen los pasos
+            pasos: Lista de (nombre, función sin argumentos)
+
+        Returns:
+            True si se lanzó un hilo nuevo
+        """
+        with self._lock:
+            if self._version == version:
+                return False
+            self._version = version
+            self._pasos = [{'paso': nombre, 'estado': 'pendiente', 'ms': None} for nombre, _ in pasos]
+            self.listo.clear()
+            self._hilo = threading.Thread(
+                target=self._ejecutar, args=(version, pasos),
+                name='precalentamiento', daemon=True
+            )
+            self._hilo.start()
+            return True
+
+    def _ejecutar(self, version: str, pasos: list):
+        for i, (nombre, funcion) in enumerate(pasos):
+            with self._lock:
+                if self._version != version:
+                    return  # llegó una versión nueva: su hilo continúa
+                self._pasos[i]['estado'] = 'en curso'
+            inicio = time.perf_counter()
+            try:
+                with medir_etapa(f'precalentamiento_{nombre}'):
+                    funcion()
+                estado = 'listo'
+            except Exception as e:
+                # Un paso fallido no detiene los demás; el usuario lo calculará en frío
+                estado = f'error: {e}'
+            with self._lock:
+                self._pasos[i].update(estado=estado, ms=(time.perf_counter() - inicio) * 1000)
+        with self._lock:
+            if self._version == version:
+                self.listo.set()
+
+    def esperar(self, timeout: float = None) -> bool:
+        """Bloquea hasta que termine el precalentamiento (True si terminó)"""
+        return self.listo.wait(timeout)
+
+    def estado(self) -> dict:
+        """Versión, disponibilidad y detalle de cada paso"""
+        with self._lock:
+            return {
+                'version': self._version,
+                'listo': self.listo.is_set(),
+                'pasos': [dict(p) for p in self._pasos]
+            }
+
+
+# Un precalentador por municipio y proceso, compartido por todas las sesiones
+_precalentadores = {}
+_lock_precalentadores = threading.Lock()
+
+
+def obtener_precalentador(cod_municipio: int = None) -> Precalentador:
+    """Precalentador del municipio (los hilos de municipios distintos no se interrumpen)"""
+    cod_municipio = obtener_municipio(cod_municipio)['cod_municipio']
+    with _lock_precalentadores:
+        return _precalentadores.setdefault(cod_municipio, Precalentador())
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Precalentamiento del almacén de Jamundí Conectada')
+    parser.add_argument('--directorio', default=DIRECTORIO_ALMACEN)
+    parser.add_argument('--forzar', action='store_true',
+                        help='Vuelve a consultar las fuentes aunque el snapshot esté vigente')
+    parser.add_argument('--cada', type=float, default=None, metavar='SEGUNDOS',
+                        help='Refresca el snapshot periódicamente (usar un valor menor que '
+                             f'{MAX_ANTIGUEDAD_DATOS_S} s para que nunca caduque)')
+    parser.add_argument('--comprobar', action='store_true',
+                        help='Solo comprueba si hay un snapshot publicado (código 0 = listo)')
+    parser.add_argument('--municipio', type=int, action='append', default=None, metavar='COD',
+                        help=f'Código DANE a precalentar (repetible; por defecto {MUNICIPIOS_ACTIVOS})')
+    args = parser.parse_args(argv)
+    municipios = args.municipio or MUNICIPIOS_ACTIVOS
+
+    if args.comprobar:
+        versiones = {cod: leer_version(args.directorio, particion_municipio(cod)) for cod in municipios}
+        for cod, version in versiones.items():
+            print(f"{'✅ Listo' if version else '⏳ Sin snapshot'} ({cod}): {version}")
+        return 0 if all(versiones.values()) else 1
+
+    forzar = args.forzar
+    while True:
+        fallidos = 0
+        for cod in municipios:
+            inicio = time.perf_counter()
+            try:
+                version = precalentar_almacen(args.directorio, forzar=forzar, cod_municipio=cod)
+            except RuntimeError as e:
+                # Fuentes caídas: el snapshot publicado (si lo hay) sigue siendo el vigente
+                fallidos += 1
+                vigente = leer_version(args.directorio, particion_municipio(cod))
+                print(f"❌ {e}; se conserva el snapshot {vigente or '(ninguno)'}")
+                continue
+            print(f"✅ Snapshot {version} de {obtener_municipio(cod)['nombre']} listo en "
+                  f"{time.perf_counter() - inicio:.1f} s ({args.directorio})")
+        if args.cada is None:
+            return 1 if fallidos else 0
+        time.sleep(args.cada)
+        forzar = True
+
+
+if __name__ == "__main__":
+    sys.exit(main())
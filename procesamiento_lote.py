@@ -0,0 +1,250 @@
+"""
+Procesamiento por lotes del SIPID sin Streamlit
+Ejecuta carga, ranking, alertas y exportación (CSV/Parquet/XLSX/PDF) desde la
+línea de comandos, pensado para tareas programadas (cron)
+
+Uso:
+    python procesamiento_lote.py --salida resultados/
+    python procesamiento_lote.py --zonas zonas.parquet --conectividad conectividad.parquet \\
+        --pesos 0.5 0.2 0.3 --formatos csv parquet pdf --salida resultados/
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from data_processing import consolidar_datos_jamundi, crear_datos_zonas_simulados
+from ranking import calcular_puntaje_prioridad, generar_reporte_ranking
+from utils import generar_alertas, obtener_estadisticas_alertas, exportar_zona_a_pdf
+from reportes_pdf import generar_paquete_reportes
+from imagenes_graficos import imagenes_zonas
+from estadisticas_zonas import calcular_estadisticas_zonas
+from perfilado import medir_etapa, obtener_registro, resumen_etapas
+from exportacion import FORMATOS_EXPORTACION, escribir_tabla
+
+FORMATOS_DISPONIBLES = ['csv', 'parquet', 'xlsx', 'pdf']
+
+# ============================================================================
+# CARGA
+# ============================================================================
+
+def leer_tabla(ruta: str) -> pd.DataFrame:
+    """
+    Lee una tabla CSV o Parquet según su extensión
+
+    Args:
+        ruta: Ruta del archivo
+
+    Returns:
+        DataFrame leído
+    """
+    if ruta.endswith('.parquet'):
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+
+def cargar_entradas(ruta_zonas: str = None, ruta_conectividad: str = None,
+                    sin_conectividad: bool = False):
+    """
+    Carga las zonas y la conectividad desde archivos o desde las fuentes del dashboard
+
+    Args:
+        ruta_zonas: Snapshot de zonas (CSV/Parquet); si es None se usan las zonas del dashboard
+        ruta_conectividad: Snapshot de conectividad; si es None se consulta la API
+        sin_conectividad: Si es True no se carga la conectividad
+
+    Returns:
+        Tupla (df_zonas, df_conectividad)
+    """
+    df_zonas = leer_tabla(ruta_zonas) if ruta_zonas else crear_datos_zonas_simulados()
+
+    if sin_conectividad:
+        df_conectividad = pd.DataFrame()
+    elif ruta_conectividad:
+        df_conectividad = leer_tabla(ruta_conectividad)
+    else:
+        df_conectividad = consolidar_datos_jamundi()
+
+    return df_zonas, df_conectividad
+
+# ============================================================================
+# EXPORTACIÓN
+# ============================================================================
+
+def exportar_tabla(df: pd.DataFrame, directorio: str, nombre: str, formatos: list) -> list:
+    """
+    Escribe una tabla en los formatos tabulares solicitados (por bloques)
+
+    Returns:
+        Lista de rutas escritas
+    """
+    rutas = []
+    for formato, (_, extension) in FORMATOS_EXPORTACION.items():
+        if formato in formatos:
+            ruta = os.path.join(directorio, f'{nombre}{extension}')
+            escribir_tabla(df, ruta, formato)
+            rutas.append(ruta)
+    return rutas
+
+
+def exportar_pdfs(df_zonas_ranked: pd.DataFrame, directorio: str, top_n: int = None,
+                  pesos: dict = None) -> int:
+    """
+    Genera un PDF por zona, en orden de ranking, y un paquete con todos ellos
+    (con gráficos si kaleido está instalado)
+
+    Args:
+        df_zonas_ranked: Zonas con puntajes calculados
+        directorio: Carpeta donde se escriben los PDF
+        top_n: Si se indica, solo las top N zonas
+        pesos: Pesos con los que se calculó el ranking (se muestran en cada reporte)
+
+    Returns:
+        Número de PDF generados correctamente
+    """
+    os.makedirs(directorio, exist_ok=True)
+    df = df_zonas_ranked.sort_values('ranking')
+    if top_n:
+        df = df.head(top_n)
+
+    if len(df) == 0:
+        return 0
+    # Los gráficos se renderizan una vez y los comparten los PDF sueltos y el paquete
+    imagenes = imagenes_zonas(df, calcular_estadisticas_zonas(df_zonas_ranked))
+
+    generados = 0
+    for _, zona_data in df.iterrows():
+        ruta = os.path.join(directorio, f"reporte_{str(zona_data['zona']).replace(' ', '_')}.pdf")
+        if exportar_zona_a_pdf(zona_data, ruta, imagenes.get(zona_data['zona']), pesos=pesos):
+            generados += 1
+    # Un solo documento para imprimir o enviar: reutiliza la plantilla y las fuentes
+    generar_paquete_reportes(df, os.path.join(directorio, 'reportes_zonas.pdf'), imagenes, pesos=pesos)
+    return generados
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def ejecutar_lote(directorio_salida: str, ruta_zonas: str = None, ruta_conectividad: str = None,
+                  pesos: dict = None, formatos: list = None, pdf_top: int = None,
+                  sin_conectividad: bool = False) -> dict:
+    """
+    Ejecuta el pipeline completo: carga, ranking, alertas y exportación
+
+    Args:
+        directorio_salida: Carpeta de resultados
+        ruta_zonas: Snapshot de zonas (opcional)
+        ruta_conectividad: Snapshot de conectividad (opcional)
+        pesos: Pesos del ranking (opcional)
+        formatos: Subconjunto de FORMATOS_DISPONIBLES
+        pdf_top: Limita los PDF a las top N zonas
+        sin_conectividad: Omite la carga de conectividad
+
+    Returns:
+        Diccionario con el reporte del ranking, estadísticas de alertas y archivos escritos
+    """
+    formatos = formatos or ['csv']
+    os.makedirs(directorio_salida, exist_ok=True)
+    ciclo = obtener_registro().iniciar_ciclo()
+    archivos = []
+
+    with medir_etapa('carga') as etapa:
+        df_zonas, df_conectividad = cargar_entradas(ruta_zonas, ruta_conectividad, sin_conectividad)
+        etapa['filas_salida'] = len(df_zonas)
+
+    with medir_etapa('ranking', filas_entrada=len(df_zonas)):
+        df_zonas_ranked = calcular_puntaje_prioridad(df_zonas, pesos)
+        reporte = generar_reporte_ranking(df_zonas_ranked)
+
+    with medir_etapa('alertas', filas_entrada=len(df_zonas_ranked)) as etapa:
+        alertas = generar_alertas(df_zonas_ranked)
+        etapa['filas_salida'] = len(alertas)
+        df_alertas = pd.DataFrame(alertas, columns=['tipo', 'zona', 'mensaje', 'prioridad', 'icono', 'color'])
+
+    with medir_etapa('exportacion'):
+        archivos += exportar_tabla(df_zonas_ranked.sort_values('ranking'), directorio_salida, 'ranking', formatos)
+        archivos += exportar_tabla(df_alertas, directorio_salida, 'alertas', formatos)
+        if not df_conectividad.empty:
+            archivos += exportar_tabla(df_conectividad, directorio_salida, 'conectividad', formatos)
+
+        ruta_reporte = os.path.join(directorio_salida, 'reporte_ranking.json')
+        with open(ruta_reporte, 'w', encoding='utf-8') as f:
+            json.dump({
+                'reporte': reporte,
+                'alertas': obtener_estadisticas_alertas(alertas),
+                'pesos': pesos
+            }, f, indent=2, ensure_ascii=False, default=str)
+        archivos.append(ruta_reporte)
+
+    if 'pdf' in formatos:
+        with medir_etapa('pdf') as etapa:
+            etapa['filas_salida'] = exportar_pdfs(
+                df_zonas_ranked, os.path.join(directorio_salida, 'pdf'), pdf_top, pesos
+            )
+
+    tiempos = resumen_etapas(ciclo)
+    ruta_tiempos = os.path.join(directorio_salida, 'tiempos.json')
+    tiempos.to_json(ruta_tiempos, orient='records', force_ascii=False, indent=2)
+    archivos.append(ruta_tiempos)
+
+    return {
+        'reporte': reporte,
+        'alertas': obtener_estadisticas_alertas(alertas),
+        'archivos': archivos,
+        'tiempos': tiempos
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Procesamiento por lotes del SIPID (sin Streamlit)')
+    parser.add_argument('--zonas', help='Snapshot de zonas (CSV o Parquet)')
+    parser.add_argument('--conectividad', help='Snapshot de conectividad (CSV o Parquet)')
+    parser.add_argument('--sin-conectividad', action='store_true',
+                        help='No cargar datos de conectividad (evita la consulta a la API)')
+    parser.add_argument('--pesos', type=float, nargs=3, metavar=('EDUCACION', 'POBLACION', 'CONECTIVIDAD'),
+                        help='Pesos del ranking (deben sumar 1)')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS_DISPONIBLES, default=['csv'])
+    parser.add_argument('--pdf-top', type=int, help='Generar PDF solo para las top N zonas')
+    parser.add_argument('--salida', default='resultados_lote', help='Carpeta de resultados')
+    parser.add_argument('--silencioso', action='store_true', help='Ocultar mensajes de carga')
+    args = parser.parse_args(argv)
+
+    pesos = None
+    if args.pesos:
+        pesos = dict(zip(['educacion', 'poblacion', 'conectividad'], args.pesos))
+        if abs(sum(args.pesos) - 1.0) > 1e-6:
+            parser.error(f"los pesos deben sumar 1 (suman {sum(args.pesos):.3f})")
+
+    inicio = time.perf_counter()
+    salida_carga = io.StringIO() if args.silencioso else sys.stdout
+    try:
+        with contextlib.redirect_stdout(salida_carga):
+            resultado = ejecutar_lote(
+                args.salida, args.zonas, args.conectividad, pesos,
+                args.formatos, args.pdf_top, args.sin_conectividad
+            )
+    except Exception as e:
+        print(f"❌ Error en el procesamiento por lotes: {e}", file=sys.stderr)
+        return 1
+
+    etapas = resultado['tiempos']
+    etapas = etapas[etapas['etapa'].isin(['carga', 'ranking', 'alertas', 'exportacion', 'pdf'])]
+
+    print("\n⏱️ RESUMEN DE TIEMPOS:")
+    for _, fila in etapas.iterrows():
+        print(f"   {fila['etapa']:<12} {fila['total_ms']:>10.1f} ms")
+    print(f"   {'total':<12} {(time.perf_counter() - inicio) * 1000:>10.1f} ms")
+
+    print(f"\n✅ {resultado['reporte']['total_zonas']} zonas, {resultado['alertas']['total']} alertas, "
+          f"{len(resultado['archivos'])} archivos en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
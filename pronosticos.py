@@ -0,0 +1,368 @@
+"""
+Pronósticos de series trimestrales para el proyecto Jamundí Conectada
+Ajusta en lote un modelo pequeño (tendencia lineal + estacionalidad por
+trimestre) a cada serie proveedor × tecnología × segmento con mínimos
+cuadrados vectorizados en NumPy, y proyecta horizontes con intervalos de
+predicción. Los parámetros ajustados se guardan en caché por huella de datos.
+"""
+
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import huella_datos
+from perfilado import perfilar, registrar_cache
+
+CLAVES_SERIE = ['proveedor', 'tecnologia', 'segmento']
+VARIABLES = {
+    # variable -> (columna de origen, escala logarítmica)
+    'accesos': ('accesos', False),
+    'velocidad': ('velocidad_bajada', True),
+}
+
+META_VELOCIDAD_MBPS = 25
+HORIZONTE_MAXIMO_META = 40  # trimestres (10 años)
+
+# Observaciones mínimas para estimar cada parte del modelo
+MIN_OBS_TENDENCIA = 2
+MIN_OBS_ESTACIONALIDAD = 6
+
+MAX_MODELOS_CACHE = 32
+
+_cache_modelos = OrderedDict()
+_lock_cache = threading.Lock()
+
+# ============================================================================
+# SERIES
+# ============================================================================
+
+def _indice_trimestre(anno, trimestre) -> np.ndarray:
+    """Índice absoluto de trimestre (anno * 4 + trimestre - 1)"""
+    return np.asarray(anno, dtype=np.int64) * 4 + np.asarray(trimestre, dtype=np.int64) - 1
+
+
+def etiqueta_periodo(indice: int) -> str:
+    """Etiqueta 'AAAA-Tn' de un índice absoluto de trimestre"""
+    return f"{int(indice) // 4}-T{int(indice) % 4 + 1}"
+
+
+def construir_series(df_conectividad: pd.DataFrame, variable: str = 'accesos',
+                     claves: list = None):
+    """
+    Agrega los registros en una matriz serie × trimestre
+
+    Los accesos se suman; la velocidad es el promedio ponderado por accesos.
+    Los trimestres sin registros quedan como NaN.
+
+    Args:
+        df_conectividad: Registros con anno, trimestre, accesos y velocidad_bajada
+        variable: 'accesos' o 'velocidad'
+        claves: Columnas que identifican cada serie (por defecto CLAVES_SERIE)
+
+    Returns:
+        Tupla (df_claves, indices_trimestre, matriz) con matriz de forma (series, trimestres);
+        sin registros válidos, las tres vacías
+    """
+    claves = list(claves or CLAVES_SERIE)
+    columna, _ = VARIABLES[variable]
+
+    columnas = list(dict.fromkeys(claves + ['anno', 'trimestre', 'accesos', columna]))
+    df = df_conectividad[columnas].dropna(
+        subset=['anno', 'trimestre', columna]
+    )
+    if df.empty:
+        # p. ej. facetas cuyas filas no tienen velocidad (se lee con errors='coerce')
+        return pd.DataFrame(columns=claves), np.array([], dtype=np.int64), np.empty((0, 0))
+    t = _indice_trimestre(df['anno'], df['trimestre'])
+
+    codigos_serie, df_claves = _factorizar_claves(df, claves)
+    t0 = int(t.min())
+    columnas = t - t0
+    n_series, n_t = len(df_claves), int(columnas.max()) + 1
+
+    plano = codigos_serie * n_t + columnas
+    if variable == 'accesos':
+        suma = np.bincount(plano, weights=df['accesos'].to_numpy(dtype=float), minlength=n_series * n_t)
+        conteo = np.bincount(plano, minlength=n_series * n_t)
+        valores = np.where(conteo > 0, suma, np.nan)
+    else:
+        peso = df['accesos'].to_numpy(dtype=float).clip(min=0)
+        vel = df[columna].to_numpy(dtype=float)
+        suma_pond = np.bincount(plano, weights=vel * peso, minlength=n_series * n_t)
+        suma_peso = np.bincount(plano, weights=peso, minlength=n_series * n_t)
+        suma_simple = np.bincount(plano, weights=vel, minlength=n_series * n_t)
+        conteo = np.bincount(plano, minlength=n_series * n_t)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            valores = np.where(suma_peso > 0, suma_pond / suma_peso, suma_simple / conteo)
+        valores = np.where(conteo > 0, valores, np.nan)
+
+    return df_claves, np.arange(t0, t0 + n_t), valores.reshape(n_series, n_t)
+
+
+def _factorizar_claves(df: pd.DataFrame, claves: list):
+    """Código de serie por fila y tabla de claves distintas"""
+    if not claves:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=[0])
+    grupos = df.groupby(claves, sort=True, observed=True, dropna=False)
+    df_claves = grupos.size().reset_index()[claves]
+    return grupos.ngroup().to_numpy(dtype=np.int64), df_claves
+
+# ============================================================================
+# AJUSTE EN LOTE
+# ============================================================================
+
+def _diseno(indices_trimestre: np.ndarray, t_ref: int) -> np.ndarray:
+    """Matriz de diseño [1, t, T2, T3, T4] (t en años desde t_ref)"""
+    indices_trimestre = np.asarray(indices_trimestre)
+    trimestre = indices_trimestre % 4
+    return np.column_stack([
+        np.ones(len(indices_trimestre)),
+        (indices_trimestre - t_ref) / 4.0,
+        trimestre == 1,
+        trimestre == 2,
+        trimestre == 3
+    ]).astype(float)
+
+
+def ajustar_lote(matriz: np.ndarray, indices_trimestre: np.ndarray, logaritmica: bool = False) -> dict:
+    """
+    Ajusta tendencia + estacionalidad a todas las series a la vez
+
+    Resuelve las ecuaciones normales de cada serie (solo sobre sus trimestres
+    observados) con un único np.linalg.solve por lotes. Las series cortas
+    anulan por penalización las partes que no pueden estimar: con menos de
+    MIN_OBS_ESTACIONALIDAD puntos no hay estacionalidad y con uno solo el
+    pronóstico es constante.
+
+    Args:
+        matriz: Valores (series, trimestres) con NaN donde no hay dato
+        indices_trimestre: Índice absoluto de cada columna
+        logaritmica: Ajustar sobre log(valor) (crecimiento multiplicativo)
+
+    Returns:
+        Diccionario con coeficientes, covarianza sin escalar, varianza residual y observaciones
+    """
+    y = np.log(np.where(matriz > 0, matriz, np.nan)) if logaritmica else matriz.astype(float)
+    observado = ~np.isnan(y)
+    y0 = np.where(observado, y, 0.0)
+    n_obs = observado.sum(axis=1)
+
+    t_ref = int(indices_trimestre[-1])
+    X = _diseno(indices_trimestre, t_ref)                  # (T, p)
+    W = observado.astype(float)                            # (S, T)
+
+    XtWX = np.einsum('tp,st,tq->spq', X, W, X)             # (S, p, p)
+    XtWy = np.einsum('tp,st->sp', X, W * y0)               # (S, p)
+
+    penalizacion = np.full((len(y), X.shape[1]), 1e-9)
+    penalizacion[n_obs < MIN_OBS_ESTACIONALIDAD, 2:] = 1e9
+    penalizacion[n_obs < MIN_OBS_TENDENCIA, 1] = 1e9
+    penalizacion[:, 0] = 1e-9
+    A = XtWX + penalizacion[:, :, None] * np.eye(X.shape[1])[None]
+
+    coef = np.linalg.solve(A, XtWy[..., None])[..., 0]     # (S, p)
+    A_inv = np.linalg.inv(A)
+
+    residuos = np.where(observado, y0 - coef @ X.T, 0.0)
+    params_efectivos = (penalizacion < 1).sum(axis=1)
+    grados = np.maximum(n_obs - params_efectivos, 1)
+    sigma2 = (residuos ** 2).sum(axis=1) / grados
+    # Sin grados de libertad reales no hay estimación de dispersión
+    sigma2 = np.where(n_obs > params_efectivos, sigma2, np.nan)
+
+    return {
+        'coef': coef,
+        'cov': A_inv,
+        'sigma2': sigma2,
+        'n_obs': n_obs,
+        't_ref': t_ref,
+        'logaritmica': logaritmica,
+        'ultimo_observado': np.array([
+            indices_trimestre[np.flatnonzero(fila)[-1]] if fila.any() else -1 for fila in observado
+        ])
+    }
+
+# ============================================================================
+# MODELO
+# ============================================================================
+
+class ModeloPronostico:
+    """Parámetros ajustados de un lote de series y sus proyecciones"""
+
+    def __init__(self, df_claves: pd.DataFrame, indices_trimestre: np.ndarray,
+                 historia: np.ndarray, ajuste: dict, variable: str):
+        self.claves = df_claves
+        self.indices_trimestre = indices_trimestre
+        self.historia = historia
+        self.ajuste = ajuste
+        self.variable = variable
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    @property
+    def vacio(self) -> bool:
+        """True si no hubo registros con los que ajustar (sin series ni trimestres)"""
+        return len(self.indices_trimestre) == 0
+
+    def _predecir(self, indices_futuros: np.ndarray, nivel: float):
+        """Media e intervalo (series × horizonte) en la escala original"""
+        X = _diseno(indices_futuros, self.ajuste['t_ref'])                # (H, p)
+        media = self.ajuste['coef'] @ X.T                                 # (S, H)
+        var_param = np.einsum('hp,spq,hq->sh', X, self.ajuste['cov'], X)
+        sigma2 = self.ajuste['sigma2'][:, None]
+        desv = np.sqrt(sigma2 * (1 + var_param))
+        z = NormalDist().inv_cdf(0.5 + nivel / 2)
+
+        inferior, superior = media - z * desv, media + z * desv
+        if self.ajuste['logaritmica']:
+            return np.exp(media), np.exp(inferior), np.exp(superior)
+        return media, np.maximum(inferior, 0), superior
+
+    def pronosticar(self, horizonte: int = 8, nivel: float = 0.95) -> pd.DataFrame:
+        """
+        Proyección de los próximos trimestres para todas las series
+
+        Args:
+            horizonte: Número de trimestres a proyectar
+            nivel: Nivel de confianza del intervalo de predicción
+
+        Returns:
+            DataFrame largo con las claves, periodo, prediccion, inferior y superior
+        """
+        if self.vacio:
+            return pd.DataFrame(columns=list(self.claves.columns) + [
+                'periodo', 'indice_trimestre', 'prediccion', 'inferior', 'superior'])
+        ultimo = int(self.indices_trimestre[-1])
+        futuros = np.arange(ultimo + 1, ultimo + 1 + horizonte)
+        media, inferior, superior = self._predecir(futuros, nivel)
+
+        n_series = len(self.claves)
+        df = self.claves.loc[self.claves.index.repeat(horizonte)].reset_index(drop=True)
+        df['periodo'] = [etiqueta_periodo(t) for t in futuros] * n_series
+        df['indice_trimestre'] = np.tile(futuros, n_series)
+        df['prediccion'] = media.ravel()
+        df['inferior'] = inferior.ravel()
+        df['superior'] = superior.ravel()
+        return df
+
+    def historico(self) -> pd.DataFrame:
+        """Serie histórica agregada en formato largo (solo trimestres observados)"""
+        if self.vacio:
+            return pd.DataFrame(columns=list(self.claves.columns) + ['indice_trimestre', 'periodo', 'valor'])
+        n_series, n_t = self.historia.shape
+        df = self.claves.loc[self.claves.index.repeat(n_t)].reset_index(drop=True)
+        df['indice_trimestre'] = np.tile(self.indices_trimestre, n_series)
+        df['periodo'] = [etiqueta_periodo(t) for t in df['indice_trimestre']]
+        df['valor'] = self.historia.ravel()
+        return df.dropna(subset=['valor'])
+
+    def periodo_meta(self, meta: float = META_VELOCIDAD_MBPS,
+                     horizonte_maximo: int = HORIZONTE_MAXIMO_META) -> pd.DataFrame:
+        """
+        Primer trimestre en que cada serie alcanza la meta
+
+        Si el último valor observado ya la cumple, el periodo es ese trimestre.
+
+        Args:
+            meta: Umbral a alcanzar (por defecto 25 Mbps)
+            horizonte_maximo: Trimestres proyectados como máximo
+
+        Returns:
+            DataFrame con las claves, valor_actual, periodo_meta (None si no se
+            alcanza en el horizonte) y trimestres_restantes
+        """
+        if self.vacio:
+            return pd.DataFrame(columns=list(self.claves.columns) + [
+                'valor_actual', 'trimestres_restantes', 'periodo_meta'])
+        ultimo = int(self.indices_trimestre[-1])
+        futuros = np.arange(ultimo + 1, ultimo + 1 + horizonte_maximo)
+        media, _, _ = self._predecir(futuros, 0.95)
+
+        actual = np.array([
+            fila[~np.isnan(fila)][-1] if (~np.isnan(fila)).any() else np.nan for fila in self.historia
+        ])
+        alcanza = media >= meta
+        primero = np.where(alcanza.any(axis=1), alcanza.argmax(axis=1), -1)
+        restantes = np.where(actual >= meta, 0, np.where(primero >= 0, primero + 1, -1))
+
+        df = self.claves.copy()
+        df['valor_actual'] = actual
+        df['trimestres_restantes'] = np.where(restantes >= 0, restantes, np.nan)
+        df['periodo_meta'] = [
+            etiqueta_periodo(ultimo + r) if r > 0 else
+            (etiqueta_periodo(self.ajuste['ultimo_observado'][i]) if r == 0 else None)
+            for i, r in enumerate(restantes)
+        ]
+        return df
+
+
+@perfilar()
+def ajustar_pronosticos(df_conectividad: pd.DataFrame, variable: str = 'accesos',
+                        claves: list = None) -> ModeloPronostico:
+    """
+    Ajusta (o recupera de la caché) los modelos de todas las series
+
+    La caché se indexa por la huella del contenido de las columnas usadas, de
+    modo que el ajuste solo se repite cuando cambian los datos.
+
+    Args:
+        df_conectividad: Registros de conectividad
+        variable: 'accesos' o 'velocidad'
+        claves: Columnas que definen cada serie (por defecto proveedor, tecnología y segmento)
+
+    Returns:
+        ModeloPronostico listo para proyectar
+    """
+    claves = list(claves or CLAVES_SERIE)
+    columna, logaritmica = VARIABLES[variable]
+    columnas = list(dict.fromkeys(claves + ['anno', 'trimestre', 'accesos', columna]))
+    clave_cache = (huella_datos(df_conectividad[columnas]), variable, tuple(claves))
+
+    with _lock_cache:
+        modelo = _cache_modelos.get(clave_cache)
+        if modelo is not None:
+            _cache_modelos.move_to_end(clave_cache)
+    registrar_cache('pronosticos', acierto=modelo is not None)
+    if modelo is not None:
+        return modelo
+
+    df_claves, indices, matriz = construir_series(df_conectividad, variable, claves)
+    ajuste = ajustar_lote(matriz, indices, logaritmica) if len(indices) else None
+    modelo = ModeloPronostico(df_claves, indices, matriz, ajuste, variable)
+
+    with _lock_cache:
+        _cache_modelos[clave_cache] = modelo
+        if len(_cache_modelos) > MAX_MODELOS_CACHE:
+            _cache_modelos.popitem(last=False)
+    return modelo
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas, generar_conectividad
+
+    print("="*80)
+    print("PRUEBA DEL MÓDULO DE PRONÓSTICOS")
+    print("="*80)
+
+    df = generar_conectividad(500_000, generar_zonas(100, 42), 42)
+
+    for variable in VARIABLES:
+        inicio = time.perf_counter()
+        modelo = ajustar_pronosticos(df, variable)
+        t_ajuste = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        ajustar_pronosticos(df, variable)
+        t_cache = time.perf_counter() - inicio
+        pronostico = modelo.pronosticar(horizonte=8)
+        print(f"\n📈 {variable}: {len(modelo)} series ajustadas en {t_ajuste * 1000:.0f} ms "
+              f"(caché {t_cache * 1000:.0f} ms), {len(pronostico):,} filas proyectadas")
+
+    modelo_tec = ajustar_pronosticos(df, 'velocidad', ['tecnologia'])
+    print(f"\n🎯 Periodo estimado para alcanzar {META_VELOCIDAD_MBPS} Mbps por tecnología:")
+    print(modelo_tec.periodo_meta().round(1).to_string(index=False))
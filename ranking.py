@@ -9,11 +9,19 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
 
+from perfilado import perfilar
+
 # Pesos del sistema de ranking (priorizando educación)
 PESO_EDUCACION = 0.5
 PESO_POBLACION = 0.2
 PESO_CONECTIVIDAD = 0.3
 
+PESOS_POR_DEFECTO = {
+    'educacion': PESO_EDUCACION,
+    'poblacion': PESO_POBLACION,
+    'conectividad': PESO_CONECTIVIDAD
+}
+
 
 def normalizar_valores(serie: pd.Series) -> pd.Series:
     """
@@ -50,7 +58,8 @@ def calcular_bono_educativo(tiene_sede: bool, sede_con_conexion: bool) -> float:
     return 0.0
 
 
-def calcular_puntaje_prioridad(df_zonas: pd.DataFrame) -> pd.DataFrame:
+@perfilar()
+def calcular_puntaje_prioridad(df_zonas: pd.DataFrame, pesos: Dict[str, float] = None) -> pd.DataFrame:
     """
     Calcula el Puntaje de Prioridad (PP) para cada zona según la fórmula:
     PP = (Peso_Educación * Bono_Educativo) + 
@@ -63,20 +72,23 @@ def calcular_puntaje_prioridad(df_zonas: pd.DataFrame) -> pd.DataFrame:
                  - tiene_sede_educativa: Si tiene sede educativa
                  - sede_con_conexion: Si la sede tiene conexión
                  - velocidad_promedio_mbps: Velocidad promedio de conexión
+        pesos: Pesos 'educacion', 'poblacion' y 'conectividad' (deben sumar 1).
+               Los que no se indiquen toman el valor por defecto
     
     Returns:
         DataFrame con columnas adicionales de scoring
     """
+    pesos = {**PESOS_POR_DEFECTO, **(pesos or {})}
+    if abs(sum(pesos.values()) - 1.0) > 1e-6:
+        raise ValueError(f"Los pesos deben sumar 1 (suman {sum(pesos.values()):.3f})")
+    
     df = df_zonas.copy()
     
     # 1. Calcular Bono Educativo
-    df['bono_educativo'] = df.apply(
-        lambda row: calcular_bono_educativo(
-            row['tiene_sede_educativa'], 
-            row['sede_con_conexion']
-        ), 
-        axis=1
-    )
+    # (versión vectorizada de calcular_bono_educativo)
+    df['bono_educativo'] = (
+        df['tiene_sede_educativa'].astype(bool) & ~df['sede_con_conexion'].astype(bool)
+    ).astype(float)
     
     # 2. Normalizar Población (mayor población = mayor puntaje)
     df['poblacion_normalizada'] = normalizar_valores(df['poblacion'])
@@ -87,9 +99,9 @@ def calcular_puntaje_prioridad(df_zonas: pd.DataFrame) -> pd.DataFrame:
     df['conectividad_inversa_normalizada'] = normalizar_valores(velocidad_invertida)
     
     # 4. Calcular componentes ponderados
-    df['componente_educacion'] = PESO_EDUCACION * df['bono_educativo']
-    df['componente_poblacion'] = PESO_POBLACION * df['poblacion_normalizada']
-    df['componente_conectividad'] = PESO_CONECTIVIDAD * df['conectividad_inversa_normalizada']
+    df['componente_educacion'] = pesos['educacion'] * df['bono_educativo']
+    df['componente_poblacion'] = pesos['poblacion'] * df['poblacion_normalizada']
+    df['componente_conectividad'] = pesos['conectividad'] * df['conectividad_inversa_normalizada']
     
     # 5. Calcular Puntaje de Prioridad Total
     df['puntaje_prioridad'] = (
@@ -126,6 +138,7 @@ def obtener_top_zonas(df_zonas_ranked: pd.DataFrame, n: int = 10) -> pd.DataFram
     return df_zonas_ranked.nsmallest(n, 'ranking')
 
 
+@perfilar()
 def generar_reporte_ranking(df_zonas_ranked: pd.DataFrame) -> Dict:
     """
     Genera un reporte resumen del ranking de zonas
@@ -151,6 +164,7 @@ def generar_reporte_ranking(df_zonas_ranked: pd.DataFrame) -> Dict:
     return reporte
 
 
+@perfilar()
 def crear_tabla_ranking_display(df_zonas_ranked: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     Crea una tabla formateada para visualización del ranking
@@ -0,0 +1,353 @@
+"""
+Motor de reportes PDF por plantilla para el proyecto Jamundí Conectada
+La parte fija del reporte de zona (encabezado, títulos de sección, etiquetas
+y el párrafo de descargo) se dibuja una sola vez por municipio con fpdf2 y se
+guarda como flujo de contenido PDF ya compilado. Cada reporte copia ese flujo
+en una página nueva y escribe solo los valores de la zona en posiciones
+precalculadas, sin volver a partir líneas ni medir las etiquetas.
+
+Los paquetes municipales ponen todas las zonas en un mismo documento: las
+fuentes se declaran una vez y una imagen compartida (p. ej. un gráfico del
+municipio) se incrusta una sola vez aunque aparezca en todas las páginas.
+
+El flujo fijo se reutiliza con las API internas `_out` y `_resource_catalog`
+de fpdf2 (probado con la serie 2.8).
+"""
+
+import io
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from municipios import obtener_municipio
+from perfilado import perfilar
+from ranking import PESOS_POR_DEFECTO
+
+COLORES_NIVEL = {
+    'Alta': (214, 39, 40),
+    'Media': (255, 127, 14),
+    'Baja': (44, 160, 44),
+}
+
+# Fuente base (las fuentes estándar de PDF no se incrustan)
+FUENTE = 'helvetica'
+
+# Alto reservado para gráficos entre la información adicional y el descargo
+ALTO_IMAGENES_MM = 70
+COLUMNAS_IMAGENES = 2
+
+# ============================================================================
+# PLANTILLA
+# ============================================================================
+
+def _porcentaje(peso: float) -> str:
+    """Peso del ranking como porcentaje (0.5 -> '50%', 0.333 -> '33.3%')"""
+    return f"{round(peso * 100, 1):g}%"
+
+
+class PlantillaReporte:
+    """Parte fija del reporte de zona, compilada una vez, y posiciones de sus campos"""
+
+    def __init__(self, cod_municipio: int = None, pesos: dict = None):
+        """
+        Args:
+            cod_municipio: Municipio del título y del descargo (por defecto el configurado)
+            pesos: Pesos del ranking que se muestran junto a cada componente
+                   (por defecto PESOS_POR_DEFECTO)
+        """
+        from fpdf import FPDF
+        from fpdf.enums import XPos, YPos
+
+        municipio = obtener_municipio(cod_municipio)
+        self.cod_municipio = municipio['cod_municipio']
+        self.pesos = {**PESOS_POR_DEFECTO, **(pesos or {})}
+        self.campos = {}
+
+        pdf = FPDF()
+        pdf.set_auto_page_break(False)
+        pdf.add_page()
+        # add_page ya escribe el estado inicial (grosor de línea, etc.) en cada página
+        inicio_contenido = len(pdf.pages[1].contents)
+        siguiente = dict(new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+        def reservar(nombre, ancho, alto, estilo, tamano, alineacion='L', salto=True):
+            """Deja el hueco de una celda y guarda dónde escribir su valor"""
+            pdf.set_font(FUENTE, estilo, tamano)
+            x, y = pdf.get_x(), pdf.get_y()
+            ancho_real = ancho or (pdf.w - pdf.r_margin - x)
+            self.campos[nombre] = (x, y, ancho_real, alto, estilo, tamano, alineacion)
+            pdf.cell(ancho, alto, '', **(siguiente if salto else {}))
+
+        def etiqueta(texto, ancho, alto, estilo, tamano, alineacion='L', salto=True):
+            pdf.set_font(FUENTE, estilo, tamano)
+            pdf.cell(ancho, alto, texto, align=alineacion, **(siguiente if salto else {}))
+
+        def seccion(titulo, filas):
+            etiqueta(titulo, 0, 8, 'B', 12)
+            for nombre, texto in filas:
+                etiqueta(f"  - {texto}:", 80, 6, '', 10, salto=False)
+                reservar(nombre, 0, 6, 'B', 10)
+            pdf.ln(5)
+
+        # Encabezado
+        etiqueta(f"{municipio['nombre']} Conectada - Reporte de Zona", 0, 10, 'B', 16, 'C')
+        reservar('generado', 0, 5, 'I', 10, 'C')
+        pdf.ln(5)
+
+        # Zona, nivel y ranking
+        reservar('titulo', 0, 10, 'B', 14)
+        pdf.ln(2)
+        reservar('nivel', 40, 8, 'B', 11)
+        pdf.ln(5)
+        reservar('ranking', 0, 6, '', 11)
+        pdf.ln(3)
+
+        seccion('Métricas Principales', [
+            ('poblacion', 'Población'),
+            ('velocidad', 'Velocidad Promedio'),
+            ('puntaje', 'Puntaje de Prioridad'),
+            ('penetracion', 'Penetración Internet'),
+            ('densidad', 'Densidad Poblacional'),
+        ])
+        seccion('Componentes del Puntaje de Prioridad', [
+            ('componente_educacion', f"Educación ({_porcentaje(self.pesos['educacion'])})"),
+            ('componente_poblacion', f"Población ({_porcentaje(self.pesos['poblacion'])})"),
+            ('componente_conectividad', f"Conectividad ({_porcentaje(self.pesos['conectividad'])})"),
+        ])
+        seccion('Información Adicional', [
+            ('tipo', 'Tipo de Zona'),
+            ('sede', 'Tiene Sede Educativa'),
+            ('sede_conectada', 'Sede Conectada'),
+        ])
+
+        # Hueco para gráficos y descargo al pie
+        self.area_imagenes = (pdf.l_margin, pdf.get_y(), pdf.epw, ALTO_IMAGENES_MM)
+        pdf.set_y(pdf.get_y() + ALTO_IMAGENES_MM + 5)
+        pdf.set_font(FUENTE, 'I', 9)
+        pdf.multi_cell(0, 5,
+            'Este reporte fue generado automáticamente por el Sistema Inteligente de Priorización '
+            f"de Infraestructura Digital (SIPID) del proyecto {municipio['nombre']} Conectada. "
+            f"Los datos presentados se basan en información oficial de MinTIC Colombia y la "
+            f"Alcaldía de {municipio['nombre']}."
+        )
+
+        # Pie de página
+        pdf.set_y(-15)
+        reservar('pagina', 0, 10, 'I', 8, 'C')
+
+        self.contenido = bytes(pdf.pages[1].contents[inicio_contenido:])
+        # Orden de declaración de las fuentes: fija sus identificadores /F<i> en el flujo
+        self.fuentes = list(pdf.fonts)
+        self.estilos = {clave: (FUENTE, clave[len(FUENTE):]) for clave in self.fuentes}
+
+    def __repr__(self) -> str:
+        return (f"PlantillaReporte(cod_municipio={self.cod_municipio}, pesos={self.pesos}, "
+                f"campos={len(self.campos)})")
+
+    def nuevo_documento(self):
+        """Documento vacío con las fuentes de la plantilla ya declaradas"""
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.set_auto_page_break(False)
+        pdf.add_page()
+        for clave in self.fuentes:
+            pdf.set_font(*self.estilos[clave])
+        # La primera página queda lista para el primer reporte
+        pdf._plantilla_pagina_libre = True
+        return pdf
+
+    def _escribir(self, pdf, nombre: str, texto: str):
+        x, y, ancho, alto, estilo, tamano, alineacion = self.campos[nombre]
+        pdf.set_font(FUENTE, estilo, tamano)
+        if alineacion == 'L':
+            x_texto = x + pdf.c_margin
+        else:
+            ancho_texto = pdf.get_string_width(texto)
+            x_texto = x + (ancho - ancho_texto) / 2 if alineacion == 'C' else x + ancho - pdf.c_margin - ancho_texto
+        # Misma línea base que usa fpdf2 al centrar el texto en una celda
+        pdf.text(x_texto, y + 0.5 * alto + 0.3 * pdf.font_size, texto)
+
+    def pagina(self, pdf, zona_data, generado: str, numero: int, imagenes: list = None):
+        """
+        Agrega al documento la página de una zona
+
+        Args:
+            pdf: Documento creado con nuevo_documento
+            zona_data: Serie o diccionario con la fila de la zona
+            generado: Texto de la fecha de generación
+            numero: Número de página del pie
+            imagenes: Imágenes (bytes, ruta o PIL) para el hueco de gráficos,
+                      repartidas en una cuadrícula
+        """
+        from fpdf.enums import PDFResourceType
+
+        if getattr(pdf, '_plantilla_pagina_libre', False):
+            pdf._plantilla_pagina_libre = False
+        else:
+            pdf.add_page()
+        for clave in self.fuentes:
+            pdf._resource_catalog.add(PDFResourceType.FONT, pdf.fonts[clave].i, pdf.page)
+        pdf._out(self.contenido)
+
+        # El texto de la plantilla deja activa la última fuente declarada en el flujo
+        pdf.current_font_is_set_on_page = False
+
+        self._escribir(pdf, 'generado', f'Generado: {generado}')
+        self._escribir(pdf, 'titulo', f"Corregimiento: {zona_data['zona']}")
+
+        nivel = zona_data['nivel_prioridad']
+        x, y, ancho, alto, *_ = self.campos['nivel']
+        pdf.set_fill_color(*COLORES_NIVEL.get(nivel, COLORES_NIVEL['Baja']))
+        pdf.rect(x, y, ancho, alto, style='F')
+        pdf.set_text_color(255, 255, 255)
+        self._escribir(pdf, 'nivel', f'  {nivel}  ')
+        pdf.set_text_color(0, 0, 0)
+
+        valores = {
+            'ranking': f"Ranking: #{int(zona_data['ranking'])}",
+            'poblacion': f"{int(zona_data['poblacion']):,} habitantes",
+            'velocidad': f"{zona_data['velocidad_promedio_mbps']:.2f} Mbps",
+            'puntaje': f"{zona_data['puntaje_prioridad']:.3f}",
+            'penetracion': f"{zona_data['penetracion_internet']*100:.1f}%",
+            'densidad': f"{zona_data['densidad_poblacion']:.2f} hab/km²",
+            'componente_educacion': f"{zona_data['componente_educacion']:.3f}",
+            'componente_poblacion': f"{zona_data['componente_poblacion']:.3f}",
+            'componente_conectividad': f"{zona_data['componente_conectividad']:.3f}",
+            'tipo': str(zona_data['tipo']),
+            'sede': 'Sí' if zona_data['tiene_sede_educativa'] else 'No',
+            'sede_conectada': 'Sí' if zona_data['sede_con_conexion'] else 'No',
+            'pagina': f'Página {numero}',
+        }
+        for nombre, texto in valores.items():
+            self._escribir(pdf, nombre, texto)
+
+        imagenes = [imagen for imagen in (imagenes or []) if imagen is not None]
+        if imagenes:
+            # Cuadrícula de hasta COLUMNAS_IMAGENES columnas dentro del hueco reservado
+            x, y, ancho, alto = self.area_imagenes
+            columnas = min(len(imagenes), COLUMNAS_IMAGENES)
+            filas = -(-len(imagenes) // columnas)
+            ancho_celda, alto_celda = ancho / columnas, alto / filas
+            for i, imagen in enumerate(imagenes):
+                if isinstance(imagen, bytes):
+                    imagen = io.BytesIO(imagen)
+                fila, columna = divmod(i, columnas)
+                # keep_aspect_ratio: la imagen cabe en su celda sin deformarse
+                pdf.image(imagen, x=x + columna * ancho_celda, y=y + fila * alto_celda,
+                          w=ancho_celda - 2, h=alto_celda - 2, keep_aspect_ratio=True)
+
+
+_plantillas = {}
+_lock_plantillas = threading.Lock()
+
+
+def obtener_plantilla(cod_municipio: int = None, pesos: dict = None) -> PlantillaReporte:
+    """Plantilla del municipio y los pesos (se compila con el primer reporte y se comparte)"""
+    cod_municipio = obtener_municipio(cod_municipio)['cod_municipio']
+    pesos = {**PESOS_POR_DEFECTO, **(pesos or {})}
+    clave = (cod_municipio, tuple(sorted(pesos.items())))
+    with _lock_plantillas:
+        if clave not in _plantillas:
+            _plantillas[clave] = PlantillaReporte(cod_municipio, pesos)
+        return _plantillas[clave]
+
+# ============================================================================
+# REPORTES
+# ============================================================================
+
+def _fecha_generacion() -> str:
+    return datetime.now().strftime("%d/%m/%Y %H:%M")
+
+
+@perfilar()
+def generar_reporte_zona(zona_data, ruta_salida: str, imagenes: list = None,
+                         cod_municipio: int = None, pesos: dict = None) -> str:
+    """
+    Escribe el reporte PDF de una zona
+
+    Args:
+        zona_data: Serie o diccionario con la fila de la zona (ranking incluido)
+        ruta_salida: Ruta del PDF
+        imagenes: Gráficos opcionales (bytes PNG/JPEG, rutas o imágenes PIL)
+        cod_municipio: Municipio de la plantilla (por defecto el configurado)
+        pesos: Pesos con los que se calculó el ranking (por defecto PESOS_POR_DEFECTO)
+
+    Returns:
+        Ruta del PDF escrito
+    """
+    plantilla = obtener_plantilla(cod_municipio, pesos)
+    pdf = plantilla.nuevo_documento()
+    plantilla.pagina(pdf, zona_data, _fecha_generacion(), 1, imagenes)
+    pdf.output(ruta_salida)
+    return ruta_salida
+
+
+@perfilar()
+def generar_paquete_reportes(df_zonas: pd.DataFrame, ruta_salida: str, imagenes_zona: dict = None,
+                             imagenes_comunes: list = None, cod_municipio: int = None,
+                             pesos: dict = None) -> str:
+    """
+    Escribe un solo PDF con el reporte de cada zona, en orden de ranking
+
+    Args:
+        df_zonas: Zonas con puntajes calculados
+        ruta_salida: Ruta del PDF
+        imagenes_zona: Diccionario zona -> lista de gráficos de esa zona
+        imagenes_comunes: Gráficos que se repiten en todas las páginas
+                          (se incrustan una sola vez en el documento)
+        cod_municipio: Municipio de la plantilla (por defecto el configurado)
+        pesos: Pesos con los que se calculó el ranking (por defecto PESOS_POR_DEFECTO)
+
+    Returns:
+        Ruta del PDF escrito
+    """
+    if len(df_zonas) == 0:
+        raise ValueError("No hay zonas para el paquete de reportes")
+
+    plantilla = obtener_plantilla(cod_municipio, pesos)
+    pdf = plantilla.nuevo_documento()
+    generado = _fecha_generacion()
+    imagenes_zona = imagenes_zona or {}
+    comunes = list(imagenes_comunes or [])
+
+    df = df_zonas.sort_values('ranking') if 'ranking' in df_zonas.columns else df_zonas
+    for numero, zona_data in enumerate(df.to_dict('records'), start=1):
+        plantilla.pagina(pdf, zona_data, generado, numero,
+                         list(imagenes_zona.get(zona_data['zona'], [])) + comunes)
+    pdf.output(ruta_salida)
+    return ruta_salida
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import tempfile
+    import time
+    from generador_sintetico import generar_zonas
+    from ranking import calcular_puntaje_prioridad
+
+    print("="*80)
+    print("PRUEBA DEL MOTOR DE REPORTES PDF")
+    print("="*80)
+
+    df_ranked = calcular_puntaje_prioridad(generar_zonas(500, 42))
+    directorio = tempfile.mkdtemp(prefix='sipid_reportes_')
+    zona_data = df_ranked.iloc[0]
+
+    inicio = time.perf_counter()
+    obtener_plantilla()
+    print(f"\n🧱 Plantilla compilada en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    inicio = time.perf_counter()
+    for _ in range(50):
+        generar_reporte_zona(zona_data, os.path.join(directorio, 'zona.pdf'))
+    print(f"📄 Reporte de zona: {(time.perf_counter() - inicio) / 50 * 1000:.2f} ms")
+
+    inicio = time.perf_counter()
+    ruta = generar_paquete_reportes(df_ranked, os.path.join(directorio, 'paquete.pdf'))
+    t_paquete = time.perf_counter() - inicio
+    print(f"📚 Paquete de {len(df_ranked)} zonas en {t_paquete * 1000:.0f} ms "
+          f"({t_paquete / len(df_ranked) * 1000:.2f} ms por zona, {os.path.getsize(ruta) / 1024:.0f} KB)")
+    print(f"\n✅ Archivos en {directorio}")
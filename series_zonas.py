@@ -0,0 +1,211 @@
+"""
+Almacén de series por zona para el proyecto Jamundí Conectada
+Precalcula una matriz zona × periodo de accesos y una matriz zona ×
+tecnología, de modo que el detalle de una zona es un slice O(1) en lugar de
+reagrupar toda la conectividad en cada clic.
+
+Si los registros traen la columna 'zona' se agregan tal cual. Si no (la API
+nacional publica por municipio), cada total municipal se reparte entre las
+zonas en proporción a población × penetración de internet: un reparto
+determinista y estable entre procesos, marcado como estimado.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import huella_datos
+from perfilado import perfilar
+from pronosticos import etiqueta_periodo
+
+
+class SeriesZonas:
+    """Series precalculadas por zona (solo lectura)"""
+
+    def __init__(self, zonas: list, indices_periodo: np.ndarray, accesos: np.ndarray,
+                 tecnologias: list, accesos_tecnologia: np.ndarray, atribuido: bool, huella: str):
+        """
+        Args:
+            zonas: Nombres de zona (filas de las matrices)
+            indices_periodo: Índice absoluto de trimestre de cada columna
+            accesos: Matriz (zonas, periodos) de accesos
+            tecnologias: Nombres de tecnología (columnas de accesos_tecnologia)
+            accesos_tecnologia: Matriz (zonas, tecnologías) de accesos en el último periodo
+            atribuido: True si las cifras provienen del reparto proporcional
+            huella: Huella de los datos de origen (identifica el contenido)
+        """
+        self.zonas = list(zonas)
+        self._fila = {zona: i for i, zona in enumerate(self.zonas)}
+        self.indices_periodo = indices_periodo
+        self.periodos = [etiqueta_periodo(t) for t in indices_periodo]
+        self.accesos = accesos
+        self.tecnologias = list(tecnologias)
+        self.accesos_tecnologia = accesos_tecnologia
+        self.atribuido = atribuido
+        self.huella = huella
+
+    def __contains__(self, zona) -> bool:
+        return zona in self._fila
+
+    def evolucion(self, zona: str, ultimos: int = 8) -> pd.DataFrame:
+        """
+        Accesos de la zona en los últimos periodos
+
+        Args:
+            zona: Nombre de la zona
+            ultimos: Número de trimestres finales a devolver
+
+        Returns:
+            DataFrame con periodo y accesos (vacío si la zona no existe)
+        """
+        fila = self._fila.get(zona)
+        if fila is None:
+            return pd.DataFrame({'periodo': [], 'accesos': []})
+        return pd.DataFrame({
+            'periodo': self.periodos[-ultimos:],
+            'accesos': self.accesos[fila, -ultimos:]
+        })
+
+    def tecnologias_zona(self, zona: str, top: int = 6) -> pd.DataFrame:
+        """
+        Accesos por tecnología de la zona, de mayor a menor
+
+        Args:
+            zona: Nombre de la zona
+            top: Número máximo de tecnologías
+
+        Returns:
+            DataFrame con tecnologia y accesos (vacío si la zona no existe)
+        """
+        fila = self._fila.get(zona)
+        if fila is None:
+            return pd.DataFrame({'tecnologia': [], 'accesos': []})
+        return self._top_tecnologias(self.accesos_tecnologia[fila], top)
+
+    def tecnologias_municipio(self, top: int = 6) -> pd.DataFrame:
+        """
+        Accesos por tecnología de todo el municipio, de mayor a menor
+
+        Con el reparto proporcional es la única mezcla real: todas las zonas
+        comparten estas proporciones.
+
+        Args:
+            top: Número máximo de tecnologías
+
+        Returns:
+            DataFrame con tecnologia y accesos
+        """
+        return self._top_tecnologias(self.accesos_tecnologia.sum(axis=0), top)
+
+    def _top_tecnologias(self, valores: np.ndarray, top: int) -> pd.DataFrame:
+        """Tecnologías con accesos positivos ordenadas de mayor a menor"""
+        orden = np.argsort(-valores, kind='stable')[:top]
+        orden = orden[valores[orden] > 0]
+        return pd.DataFrame({
+            'tecnologia': [self.tecnologias[i] for i in orden],
+            'accesos': valores[orden]
+        })
+
+
+def _pesos_zonas(df_zonas: pd.DataFrame) -> np.ndarray:
+    """Peso de cada zona: población × penetración (uniforme si faltan columnas)"""
+    if {'poblacion', 'penetracion_internet'} <= set(df_zonas.columns):
+        pesos = (df_zonas['poblacion'].to_numpy(dtype=float) *
+                 df_zonas['penetracion_internet'].to_numpy(dtype=float))
+        pesos = np.nan_to_num(pesos).clip(min=0)
+        if pesos.sum() > 0:
+            return pesos / pesos.sum()
+    return np.full(len(df_zonas), 1.0 / max(len(df_zonas), 1))
+
+
+@perfilar()
+def construir_series_zonas(df_conectividad: pd.DataFrame, df_zonas: pd.DataFrame) -> SeriesZonas:
+    """
+    Construye el almacén de series por zona
+
+    Args:
+        df_conectividad: Registros con anno, trimestre, tecnologia, accesos (y opcionalmente zona)
+        df_zonas: Zonas con poblacion y penetracion_internet (para el reparto proporcional)
+
+    Returns:
+        SeriesZonas con accesos por zona × periodo y por zona × tecnología
+    """
+    huella = huella_datos((
+        df_conectividad[[c for c in ['zona', 'anno', 'trimestre', 'tecnologia', 'accesos']
+                         if c in df_conectividad.columns]],
+        df_zonas[[c for c in ['zona', 'poblacion', 'penetracion_internet'] if c in df_zonas.columns]]
+    ))[:16]
+
+    df = df_conectividad.dropna(subset=['anno', 'trimestre'])
+    if df.empty:
+        return SeriesZonas(df_zonas['zona'].tolist(), np.array([], dtype=np.int64),
+                           np.zeros((len(df_zonas), 0)), [], np.zeros((len(df_zonas), 0)),
+                           atribuido=True, huella=huella)
+
+    t = df['anno'].to_numpy(dtype=np.int64) * 4 + df['trimestre'].to_numpy(dtype=np.int64) - 1
+    t0, t1 = int(t.min()), int(t.max())
+    columna_periodo = t - t0
+    n_periodos = t1 - t0 + 1
+    codigos_tec, tecnologias = pd.factorize(df['tecnologia'], sort=True)
+    accesos = df['accesos'].to_numpy(dtype=float)
+    # La mezcla tecnológica se toma del último periodo disponible
+    ultimo = columna_periodo == n_periodos - 1
+
+    if 'zona' in df.columns:
+        zonas = list(dict.fromkeys(df_zonas['zona'].tolist() + df['zona'].dropna().unique().tolist()))
+        codigos_zona = pd.Index(zonas).get_indexer(df['zona'])
+        validos = codigos_zona >= 0
+        n_zonas = len(zonas)
+
+        matriz = np.bincount(
+            codigos_zona[validos] * n_periodos + columna_periodo[validos],
+            weights=accesos[validos], minlength=n_zonas * n_periodos
+        ).reshape(n_zonas, n_periodos)
+        sel = validos & ultimo & (codigos_tec >= 0)
+        matriz_tec = np.bincount(
+            codigos_zona[sel] * len(tecnologias) + codigos_tec[sel],
+            weights=accesos[sel], minlength=n_zonas * len(tecnologias)
+        ).reshape(n_zonas, len(tecnologias))
+        atribuido = False
+    else:
+        zonas = df_zonas['zona'].tolist()
+        pesos = _pesos_zonas(df_zonas)
+        total_periodo = np.bincount(columna_periodo, weights=accesos, minlength=n_periodos)
+        sel = ultimo & (codigos_tec >= 0)
+        total_tec = np.bincount(codigos_tec[sel], weights=accesos[sel], minlength=len(tecnologias))
+        matriz = np.outer(pesos, total_periodo)
+        matriz_tec = np.outer(pesos, total_tec)
+        atribuido = True
+
+    return SeriesZonas(
+        zonas, np.arange(t0, t1 + 1), np.rint(matriz).astype(np.int64),
+        list(tecnologias), np.rint(matriz_tec).astype(np.int64), atribuido, huella
+    )
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas, generar_conectividad
+
+    print("="*80)
+    print("PRUEBA DEL ALMACÉN DE SERIES POR ZONA")
+    print("="*80)
+
+    df_zonas = generar_zonas(10_000, 42)
+    df = generar_conectividad(1_000_000, df_zonas, 42)
+
+    for nombre, datos in [('con zona', df), ('sin zona (reparto)', df.drop(columns='zona'))]:
+        inicio = time.perf_counter()
+        series = construir_series_zonas(datos, df_zonas)
+        t_construir = time.perf_counter() - inicio
+
+        zona = series.zonas[0]
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            series.evolucion(zona)
+        t_consulta = (time.perf_counter() - inicio) / 1000
+
+        print(f"\n📦 {nombre}: {len(series.zonas):,} zonas × {len(series.periodos)} periodos "
+              f"en {t_construir * 1000:.0f} ms; consulta {t_consulta * 1e6:.0f} µs")
+        print(series.evolucion(zona).tail(3).to_string(index=False))
+        print(series.tecnologias_zona(zona).to_string(index=False))
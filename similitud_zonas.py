@@ -0,0 +1,174 @@
+"""
+Índice de similitud entre zonas para el proyecto Jamundí Conectada
+Representa cada zona como un vector de métricas normalizadas (población,
+velocidad, penetración, densidad y sede educativa) y responde consultas de
+k vecinos más cercanos por fuerza bruta vectorizada en NumPy, por lotes
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import huella_datos
+from perfilado import perfilar
+
+# Columna -> transformación antes de estandarizar
+CARACTERISTICAS = {
+    'poblacion': np.log1p,
+    'velocidad_promedio_mbps': np.log1p,
+    'penetracion_internet': None,
+    'densidad_poblacion': np.log1p,
+    'tiene_sede_educativa': None,
+    'sede_con_conexion': None,
+}
+
+# Consultas por lote: acota la matriz de distancias a TAMANO_LOTE × n float32
+TAMANO_LOTE = 128
+
+
+class IndiceSimilitud:
+    """Embeddings de zonas y búsqueda de vecinos por distancia euclidiana (solo lectura)"""
+
+    @perfilar('construir_indice_similitud')
+    def __init__(self, df_zonas: pd.DataFrame):
+        """
+        Args:
+            df_zonas: Zonas con las columnas de CARACTERISTICAS disponibles
+        """
+        self.df_zonas = df_zonas
+        self.zonas = df_zonas['zona'].astype(str).to_numpy()
+        self._fila = {}
+        for i, zona in enumerate(self.zonas):
+            self._fila.setdefault(zona, i)
+
+        columnas = []
+        self.caracteristicas = []
+        for columna, transformacion in CARACTERISTICAS.items():
+            if columna not in df_zonas.columns:
+                continue
+            valores = df_zonas[columna].to_numpy(dtype=float)
+            if transformacion is not None:
+                valores = transformacion(np.clip(valores, 0, None))
+            columnas.append(valores)
+            self.caracteristicas.append(columna)
+
+        matriz = np.column_stack(columnas) if columnas else np.zeros((len(df_zonas), 0))
+        matriz = np.nan_to_num(matriz, nan=np.nanmean(matriz, axis=0) if len(matriz) else 0.0)
+        self.media = matriz.mean(axis=0) if len(matriz) else np.zeros(matriz.shape[1])
+        desviacion = matriz.std(axis=0) if len(matriz) else np.ones(matriz.shape[1])
+        self.desviacion = np.where(desviacion > 0, desviacion, 1.0)
+
+        self.embeddings = ((matriz - self.media) / self.desviacion).astype(np.float32)
+        self._normas = (self.embeddings ** 2).sum(axis=1)
+
+        columnas_huella = ['zona', 'puntaje_prioridad'] + self.caracteristicas
+        self.huella = huella_datos(df_zonas[[c for c in columnas_huella if c in df_zonas.columns]])[:16]
+
+    def __len__(self) -> int:
+        return len(self.zonas)
+
+    def vecinos_lote(self, ids: np.ndarray, k: int = 5, candidatos: np.ndarray = None):
+        """
+        k vecinos más cercanos de varias zonas a la vez (excluida la propia zona)
+
+        Usa ||a - b||² = ||a||² + ||b||² - 2·a·b con un producto de matrices
+        por lote de consultas y argpartition para no ordenar todo el catálogo.
+
+        Args:
+            ids: Posiciones de las zonas consultadas
+            k: Número de vecinos
+            candidatos: Máscara booleana opcional de zonas elegibles
+
+        Returns:
+            Tupla (vecinos, distancias), cada una de forma (len(ids), k); -1/inf si faltan
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n = len(self)
+        excluidos = None if candidatos is None else ~np.asarray(candidatos, dtype=bool)
+        n_elegibles = n if excluidos is None else n - int(excluidos.sum())
+        k_efectivo = max(0, min(k, n_elegibles))
+
+        vecinos = np.full((len(ids), k), -1, dtype=np.int64)
+        distancias = np.full((len(ids), k), np.inf)
+        if k_efectivo == 0:
+            return vecinos, distancias
+
+        for inicio in range(0, len(ids), TAMANO_LOTE):
+            lote = ids[inicio:inicio + TAMANO_LOTE]
+            d2 = self.embeddings[lote] @ self.embeddings.T
+            d2 *= -2.0
+            d2 += self._normas[None, :]
+            d2 += self._normas[lote, None]
+            np.maximum(d2, 0, out=d2)
+            if excluidos is not None:
+                d2[:, excluidos] = np.inf
+            d2[np.arange(len(lote)), lote] = np.inf
+
+            cercanos = np.argpartition(d2, k_efectivo - 1, axis=1)[:, :k_efectivo]
+            d_cercanos = np.take_along_axis(d2, cercanos, axis=1)
+            orden = np.argsort(d_cercanos, axis=1, kind='stable')
+            cercanos = np.take_along_axis(cercanos, orden, axis=1)
+            d_cercanos = np.sqrt(np.take_along_axis(d_cercanos, orden, axis=1).astype(float))
+
+            finitos = np.isfinite(d_cercanos)
+            vecinos[inicio:inicio + len(lote), :k_efectivo] = np.where(finitos, cercanos, -1)
+            distancias[inicio:inicio + len(lote), :k_efectivo] = d_cercanos
+
+        return vecinos, distancias
+
+    def vecinos(self, zona: str, k: int = 5, candidatos: np.ndarray = None) -> pd.DataFrame:
+        """
+        Zonas más parecidas a una zona dada
+
+        Args:
+            zona: Nombre de la zona consultada
+            k: Número de vecinos
+            candidatos: Máscara booleana opcional de zonas elegibles
+
+        Returns:
+            DataFrame con posicion, zona y distancia, de la más a la menos parecida
+        """
+        fila = self._fila.get(zona)
+        if fila is None:
+            return pd.DataFrame({'posicion': [], 'zona': [], 'distancia': []})
+        vecinos, distancias = self.vecinos_lote(np.array([fila]), k, candidatos)
+        validos = vecinos[0] >= 0
+        return pd.DataFrame({
+            'posicion': vecinos[0][validos],
+            'zona': self.zonas[vecinos[0][validos]],
+            'distancia': distancias[0][validos]
+        })
+
+
+if __name__ == "__main__":
+    # Prueba del módulo
+    import time
+    from generador_sintetico import generar_zonas
+
+    print("="*80)
+    print("PRUEBA DEL ÍNDICE DE SIMILITUD")
+    print("="*80)
+
+    df_zonas = generar_zonas(100_000, 42)
+
+    inicio = time.perf_counter()
+    indice = IndiceSimilitud(df_zonas)
+    print(f"\n🏗️ Índice de {len(indice):,} zonas en {(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"({len(indice.caracteristicas)} características)")
+
+    zona = df_zonas['zona'].iloc[0]
+    inicio = time.perf_counter()
+    for _ in range(20):
+        resultado = indice.vecinos(zona, k=5)
+    print(f"⏱️ Consulta k=5: {(time.perf_counter() - inicio) / 20 * 1000:.2f} ms")
+    print(resultado.to_string(index=False))
+
+    # Verificación contra la distancia calculada directamente
+    fila = indice._fila[zona]
+    d = np.sqrt(((indice.embeddings - indice.embeddings[fila]) ** 2).sum(axis=1))
+    d[fila] = np.inf
+    assert np.allclose(np.sort(d)[:5], resultado['distancia'], atol=1e-3)
+
+    inicio = time.perf_counter()
+    indice.vecinos_lote(np.arange(1_000), k=5)
+    t_lote = time.perf_counter() - inicio
+    print(f"⏱️ Lote de 1,000 consultas: {t_lote * 1000:.0f} ms ({t_lote:.2f} ms por consulta)")
@@ -4,14 +4,65 @@ Incluye funciones para exportación a PDF y sistema de alertas
 """
 
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from fpdf import FPDF
+from functools import lru_cache
 import json
 
+from perfilado import perfilar
+
 # ============================================================================
 # SISTEMA DE ALERTAS
 # ============================================================================
 
+def evaluar_reglas_alertas(df_zonas):
+    """
+    Evalúa cada regla de alerta de forma vectorizada sobre todas las zonas
+    
+    Args:
+        df_zonas: DataFrame con información de zonas (con nivel_prioridad)
+    
+    Returns:
+        Lista de (mascara, tipo, prioridad, icono, color, mensaje), una por
+        regla; mascara es un arreglo booleano por zona y mensaje(i) el texto
+        de la alerta de la zona en la posición i
+    """
+    velocidad = df_zonas['velocidad_promedio_mbps'].to_numpy(dtype=float)
+    penetracion = df_zonas['penetracion_internet'].to_numpy(dtype=float)
+    densidad = df_zonas['densidad_poblacion'].to_numpy(dtype=float)
+    
+    reglas = [
+        # Alerta 1: Zona de alta prioridad sin sede educativa conectada
+        (
+            (df_zonas['nivel_prioridad'] == 'Alta').to_numpy() &
+            df_zonas['tiene_sede_educativa'].astype(bool).to_numpy() &
+            ~df_zonas['sede_con_conexion'].astype(bool).to_numpy(),
+            'CRÍTICO', 1, '🚨', '#d62728',
+            lambda i: "Sede educativa sin conexión en zona de alta prioridad"
+        ),
+        # Alerta 2: Velocidad muy baja (<3 Mbps)
+        (
+            velocidad < 3,
+            'URGENTE', 2, '⚠️', '#ff7f0e',
+            lambda i: f"Velocidad crítica: {velocidad[i]:.1f} Mbps (< 3 Mbps)"
+        ),
+        # Alerta 3: Baja penetración (<20%)
+        (
+            penetracion < 0.20,
+            'ADVERTENCIA', 3, 'ℹ️', '#1f77b4',
+            lambda i: f"Penetración muy baja: {penetracion[i]*100:.1f}%"
+        ),
+        # Alerta 4: Alta densidad poblacional con baja conectividad
+        (
+            (densidad > 1000) & (velocidad < 10),
+            'ATENCIÓN', 2, '👥', '#ff7f0e',
+            lambda i: f"Alta densidad ({densidad[i]:.0f} hab/km²) con baja velocidad"
+        )
+    ]
+    
+    return reglas
+
+@perfilar()
 def generar_alertas(df_zonas):
     """
     Genera alertas para zonas críticas basándose en múltiples criterios
@@ -24,53 +75,24 @@ def generar_alertas(df_zonas):
     """
     alertas = []
     
-    for idx, zona in df_zonas.iterrows():
-        # Alerta 1: Zona de alta prioridad sin sede educativa conectada
-        if zona['nivel_prioridad'] == 'Alta' and zona['tiene_sede_educativa'] and not zona['sede_con_conexion']:
-            alertas.append({
-                'tipo': 'CRÍTICO',
-                'zona': zona['zona'],
-                'mensaje': f"Sede educativa sin conexión en zona de alta prioridad",
-                'prioridad': 1,
-                'icono': '🚨',
-                'color': '#d62728'
-            })
-        
-        # Alerta 2: Velocidad muy baja (<3 Mbps)
-        if zona['velocidad_promedio_mbps'] < 3:
-            alertas.append({
-                'tipo': 'URGENTE',
-                'zona': zona['zona'],
-                'mensaje': f"Velocidad crítica: {zona['velocidad_promedio_mbps']:.1f} Mbps (< 3 Mbps)",
-                'prioridad': 2,
-                'icono': '⚠️',
-                'color': '#ff7f0e'
-            })
-        
-        # Alerta 3: Baja penetración (<20%)
-        if zona['penetracion_internet'] < 0.20:
-            alertas.append({
-                'tipo': 'ADVERTENCIA',
-                'zona': zona['zona'],
-                'mensaje': f"Penetración muy baja: {zona['penetracion_internet']*100:.1f}%",
-                'prioridad': 3,
-                'icono': 'ℹ️',
-                'color': '#1f77b4'
-            })
-        
-        # Alerta 4: Alta densidad poblacional con baja conectividad
-        if zona['densidad_poblacion'] > 1000 and zona['velocidad_promedio_mbps'] < 10:
+    # 'orden' conserva el orden original (zona por zona, regla por regla)
+    posiciones = np.arange(len(df_zonas))
+    zonas = df_zonas['zona'].to_numpy()
+    
+    for num_regla, (mascara, tipo, prioridad, icono, color, mensaje) in enumerate(evaluar_reglas_alertas(df_zonas)):
+        for i in posiciones[mascara]:
             alertas.append({
-                'tipo': 'ATENCIÓN',
-                'zona': zona['zona'],
-                'mensaje': f"Alta densidad ({zona['densidad_poblacion']:.0f} hab/km²) con baja velocidad",
-                'prioridad': 2,
-                'icono': '👥',
-                'color': '#ff7f0e'
+                'tipo': tipo,
+                'zona': zonas[i],
+                'mensaje': mensaje(i),
+                'prioridad': prioridad,
+                'icono': icono,
+                'color': color,
+                'orden': (i, num_regla)
             })
     
-    # Ordenar por prioridad
-    alertas_ordenadas = sorted(alertas, key=lambda x: x['prioridad'])
+    # Ordenar por prioridad (y por el orden original dentro de cada prioridad)
+    alertas_ordenadas = sorted(alertas, key=lambda x: (x['prioridad'], x.pop('orden')))
     
     return alertas_ordenadas
 
@@ -107,135 +129,62 @@ def obtener_estadisticas_alertas(alertas):
 # EXPORTACIÓN A PDF
 # ============================================================================
 
-class PDFReporte(FPDF):
-    """Clase personalizada para generar reportes PDF"""
-    
-    def header(self):
-        """Encabezado del PDF"""
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'Jamundí Conectada - Reporte de Zona', 0, 1, 'C')
-        self.set_font('Arial', 'I', 10)
-        self.cell(0, 5, f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 1, 'C')
-        self.ln(5)
-    
-    def footer(self):
-        """Pie de página del PDF"""
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+@lru_cache(maxsize=1)
+def clase_pdf_reporte():
+    """
+    Clase PDFReporte, definida en el primer uso
 
-def exportar_zona_a_pdf(zona_data, ruta_salida):
+    fpdf tarda ~0.3 s en importarse y solo se necesita al exportar, así que
+    no se carga al arrancar el dashboard.
     """
-    Exporta la información de una zona a PDF
+    from fpdf import FPDF
+
+    class PDFReporte(FPDF):
+        """Clase personalizada para generar reportes PDF"""
+        
+        def header(self):
+            """Encabezado del PDF"""
+            self.set_font('Arial', 'B', 16)
+            self.cell(0, 10, 'Jamundí Conectada - Reporte de Zona', 0, 1, 'C')
+            self.set_font('Arial', 'I', 10)
+            self.cell(0, 5, f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 1, 'C')
+            self.ln(5)
+        
+        def footer(self):
+            """Pie de página del PDF"""
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+    
+    return PDFReporte
+
+
+def __getattr__(nombre):
+    # utils.PDFReporte sigue disponible para quien la importe por nombre
+    if nombre == 'PDFReporte':
+        return clase_pdf_reporte()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+@perfilar()
+def exportar_zona_a_pdf(zona_data, ruta_salida, imagenes=None, cod_municipio=None, pesos=None):
+    """
+    Exporta la información de una zona a PDF con la plantilla precompilada
     
     Args:
         zona_data: Serie de pandas con datos de la zona
         ruta_salida: Ruta donde guardar el PDF
+        imagenes: Gráficos opcionales para el reporte (bytes PNG/JPEG o rutas)
+        cod_municipio: Municipio del encabezado (por defecto el configurado)
+        pesos: Pesos con los que se calculó el ranking (por defecto los del sistema)
     
     Returns:
         True si se exportó correctamente, False en caso contrario
     """
+    from reportes_pdf import generar_reporte_zona
+
     try:
-        pdf = PDFReporte()
-        pdf.add_page()
-        
-        # Título de la zona
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, f"Corregimiento: {zona_data['zona']}", 0, 1)
-        pdf.ln(2)
-        
-        # Badge de prioridad
-        nivel = zona_data['nivel_prioridad']
-        if nivel == 'Alta':
-            color = (214, 39, 40)
-        elif nivel == 'Media':
-            color = (255, 127, 14)
-        else:
-            color = (44, 160, 44)
-        
-        pdf.set_fill_color(*color)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font('Arial', 'B', 11)
-        pdf.cell(40, 8, f'  {nivel}  ', 0, 1, 'L', True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.ln(5)
-        
-        # Ranking
-        pdf.set_font('Arial', '', 11)
-        pdf.cell(0, 6, f"Ranking: #{int(zona_data['ranking'])}", 0, 1)
-        pdf.ln(3)
-        
-        # Sección: Métricas Principales
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 8, 'Métricas Principales', 0, 1)
-        pdf.set_font('Arial', '', 10)
-        
-        metricas = [
-            ('Población', f"{int(zona_data['poblacion']):,} habitantes"),
-            ('Velocidad Promedio', f"{zona_data['velocidad_promedio_mbps']:.2f} Mbps"),
-            ('Puntaje de Prioridad', f"{zona_data['puntaje_prioridad']:.3f}"),
-            ('Penetración Internet', f"{zona_data['penetracion_internet']*100:.1f}%"),
-            ('Densidad Poblacional', f"{zona_data['densidad_poblacion']:.2f} hab/km²")
-        ]
-        
-        for metrica, valor in metricas:
-            pdf.cell(80, 6, f"  • {metrica}:", 0, 0)
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(0, 6, valor, 0, 1)
-            pdf.set_font('Arial', '', 10)
-        
-        pdf.ln(5)
-        
-        # Sección: Componentes del Puntaje
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 8, 'Componentes del Puntaje de Prioridad', 0, 1)
-        pdf.set_font('Arial', '', 10)
-        
-        componentes = [
-            ('Educación (50%)', zona_data['componente_educacion']),
-            ('Población (20%)', zona_data['componente_poblacion']),
-            ('Conectividad (30%)', zona_data['componente_conectividad'])
-        ]
-        
-        for comp, valor in componentes:
-            pdf.cell(80, 6, f"  • {comp}:", 0, 0)
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(0, 6, f"{valor:.3f}", 0, 1)
-            pdf.set_font('Arial', '', 10)
-        
-        pdf.ln(5)
-        
-        # Sección: Información Adicional
-        pdf.set_font('Arial', 'B', 12)
-        pdf.cell(0, 8, 'Información Adicional', 0, 1)
-        pdf.set_font('Arial', '', 10)
-        
-        info_adicional = [
-            ('Tipo de Zona', zona_data['tipo']),
-            ('Tiene Sede Educativa', 'Sí' if zona_data['tiene_sede_educativa'] else 'No'),
-            ('Sede Conectada', 'Sí' if zona_data['sede_con_conexion'] else 'No')
-        ]
-        
-        for info, valor in info_adicional:
-            pdf.cell(80, 6, f"  • {info}:", 0, 0)
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(0, 6, str(valor), 0, 1)
-            pdf.set_font('Arial', '', 10)
-        
-        pdf.ln(10)
-        
-        # Pie de página informativo
-        pdf.set_font('Arial', 'I', 9)
-        pdf.multi_cell(0, 5, 
-            'Este reporte fue generado automáticamente por el Sistema Inteligente de Priorización '
-            'de Infraestructura Digital (SIPID) del proyecto Jamundí Conectada. '
-            'Los datos presentados se basan en información oficial de MinTIC Colombia y la Alcaldía de Jamundí.'
-        )
-        
-        # Guardar PDF
-        pdf.output(ruta_salida)
+        generar_reporte_zona(zona_data, ruta_salida, imagenes, cod_municipio, pesos)
         return True
-    
     except Exception as e:
         print(f"Error al exportar PDF: {e}")
         return False
@@ -244,6 +193,7 @@ def exportar_zona_a_pdf(zona_data, ruta_salida):
 # BÚSQUEDA Y AUTOCOMPLETADO
 # ============================================================================
 
+@perfilar()
 def buscar_zonas(query, df_zonas):
     """
     Busca zonas que coincidan con el query
@@ -265,6 +215,7 @@ def buscar_zonas(query, df_zonas):
     
     return df_zonas[mask]
 
+@perfilar()
 def obtener_sugerencias(query, df_zonas, max_sugerencias=5):
     """
     Obtiene sugerencias de zonas basadas en el query
@@ -294,6 +245,7 @@ def obtener_sugerencias(query, df_zonas, max_sugerencias=5):
 # CARGA DE GEOJSON
 # ============================================================================
 
+@perfilar()
 def cargar_geojson_corregimientos(ruta_geojson):
     """
     Carga el archivo GeoJSON de corregimientos
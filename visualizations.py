@@ -6,10 +6,19 @@ Fecha: 2025
 """
 
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from typing import Dict, List, Optional
 
+from cache_figuras import cachear_figura
+from carga_perezosa import importar_perezoso
+from concentracion_mercado import UMBRALES_HHI
+from municipios import obtener_municipio
+from perfilado import perfilar
+from pronosticos import ajustar_pronosticos
+
+# plotly.express tarda ~0.2 s en importarse; se carga con el primer gráfico que lo usa
+px = importar_perezoso('plotly.express')
+
 # Configuración de colores del tema
 COLOR_ALTA_PRIORIDAD = '#d62728'  # Rojo
 COLOR_MEDIA_PRIORIDAD = '#ff7f0e'  # Naranja
@@ -18,16 +27,21 @@ COLOR_URBANO = '#1f77b4'  # Azul
 COLOR_RURAL = '#8c564b'  # Marrón
 
 
-def crear_mapa_prioridades(df_zonas: pd.DataFrame) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_mapa_prioridades(df_zonas: pd.DataFrame, cod_municipio: int = None) -> go.Figure:
     """
     Crea un mapa de calor geoespacial con el puntaje de prioridad de cada zona
     
     Args:
         df_zonas: DataFrame con datos de zonas incluyendo latitud, longitud y puntaje_prioridad
+        cod_municipio: Municipio (centro del mapa y título); por defecto el configurado
         
     Returns:
         Figura de Plotly con el mapa
     """
+    municipio = obtener_municipio(cod_municipio)
+    
     # Crear mapa de dispersión con tamaño según población
     fig = px.scatter_mapbox(
         df_zonas,
@@ -48,8 +62,8 @@ def crear_mapa_prioridades(df_zonas: pd.DataFrame) -> go.Figure:
         },
         color_continuous_scale='RdYlGn_r',  # Rojo (alto) a Verde (bajo) invertido
         size_max=50,
-        zoom=10,
-        title='Mapa de Prioridades de Intervención - Jamundí',
+        zoom=municipio['zoom'],
+        title=f"Mapa de Prioridades de Intervención - {municipio['nombre']}",
         labels={
             'puntaje_prioridad': 'Puntaje de Prioridad',
             'poblacion': 'Población',
@@ -63,8 +77,8 @@ def crear_mapa_prioridades(df_zonas: pd.DataFrame) -> go.Figure:
     fig.update_layout(
         mapbox_style='open-street-map',
         mapbox=dict(
-            center=dict(lat=3.28, lon=-76.58),
-            zoom=10
+            center=dict(lat=municipio['centro'][0], lon=municipio['centro'][1]),
+            zoom=municipio['zoom']
         ),
         height=600,
         margin={"r": 0, "t": 40, "l": 0, "b": 0}
@@ -73,16 +87,83 @@ def crear_mapa_prioridades(df_zonas: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def crear_mapa_velocidades(df_zonas: pd.DataFrame) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_mapa_marcadores_prioridad(df_zonas: pd.DataFrame, cod_municipio: int = None) -> go.Figure:
+    """
+    Crea el mapa principal del dashboard con un marcador por zona según su nivel de prioridad
+
+    Usa una sola traza por nivel (tres en total) en lugar de una por zona, de
+    modo que el costo de construir y serializar el mapa no crece con las trazas.
+
+    Args:
+        df_zonas: DataFrame con zonas rankeadas (latitud, longitud, nivel_prioridad...)
+        cod_municipio: Municipio (centro del mapa); por defecto el configurado
+
+    Returns:
+        Figura de Plotly con el mapa
+    """
+    estilos = {
+        'Alta': (COLOR_ALTA_PRIORIDAD, 25),
+        'Media': (COLOR_MEDIA_PRIORIDAD, 20),
+        'Baja': (COLOR_BAJA_PRIORIDAD, 15)
+    }
+    columnas_hover = ['zona', 'poblacion', 'velocidad_promedio_mbps',
+                      'puntaje_prioridad', 'nivel_prioridad', 'ranking']
+
+    fig = go.Figure()
+    for nivel, (color, size) in estilos.items():
+        df_nivel = df_zonas[df_zonas['nivel_prioridad'] == nivel]
+        if df_nivel.empty:
+            continue
+        fig.add_trace(go.Scattermapbox(
+            lat=df_nivel['latitud'],
+            lon=df_nivel['longitud'],
+            mode='markers',
+            marker=dict(size=size, color=color, opacity=0.8),
+            text=df_nivel['zona'],
+            name=nivel,
+            customdata=df_nivel[columnas_hover].to_numpy(dtype=object),
+            hovertemplate="<b>%{customdata[0]}</b><br>" +
+                          "Población: %{customdata[1]:,}<br>" +
+                          "Velocidad: %{customdata[2]:.2f} Mbps<br>" +
+                          "Puntaje: %{customdata[3]:.3f}<br>" +
+                          "Nivel: %{customdata[4]}<br>" +
+                          "Ranking: #%{customdata[5]}<br>" +
+                          "<extra></extra>",
+            showlegend=False
+        ))
+
+    municipio = obtener_municipio(cod_municipio)
+    fig.update_layout(
+        mapbox=dict(
+            style='open-street-map',
+            center=dict(lat=municipio['centro'][0], lon=municipio['centro'][1]),
+            zoom=municipio['zoom']
+        ),
+        height=600,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        showlegend=False,
+        hovermode='closest'
+    )
+
+    return fig
+
+
+@perfilar()
+@cachear_figura
+def crear_mapa_velocidades(df_zonas: pd.DataFrame, cod_municipio: int = None) -> go.Figure:
     """
     Crea un mapa geográfico mostrando la velocidad promedio de conexión por zona
     
     Args:
         df_zonas: DataFrame con datos de zonas
+        cod_municipio: Municipio (centro del mapa y título); por defecto el configurado
         
     Returns:
         Figura de Plotly con el mapa de velocidades
     """
+    municipio = obtener_municipio(cod_municipio)
     fig = px.scatter_mapbox(
         df_zonas,
         lat='latitud',
@@ -100,8 +181,8 @@ def crear_mapa_velocidades(df_zonas: pd.DataFrame) -> go.Figure:
         },
         color_continuous_scale='Viridis',
         size_max=50,
-        zoom=10,
-        title='Mapa de Velocidades de Conexión - Jamundí',
+        zoom=municipio['zoom'],
+        title=f"Mapa de Velocidades de Conexión - {municipio['nombre']}",
         labels={
             'velocidad_promedio_mbps': 'Velocidad (Mbps)',
             'poblacion': 'Población',
@@ -112,8 +193,8 @@ def crear_mapa_velocidades(df_zonas: pd.DataFrame) -> go.Figure:
     fig.update_layout(
         mapbox_style='open-street-map',
         mapbox=dict(
-            center=dict(lat=3.28, lon=-76.58),
-            zoom=10
+            center=dict(lat=municipio['centro'][0], lon=municipio['centro'][1]),
+            zoom=municipio['zoom']
         ),
         height=600,
         margin={"r": 0, "t": 40, "l": 0, "b": 0}
@@ -122,6 +203,8 @@ def crear_mapa_velocidades(df_zonas: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@perfilar()
+@cachear_figura
 def crear_grafico_dispersion_vulnerabilidad(df_zonas: pd.DataFrame) -> go.Figure:
     """
     Crea un gráfico de dispersión relacionando densidad de población vs velocidad de conexión
@@ -181,19 +264,29 @@ def crear_grafico_dispersion_vulnerabilidad(df_zonas: pd.DataFrame) -> go.Figure
     return fig
 
 
-def crear_grafico_barras_tecnologias(df_conectividad: pd.DataFrame) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_grafico_barras_tecnologias(df_conectividad: pd.DataFrame, motor=None,
+                                     filtros: Dict = None, rangos: Dict = None) -> go.Figure:
     """
     Crea un gráfico de barras mostrando la distribución de accesos por tecnología
     
     Args:
         df_conectividad: DataFrame con datos de conectividad
+        motor: MotorConsultas opcional; si se indica, el agregado se calcula
+               en SQL y df_conectividad puede ser None
+        filtros: Filtros del motor (columna -> valores admitidos)
+        rangos: Rangos del motor (columna -> (mínimo, máximo))
         
     Returns:
         Figura de Plotly con el gráfico de barras
     """
     # Agrupar por tecnología
-    df_tech = df_conectividad.groupby('tecnologia')['accesos'].sum().reset_index()
-    df_tech = df_tech.sort_values('accesos', ascending=False)
+    if motor is not None:
+        df_tech = motor.accesos_por('tecnologia', filtros, rangos)
+    else:
+        df_tech = df_conectividad.groupby('tecnologia')['accesos'].sum().reset_index()
+        df_tech = df_tech.sort_values('accesos', ascending=False)
     
     fig = px.bar(
         df_tech,
@@ -217,22 +310,35 @@ def crear_grafico_barras_tecnologias(df_conectividad: pd.DataFrame) -> go.Figure
     return fig
 
 
-def crear_grafico_evolucion_temporal(df_conectividad: pd.DataFrame) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_grafico_evolucion_temporal(df_conectividad: pd.DataFrame, motor=None,
+                                     filtros: Dict = None, rangos: Dict = None) -> go.Figure:
     """
     Crea un gráfico de líneas mostrando la evolución temporal de accesos
     
     Args:
         df_conectividad: DataFrame con datos de conectividad
+        motor: MotorConsultas opcional; si se indica, el agregado se calcula
+               en SQL y df_conectividad puede ser None
+        filtros: Filtros del motor (columna -> valores admitidos)
+        rangos: Rangos del motor (columna -> (mínimo, máximo))
         
     Returns:
         Figura de Plotly con el gráfico de evolución
     """
-    # Crear columna de periodo
-    df_temp = df_conectividad.copy()
-    df_temp['periodo'] = df_temp['anno'].astype(str) + '-Q' + df_temp['trimestre'].astype(str)
-    
-    # Agrupar por periodo
-    df_evol = df_temp.groupby('periodo')['accesos'].sum().reset_index()
+    if motor is not None:
+        # Agrupar por año y trimestre en el motor; el periodo se arma sobre el agregado
+        df_evol = motor.accesos_por(['anno', 'trimestre'], filtros, rangos, orden='grupo')
+        df_evol['periodo'] = df_evol['anno'].astype(str) + '-Q' + df_evol['trimestre'].astype(str)
+        df_evol = df_evol.groupby('periodo')['accesos'].sum().reset_index()
+    else:
+        # Crear columna de periodo
+        df_temp = df_conectividad.copy()
+        df_temp['periodo'] = df_temp['anno'].astype(str) + '-Q' + df_temp['trimestre'].astype(str)
+        
+        # Agrupar por periodo
+        df_evol = df_temp.groupby('periodo')['accesos'].sum().reset_index()
     
     fig = px.line(
         df_evol,
@@ -254,27 +360,39 @@ def crear_grafico_evolucion_temporal(df_conectividad: pd.DataFrame) -> go.Figure
     return fig
 
 
-def crear_grafico_proveedores(df_conectividad: pd.DataFrame, top_n: int = 10) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_grafico_proveedores(df_conectividad: pd.DataFrame, top_n: int = 10, motor=None,
+                              filtros: Dict = None, rangos: Dict = None,
+                              cod_municipio: int = None) -> go.Figure:
     """
     Crea un gráfico de barras horizontales con los principales proveedores
     
     Args:
         df_conectividad: DataFrame con datos de conectividad
         top_n: Número de proveedores a mostrar
+        motor: MotorConsultas opcional; si se indica, el agregado se calcula
+               en SQL y df_conectividad puede ser None
+        filtros: Filtros del motor (columna -> valores admitidos)
+        rangos: Rangos del motor (columna -> (mínimo, máximo))
+        cod_municipio: Municipio del título; por defecto el configurado
         
     Returns:
         Figura de Plotly con el gráfico
     """
     # Agrupar por proveedor
-    df_prov = df_conectividad.groupby('proveedor')['accesos'].sum().reset_index()
-    df_prov = df_prov.sort_values('accesos', ascending=False).head(top_n)
+    if motor is not None:
+        df_prov = motor.accesos_por('proveedor', filtros, rangos, top=top_n)
+    else:
+        df_prov = df_conectividad.groupby('proveedor')['accesos'].sum().reset_index()
+        df_prov = df_prov.sort_values('accesos', ascending=False).head(top_n)
     
     fig = px.bar(
         df_prov,
         y='proveedor',
         x='accesos',
         orientation='h',
-        title=f'Top {top_n} Proveedores de Internet en Jamundí',
+        title=f"Top {top_n} Proveedores de Internet en {obtener_municipio(cod_municipio)['nombre']}",
         labels={
             'proveedor': 'Proveedor',
             'accesos': 'Número de Accesos'
@@ -291,18 +409,28 @@ def crear_grafico_proveedores(df_conectividad: pd.DataFrame, top_n: int = 10) ->
     return fig
 
 
-def crear_grafico_segmentos(df_conectividad: pd.DataFrame) -> go.Figure:
+@perfilar()
+@cachear_figura
+def crear_grafico_segmentos(df_conectividad: pd.DataFrame, motor=None,
+                            filtros: Dict = None, rangos: Dict = None) -> go.Figure:
     """
     Crea un gráfico de torta mostrando la distribución por segmentos
     
     Args:
         df_conectividad: DataFrame con datos de conectividad
+        motor: MotorConsultas opcional; si se indica, el agregado se calcula
+               en SQL y df_conectividad puede ser None
+        filtros: Filtros del motor (columna -> valores admitidos)
+        rangos: Rangos del motor (columna -> (mínimo, máximo))
         
     Returns:
         Figura de Plotly con el gráfico de torta
     """
     # Agrupar por segmento
-    df_seg = df_conectividad.groupby('segmento')['accesos'].sum().reset_index()
+    if motor is not None:
+        df_seg = motor.accesos_por('segmento', filtros, rangos, orden='grupo')
+    else:
+        df_seg = df_conectividad.groupby('segmento')['accesos'].sum().reset_index()
     
     fig = px.pie(
         df_seg,
@@ -319,17 +447,198 @@ def crear_grafico_segmentos(df_conectividad: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def crear_indicadores_kpi(df_zonas: pd.DataFrame, df_conectividad: pd.DataFrame) -> Dict[str, any]:
+@perfilar()
+@cachear_figura
+def crear_grafico_pronostico_velocidad(df_conectividad: pd.DataFrame, meta_velocidad: float = 25,
+                                       horizonte: int = 8) -> go.Figure:
+    """
+    Crea un gráfico de la velocidad por tecnología con su proyección y la meta
+    
+    Args:
+        df_conectividad: DataFrame con datos de conectividad
+        meta_velocidad: Meta de velocidad en Mbps (línea horizontal)
+        horizonte: Trimestres a proyectar
+        
+    Returns:
+        Figura de Plotly con histórico (línea continua), proyección (punteada)
+        e intervalo de predicción del 95%
+    """
+    modelo = ajustar_pronosticos(df_conectividad, 'velocidad', ['tecnologia'])
+    df_hist = modelo.historico()
+    df_pron = modelo.pronosticar(horizonte=horizonte)
+    colores = px.colors.qualitative.Plotly
+    
+    # Sin registros con velocidad el modelo queda vacío y solo se dibuja la meta
+    fig = go.Figure()
+    for i, tecnologia in enumerate(modelo.claves['tecnologia']):
+        color = colores[i % len(colores)]
+        hist = df_hist[df_hist['tecnologia'] == tecnologia]
+        pron = df_pron[df_pron['tecnologia'] == tecnologia]
+        
+        fig.add_trace(go.Scatter(
+            x=pd.concat([pron['periodo'], pron['periodo'][::-1]]),
+            y=pd.concat([pron['superior'], pron['inferior'][::-1]]),
+            fill='toself',
+            fillcolor=color,
+            opacity=0.15,
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False,
+            legendgroup=tecnologia
+        ))
+        fig.add_trace(go.Scatter(
+            x=hist['periodo'],
+            y=hist['valor'],
+            mode='lines+markers',
+            name=tecnologia,
+            line=dict(color=color),
+            legendgroup=tecnologia
+        ))
+        fig.add_trace(go.Scatter(
+            x=pd.concat([hist['periodo'].tail(1), pron['periodo']]),
+            y=pd.concat([hist['valor'].tail(1), pron['prediccion']]),
+            mode='lines',
+            name=f"{tecnologia} (proyección)",
+            line=dict(color=color, dash='dot'),
+            legendgroup=tecnologia,
+            showlegend=False
+        ))
+    
+    fig.add_hline(
+        y=meta_velocidad,
+        line_dash='dash',
+        line_color=COLOR_ALTA_PRIORIDAD,
+        annotation_text=f"Meta {meta_velocidad} Mbps"
+    )
+    
+    fig.update_layout(
+        title='Velocidad de Bajada por Tecnología y Proyección',
+        xaxis_title='Periodo',
+        yaxis_title='Velocidad (Mbps, escala log)',
+        yaxis_type='log',
+        height=450,
+        xaxis_tickangle=-45,
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+@perfilar()
+@cachear_figura
+def crear_grafico_concentracion_mercado(df_hhi: pd.DataFrame) -> go.Figure:
+    """
+    Crea un gráfico del índice HHI por periodo con las bandas de concentración
+    
+    Args:
+        df_hhi: Resultado de CuboMercado.hhi() (periodo, hhi, cr4, lider, cuota_lider)
+        
+    Returns:
+        Figura de Plotly con el HHI (eje izquierdo) y la cuota de los 4 mayores
+        proveedores (eje derecho)
+    """
+    fig = go.Figure()
+    
+    # Bandas: no concentrado / moderado / alto
+    limites = [0, *UMBRALES_HHI, 10000]
+    colores = [COLOR_BAJA_PRIORIDAD, COLOR_MEDIA_PRIORIDAD, COLOR_ALTA_PRIORIDAD]
+    for inferior, superior, color in zip(limites[:-1], limites[1:], colores):
+        fig.add_hrect(y0=inferior, y1=superior, fillcolor=color, opacity=0.08, line_width=0)
+    
+    fig.add_trace(go.Scatter(
+        x=df_hhi['periodo'],
+        y=df_hhi['hhi'],
+        mode='lines+markers',
+        name='HHI',
+        line=dict(color=COLOR_URBANO, width=3),
+        customdata=df_hhi[['lider', 'cuota_lider']],
+        hovertemplate='HHI %{y:,.0f}<br>Líder: %{customdata[0]} (%{customdata[1]:.1%})<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=df_hhi['periodo'],
+        y=df_hhi['cr4'] * 100,
+        mode='lines',
+        name='Cuota de los 4 mayores (%)',
+        line=dict(color=COLOR_RURAL, dash='dot'),
+        yaxis='y2'
+    ))
+    
+    # Escala hasta un poco más allá del umbral alto (o del máximo observado)
+    techo = max(UMBRALES_HHI[-1] * 1.2, float(df_hhi['hhi'].max()) * 1.1) if len(df_hhi) else 10000
+    fig.update_layout(
+        title='Concentración del Mercado de Proveedores (HHI)',
+        xaxis_title='Periodo',
+        yaxis=dict(title='HHI', range=[0, techo]),
+        yaxis2=dict(title='CR4 (%)', overlaying='y', side='right', range=[0, 100], showgrid=False),
+        height=400,
+        xaxis_tickangle=-45,
+        hovermode='x unified',
+        legend=dict(orientation='h', y=-0.3)
+    )
+    
+    return fig
+
+
+@perfilar()
+@cachear_figura
+def crear_grafico_mezcla_tecnologica(df_mezcla: pd.DataFrame) -> go.Figure:
+    """
+    Crea un gráfico de áreas apiladas con la participación de cada tecnología
+    
+    Args:
+        df_mezcla: Resultado de CuboMercado.mezcla_tecnologica() (periodo, tecnologia, participacion)
+        
+    Returns:
+        Figura de Plotly con la participación (%) por periodo
+    """
+    fig = px.area(
+        df_mezcla.assign(participacion=df_mezcla['participacion'] * 100),
+        x='periodo',
+        y='participacion',
+        color='tecnologia',
+        title='Mezcla Tecnológica de los Accesos',
+        labels={
+            'periodo': 'Periodo',
+            'participacion': 'Participación (%)',
+            'tecnologia': 'Tecnología'
+        }
+    )
+    
+    fig.update_layout(
+        height=400,
+        xaxis_tickangle=-45,
+        yaxis_range=[0, 100],
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+@perfilar()
+def crear_indicadores_kpi(df_zonas: pd.DataFrame, df_conectividad: pd.DataFrame, motor=None,
+                          filtros: Dict = None) -> Dict[str, any]:
     """
     Calcula indicadores clave de rendimiento (KPIs) para el dashboard
     
     Args:
         df_zonas: DataFrame con datos de zonas
         df_conectividad: DataFrame con datos de conectividad
+        motor: MotorConsultas opcional; si se indica, los totales de
+               conectividad se calculan en SQL y df_conectividad puede ser None
+        filtros: Filtros del motor (columna -> valores admitidos)
         
     Returns:
         Diccionario con KPIs
     """
+    if motor is not None:
+        totales = motor.indicadores(filtros)
+    else:
+        totales = {
+            'total_accesos': int(df_conectividad['accesos'].sum()),
+            'num_proveedores': int(df_conectividad['proveedor'].nunique()),
+            'num_tecnologias': int(df_conectividad['tecnologia'].nunique())
+        }
+    
     kpis = {
         'poblacion_total': int(df_zonas['poblacion'].sum()),
         'zonas_totales': len(df_zonas),
@@ -340,9 +649,9 @@ def crear_indicadores_kpi(df_zonas: pd.DataFrame, df_conectividad: pd.DataFrame)
         ]),
         'velocidad_promedio': float(df_zonas['velocidad_promedio_mbps'].mean()),
         'penetracion_promedio': float(df_zonas['penetracion_internet'].mean()),
-        'total_accesos': int(df_conectividad['accesos'].sum()),
-        'num_proveedores': int(df_conectividad['proveedor'].nunique()),
-        'num_tecnologias': int(df_conectividad['tecnologia'].nunique())
+        'total_accesos': totales['total_accesos'],
+        'num_proveedores': totales['num_proveedores'],
+        'num_tecnologias': totales['num_tecnologias']
     }
     
     return kpis
@@ -4,44 +4,44 @@ Gráficos adicionales para análisis detallado de zonas
 """
 
 import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
 
+from cache_figuras import cachear_figura
+from carga_perezosa import importar_perezoso
+from perfilado import perfilar
+from estadisticas_zonas import METRICAS_RADAR
+
+px = importar_perezoso('plotly.express')
+
 # ============================================================================
 # GRÁFICOS PARA EL PANEL LATERAL
 # ============================================================================
 
-def crear_grafico_evolucion_zona(zona_nombre, df_conectividad):
+@perfilar()
+@cachear_figura
+def crear_grafico_evolucion_zona(zona_nombre, series_zonas):
     """
     Crea un gráfico de evolución temporal de accesos para una zona específica
-    (Simulado ya que no tenemos datos por zona en el dataset)
     
     Args:
         zona_nombre: Nombre de la zona
-        df_conectividad: DataFrame con datos de conectividad
+        series_zonas: Almacén SeriesZonas (ver series_zonas.construir_series_zonas)
     
     Returns:
         Figura de Plotly
     """
-    # Simular datos de evolución (en producción, filtrar por zona)
-    df_evol = df_conectividad.groupby(['anno', 'trimestre'])['accesos'].sum().reset_index()
-    df_evol = df_evol.sort_values(['anno', 'trimestre'])
-    df_evol['periodo'] = df_evol['anno'].astype(str) + '-T' + df_evol['trimestre'].astype(str)
-    
-    # Tomar últimos 8 trimestres
-    df_evol = df_evol.tail(8)
-    
-    # Simular variación para la zona específica (±20% del promedio)
-    np.random.seed(hash(zona_nombre) % 1000)
-    factor = 1 + (np.random.random(len(df_evol)) - 0.5) * 0.4
-    df_evol['accesos_zona'] = (df_evol['accesos'] * factor / 100).astype(int)
+    # Últimos 8 trimestres de la zona (slice precalculado)
+    df_evol = series_zonas.evolucion(zona_nombre, ultimos=8)
+    titulo = 'Evolución de Accesos (últimos 8 trimestres)'
+    if series_zonas.atribuido:
+        titulo += ' - estimado'
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
         x=df_evol['periodo'],
-        y=df_evol['accesos_zona'],
+        y=df_evol['accesos'],
         mode='lines+markers',
         name='Accesos',
         line=dict(color='#1f77b4', width=2),
@@ -51,7 +51,7 @@ def crear_grafico_evolucion_zona(zona_nombre, df_conectividad):
     ))
     
     fig.update_layout(
-        title=dict(text='Evolución de Accesos (últimos 8 trimestres)', font=dict(size=11)),
+        title=dict(text=titulo, font=dict(size=11)),
         xaxis_title='',
         yaxis_title='Accesos',
         height=200,
@@ -62,27 +62,42 @@ def crear_grafico_evolucion_zona(zona_nombre, df_conectividad):
     
     return fig
 
-def crear_grafico_comparacion_zonas_similares(zona_data, df_zonas):
+@perfilar()
+@cachear_figura
+def crear_grafico_comparacion_zonas_similares(zona_data, indice_similitud, k=4, estadisticas_zonas=None):
     """
-    Compara la zona seleccionada con zonas similares (mismo tipo)
+    Compara la zona seleccionada con sus k zonas más parecidas
+    
+    La similitud se mide sobre población, velocidad, penetración, densidad y
+    sede educativa normalizadas (ver similitud_zonas), no solo por tipo.
     
     Args:
         zona_data: Datos de la zona seleccionada
-        df_zonas: DataFrame con todas las zonas
+        indice_similitud: IndiceSimilitud de las zonas candidatas
+        k: Número de zonas similares a mostrar
+        estadisticas_zonas: EstadisticasZonas opcional; marca la mediana del tipo
     
     Returns:
         Figura de Plotly
     """
-    # Filtrar zonas del mismo tipo
-    zonas_similares = df_zonas[df_zonas['tipo'] == zona_data['tipo']].copy()
-    
-    # Tomar top 5 por ranking
-    zonas_similares = zonas_similares.nsmallest(5, 'ranking')
+    vecinos = indice_similitud.vecinos(zona_data['zona'], k=k)
+    puntajes = indice_similitud.df_zonas['puntaje_prioridad'].to_numpy()
+    
+    zonas_similares = pd.concat([
+        pd.DataFrame({
+            'zona': [zona_data['zona']],
+            'puntaje_prioridad': [zona_data['puntaje_prioridad']],
+            'distancia': [0.0]
+        }),
+        pd.DataFrame({
+            'zona': vecinos['zona'],
+            'puntaje_prioridad': puntajes[vecinos['posicion'].to_numpy(dtype=int)],
+            'distancia': vecinos['distancia']
+        })
+    ], ignore_index=True)
     
     # Resaltar la zona seleccionada
-    zonas_similares['color'] = zonas_similares['zona'].apply(
-        lambda x: '#1f77b4' if x == zona_data['zona'] else '#cccccc'
-    )
+    zonas_similares['color'] = np.where(zonas_similares.index == 0, '#1f77b4', '#cccccc')
     
     fig = go.Figure()
     
@@ -92,11 +107,20 @@ def crear_grafico_comparacion_zonas_similares(zona_data, df_zonas):
         marker=dict(color=zonas_similares['color']),
         text=zonas_similares['puntaje_prioridad'].round(3),
         textposition='outside',
-        hovertemplate='<b>%{x}</b><br>Puntaje: %{y:.3f}<extra></extra>'
+        customdata=zonas_similares['distancia'],
+        hovertemplate='<b>%{x}</b><br>Puntaje: %{y:.3f}<br>Distancia: %{customdata:.2f}<extra></extra>'
     ))
     
+    if estadisticas_zonas is not None:
+        tipo = zona_data.get('tipo')
+        mediana = estadisticas_zonas.resumen('puntaje_prioridad', tipo)['p50']
+        fig.add_hline(
+            y=mediana, line_dash='dash', line_color='red', line_width=1,
+            annotation_text=f'Mediana {tipo or "global"}', annotation_font_size=9
+        )
+    
     fig.update_layout(
-        title=dict(text=f'Comparación con Zonas {zona_data["tipo"]}s', font=dict(size=11)),
+        title=dict(text='Comparación con Zonas Similares', font=dict(size=11)),
         xaxis_title='',
         yaxis_title='Puntaje de Prioridad',
         height=220,
@@ -107,31 +131,35 @@ def crear_grafico_comparacion_zonas_similares(zona_data, df_zonas):
     
     return fig
 
-def crear_grafico_distribucion_tecnologias_zona(zona_nombre, df_conectividad):
+@perfilar()
+@cachear_figura
+def crear_grafico_distribucion_tecnologias_zona(zona_nombre, series_zonas):
     """
-    Muestra la distribución de tecnologías en la zona
-    (Simulado ya que no tenemos datos por zona)
+    Muestra la distribución de tecnologías en la zona (último trimestre disponible)
+    
+    Si la conectividad no trae la columna zona, el reparto proporcional daría
+    a todas las zonas la misma mezcla: se muestra entonces la del municipio,
+    titulada como tal.
     
     Args:
         zona_nombre: Nombre de la zona
-        df_conectividad: DataFrame con datos de conectividad
+        series_zonas: Almacén SeriesZonas (ver series_zonas.construir_series_zonas)
     
     Returns:
         Figura de Plotly
     """
-    # Obtener distribución general de tecnologías
-    df_tech = df_conectividad.groupby('tecnologia')['accesos'].sum().reset_index()
-    df_tech = df_tech.nlargest(6, 'accesos')
-    
-    # Simular variación para la zona
-    np.random.seed(hash(zona_nombre) % 1000)
-    df_tech['accesos_zona'] = (df_tech['accesos'] * (0.5 + np.random.random(len(df_tech))) / 100).astype(int)
+    if series_zonas.atribuido:
+        df_tech = series_zonas.tecnologias_municipio(top=6)
+        titulo = 'Mezcla Tecnológica del Municipio (sin datos por zona)'
+    else:
+        df_tech = series_zonas.tecnologias_zona(zona_nombre, top=6)
+        titulo = 'Distribución de Tecnologías'
     
     fig = go.Figure()
     
     fig.add_trace(go.Pie(
         labels=df_tech['tecnologia'],
-        values=df_tech['accesos_zona'],
+        values=df_tech['accesos'],
         hole=0.4,
         marker=dict(colors=px.colors.qualitative.Set3),
         textinfo='label+percent',
@@ -140,7 +168,7 @@ def crear_grafico_distribucion_tecnologias_zona(zona_nombre, df_conectividad):
     ))
     
     fig.update_layout(
-        title=dict(text='Distribución de Tecnologías', font=dict(size=11)),
+        title=dict(text=titulo, font=dict(size=11)),
         height=250,
         margin=dict(l=10, r=10, t=40, b=10),
         showlegend=False
@@ -148,35 +176,36 @@ def crear_grafico_distribucion_tecnologias_zona(zona_nombre, df_conectividad):
     
     return fig
 
-def crear_grafico_radar_metricas(zona_data, df_zonas):
+@perfilar()
+@cachear_figura
+def crear_grafico_radar_metricas(zona_data, estadisticas_zonas, escala='percentil'):
     """
-    Crea un gráfico de radar comparando métricas de la zona con promedios
+    Crea un gráfico de radar comparando métricas de la zona con el catálogo
     
     Args:
         zona_data: Datos de la zona seleccionada
-        df_zonas: DataFrame con todas las zonas
+        estadisticas_zonas: EstadisticasZonas del catálogo (ver estadisticas_zonas)
+        escala: 'percentil' (posición en la distribución, 50 = mediana) o
+                'media' (valor relativo a la media, 50 = promedio)
     
     Returns:
         Figura de Plotly
     """
-    # Calcular promedios
-    promedios = {
-        'Velocidad': df_zonas['velocidad_promedio_mbps'].mean(),
-        'Penetración': df_zonas['penetracion_internet'].mean() * 100,
-        'Densidad': df_zonas['densidad_poblacion'].mean(),
-        'Población': df_zonas['poblacion'].mean()
-    }
-    
-    # Normalizar valores de la zona (0-100)
-    valores_zona = {
-        'Velocidad': min(zona_data['velocidad_promedio_mbps'] / promedios['Velocidad'] * 50, 100),
-        'Penetración': zona_data['penetracion_internet'] * 100,
-        'Densidad': min(zona_data['densidad_poblacion'] / promedios['Densidad'] * 50, 100),
-        'Población': min(zona_data['poblacion'] / promedios['Población'] * 50, 100)
-    }
-    
-    categorias = list(valores_zona.keys())
-    valores = list(valores_zona.values())
+    tipo = zona_data.get('tipo')
+    
+    def escalar(metrica, valor):
+        if escala == 'percentil':
+            return estadisticas_zonas.percentil(metrica, valor)
+        if metrica == 'penetracion_internet':
+            return valor * 100
+        return estadisticas_zonas.escala_media(metrica, valor)
+    
+    # Referencia del tipo de zona: su mediana (o media) en la misma escala
+    clave_tipo = 'p50' if escala == 'percentil' else 'media'
+    categorias = list(METRICAS_RADAR.keys())
+    valores = [escalar(m, zona_data[m]) for m in METRICAS_RADAR.values()]
+    valores_tipo = [escalar(m, estadisticas_zonas.resumen(m, tipo)[clave_tipo]) for m in METRICAS_RADAR.values()]
+    referencia = 'Mediana' if escala == 'percentil' else 'Promedio'
     
     fig = go.Figure()
     
@@ -189,16 +218,26 @@ def crear_grafico_radar_metricas(zona_data, df_zonas):
         fillcolor='rgba(31, 119, 180, 0.3)'
     ))
     
-    # Añadir línea de promedio (50)
+    # Añadir línea de referencia global (50)
     fig.add_trace(go.Scatterpolar(
-        r=[50, 50, 50, 50],
+        r=[50] * len(categorias),
         theta=categorias,
         fill=None,
-        name='Promedio',
+        name=referencia,
         line=dict(color='red', width=1, dash='dash'),
         showlegend=True
     ))
     
+    if tipo is not None and tipo in estadisticas_zonas.por_tipo:
+        fig.add_trace(go.Scatterpolar(
+            r=valores_tipo,
+            theta=categorias,
+            fill=None,
+            name=f'{referencia} {tipo}',
+            line=dict(color='gray', width=1, dash='dot'),
+            showlegend=True
+        ))
+    
     fig.update_layout(
         polar=dict(
             radialaxis=dict(
@@ -206,7 +245,8 @@ def crear_grafico_radar_metricas(zona_data, df_zonas):
                 range=[0, 100]
             )
         ),
-        title=dict(text='Radar de Métricas', font=dict(size=11)),
+        title=dict(text='Radar de Métricas' + (' (percentiles)' if escala == 'percentil' else ''),
+                   font=dict(size=11)),
         height=280,
         margin=dict(l=40, r=40, t=40, b=20),
         showlegend=True,
@@ -221,6 +261,8 @@ def crear_grafico_radar_metricas(zona_data, df_zonas):
     
     return fig
 
+@perfilar()
+@cachear_figura
 def crear_mini_mapa_ubicacion(zona_data):
     """
     Crea un mini mapa mostrando solo la ubicación de la zona seleccionada
@@ -270,6 +312,8 @@ def crear_mini_mapa_ubicacion(zona_data):
     
     return fig
 
+@perfilar()
+@cachear_figura
 def crear_grafico_barras_componentes_detallado(zona_data):
     """
     Versión mejorada del gráfico de componentes con más detalles
@@ -351,19 +395,30 @@ def crear_grafico_barras_componentes_detallado(zona_data):
     
     return fig
 
-def crear_indicador_progreso_meta(zona_data, meta_velocidad=25):
+@perfilar()
+@cachear_figura
+def crear_indicador_progreso_meta(zona_data, meta_velocidad=25, estadisticas_zonas=None):
     """
     Crea un indicador de progreso hacia la meta de velocidad
     
     Args:
         zona_data: Datos de la zona seleccionada
         meta_velocidad: Meta de velocidad en Mbps (default: 25)
+        estadisticas_zonas: EstadisticasZonas opcional; añade la mediana del
+                            tipo de zona y extiende la escala hasta su p95
     
     Returns:
         Figura de Plotly
     """
     velocidad_actual = zona_data['velocidad_promedio_mbps']
-    progreso = min((velocidad_actual / meta_velocidad) * 100, 100)
+    maximo_escala = meta_velocidad * 1.2
+    titulo = f"Progreso hacia Meta ({meta_velocidad} Mbps)"
+    
+    if estadisticas_zonas is not None:
+        resumen_tipo = estadisticas_zonas.resumen('velocidad_promedio_mbps', zona_data.get('tipo'))
+        maximo_escala = max(maximo_escala, resumen_tipo['p95'])
+        titulo += (f"<br><span style='font-size:9px;color:gray'>"
+                   f"Mediana {zona_data.get('tipo', 'global')}: {resumen_tipo['p50']:.1f} Mbps</span>")
     
     fig = go.Figure()
     
@@ -371,10 +426,10 @@ def crear_indicador_progreso_meta(zona_data, meta_velocidad=25):
         mode="gauge+number+delta",
         value=velocidad_actual,
         delta={'reference': meta_velocidad, 'relative': False, 'suffix': ' Mbps'},
-        title={'text': f"Progreso hacia Meta ({meta_velocidad} Mbps)", 'font': {'size': 11}},
+        title={'text': titulo, 'font': {'size': 11}},
         number={'suffix': ' Mbps'},
         gauge={
-            'axis': {'range': [None, meta_velocidad * 1.2]},
+            'axis': {'range': [None, maximo_escala]},
             'bar': {'color': "darkblue"},
             'steps': [
                 {'range': [0, meta_velocidad * 0.3], 'color': "#ffcccc"},